@@ -1,2 +1,9 @@
 # backtest/__init__.py
 from .backtester import run_backtest, Backtester  # re-export for convenience
+from .optimizer import optimize, best_results, param_grid_from_config
+from .portfolio import run_portfolio_backtest, PortfolioBacktester
+from .fills import FillModel
+from .replay import ReplayEngine
+from .walk_forward import walk_forward
+from .monte_carlo import monte_carlo
+from .results_store import ResultsStore, get_results_store
@@ -7,17 +7,38 @@ Light-weight historical simulator for strategies that implement   backtest_step(
     "sell"  – open short if flat
     "exit"  – close any open position
     None    – do nothing
+• Strategies may instead implement   backtest_signals(candles) → np.ndarray
+  returning one SIGNAL_* code per candle (see strategies/base_strategy.py).
+  Those run through the vectorised engine: positions, P/L and equity are
+  derived with NumPy cumulative ops instead of a per-candle Python loop.
 • One position at a time (you can extend to multiple later).
-• Uses close price for fills; latency/slippage ignored for now.
+• Fills come from a pluggable execution model (backtest/fills.py): mid
+  close by default; bid/ask spread, slippage/latency distributions and
+  intrabar SL/TP exits from the configured SL/TP strategies and
+  RiskManager position sizing (`position_sizing`) on request.
+• Results hold trades and the equity curve as NumPy record arrays plus
+  "metrics" (Sharpe, Sortino, drawdown, profit factor … – backtest/metrics.py).
 ----------------------------------------------------------------
 """
 
 from datetime import datetime
-import uuid
 import importlib
+import time
+import numpy as np
 import pandas as pd
-from oandapyV20 import API
-from oandapyV20.endpoints.instruments import InstrumentsCandles
+from utils.api_client import get_client
+from utils.candle_downloader import download_range, estimate_start
+from utils.candle_store import MAX_CANDLES_PER_REQUEST, get_candle_store
+from utils.streaming_indicators import IndicatorSet
+from backtest.fills import FillModel, simulate
+from backtest.metrics import (
+    EQUITY_DTYPE,
+    TRADE_DTYPE,
+    equity_records,
+    summary,
+    trade_records,
+)
+from strategies.base_strategy import ACTION_CODES, SIGNAL_NONE
 
 
 class Backtester:
@@ -27,8 +48,9 @@ class Backtester:
         self.granularity = self.cfg["timeframe"]  # e.g. "M15"
         self.initial_balance = float(self.cfg.get("starting_balance", 100_000))
         self.balance = self.initial_balance
-        self.equity_curve = []  # list[dict(time, equity)]
-        self.trades = []  # list[dict(...)]
+        self.equity_curve = np.empty(0, EQUITY_DTYPE)  # records (time, equity)
+        self.trades = np.empty(0, TRADE_DTYPE)  # records, see backtest/metrics.py
+        self.sim = None  # raw simulate() arrays of the last run (backtest/portfolio.py)
 
         # ----- basic validation before we touch OANDA ----------
         if not self.cfg.get("token"):
@@ -38,8 +60,10 @@ class Backtester:
         # load Strategy
         self._load_strategy()
         # build API client only *after* the checks above
-        self.client = API(
-            access_token=self.cfg["token"], environment=self.cfg["environment"]
+        self.client = get_client(self.cfg["token"], self.cfg["environment"])
+        drill = self.cfg.get("drill_down")
+        self.fills = FillModel.from_config(
+            self.cfg, drill_down=self._drill_down_loader(drill) if drill else None
         )
 
     # -------------------------------- private helpers --------------
@@ -55,120 +79,172 @@ class Backtester:
             pair=self.instrument,
             chart_timeframe=self.granularity,
         )
-        if not hasattr(self.strategy, "backtest_step"):
+        # private indicator state – never mix history into the live shared set
+        self.strategy.indicators = IndicatorSet(self.instrument, self.granularity)
+        if not (
+            hasattr(self.strategy, "backtest_step")
+            or hasattr(self.strategy, "backtest_signals")
+        ):
             raise AttributeError(
-                f"{self.cfg['strategy']} must implement backtest_step() "
-                "to be used in backtest mode."
+                f"{self.cfg['strategy']} must implement backtest_step() or "
+                "backtest_signals() to be used in backtest mode."
             )
 
-    # backtest/backtester.py
-    def _fetch_candles(self, count: int = 1000) -> pd.DataFrame:
-        """Return *exactly* `count` completed candles."""
-        params = {"granularity": self.granularity, "count": count + 1, "price": "M"}
-
-        rows = []
-        while len(rows) < count:
-            r = InstrumentsCandles(instrument=self.instrument, params=params)
-            raw = self.client.request(r)["candles"]
-            filled = [c for c in raw if c["complete"]]
-
-            rows.extend(filled)
-            # stop if we have enough, otherwise ask further back in time
-            if len(rows) >= count:
-                rows = rows[-count:]  # keep last `count`
-                break
-            # move the `to` parameter back for next fetch
-            params["to"] = filled[0]["time"]
-
-        return pd.DataFrame(
-            dict(
-                time=c["time"],
-                open=float(c["mid"]["o"]),
-                high=float(c["mid"]["h"]),
-                low=float(c["mid"]["l"]),
-                close=float(c["mid"]["c"]),
+    def _drill_down_loader(self, granularity: str):
+        """(start_ns, end_ns) → lower-granularity columns from the candle store."""
+
+        def load(start_ns, end_ns):
+            return get_candle_store().columns_range(
+                self.client,
+                self.instrument,
+                granularity,
+                start_ns,
+                end_ns,
+                price=self.fills.price,
+                offline=True,  # back-tests may run on the stored history
             )
-            for c in rows
-        )
 
-    # -------------------------------- public API -------------------
-    def run(self, candle_count: int = 1000) -> dict:
-        df = self._fetch_candles(candle_count)
-        position = None  # None or dict(entry_price, dir, entry_time, multiplier)
-
-        for _, candle in df.iterrows():
-            px = candle["close"]
-            self.strategy.current_price = px
-            action = self.strategy.backtest_step(candle)
-
-            # ---- exit logic
-            if position and action in ("exit", "buy", "sell"):
-                pl = (px - position["entry_price"]) * position["multiplier"]
-                self.balance += pl
-                self.trades.append(
-                    {
-                        "id": str(uuid.uuid4())[:8],
-                        "direction": position["dir"],
-                        "entry_price": position["entry_price"],
-                        "exit_price": px,
-                        "pl": pl,
-                        "entry_time": position["entry_time"],
-                        "exit_time": candle["time"],
-                    }
-                )
-                position = None
-                action = (
-                    action if action == "exit" else action
-                )  # continue to possible flip
-
-            # ---- entry logic
-            if not position and action in ("buy", "sell"):
-                position = dict(
-                    dir=action,
-                    entry_price=px,
-                    entry_time=candle["time"],
-                    multiplier=1 if action == "buy" else -1,
-                )
+        return load
 
-            # ---- equity snap
-            eq = self.balance
-            if position:
-                eq += (px - position["entry_price"]) * position["multiplier"]
-            self.equity_curve.append(
-                {
-                    "ts": pd.to_datetime(
-                        candle["time"]
-                    ),  # ↩ could be first, but fine as-is
-                    "time": candle["time"],
-                    "equity": eq,
-                }
+    def _fetch_candles(self, count: int = 1000) -> pd.DataFrame:
+        """
+        Return *exactly* `count` completed candles.
+        Served from the local candle store; only candles newer (or older) than
+        what is already recorded are downloaded. Histories longer than one
+        request are fetched first as concurrent chunks (utils/candle_downloader).
+        """
+        store = get_candle_store()
+        if count > MAX_CANDLES_PER_REQUEST:
+            end = time.time_ns()
+            try:
+                download_range(
+                    self.client,
+                    self.instrument,
+                    self.granularity,
+                    estimate_start(self.granularity, count, end),
+                    end,
+                    price=self.fills.price,
+                    store=store,
+                )
+            except Exception as e:
+                print(f"[Backtester] Bulk download failed, paging instead: {e}")
+        df = store.candles(
+            self.client,
+            self.instrument,
+            self.granularity,
+            count,
+            self.fills.price,
+            offline=True,
+        )
+        if len(df) < count:
+            print(
+                f"[Backtester] Only {len(df)} of {count} candles available "
+                f"for {self.instrument} {self.granularity}."
             )
-
-        # force-close any last open position at final candle
-        if position:
-            px = df.iloc[-1]["close"]
-            pl = (px - position["entry_price"]) * position["multiplier"]
-            self.balance += pl
-            self.trades.append(
-                {
-                    "id": str(uuid.uuid4())[:8],
-                    "direction": position["dir"],
-                    "entry_price": position["entry_price"],
-                    "exit_price": px,
-                    "pl": pl,
-                    "entry_time": position["entry_time"],
-                    "exit_time": df.iloc[-1]["time"],
-                }
+        return df
+
+    def _fetch_candle_range(self, start, end) -> pd.DataFrame:
+        """Completed candles with start <= time <= end, downloaded in chunks."""
+        store = get_candle_store()
+        try:
+            download_range(
+                self.client,
+                self.instrument,
+                self.granularity,
+                start,
+                end,
+                price=self.fills.price,
+                store=store,
             )
+        except Exception as e:
+            print(f"[Backtester] Bulk download failed, paging instead: {e}")
+        return store.candles_range(
+            self.client,
+            self.instrument,
+            self.granularity,
+            start,
+            end,
+            self.fills.price,
+            offline=True,
+        )
 
+    def _results(self) -> dict:
         return {
             "initial_balance": self.initial_balance,
             "final_balance": self.balance,
             "profit": self.balance - self.initial_balance,
             "trades": self.trades,
             "equity_curve": self.equity_curve,
+            "metrics": summary(self.equity_curve, self.trades),
         }
 
+    def _run_loop(self, df: pd.DataFrame) -> dict:
+        """
+        Per-candle path for strategies that only implement backtest_step():
+        the strategy is stepped candle by candle, its actions become signal
+        codes and fills/P&L go through the same whole-array engine.
+        """
+        signals = np.full(len(df), SIGNAL_NONE, dtype=np.int64)
+        for i, (_, candle) in enumerate(df.iterrows()):
+            self.strategy.current_price = candle["close"]
+            self.strategy.indicators.update(candle)
+            signals[i] = ACTION_CODES.get(
+                self.strategy.backtest_step(candle), SIGNAL_NONE
+            )
+        return self._simulate(df, signals)
+
+    def _run_vectorized(self, df: pd.DataFrame) -> dict:
+        """Whole-array path for strategies implementing backtest_signals()."""
+        signals = np.asarray(self.strategy.backtest_signals(df)) if len(df) else None
+        return self._simulate(df, signals)
+
+    def _simulate(self, df: pd.DataFrame, signals: np.ndarray) -> dict:
+        """
+        Signals → trades, balance and equity through backtest/fills.simulate();
+        with the default "mid" model and no SL/TP every fill is the candle close.
+        """
+        n = len(df)
+        if n == 0:
+            return self._results()
+        if signals.shape != (n,):
+            raise ValueError(
+                f"[Backtester] backtest_signals() returned shape {signals.shape}, "
+                f"expected ({n},)."
+            )
+
+        sim = self.sim = simulate(df, signals, self.fills, self.initial_balance)
+        times = pd.DatetimeIndex(pd.to_datetime(df["time"], utc=True))
+        times = times.as_unit("ns").asi8
+        self.balance = float(sim["balance"][-1])
+        self.trades = trade_records(sim, times)
+        self.equity_curve = equity_records(times, sim["equity"])
+        return self._results()
 
-def run_backtest(config: dict, candle_count: int = 1000):
-    return Backtester(config).run(candle_count)
+    # -------------------------------- public API -------------------
+    def run(self, candle_count: int = 1000, candles: pd.DataFrame = None) -> dict:
+        """Back-test over the last `candle_count` candles, or a preloaded frame."""
+        df = self._fetch_candles(candle_count) if candles is None else candles
+        if hasattr(self.strategy, "backtest_signals"):
+            return self._run_vectorized(df)
+        return self._run_loop(df)
+
+
+def run_backtest(config: dict, candle_count: int = 1000, store=None):
+    """
+    Back-test `config`; with a backtest/results_store.ResultsStore an
+    identical earlier run (same parameters, strategy code and candles) is
+    returned from the store, and new runs are saved to it. Runs with
+    `drill_down` are always re-run: the lower-granularity candles they read
+    are not part of the run_id.
+    """
+    bt = Backtester(config)
+    if store is None:
+        return bt.run(candle_count)
+    candles = bt._fetch_candles(candle_count)
+    cached = None if config.get("drill_down") else store.cached(config, candles)
+    if cached is not None:
+        print(f"[Backtester] Stored result {cached['run_id']} reused.")
+        return cached
+    results = bt.run(candles=candles)
+    results["run_id"] = store.save(config, results, candles)
+    return results
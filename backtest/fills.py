@@ -0,0 +1,461 @@
+# backtest/fills.py
+"""
+Execution model for the back-tester – where market and SL/TP orders fill.
+
+• Spread: "mid" fills at the mid close (the original behaviour), "bid_ask"
+  buys at the ask and sells at the bid of price="MBA" candles, "spread"
+  puts a fixed `spread_pips` around mid when only mid candles are at hand.
+• Slippage: adverse, in pips, drawn per market fill from a configurable
+  distribution (fixed / normal / uniform / exponential, seeded).
+• Latency: ms between the signal candle's close and the fill; the fill price
+  moves towards the next close by latency / candle length.
+• SL/TP: levels from the compiled core/trade_plan rules, set at entry
+  ("Trailing SL" trails the best price of the candles already closed). Hits
+  are found intrabar from bid (long) / ask (short) high and low; a candle
+  that opens beyond a level fills at its open. When both levels lie inside
+  one candle, lower-granularity candles decide (`drill_down`), otherwise the
+  stop is assumed to come first.
+• Sizing: with `position_sizing` trades carry RiskManager units computed
+  from the same stops for every trade at once; otherwise 1 unit (P/L in
+  price units, the original behaviour).
+• All of it is whole-array NumPy over the candles trades actually hold – no
+  per-candle Python.
+
+Config keys (all optional – none of them → mid-close fills, no SL/TP)
+-----------
+fill_model      "mid" | "bid_ask" | "spread"
+spread_pips     spread for "spread"
+slippage_pips   number, or {"dist": "normal", "mean": 0.2, "std": 0.1}
+latency_ms      number, or a distribution dict as above
+fill_seed       RNG seed for slippage / latency draws
+use_sl_tp       default: on when sl_strategy or tp_strategy is configured
+drill_down      lower granularity for ambiguous candles, e.g. "M1"
+position_sizing size every trade like RiskManager (risk_per_trade % of
+                starting_balance down to its stop) instead of 1 unit
+
+Usage
+-----
+>>> model = FillModel.from_config(cfg)
+>>> entry_px = model.entry_prices(candles, entries, dirs)
+>>> sl, tp = model.levels(candles, entries, dirs, entry_px)
+>>> bars, px, reason = model.intrabar_exits(candles, entries, ends, dirs, sl, tp)
+>>> sim = simulate(candles, signals, model, initial_balance=100_000)
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.candle_scheduler import GRANULARITY_SECONDS
+from core.trade_plan import TradePlan
+from strategies.base_strategy import SIGNAL_BUY, SIGNAL_NONE, SIGNAL_SELL
+from utils.indicator_kernels import ema
+from utils.price_tools import get_pip_value
+
+# ------------------------ config -------------------------------------------------
+FILL_MODES = ("mid", "bid_ask", "spread")
+DISTRIBUTIONS = ("fixed", "normal", "uniform", "exponential")
+REASON_SIGNAL, REASON_SL, REASON_TP, REASON_END = "signal", "sl", "tp", "end"
+# ---------------------------------------------------------------------------------
+
+Sampler = Callable[[np.random.Generator, int], np.ndarray]
+
+
+def distribution(spec) -> Sampler:
+    """
+    Number → fixed value; dict → {"dist": "fixed"|"normal"|"uniform"|
+    "exponential", "mean"/"std" or "low"/"high" or "value"}.
+    Returns sample(rng, n) → ndarray.
+    """
+    if spec is None or isinstance(spec, (int, float)):
+        value = float(spec or 0.0)
+        return lambda rng, n: np.full(n, value)
+    kind = spec.get("dist", "fixed")
+    if kind == "fixed":
+        value = float(spec.get("value", spec.get("mean", 0.0)))
+        return lambda rng, n: np.full(n, value)
+    if kind == "normal":
+        mean, std = float(spec.get("mean", 0.0)), float(spec.get("std", 0.0))
+        return lambda rng, n: rng.normal(mean, std, n)
+    if kind == "uniform":
+        low, high = float(spec.get("low", 0.0)), float(spec.get("high", 0.0))
+        return lambda rng, n: rng.uniform(low, high, n)
+    if kind == "exponential":
+        mean = float(spec.get("mean", 0.0))
+        return lambda rng, n: rng.exponential(mean, n)
+    raise ValueError(
+        f"[Fills] Unknown distribution {kind!r}; use one of {DISTRIBUTIONS}"
+    )
+
+
+def spans(starts: np.ndarray, stops: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Concatenated ranges [starts[k], stops[k]) → (candle index, owner k) per
+    row, in order – the candles each trade holds, without a Python loop.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.maximum(np.asarray(stops, dtype=np.int64) - starts, 0)
+    owner = np.repeat(np.arange(len(starts)), lengths)
+    offset = np.arange(int(lengths.sum())) - np.repeat(
+        np.cumsum(lengths) - lengths, lengths
+    )
+    return np.repeat(starts, lengths) + offset, owner
+
+
+def _col(candles, name: str) -> np.ndarray:
+    try:
+        return np.asarray(candles[name], dtype=float)
+    except (KeyError, ValueError) as e:
+        raise ValueError(
+            f"[Fills] Candles lack a '{name}' column – fetch price='MBA' for bid/ask fills."
+        ) from e
+
+
+def _times_ns(candles) -> np.ndarray:
+    t = np.asarray(candles["time"])
+    if t.dtype.kind in "iu":
+        return t.astype(np.int64)
+    return pd.DatetimeIndex(pd.to_datetime(t, utc=True)).as_unit("ns").asi8
+
+
+def strategy_levels(config: dict) -> Callable:
+    """
+    levels(candles, entries, dirs, entry_px) → (sl, tp) from the compiled
+    core/trade_plan.TradePlan the live strategy uses, for all trades in one
+    array pass; NaN = none.
+    """
+    use_sl = "sl_strategy" in config
+    use_tp = "tp_strategy" in config
+    plan = TradePlan.from_config(config, sizing=False)
+
+    def levels(candles, entries, dirs, entry_px):
+        sl = np.full(len(entries), np.nan)
+        tp = np.full(len(entries), np.nan)
+        if use_sl:
+            emas = None
+            if plan.sl_rule == "EMA-Based SL":  # EMA still warming up → no stop
+                emas = ema(_col(candles, "close"), plan.ema_period)[entries]
+            sl = plan.stops(entry_px, dirs, emas)
+        if use_tp:
+            tp = plan.targets(entry_px, dirs, sl)
+        return sl, tp
+
+    return levels
+
+
+def strategy_sizes(config: dict) -> Callable:
+    """
+    sizes(entry_px, sl) → units per trade from RiskManager's rule (risk_per_trade
+    % of starting_balance down to each stop) for all trades in one pass.
+    """
+    balance = config.get("starting_balance", 100_000)
+    plan = TradePlan.from_config({**config, "account_balance": balance})
+    return plan.sizes
+
+
+class FillModel:
+    def __init__(
+        self,
+        mode: str = "mid",
+        spread_pips: float = 0.0,
+        slippage_pips=0.0,
+        latency_ms=0.0,
+        pip: float = 0.0001,
+        bar_seconds: float = 60.0,
+        levels: Optional[Callable] = None,
+        trailing_pips: Optional[float] = None,
+        sizes: Optional[Callable] = None,
+        drill_down: Optional[Callable[[int, int], Dict[str, np.ndarray]]] = None,
+        seed: Optional[int] = None,
+    ):
+        if mode not in FILL_MODES:
+            raise ValueError(
+                f"[Fills] Unknown fill model {mode!r}; use one of {FILL_MODES}"
+            )
+        self.mode = mode
+        self.spread_pips = float(spread_pips)
+        self.slippage = distribution(slippage_pips)
+        self.latency = distribution(latency_ms)
+        self.pip = pip
+        self.bar_seconds = bar_seconds
+        self.level_fn = levels
+        self.trailing_pips = trailing_pips
+        self.size_fn = sizes
+        self.drill_down = drill_down  # (start_ns, end_ns) → lower-granularity columns
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_config(cls, config: dict, drill_down=None) -> "FillModel":
+        use_sl_tp = config.get(
+            "use_sl_tp", "sl_strategy" in config or "tp_strategy" in config
+        )
+        sizing = config.get("position_sizing", False)
+        if sizing and not (use_sl_tp and "sl_strategy" in config):
+            raise ValueError("[Fills] position_sizing needs an sl_strategy to size to.")
+        trailing = None
+        if use_sl_tp and config.get("sl_strategy") == "Trailing SL":
+            trailing = float(config.get("trailing_distance", 10))
+        return cls(
+            mode=config.get("fill_model", "mid"),
+            spread_pips=config.get("spread_pips", 0.0),
+            slippage_pips=config.get("slippage_pips", 0.0),
+            latency_ms=config.get("latency_ms", 0.0),
+            pip=get_pip_value(config.get("pair", "")),
+            bar_seconds=GRANULARITY_SECONDS.get(config.get("timeframe"), 60),
+            levels=strategy_levels(config) if use_sl_tp else None,
+            trailing_pips=trailing,
+            sizes=strategy_sizes(config) if sizing else None,
+            drill_down=drill_down,
+            seed=config.get("fill_seed"),
+        )
+
+    @property
+    def price(self) -> str:
+        """Candle price components this model needs from the store."""
+        return "MBA" if self.mode == "bid_ask" else "M"
+
+    # -------------------------------- prices -------------------------------
+    def side_prices(self, candles, side: str, field: str) -> np.ndarray:
+        """`field` (open/high/low/close) as paid on `side` ("ask" or "bid")."""
+        if self.mode == "bid_ask":
+            return _col(candles, f"{side}_{field}")
+        mid = _col(candles, field)
+        if self.mode == "spread":
+            half = self.spread_pips * self.pip / 2
+            return mid + half if side == "ask" else mid - half
+        return mid
+
+    def _market(self, candles, idx, buying) -> np.ndarray:
+        """Market fills after the candles at `idx` close; buying → ask side."""
+        ask = self.side_prices(candles, "ask", "close")
+        bid = self.side_prices(candles, "bid", "close")
+        px = np.where(buying, ask[idx], bid[idx])
+        n = len(idx)
+        if n == 0:
+            return px
+        latency = np.maximum(self.latency(self.rng, n), 0.0)
+        if latency.any():
+            frac = np.minimum(latency / (self.bar_seconds * 1000.0), 1.0)
+            nxt = np.minimum(idx + 1, len(ask) - 1)
+            px = px + (np.where(buying, ask[nxt], bid[nxt]) - px) * frac
+        slip = self.slippage(self.rng, n)
+        if slip.any():
+            px = px + np.where(buying, slip, -slip) * self.pip
+        return px
+
+    def entry_prices(self, candles, idx: np.ndarray, dirs: np.ndarray) -> np.ndarray:
+        return self._market(candles, idx, dirs > 0)
+
+    def exit_prices(self, candles, idx: np.ndarray, dirs: np.ndarray) -> np.ndarray:
+        return self._market(candles, idx, dirs < 0)
+
+    def marks(self, candles, dirs: np.ndarray) -> np.ndarray:
+        """Per-candle liquidation price of a position held in `dirs`."""
+        return np.where(
+            dirs < 0,
+            self.side_prices(candles, "ask", "close"),
+            self.side_prices(candles, "bid", "close"),
+        )
+
+    # -------------------------------- SL / TP ------------------------------
+    def levels(self, candles, entries, dirs, entry_px) -> Tuple[np.ndarray, np.ndarray]:
+        if self.level_fn is None or len(entries) == 0:
+            nan = np.full(len(entries), np.nan)
+            return nan, nan.copy()
+        sl, tp = self.level_fn(candles, entries, dirs, entry_px)
+        return np.asarray(sl, dtype=float), np.asarray(tp, dtype=float)
+
+    def units(self, entry_px, sl) -> np.ndarray:
+        """Units per trade: 1 (P/L in price units) unless position sizing is on."""
+        if self.size_fn is None:
+            return np.ones(len(entry_px))
+        return np.asarray(self.size_fn(entry_px, sl), dtype=float)
+
+    def intrabar_exits(self, candles, entries, ends, dirs, sl, tp):
+        """
+        First candle in (entry, end] touching SL or TP for every trade.
+        Returns (candle index or -1, fill price, reason) arrays.
+        """
+        n_trades = len(entries)
+        hit_bar = np.full(n_trades, -1, dtype=np.int64)
+        hit_px = np.full(n_trades, np.nan)
+        reason = np.full(n_trades, REASON_SIGNAL, dtype=object)
+        armed = np.flatnonzero(~(np.isnan(sl) & np.isnan(tp)))
+        if len(armed) == 0:
+            return hit_bar, hit_px, reason
+
+        bars, row_owner = spans(entries[armed] + 1, ends[armed] + 1)
+        owner = armed[row_owner]
+        d = dirs[owner]
+        long = d > 0
+        side = {
+            f: np.where(
+                long,
+                self.side_prices(candles, "bid", f)[bars],
+                self.side_prices(candles, "ask", f)[bars],
+            )
+            for f in ("open", "high", "low")
+        }
+        stop, target = sl[owner], tp[owner]
+        if self.trailing_pips is not None:
+            stop = self._trail(stop, side, long, row_owner)
+
+        sl_hit = np.where(long, side["low"] <= stop, side["high"] >= stop)
+        tp_hit = np.where(long, side["high"] >= target, side["low"] <= target)
+        rows = np.flatnonzero(sl_hit | tp_hit)
+        if len(rows) == 0:
+            return hit_bar, hit_px, reason
+        _, first = np.unique(row_owner[rows], return_index=True)
+        r = rows[first]  # first touching row of each trade that got hit
+
+        opn, lg = side["open"][r], long[r]
+        gap_sl = sl_hit[r] & np.where(lg, opn <= stop[r], opn >= stop[r])
+        gap_tp = tp_hit[r] & np.where(lg, opn >= target[r], opn <= target[r])
+        stop_first = sl_hit[r] & ~tp_hit[r] | gap_sl
+        ambiguous = sl_hit[r] & tp_hit[r] & ~gap_sl & ~gap_tp
+        if ambiguous.any():
+            stop_first[ambiguous] = self._stop_first_intrabar(
+                candles,
+                bars[r][ambiguous],
+                lg[ambiguous],
+                stop[r][ambiguous],
+                target[r][ambiguous],
+            )
+
+        slip = self.slippage(self.rng, len(r)) * self.pip  # stops fill as market
+        stop_px = np.where(
+            lg, np.minimum(stop[r], opn) - slip, np.maximum(stop[r], opn) + slip
+        )
+        target_px = np.where(lg, np.maximum(target[r], opn), np.minimum(target[r], opn))
+        trades = owner[r]
+        hit_bar[trades] = bars[r]
+        hit_px[trades] = np.where(stop_first, stop_px, target_px)
+        reason[trades] = np.where(stop_first, REASON_SL, REASON_TP)
+        return hit_bar, hit_px, reason
+
+    def _trail(self, stop, side, long, row_owner):
+        """Stop ratcheted behind the best price of the previous held candles."""
+        best = np.where(long, side["high"], -side["low"])
+        prev = (
+            pd.Series(best).groupby(row_owner).cummax().groupby(row_owner).shift(1)
+        ).to_numpy()
+        dist = self.trailing_pips * self.pip
+        trail = np.where(long, prev - dist, -prev + dist)
+        moved = np.where(long, np.fmax(stop, trail), np.fmin(stop, trail))
+        return np.where(np.isnan(prev), stop, moved)
+
+    def _stop_first_intrabar(self, candles, bars, long, stop, target) -> np.ndarray:
+        """
+        Order of SL vs TP inside candles where both were touched: replayed on
+        lower-granularity candles when available, else the stop (pessimistic).
+        """
+        stop_first = np.ones(len(bars), dtype=bool)
+        if self.drill_down is None:
+            return stop_first
+        starts = _times_ns(candles)[bars]
+        width = int(self.bar_seconds * 1e9)
+        sub = self.drill_down(int(starts.min()), int(starts.max()) + width - 1)
+        if sub is None or len(sub["time"]) == 0:
+            return stop_first
+
+        sub_t = _times_ns(sub)
+        order = np.argsort(starts, kind="stable")
+        pos = np.searchsorted(starts[order], sub_t, side="right") - 1
+        inside = pos >= 0
+        parent = order[np.maximum(pos, 0)]
+        inside &= sub_t < starts[parent] + width
+        rows, parent = np.flatnonzero(inside), parent[inside]
+
+        lg = long[parent]
+        hi = np.where(
+            lg,
+            self.side_prices(sub, "bid", "high")[rows],
+            self.side_prices(sub, "ask", "high")[rows],
+        )
+        lo = np.where(
+            lg,
+            self.side_prices(sub, "bid", "low")[rows],
+            self.side_prices(sub, "ask", "low")[rows],
+        )
+        s, t = stop[parent], target[parent]
+        sl_hit = np.where(lg, lo <= s, hi >= s)
+        tp_hit = np.where(lg, hi >= t, lo <= t)
+        touched = np.flatnonzero(sl_hit | tp_hit)
+        if len(touched):
+            first_parent, first = np.unique(parent[touched], return_index=True)
+            # both inside the same lower candle as well → still the stop
+            stop_first[first_parent] = sl_hit[touched[first]]
+        return stop_first
+
+
+def simulate(candles, signals: np.ndarray, model: FillModel, initial_balance: float):
+    """
+    Whole-array trade engine of the back-tester (backtest/backtester.py).
+    Every non-NONE signal closes the open position, BUY/SELL then (re)open
+    after that close; prices, SL/TP exits and marks come from `model`.
+
+    Returns arrays: entries / exits (row index), dirs (+1/-1), units,
+    entry_price, exit_price, sl / tp at entry (NaN = none), pl, reason per
+    trade and balance / equity per row.
+    """
+    n = len(signals)
+    acting = np.flatnonzero(signals != SIGNAL_NONE)
+    entries = np.flatnonzero((signals == SIGNAL_BUY) | (signals == SIGNAL_SELL))
+    nxt = np.searchsorted(acting, entries, side="right")
+    closed = nxt < len(acting)
+    ends = np.where(closed, acting[np.minimum(nxt, len(acting) - 1)], n - 1)
+    dirs = np.where(signals[entries] == SIGNAL_BUY, 1, -1)
+
+    entry_px = model.entry_prices(candles, entries, dirs)
+    sl, tp = model.levels(candles, entries, dirs, entry_px)
+    units = model.units(entry_px, sl)
+    hit_bar, hit_px, reason = model.intrabar_exits(candles, entries, ends, dirs, sl, tp)
+    hit = hit_bar >= 0
+    exits = np.where(hit, hit_bar, ends)
+    exit_px = np.where(hit, hit_px, model.exit_prices(candles, ends, dirs))
+    reason[~hit & ~closed] = REASON_END
+    pls = (exit_px - entry_px) * dirs * units
+
+    realised = np.zeros(n + 1)
+    realised[0] = initial_balance  # seed → sequential summation order
+    np.add.at(realised, exits + 1, pls)
+    balance = np.cumsum(realised)[1:]
+
+    # ---- equity = balance + open P/L of the rows each trade holds
+    held, owner = spans(entries, exits)
+    held_dir = np.zeros(n, dtype=np.int64)
+    held_dir[held] = dirs[owner]
+    unrealised = np.zeros(n)
+    unrealised[held] = (
+        (model.marks(candles, held_dir)[held] - entry_px[owner])
+        * dirs[owner]
+        * units[owner]
+    )
+    return {
+        "entries": entries,
+        "exits": exits,
+        "dirs": dirs,
+        "units": units,
+        "entry_price": entry_px,
+        "exit_price": exit_px,
+        "sl": sl,
+        "tp": tp,
+        "pl": pls,
+        "reason": reason,
+        "balance": balance,
+        "equity": balance + unrealised,
+    }
+
+
+__all__ = [
+    "FillModel",
+    "distribution",
+    "simulate",
+    "spans",
+    "strategy_levels",
+    "strategy_sizes",
+    "FILL_MODES",
+]
@@ -0,0 +1,341 @@
+# backtest/metrics.py
+"""
+Performance statistics on columnar back-test results
+----------------------------------------------------------------
+• Back-test results are compact NumPy record arrays instead of lists of
+  dicts:
+    equity_curve – EQUITY_DTYPE (time datetime64[ns] UTC, equity f8),
+                   16 bytes per candle
+    trades       – TRADE_DTYPE, one record per round trip
+  Both index like the old form (curve[-1]["equity"], trade["pl"]) and
+  give whole columns (curve["equity"], trades["pl"]) without copying.
+• Every statistic is a few whole-array NumPy passes, so a 10M-point curve
+  takes milliseconds:
+    sharpe / sortino            – per-bar returns, annualised with the
+                                  curve's own bars per year
+    max_drawdown (+ % of peak)  – one maximum.accumulate; each new high
+    drawdown_duration             starts a run, minimum.reduceat its depth
+    profit_factor / expectancy / win_rate – per-trade P/L
+    exposure                    – share of the curve's time in a position
+• rolling_* versions return arrays aligned with their input (NaN until the
+  first full window); window sums use cumsum differences and window maxima
+  the van Herk / Gil-Werman block trick – O(n) whatever the window.
+----------------------------------------------------------------
+Usage
+-----
+>>> from backtest.metrics import summary, rolling_sharpe, returns
+>>> stats = summary(results["equity_curve"], results["trades"])
+>>> rolling_sharpe(returns(results["equity_curve"]["equity"]), 500)
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+# ------------------------ config -------------------------------------------------
+YEAR_NS = int(365.25 * 86400 * 10**9)
+EQUITY_DTYPE = np.dtype([("time", "datetime64[ns]"), ("equity", "f8")])
+TRADE_DTYPE = np.dtype(
+    [
+        ("id", "U8"),
+        ("direction", "U4"),
+        ("units", "f8"),
+        ("entry_price", "f8"),
+        ("exit_price", "f8"),
+        ("pl", "f8"),
+        ("entry_time", "datetime64[ns]"),
+        ("exit_time", "datetime64[ns]"),
+        ("exit_reason", "U6"),
+    ]
+)
+# ---------------------------------------------------------------------------------
+
+
+# ------------------------ columnar results ---------------------------------------
+def equity_records(time_ns, equity) -> np.ndarray:
+    """Equity curve record array from epoch-ns times and equity values."""
+    out = np.empty(len(equity), dtype=EQUITY_DTYPE)
+    out["time"] = np.asarray(time_ns, dtype=np.int64).view("datetime64[ns]")
+    out["equity"] = equity
+    return out
+
+
+def trade_records(sim: dict, time_ns) -> np.ndarray:
+    """Trade record array from backtest/fills.simulate() output."""
+    time_ns = np.asarray(time_ns, dtype=np.int64)
+    n = len(sim["pl"])
+    out = np.empty(n, dtype=TRADE_DTYPE)
+    out["id"] = np.char.mod(
+        "%08x", np.random.default_rng().integers(0, 1 << 32, n, dtype=np.uint64)
+    )
+    out["direction"] = np.where(sim["dirs"] > 0, "buy", "sell")
+    out["units"] = sim.get("units", 1.0)
+    out["entry_price"] = sim["entry_price"]
+    out["exit_price"] = sim["exit_price"]
+    out["pl"] = sim["pl"]
+    out["entry_time"] = time_ns[sim["entries"]].view("datetime64[ns]")
+    out["exit_time"] = time_ns[sim["exits"]].view("datetime64[ns]")
+    out["exit_reason"] = sim["reason"]
+    return out
+
+
+def _ns(time) -> np.ndarray:
+    return np.asarray(time).astype("datetime64[ns]", copy=False).view(np.int64)
+
+
+# ------------------------ whole-curve statistics ---------------------------------
+def returns(equity: np.ndarray) -> np.ndarray:
+    """Simple per-bar returns (len n-1)."""
+    equity = np.asarray(equity, dtype=float)
+    out = np.divide(equity[1:], equity[:-1])
+    out -= 1.0
+    return out
+
+
+def periods_per_year(time) -> float:
+    """Bars per year actually present in `time` (weekends/gaps included)."""
+    t = _ns(time)
+    span = t[-1] - t[0] if len(t) > 1 else 0
+    return (len(t) - 1) * YEAR_NS / span if span > 0 else 1.0
+
+
+def sharpe(rets: np.ndarray, periods: float = 1.0, risk_free: float = 0.0) -> float:
+    """Annualised Sharpe ratio; `risk_free` is per year."""
+    n = len(rets)
+    if n < 2:
+        return 0.0
+    mean = rets.sum() / n
+    var = max(np.dot(rets, rets) - n * mean * mean, 0.0) / (n - 1)  # one pass
+    std = np.sqrt(var)
+    excess = mean - risk_free / periods
+    return float(excess / std * np.sqrt(periods)) if std > 0 else 0.0
+
+
+def sortino(rets: np.ndarray, periods: float = 1.0, risk_free: float = 0.0) -> float:
+    """Annualised Sortino ratio (downside deviation below `risk_free`)."""
+    n = len(rets)
+    if n < 2:
+        return 0.0
+    floor = risk_free / periods
+    below = np.minimum(rets, floor)
+    below -= floor
+    downside = np.sqrt(np.dot(below, below) / n)
+    excess = rets.sum() / n - floor
+    return float(excess / downside * np.sqrt(periods)) if downside > 0 else 0.0
+
+
+def _drawdowns(equity: np.ndarray, time=None):
+    """
+    (max drop, max drop ÷ peak, longest bars under water, its elapsed time)
+    from one running-peak pass: every new high starts a run, and the run's
+    depth is its peak minus minimum.reduceat() over the run.
+    """
+    equity = np.asarray(equity, dtype=float)
+    if not len(equity):
+        return 0.0, 0.0, 0, None if time is None else np.timedelta64(0, "ns")
+    starts = np.flatnonzero(equity >= np.maximum.accumulate(equity))
+    ends = np.append(starts[1:], len(equity)) - 1  # last bar of each run
+    highs = equity[starts]
+    lows = np.minimum.reduceat(equity, starts)
+    elapsed = None
+    if time is not None:
+        t = _ns(time)
+        elapsed = np.timedelta64(int((t[ends] - t[starts]).max()), "ns")
+    return (
+        float((highs - lows).max()),
+        float((1.0 - lows / highs).max()),
+        int((ends - starts).max()),
+        elapsed,
+    )
+
+
+def max_drawdown(equity: np.ndarray):
+    """(deepest drop from a running peak, same as a fraction of that peak)."""
+    return _drawdowns(equity)[:2]
+
+
+def drawdown_duration(equity: np.ndarray, time=None):
+    """
+    Longest stretch below a previous peak: bars, and the elapsed
+    np.timedelta64 (peak → last bar under water) when `time` is given.
+    """
+    return _drawdowns(equity, time)[2:]
+
+
+def profit_factor(pl: np.ndarray) -> float:
+    """Gross profit ÷ gross loss (inf with no losing trade, 0 with no winner)."""
+    gain = pl[pl > 0].sum()
+    loss = -pl[pl < 0].sum()
+    if loss > 0:
+        return float(gain / loss)
+    return float("inf") if gain > 0 else 0.0
+
+
+def expectancy(pl: np.ndarray) -> float:
+    """Mean P/L per trade."""
+    return float(pl.mean()) if len(pl) else 0.0
+
+
+def win_rate(pl: np.ndarray) -> float:
+    return float((pl > 0).mean()) if len(pl) else 0.0
+
+
+def in_market(time, trades: np.ndarray) -> np.ndarray:
+    """Bool per curve bar: a position was open (entry <= t < exit)."""
+    t = _ns(time)
+    opened = np.zeros(len(t) + 1, dtype=np.int32)
+    np.add.at(opened, np.searchsorted(t, _ns(trades["entry_time"])), 1)
+    np.add.at(opened, np.searchsorted(t, _ns(trades["exit_time"])), -1)
+    return np.cumsum(opened[:-1], dtype=np.int32) > 0
+
+
+def exposure(time, trades: np.ndarray) -> float:
+    """Share of the curve's time span spent in a position."""
+    t = _ns(time)
+    span = t[-1] - t[0] if len(t) > 1 else 0
+    if span <= 0 or not len(trades):
+        return 0.0
+    held = (_ns(trades["exit_time"]) - _ns(trades["entry_time"])).sum()
+    return float(min(held / span, 1.0))
+
+
+# ------------------------ rolling windows ----------------------------------------
+def _window_sums(x: np.ndarray, window: int) -> np.ndarray:
+    """Trailing `window` sums aligned with x (NaN before the first full one)."""
+    if window < 1:
+        raise ValueError("[Metrics] window must be >= 1.")
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        c = np.cumsum(x, dtype=float)
+        out[window - 1] = c[window - 1]
+        np.subtract(c[window:], c[:-window], out=out[window:])
+    return out
+
+
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    """Trailing `window` maximum, O(n) (van Herk / Gil-Werman)."""
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    if window < 1:
+        raise ValueError("[Metrics] window must be >= 1.")
+    out = np.full(n, np.nan)
+    if n < window:
+        return out
+    blocks = -(-n // window)
+    padded = np.full(blocks * window, -np.inf)
+    padded[:n] = x
+    grid = padded.reshape(blocks, window)
+    prefix = np.maximum.accumulate(grid, axis=1).ravel()
+    suffix = np.maximum.accumulate(grid[:, ::-1], axis=1)[:, ::-1].ravel()
+    # window [i, i+w-1] = suffix of i's block ∪ prefix of (i+w-1)'s block
+    np.maximum(suffix[: n - window + 1], prefix[window - 1 : n], out=out[window - 1 :])
+    return out
+
+
+def _ratio(num: np.ndarray, den: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    """num / den * scale; 0 where den == 0 (flat window), NaN stays NaN."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.divide(num, den)
+    out *= scale
+    out[den == 0] = 0.0
+    return out
+
+
+def rolling_sharpe(rets: np.ndarray, window: int, periods: float = 1.0):
+    offset = rets.mean() if len(rets) else 0.0
+    work = rets - offset  # small sums → no cancellation in the variance
+    mean = _window_sums(work, window) / window
+    work *= work
+    var = _window_sums(work, window)
+    np.multiply(mean, mean, out=work)
+    work *= window
+    var -= work  # Σx² - w·mean²
+    np.maximum(var, 0.0, out=var)
+    var /= max(window - 1, 1)
+    mean += offset
+    return _ratio(mean, np.sqrt(var, out=var), np.sqrt(periods))
+
+
+def rolling_sortino(rets: np.ndarray, window: int, periods: float = 1.0):
+    mean = _window_sums(rets, window) / window
+    below = np.minimum(rets, 0.0)
+    below *= below
+    downside = _window_sums(below, window) / window
+    np.maximum(downside, 0.0, out=downside)
+    return _ratio(mean, np.sqrt(downside, out=downside), np.sqrt(periods))
+
+
+def rolling_drawdown(equity: np.ndarray, window: int) -> np.ndarray:
+    """Drop from the highest equity of the trailing `window` bars."""
+    out = rolling_max(equity, window)
+    out -= equity
+    return out
+
+
+def rolling_profit_factor(pl: np.ndarray, window: int) -> np.ndarray:
+    """Profit factor of the trailing `window` trades."""
+    gain = _window_sums(np.maximum(pl, 0.0), window)
+    loss = _window_sums(np.maximum(-pl, 0.0), window)
+    return np.where((loss == 0) & (gain > 0), np.inf, _ratio(gain, loss))
+
+
+def rolling_expectancy(pl: np.ndarray, window: int) -> np.ndarray:
+    return _window_sums(pl, window) / window
+
+
+def rolling_exposure(time, trades: np.ndarray, window: int) -> np.ndarray:
+    """Share of the trailing `window` bars with a position open."""
+    return _window_sums(in_market(time, trades).astype(float), window) / window
+
+
+# ------------------------ report -------------------------------------------------
+def summary(equity_curve: np.ndarray, trades: np.ndarray) -> dict:
+    """Every whole-curve statistic for one back-test's columnar results."""
+    equity = equity_curve["equity"]
+    pl = trades["pl"]
+    periods = periods_per_year(equity_curve["time"])
+    rets = returns(equity)
+    dd, dd_pct, dd_bars, dd_time = _drawdowns(equity, equity_curve["time"])
+    return {
+        "bars": len(equity),
+        "trades": len(pl),
+        "total_return": float(equity[-1] / equity[0] - 1.0) if len(equity) else 0.0,
+        "sharpe": sharpe(rets, periods),
+        "sortino": sortino(rets, periods),
+        "max_drawdown": dd,
+        "max_drawdown_pct": dd_pct,
+        "drawdown_bars": dd_bars,
+        "drawdown_duration": dd_time,
+        "profit_factor": profit_factor(pl),
+        "expectancy": expectancy(pl),
+        "win_rate": win_rate(pl),
+        "exposure": exposure(equity_curve["time"], trades),
+        "periods_per_year": periods,
+    }
+
+
+__all__ = [
+    "EQUITY_DTYPE",
+    "TRADE_DTYPE",
+    "drawdown_duration",
+    "equity_records",
+    "exposure",
+    "expectancy",
+    "in_market",
+    "max_drawdown",
+    "periods_per_year",
+    "profit_factor",
+    "returns",
+    "rolling_drawdown",
+    "rolling_exposure",
+    "rolling_expectancy",
+    "rolling_max",
+    "rolling_profit_factor",
+    "rolling_sharpe",
+    "rolling_sortino",
+    "sharpe",
+    "sortino",
+    "summary",
+    "trade_records",
+    "win_rate",
+]
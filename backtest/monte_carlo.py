@@ -0,0 +1,136 @@
+# backtest/monte_carlo.py
+"""
+Monte Carlo robustness analysis of a back-test's trade sequence
+----------------------------------------------------------------
+• Resamples the per-trade P/L into many alternative equity paths:
+    "bootstrap"   – draw trades with replacement (what else could have happened)
+    "permutation" – shuffle the same trades (order risk only; final balance
+                    is fixed, drawdowns are not)
+• Whole chunks of paths are one 2-D array (paths × trades): indices → P/L →
+  cumsum along the trade axis → running peak → drawdown, all NumPy.
+  Chunks hold at most `max_cells` values, so memory stays bounded however
+  many paths are run; the RNG stream is the same for any chunking.
+• Reports confidence intervals for the final balance, max drawdown (absolute
+  and % of peak) distributions, probability of a loss and risk of ruin
+  (equity touching `ruin_fraction` × initial balance on the way).
+----------------------------------------------------------------
+Usage
+-----
+>>> from backtest.monte_carlo import monte_carlo
+>>> report = monte_carlo(results["trades"], n_paths=100_000, seed=1)
+>>> report["final_balance"]["ci"], report["risk_of_ruin"]
+"""
+
+from __future__ import annotations
+
+from typing import Dict
+
+import numpy as np
+
+# ------------------------ config -------------------------------------------------
+DEFAULT_PATHS = 10_000
+MAX_CELLS = 1 << 22  # float64 values per chunk (~32 MiB per working array)
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+METHODS = ("bootstrap", "permutation")
+# ---------------------------------------------------------------------------------
+
+
+def trade_pls(trades) -> np.ndarray:
+    """Per-trade P/L from Backtester trade records or dicts, or any P/L sequence."""
+    if isinstance(trades, np.ndarray):
+        if trades.dtype.names:  # Backtester trade records
+            trades = trades["pl"]
+        return trades.astype(float, copy=False)
+    trades = list(trades)
+    if trades and isinstance(trades[0], dict):
+        return np.fromiter((t["pl"] for t in trades), dtype=float, count=len(trades))
+    return np.asarray(trades, dtype=float)
+
+
+def _paths(rng, pls: np.ndarray, rows: int, method: str) -> np.ndarray:
+    n = len(pls)
+    if method == "bootstrap":
+        return pls[rng.integers(0, n, size=(rows, n))]
+    return rng.permuted(np.broadcast_to(pls, (rows, n)), axis=1)
+
+
+def _summary(x: np.ndarray, confidence: float) -> Dict[str, float]:
+    tail = (1 - confidence) / 2 * 100
+    lo, hi, *pct = np.percentile(x, [tail, 100 - tail, *PERCENTILES])
+    return {
+        "mean": float(x.mean()),
+        "std": float(x.std()),
+        "ci": (float(lo), float(hi)),
+        "percentiles": {p: float(v) for p, v in zip(PERCENTILES, pct)},
+    }
+
+
+def monte_carlo(
+    trades,
+    n_paths: int = DEFAULT_PATHS,
+    method: str = "bootstrap",
+    initial_balance: float = 100_000,
+    scale: float = 1.0,
+    ruin_fraction: float = 0.5,
+    confidence: float = 0.95,
+    max_cells: int = MAX_CELLS,
+    seed=None,
+    keep_samples: bool = False,
+) -> dict:
+    """
+    Resample `trades` (Backtester trade records or a P/L array) `n_paths` times.
+    `scale` multiplies every P/L (e.g. units per trade – back-test P/L is
+    per unit). Ruin = equity at or below ruin_fraction × initial_balance.
+    """
+    if method not in METHODS:
+        raise ValueError(
+            f"[MonteCarlo] Unknown method {method!r}; use one of {METHODS}"
+        )
+    pls = trade_pls(trades) * scale
+    n = len(pls)
+    if n == 0:
+        raise ValueError("[MonteCarlo] No trades to resample.")
+    rng = np.random.default_rng(seed)
+    ruin_balance = initial_balance * ruin_fraction
+
+    final = np.empty(n_paths)
+    max_dd = np.empty(n_paths)
+    max_dd_pct = np.empty(n_paths)
+    ruined = np.empty(n_paths, dtype=bool)
+
+    rows = max(1, max_cells // n)
+    for lo in range(0, n_paths, rows):
+        hi = min(lo + rows, n_paths)
+        equity = np.cumsum(_paths(rng, pls, hi - lo, method), axis=1)
+        equity += initial_balance
+        peak = np.maximum.accumulate(equity, axis=1)
+        np.maximum(peak, initial_balance, out=peak)  # the start counts as a peak
+        drawdown = peak - equity
+        final[lo:hi] = equity[:, -1]
+        max_dd[lo:hi] = drawdown.max(axis=1)
+        drawdown /= peak
+        max_dd_pct[lo:hi] = drawdown.max(axis=1)
+        ruined[lo:hi] = equity.min(axis=1) <= ruin_balance
+
+    report = {
+        "method": method,
+        "paths": n_paths,
+        "trades": n,
+        "initial_balance": initial_balance,
+        "final_balance": _summary(final, confidence),
+        "max_drawdown": _summary(max_dd, confidence),
+        "max_drawdown_pct": _summary(max_dd_pct, confidence),
+        "prob_loss": float((final < initial_balance).mean()),
+        "risk_of_ruin": float(ruined.mean()),
+        "ruin_balance": ruin_balance,
+    }
+    if keep_samples:
+        report["samples"] = {
+            "final_balance": final,
+            "max_drawdown": max_dd,
+            "max_drawdown_pct": max_dd_pct,
+        }
+    return report
+
+
+__all__ = ["monte_carlo", "trade_pls", "METHODS"]
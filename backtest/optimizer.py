@@ -0,0 +1,250 @@
+# backtest/optimizer.py
+"""
+Parallel parameter sweeps over one shared candle array
+----------------------------------------------------------------
+• Candles are loaded once (through the candle store), copied into
+  multiprocessing.shared_memory and attached by every worker of a
+  ProcessPoolExecutor – no per-run download or pickling of the frame.
+• Search methods:
+    "grid"    – every combination of the value lists
+    "random"  – n_iter random draws from the value lists
+    "halving" – successive halving: all combos on the most recent slice,
+                keep the best 1/eta, grow the slice, repeat
+• optimize() is a generator: results stream back as workers finish, so
+  callers can show progress on 10k-combination sweeps. Halving yields a
+  combination once per rung it reaches; best_results() keeps one result
+  per combination (its last rung) for ranking and counting.
+• Each result: {"params", "final_balance", "profit", "trades",
+                "max_drawdown", "sharpe", "profit_factor", "candles", "rung"}
+  ("profit", "sharpe" or "profit_factor" make sensible objectives)
+----------------------------------------------------------------
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from .backtester import Backtester
+
+# config keys the GUI exposes as comma-separated sweep lists
+SWEEP_KEYS = ("sl_pips", "tp_pips", "rr_ratio", "ema_period", "trailing_distance")
+
+
+# ------------------------ parameter spaces ---------------------------------------
+def parameter_grid(grid: Dict[str, Iterable]) -> List[dict]:
+    """{"sl_pips": [10, 20], "tp_pips": [20, 40]} → list of 4 param dicts."""
+    keys = list(grid)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*grid.values())]
+
+
+def random_params(grid: Dict[str, Iterable], n_iter: int, seed=None) -> List[dict]:
+    """n_iter distinct random draws from the grid (fewer if the grid is smaller)."""
+    combos = parameter_grid(grid)
+    return random.Random(seed).sample(combos, min(n_iter, len(combos)))
+
+
+def param_grid_from_config(config: dict) -> Dict[str, list]:
+    """
+    Build a grid from GUI text fields: any SWEEP_KEYS value holding commas
+    ("10,15,20" or "1:1,1:2") becomes one sweep dimension.
+    """
+    grid = {
+        key: [v.strip() for v in str(config[key]).split(",") if v.strip()]
+        for key in SWEEP_KEYS
+        if "," in str(config.get(key) or "")
+    }
+    if not grid:
+        raise ValueError(
+            "[Optimizer] Enter comma-separated values (e.g. 10,15,20) in the "
+            "SL/TP fields to define the sweep."
+        )
+    return grid
+
+
+def halving_rungs(n_combos: int, eta: int) -> int:
+    """Largest r with eta**r <= n_combos (integer arithmetic, exact powers)."""
+    rungs, size = 0, eta
+    while size <= n_combos:
+        rungs += 1
+        size *= eta
+    return rungs
+
+
+def best_results(results: Iterable[dict], objective: str = "profit") -> List[dict]:
+    """
+    One result per distinct params – the one from the highest rung (most
+    candles) – ranked by rung, then `objective`, best first.
+    """
+    best = {}
+    for res in results:
+        key = json.dumps(res["params"], sort_keys=True, default=str)
+        if key not in best or res["rung"] >= best[key]["rung"]:
+            best[key] = res
+    return sorted(best.values(), key=lambda r: (r["rung"], r[objective]), reverse=True)
+
+
+# ------------------------ shared candle array ------------------------------------
+class SharedCandles:
+    """Numeric candle columns copied once into named shared-memory blocks."""
+
+    def __init__(self, candles: pd.DataFrame):
+        self._blocks = []
+        self.spec = {}
+        for name in candles.columns:
+            col = candles[name]
+            if name == "time":
+                naive = pd.to_datetime(col, utc=True).dt.tz_localize(None)
+                arr = naive.to_numpy(dtype="datetime64[ns]").view(np.int64)
+            else:
+                arr = col.to_numpy()
+            if arr.dtype == object:
+                continue
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[:] = arr
+            self._blocks.append(shm)
+            self.spec[name] = (shm.name, arr.dtype.str, len(arr))
+
+    def close(self):
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_candles(spec: dict):
+    """Rebuild a candle DataFrame from SharedCandles.spec (returns frame, handles)."""
+    handles, cols = [], {}
+    for name, (shm_name, dtype, size) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        handles.append(shm)
+        cols[name] = np.ndarray((size,), np.dtype(dtype), buffer=shm.buf)
+    df = pd.DataFrame({k: v for k, v in cols.items() if k != "time"})
+    if "time" in cols:
+        df.insert(0, "time", pd.to_datetime(cols["time"], unit="ns", utc=True))
+    return df, handles
+
+
+# ------------------------ worker side --------------------------------------------
+_worker_candles = None
+_worker_handles = []
+
+
+def _init_worker(spec: dict):
+    global _worker_candles, _worker_handles
+    _worker_candles, _worker_handles = attach_candles(spec)
+
+
+def evaluate(config: dict, params: dict, candles: pd.DataFrame, rung: int = 0):
+    """One back-test of config|params over `candles` → compact result dict."""
+    results = Backtester({**config, **params}).run(candles=candles)
+    stats = results["metrics"]
+    return {
+        "params": params,
+        "final_balance": results["final_balance"],
+        "profit": results["profit"],
+        "trades": len(results["trades"]),
+        "max_drawdown": stats["max_drawdown"],
+        "sharpe": stats["sharpe"],
+        "profit_factor": stats["profit_factor"],
+        "candles": len(candles),
+        "rung": rung,
+    }
+
+
+def _evaluate_in_worker(config: dict, params: dict, last_n: int, rung: int):
+    candles = _worker_candles.iloc[-last_n:] if last_n else _worker_candles
+    return evaluate(config, params, candles, rung)
+
+
+# ------------------------ driver -------------------------------------------------
+def _stream(pool, config, combos, last_n, rung, max_pending) -> Iterator[dict]:
+    """Submit with a bounded backlog and yield results in completion order."""
+    combos, pending = iter(combos), set()
+    while True:
+        for params in itertools.islice(combos, max_pending - len(pending)):
+            pending.add(pool.submit(_evaluate_in_worker, config, params, last_n, rung))
+        if not pending:
+            return
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            yield fut.result()
+
+
+def optimize(
+    config: dict,
+    param_grid: Dict[str, Iterable],
+    method: str = "grid",
+    candle_count: int = 1000,
+    candles: pd.DataFrame = None,
+    n_iter: int = 100,
+    eta: int = 3,
+    objective: str = "profit",
+    max_workers: int = None,
+    seed=None,
+) -> Iterator[dict]:
+    """
+    Sweep `param_grid` and yield one result dict per evaluated combination,
+    in completion order. Higher `objective` is better.
+    """
+    if method in ("grid", "halving"):
+        combos = parameter_grid(param_grid)
+    elif method == "random":
+        combos = random_params(param_grid, n_iter, seed)
+    else:
+        raise ValueError(f"[Optimizer] Unknown search method: {method}")
+
+    # GUI configs carry the stop_flag lambda – workers only need plain values
+    config = {k: v for k, v in config.items() if not callable(v)}
+
+    if candles is None:
+        # one download (or store read) for the whole sweep
+        candles = Backtester(config)._fetch_candles(candle_count)
+
+    workers = max_workers or os.cpu_count() or 1
+    with SharedCandles(candles) as shared, ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(shared.spec,)
+    ) as pool:
+        if method != "halving":
+            yield from _stream(pool, config, combos, 0, 0, workers * 4)
+            return
+
+        # ---- successive halving: budget = most recent slice of candles
+        rungs = halving_rungs(len(combos), eta)
+        for rung in range(rungs + 1):
+            budget = len(candles) // eta ** (rungs - rung)
+            last_n = 0 if rung == rungs else max(budget, 2)
+            scored = []
+            for res in _stream(pool, config, combos, last_n, rung, workers * 4):
+                scored.append(res)
+                yield res
+            scored.sort(key=lambda r: r[objective], reverse=True)
+            combos = [r["params"] for r in scored[: max(len(scored) // eta, 1)]]
+
+
+__all__ = [
+    "optimize",
+    "best_results",
+    "halving_rungs",
+    "evaluate",
+    "parameter_grid",
+    "random_params",
+    "param_grid_from_config",
+    "SharedCandles",
+    "attach_candles",
+    "SWEEP_KEYS",
+]
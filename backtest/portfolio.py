@@ -0,0 +1,281 @@
+# backtest/portfolio.py
+"""
+Multi-instrument portfolio back-test
+----------------------------------------------------------------
+• One Backtester (and so one strategy instance) per pair, run at 1 unit per
+  trade in-process or sharded across a ProcessPoolExecutor. Signals, fills
+  and SL/TP exits don't depend on the balance, so only sizing and currency
+  conversion are left for the shared step below.
+• The per-pair candle columns are merged into one time-ordered event stream
+  (merge_order: the columns are already sorted, so a stable sort of their
+  concatenation is a k-way merge of k runs) – no outer-joined
+  (time × instrument) frame is ever built.
+• Per-instrument positions are stepped against one balance: the trades of
+  every pair in event order, exits before entries at the same time. With
+  `position_sizing` each entry is sized like RiskManager from the portfolio
+  balance at that moment (risk_per_trade % of it, converted to the pair's
+  quote currency).
+• P/L is converted from each pair's quote currency to `account_currency`
+  (default "USD") at the conversion pair's close as of the fill: QUOTE_ACC
+  or ACC_QUOTE (inverted), whichever is traded, passed in `candles` or known
+  to utils/instruments; missing candles come from the candle store.
+• The equity curve is the merged stream's running sum of realised P/L and
+  open-P/L changes, one point per timestamp.
+• Cost grows linearly with the number of instruments (plus one Python step
+  per trade for the shared balance).
+----------------------------------------------------------------
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.trade_plan import TradePlan
+from utils.api_client import get_client
+from utils.candle_store import get_candle_store
+from utils.instruments import instruments
+from .backtester import Backtester
+from .fills import _times_ns, spans
+from .metrics import TRADE_DTYPE, equity_records, summary, trade_records
+
+_TRADE_COLUMNS = ("entries", "exits", "dirs", "entry_price", "exit_price", "sl")
+
+
+def portfolio_trade_dtype(pairs: List[str]) -> np.dtype:
+    """TRADE_DTYPE plus an instrument field wide enough for every name."""
+    width = max(len(pair) for pair in pairs)
+    return np.dtype(TRADE_DTYPE.descr + [("instrument", f"U{width}")])
+
+
+def merge_order(times: List[np.ndarray]) -> np.ndarray:
+    """
+    Positions in the concatenation of the sorted `times` columns, in time
+    order (ties keep column order) – the merged event stream.
+    """
+    return np.argsort(np.concatenate(times), kind="stable")
+
+
+def _run_instrument(config: dict, pair: str, candle_count: int, candles=None):
+    """
+    One pair at 1 unit per trade (P/L per unit in its quote currency): candle
+    times, mid closes and bid/ask marks plus the simulate() trade columns.
+    """
+    bt = Backtester({**config, "pair": pair, "position_sizing": False})
+    df = bt._fetch_candles(candle_count) if candles is None else candles
+    bt.run(candles=df)
+    if bt.sim is None:  # no candles
+        empty = np.empty(0)
+        out = {name: empty for name in ("close", "bid", "ask", "pl", *_TRADE_COLUMNS)}
+        out.update(time=np.empty(0, np.int64), reason=np.empty(0, dtype=object))
+        return out
+    out = {name: bt.sim[name] for name in (*_TRADE_COLUMNS, "pl", "reason")}
+    out["time"] = _times_ns(df)
+    out["close"] = np.asarray(df["close"], dtype=float)
+    out["bid"] = bt.fills.side_prices(df, "bid", "close")
+    out["ask"] = bt.fills.side_prices(df, "ask", "close")
+    return out
+
+
+class PortfolioBacktester:
+    def __init__(self, config: dict, pairs: List[str], max_workers: int = 0):
+        if not pairs:
+            raise ValueError("[Portfolio] At least one pair is required.")
+        # GUI configs carry the stop_flag lambda – workers only need plain values
+        self.cfg = {k: v for k, v in config.items() if not callable(v)}
+        self.pairs = list(dict.fromkeys(pairs))
+        self.max_workers = max_workers
+        self.initial_balance = float(self.cfg.get("starting_balance", 100_000))
+        self.account_currency = str(self.cfg.get("account_currency", "USD")).upper()
+        self.trade_dtype = portfolio_trade_dtype(self.pairs)
+        self.plans = None
+        if self.cfg.get("position_sizing"):
+            if "sl_strategy" not in self.cfg:
+                raise ValueError(
+                    "[Portfolio] position_sizing needs an sl_strategy to size to."
+                )
+            self.plans = {
+                pair: TradePlan.from_config(
+                    {**self.cfg, "pair": pair, "account_balance": self.initial_balance}
+                )
+                for pair in self.pairs
+            }
+
+    # -------------------------------- private helpers --------------
+    def _run_pairs(self, candle_count, candles) -> Dict[str, dict]:
+        candles = candles or {}
+        if self.max_workers and self.max_workers > 1 and len(self.pairs) > 1:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {
+                    pair: pool.submit(
+                        _run_instrument,
+                        self.cfg,
+                        pair,
+                        candle_count,
+                        candles.get(pair),
+                    )
+                    for pair in self.pairs
+                }
+                return {pair: fut.result() for pair, fut in futures.items()}
+        return {
+            pair: _run_instrument(self.cfg, pair, candle_count, candles.get(pair))
+            for pair in self.pairs
+        }
+
+    def _conversion(self, pair, per_pair, candles) -> Tuple[np.ndarray, np.ndarray]:
+        """(time_ns, rate) turning `pair`'s quote currency into the account's."""
+        quote, account = pair.split("_")[-1], self.account_currency
+        if quote == account:
+            return np.zeros(1, np.int64), np.ones(1)
+        for name, inverted in (
+            (f"{quote}_{account}", False),
+            (f"{account}_{quote}", True),
+        ):
+            if name in per_pair:
+                t, close = per_pair[name]["time"], per_pair[name]["close"]
+            elif name in candles:
+                t, close = _times_ns(candles[name]), candles[name]["close"]
+            elif name in instruments:
+                t, close = self._fetch_closes(name, per_pair)
+            else:
+                continue
+            close = np.asarray(close, dtype=float)
+            if len(close) == 0:
+                raise ValueError(f"[Portfolio] No {name} candles to convert {pair}.")
+            return np.asarray(t, np.int64), 1.0 / close if inverted else close
+        raise ValueError(
+            f"[Portfolio] Cannot convert {pair} P/L to {account}: pass "
+            f"{quote}_{account} or {account}_{quote} candles or load utils/instruments."
+        )
+
+    def _fetch_closes(self, name, per_pair):
+        times = [res["time"] for res in per_pair.values() if len(res["time"])]
+        if not times:
+            return np.empty(0, np.int64), np.empty(0)
+        cols = get_candle_store().columns_range(
+            get_client(self.cfg["token"], self.cfg["environment"]),
+            name,
+            self.cfg["timeframe"],
+            min(int(t[0]) for t in times),
+            max(int(t[-1]) for t in times),
+            offline=True,
+        )
+        return cols["time"], cols["close"]
+
+    def _step(self, per_pair, rates) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Every pair's trades in event order against one balance.
+        Returns pair → (units, account-currency P/L) per trade.
+        """
+        kind, pair_ix, trade_ix, times = [], [], [], []
+        for p, res in enumerate(per_pair.values()):
+            n = len(res["entries"])
+            for flag, rows in ((0, res["exits"]), (1, res["entries"])):
+                kind.append(np.full(n, flag))
+                pair_ix.append(np.full(n, p))
+                trade_ix.append(np.arange(n))
+                times.append(res["time"][rows])
+        kind, pair_ix, trade_ix = map(np.concatenate, (kind, pair_ix, trade_ix))
+        order = np.lexsort((kind, np.concatenate(times)))  # exits first per time
+
+        pairs, results = list(per_pair), list(per_pair.values())
+        units = [np.ones(len(res["entries"])) for res in results]
+        pls = [res["pl"] * rates[pair][res["exits"]] for pair, res in per_pair.items()]
+        if self.plans is not None:
+            balance = self.initial_balance
+            for flag, p, k in zip(kind[order], pair_ix[order], trade_ix[order]):
+                res, pair = results[p], pairs[p]
+                if flag == 0:
+                    balance += pls[p][k] * units[p][k]
+                    continue
+                plan = self.plans[pair]
+                plan.set_balance(balance / rates[pair][res["entries"][k]])
+                units[p][k] = plan.sizes(
+                    res["entry_price"][k : k + 1], res["sl"][k : k + 1]
+                )[0]
+        return {pair: (units[p], pls[p] * units[p]) for p, pair in enumerate(pairs)}
+
+    def _changes(self, res, rate, units, pl) -> np.ndarray:
+        """Per candle of one pair: realised P/L plus the change of its open P/L."""
+        n = len(res["time"])
+        realised = np.zeros(n)
+        np.add.at(realised, res["exits"], pl)
+        held, owner = spans(res["entries"], res["exits"])
+        dirs = res["dirs"][owner]
+        marks = np.where(dirs < 0, res["ask"][held], res["bid"][held])
+        open_pl = np.zeros(n)
+        open_pl[held] = (
+            (marks - res["entry_price"][owner]) * dirs * units[owner] * rate[held]
+        )
+        return realised + np.diff(open_pl, prepend=0.0)
+
+    def _merge_equity(self, per_pair, rates, sized) -> np.ndarray:
+        """Running portfolio equity over the merged candle stream."""
+        times = [res["time"] for res in per_pair.values()]
+        changes = [
+            self._changes(res, rates[pair], *sized[pair])
+            for pair, res in per_pair.items()
+        ]
+        order = merge_order(times)
+        times = np.concatenate(times)[order]
+        equity = self.initial_balance + np.cumsum(np.concatenate(changes)[order])
+        last = np.diff(times, append=np.iinfo(np.int64).max) != 0  # per timestamp
+        return equity_records(times[last], equity[last])
+
+    def _merge_trades(self, per_pair, sized) -> np.ndarray:
+        parts = []
+        for pair, res in per_pair.items():
+            units, pl = sized[pair]
+            sim = {**res, "units": units, "pl": pl}
+            records = trade_records(sim, res["time"])
+            part = np.empty(len(records), self.trade_dtype)
+            for name in TRADE_DTYPE.names:
+                part[name] = records[name]
+            part["instrument"] = pair
+            parts.append(part)
+        trades = np.concatenate(parts)
+        return trades[np.argsort(trades["exit_time"], kind="stable")]
+
+    # -------------------------------- public API -------------------
+    def run(
+        self, candle_count: int = 1000, candles: Dict[str, pd.DataFrame] = None
+    ) -> dict:
+        """
+        Back-test every pair; `candles` optionally maps pair → preloaded frame
+        (conversion pairs may be among them without being traded).
+        """
+        candles = candles or {}
+        per_pair = self._run_pairs(candle_count, candles)
+        rates = {}
+        for pair, res in per_pair.items():
+            t, rate = self._conversion(pair, per_pair, candles)
+            at = np.searchsorted(t, res["time"], side="right") - 1
+            rates[pair] = rate[np.maximum(at, 0)]  # as of each candle
+
+        sized = self._step(per_pair, rates)
+        trades = self._merge_trades(per_pair, sized)
+        profits = {pair: float(pl.sum()) for pair, (_, pl) in sized.items()}
+        profit = sum(profits.values())
+        curve = self._merge_equity(per_pair, rates, sized)
+
+        return {
+            "initial_balance": self.initial_balance,
+            "final_balance": self.initial_balance + profit,
+            "profit": profit,
+            "trades": trades,
+            "equity_curve": curve,
+            "metrics": summary(curve, trades),
+            "instruments": {
+                pair: {"profit": profits[pair], "trades": len(res["entries"])}
+                for pair, res in per_pair.items()
+            },
+        }
+
+
+def run_portfolio_backtest(
+    config: dict, pairs: List[str], candle_count: int = 1000, max_workers: int = 0
+):
+    return PortfolioBacktester(config, pairs, max_workers).run(candle_count)
@@ -0,0 +1,877 @@
+# backtest/replay.py
+"""
+Tick-level replay of recorded prices through the strategy interface.
+
+• Sources are memory-mapped columns (int64 epoch-ns `time`, float64 bid/ask):
+    TickRecorder  – appends live PriceStream quotes to
+                    .cache/ticks/EUR_USD/{time,bid,ask}.bin
+    load_ticks()  – maps such a recording back in
+    candle_ticks() – S5 (or any) bid/ask candles from the candle store,
+                    replayed as open → low/high → high/low → close ticks
+• Every strategy trades a ReplayBroker – a simulated account behind
+  client.request() that fills MARKET orders at the replayed bid/ask with
+  their stopLossOnFill / takeProfitOnFill, nets opposite orders FIFO
+  (positionFill DEFAULT) and answers PricingInfo, AccountSummary /
+  AccountDetails, TradeCRCDO and TradeClose. Two ways in:
+    run(stop_flag)  – unchanged live strategies, in a thread: get_client(),
+                    quote_cache, the trade log and sleep_until_candle_close()
+                    are redirected for that thread only (replayed quotes go
+                    to a private QuoteCache and a TickRing, trades to
+                    `trade_log`, "" = not logged). The engine stops at the
+                    first tick past a candle close, lets the strategy make one
+                    pass and replays on once it sleeps again (lock-step, so
+                    runs repeat); strategy.indicators feeds the mid-price
+                    candles completed so far. Every tick is a Python step:
+                    ~0.5M ticks/s with an idle strategy, ~30–50k ticks/s with
+                    ExampleStrategy (a few ms per candle pass).
+    on_ticks(time, bid, ask) → SIGNAL_* per tick, once per block of NumPy
+                    views – the fast path, ~10–18M ticks/s (flip strategy in
+                    benchmarks/bench_replay.py). Signals become
+                    MARKET orders priced by the live TradePlan (stop, target,
+                    size); the cache only sees each block's last quote.
+• Stops and targets are checked at tick resolution. With sl_strategy
+  "Trailing SL" the stop is re-priced by core/sl_strategies –
+  StopLossStrategy.trailing_sl per tick, its array twin get_stop_losses per
+  block (same rounding) – and kept when it moved in the profit direction.
+• speed: 0 → as fast as possible, 1.0 → real time, 60 → sixty times faster.
+• stats: ticks/sec and per-strategy latency (RequestMetrics percentiles of
+  each pass / block, plus µs per tick).
+
+Usage
+-----
+>>> from backtest.replay import ReplayEngine, load_ticks, candle_ticks
+>>> ticks = load_ticks("EUR_USD")
+>>> ticks = candle_ticks(get_candle_store().load("EUR_USD", "S5", "BA"))
+>>> strategy = Strategy(cfg, None, "Both", None, "EUR_USD", "M5")
+>>> out = ReplayEngine(ticks, [strategy], config=cfg).run()
+>>> out["stats"]["ticks_per_sec"], out["results"]["Strategy"]["profit"]
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import numpy as np
+from oandapyV20.endpoints.accounts import AccountDetails, AccountSummary
+from oandapyV20.endpoints.orders import OrderCreate
+from oandapyV20.endpoints.pricing import PricingInfo
+from oandapyV20.endpoints.trades import TradeClose, TradeCRCDO
+from oandapyV20.exceptions import V20Error
+
+from backtest.fills import REASON_END, REASON_SIGNAL, REASON_SL, REASON_TP
+from backtest.metrics import TRADE_DTYPE, equity_records
+from core.candle_scheduler import (
+    GRANULARITY_SECONDS,
+    candle_bounds,
+    set_thread_clock,
+)
+from core.price_stream import Quote, QuoteCache, TickRing, set_thread_quote_cache
+from core.sl_strategies import StopLossStrategy
+from core.trade_plan import TradePlan
+from logs.trade_logger import set_thread_log_path
+from strategies.base_strategy import SIGNAL_BUY, SIGNAL_EXIT, SIGNAL_SELL
+from utils.api_client import RequestMetrics, set_thread_client
+from utils.candle_store import to_frame, to_oanda_time
+from utils.price_tools import format_price
+from utils.streaming_indicators import WARMUP_BARS, IndicatorSet
+
+# ------------------------ config -------------------------------------------------
+TICK_STORE_DIR = Path(".cache") / "ticks"
+TICK_COLUMNS = {"time": np.int64, "bid": np.float64, "ask": np.float64}
+BLOCK_SIZE = 1 << 16  # ticks per on_ticks() call / per Python conversion
+PACE_SECONDS = 0.05  # wall-clock granularity of paced replay
+JOIN_TIMEOUT = 5.0  # seconds a strategy gets to leave run() after the last tick
+_OHLC = ("open", "high", "low", "close")
+# ---------------------------------------------------------------------------------
+
+
+# ======================== tick sources ===========================================
+class TickRecorder:
+    """
+    Appends quotes for one instrument to raw column files – append-only, so a
+    recording can run for days without rewriting what is already on disk.
+
+    >>> rec = TickRecorder("EUR_USD")
+    >>> ticks = stream.subscribe(["EUR_USD"])
+    >>> while running: rec.record(ticks.poll())
+    >>> rec.flush()
+    """
+
+    def __init__(
+        self, instrument: str, root: Path | str = TICK_STORE_DIR, flush_every=10_000
+    ):
+        self.instrument = instrument
+        self.path = Path(root) / instrument
+        self.flush_every = flush_every
+        self._pending = {name: [] for name in TICK_COLUMNS}
+
+    def record(self, quotes: Iterable[Quote]):
+        for q in quotes:
+            if q.instrument != self.instrument:
+                continue
+            t = q.time
+            if isinstance(t, str):  # RFC3339 from the live stream
+                t = int(np.datetime64(t.rstrip("Z"), "ns").astype(np.int64))
+            self._pending["time"].append(t)
+            self._pending["bid"].append(q.bid)
+            self._pending["ask"].append(q.ask)
+        if len(self._pending["time"]) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._pending["time"]:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        for name, dtype in TICK_COLUMNS.items():
+            with open(self.path / f"{name}.bin", "ab") as f:
+                np.asarray(self._pending[name], dtype=dtype).tofile(f)
+            self._pending[name].clear()
+
+
+def load_ticks(
+    instrument: str, root: Path | str = TICK_STORE_DIR
+) -> Dict[str, np.ndarray]:
+    """Memory-mapped time/bid/ask of a TickRecorder recording."""
+    path = Path(root) / instrument
+    cols = {}
+    for name, dtype in TICK_COLUMNS.items():
+        f = path / f"{name}.bin"
+        if not f.exists() or os.path.getsize(f) == 0:
+            raise ValueError(f"[Replay] No recorded ticks for {instrument} in {path}")
+        cols[name] = np.memmap(f, dtype=dtype, mode="r")
+    # a crash between column appends can leave unequal lengths – trim safely
+    size = min(len(a) for a in cols.values())
+    return {n: a[:size] for n, a in cols.items()}
+
+
+def candle_ticks(cols: Dict[str, np.ndarray], granularity: str = "S5"):
+    """
+    Bid/ask candle columns (price="BA") → four ticks per candle: open, the
+    extreme against the candle's direction, the other extreme, close.
+    """
+    if len(cols["time"]) == 0:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in TICK_COLUMNS.items()}
+    step = GRANULARITY_SECONDS[granularity] * 10**9 // 4
+    up = np.asarray(cols["bid_close"]) >= np.asarray(cols["bid_open"])
+
+    def path(side):
+        o, h, l, c = (np.asarray(cols[f"{side}_{f}"]) for f in _OHLC)
+        return np.column_stack([o, np.where(up, l, h), np.where(up, h, l), c]).ravel()
+
+    starts = np.asarray(cols["time"], dtype=np.int64)[:, None]
+    return {
+        "time": (starts + np.arange(4) * step).ravel(),
+        "bid": path("bid"),
+        "ask": path("ask"),
+    }
+
+
+# ======================== simulated account =======================================
+def _limit(order: dict, key: str):
+    price = (order.get(key) or {}).get("price")
+    return None if price is None else float(price)
+
+
+def _trade_id(endpoint) -> str:
+    return str(endpoint).split("/trades/")[1].split("/")[0]
+
+
+class ReplayBroker:
+    """
+    Simulated OANDA account of one replayed strategy: answers
+    client.request(endpoint) like PooledAPI at the last on_quote() prices.
+    Closed trades are kept as (id, direction, units, entry, exit, pl,
+    entry_ns, exit_ns, reason) tuples – see trade_records().
+    """
+
+    def __init__(self, config: dict, instrument: str, balance: float):
+        self.instrument = instrument
+        self.account_id = config.get("account_id", "replay")
+        self.balance = balance
+        self.sl = StopLossStrategy({**config, "pair": instrument})
+        self.trailing = config.get("sl_strategy") == "Trailing SL"
+        self.quote = None
+        self.now_ns = 0
+        self.open_trades: List[dict] = []
+        self.closed: List[tuple] = []
+        self.last_transaction = "0"
+        self._ids = itertools.count(1)
+
+    # -------------------------------- prices -------------------------------
+    def on_quote(self, quote: Quote):
+        """New tick: trail stops, then fill every stop / target it reaches."""
+        self.quote = quote
+        self.now_ns = quote.time
+        if not self.open_trades:
+            return
+        for trade in list(self.open_trades):
+            long = trade["units"] > 0
+            price = quote.bid if long else quote.ask
+            stop = trade["sl"]
+            if self.trailing and stop is not None:
+                trail = self.sl.trailing_sl(price, "Buy" if long else "Sell")
+                if trail > stop if long else trail < stop:
+                    trade["sl"] = stop = trail
+            target = trade["tp"]
+            if stop is not None and (price <= stop if long else price >= stop):
+                self._close(trade, price, REASON_SL)
+            elif target is not None and (price >= target if long else price <= target):
+                self._close(trade, price, REASON_TP)
+
+    def advance(self, time_, bid, ask):
+        """
+        on_quote() for a whole slice of ticks: each open trade's first stop /
+        target hit is found with array comparisons, a trailing stop coming
+        from StopLossStrategy.get_stop_losses – the array twin of
+        trailing_sl(), with the same float operations and rounding.
+        """
+        n = len(time_)
+        if n == 0:
+            return
+        for trade in list(self.open_trades):
+            long = trade["units"] > 0
+            price = bid if long else ask
+            stop, target = trade["sl"], trade["tp"]
+            hit = np.zeros(n, dtype=bool)
+            if stop is not None:
+                stops = np.full(n, stop)
+                if self.trailing:
+                    best = (np.maximum if long else np.minimum).accumulate(price)
+                    trail = self.sl.get_stop_losses(best, np.full(n, 1 if long else -1))
+                    stops = np.fmax(stops, trail) if long else np.fmin(stops, trail)
+                hit = price <= stops if long else price >= stops
+                trade["sl"] = float(stops[-1])
+            stop_hit = hit
+            if target is not None:
+                hit = hit | (price >= target if long else price <= target)
+            if hit.any():
+                i = int(hit.argmax())
+                reason = REASON_SL if stop_hit[i] else REASON_TP
+                self._close(trade, float(price[i]), reason, exit_ns=int(time_[i]))
+        self.quote = Quote(
+            self.instrument, int(time_[-1]), float(bid[-1]), float(ask[-1])
+        )
+        self.now_ns = self.quote.time
+
+    def equity(self) -> float:
+        q = self.quote
+        return self.balance + sum(
+            t["units"] * ((q.bid if t["units"] > 0 else q.ask) - t["price"])
+            for t in self.open_trades
+        )
+
+    def close_all(self, reason: str = REASON_END):
+        for trade in list(self.open_trades):
+            long = trade["units"] > 0
+            self._close(trade, self.quote.bid if long else self.quote.ask, reason)
+
+    # -------------------------------- REST ---------------------------------
+    def request(self, endpoint):
+        if isinstance(endpoint, OrderCreate):
+            response = self._order_create(endpoint.data["order"])
+        elif isinstance(endpoint, TradeCRCDO):
+            response = self._trade_orders(_trade_id(endpoint), endpoint.data)
+        elif isinstance(endpoint, TradeClose):
+            response = self._trade_close(_trade_id(endpoint))
+        elif isinstance(endpoint, PricingInfo):
+            response = {"prices": [self._price()]}
+        elif isinstance(endpoint, (AccountSummary, AccountDetails)):
+            response = {
+                "account": self._account(),
+                "lastTransactionID": self.last_transaction,
+            }
+        else:
+            raise V20Error(404, f"[Replay] {type(endpoint).__name__} is not simulated")
+        endpoint.response = response
+        return response
+
+    def _transaction(self, **fields) -> dict:
+        self.last_transaction = str(next(self._ids))
+        return {
+            "id": self.last_transaction,
+            "time": to_oanda_time(self.now_ns),
+            "accountID": self.account_id,
+            **fields,
+        }
+
+    def _order_create(self, order: dict) -> dict:
+        if order.get("type", "MARKET") != "MARKET":
+            raise V20Error(400, "[Replay] Only MARKET orders are simulated")
+        units = float(order["units"])
+        if units == 0:
+            raise V20Error(400, "[Replay] Order units must not be zero")
+        price = self.quote.ask if units > 0 else self.quote.bid
+        create = self._transaction(
+            type="MARKET_ORDER",
+            instrument=self.instrument,
+            units=order["units"],
+            reason="CLIENT_ORDER",
+            timeInForce=order.get("timeInForce", "FOK"),
+        )
+        fill = self._transaction(
+            type="ORDER_FILL",
+            orderID=create["id"],
+            instrument=self.instrument,
+            units=order["units"],
+            price=str(price),
+        )
+        # positionFill DEFAULT on a netting account: reduce opposite trades
+        # oldest first, open a trade with whatever is left
+        remaining, closed = units, []
+        for trade in list(self.open_trades):
+            if remaining == 0:
+                break
+            if (trade["units"] > 0) == (units > 0):
+                continue
+            part = min(abs(trade["units"]), abs(remaining))
+            closed.append({"tradeID": trade["id"], "units": f"{-trade['units']:g}"})
+            self._close(trade, price, REASON_SIGNAL, part)
+            remaining += part if remaining < 0 else -part
+        if closed:
+            fill["tradesClosed"] = closed
+        if remaining:
+            self.open_trades.append(
+                {
+                    "id": fill["id"],
+                    "units": remaining,
+                    "price": price,
+                    "time": self.now_ns,
+                    "sl": _limit(order, "stopLossOnFill"),
+                    "tp": _limit(order, "takeProfitOnFill"),
+                }
+            )
+            fill["tradeOpened"] = {"tradeID": fill["id"], "units": f"{remaining:g}"}
+        fill["accountBalance"] = f"{self.balance:.4f}"
+        return {
+            "orderCreateTransaction": create,
+            "orderFillTransaction": fill,
+            "relatedTransactionIDs": [create["id"], fill["id"]],
+            "lastTransactionID": fill["id"],
+        }
+
+    def _find(self, trade_id: str) -> dict:
+        for trade in self.open_trades:
+            if trade["id"] == trade_id:
+                return trade
+        raise V20Error(404, f"[Replay] No open trade {trade_id}")
+
+    def _trade_orders(self, trade_id: str, data: dict) -> dict:
+        trade = self._find(trade_id)
+        response = {}
+        for key, field, kind in (
+            ("stopLoss", "sl", "STOP_LOSS_ORDER"),
+            ("takeProfit", "tp", "TAKE_PROFIT_ORDER"),
+        ):
+            if key in data:
+                trade[field] = _limit(data, key)
+                response[f"{key}OrderTransaction"] = self._transaction(
+                    type=kind, tradeID=trade_id, price=data[key]["price"]
+                )
+        response["lastTransactionID"] = self.last_transaction
+        return response
+
+    def _trade_close(self, trade_id: str) -> dict:
+        trade = self._find(trade_id)
+        units = trade["units"]
+        price = self.quote.bid if units > 0 else self.quote.ask
+        self._close(trade, price, REASON_SIGNAL)
+        fill = self._transaction(
+            type="ORDER_FILL",
+            instrument=self.instrument,
+            units=f"{-units:g}",
+            price=str(price),
+            tradesClosed=[{"tradeID": trade_id, "units": f"{-units:g}"}],
+            accountBalance=f"{self.balance:.4f}",
+        )
+        return {"orderFillTransaction": fill, "lastTransactionID": fill["id"]}
+
+    def _price(self) -> dict:
+        q = self.quote
+        return {
+            "instrument": self.instrument,
+            "time": to_oanda_time(q.time),
+            "bids": [{"price": str(q.bid)}],
+            "asks": [{"price": str(q.ask)}],
+            "tradeable": q.tradeable,
+        }
+
+    def _account(self) -> dict:
+        equity = self.equity()
+        return {
+            "id": self.account_id,
+            "balance": f"{self.balance:.4f}",
+            "NAV": f"{equity:.4f}",
+            "unrealizedPL": f"{equity - self.balance:.4f}",
+            "openTradeCount": len(self.open_trades),
+        }
+
+    # -------------------------------- bookkeeping --------------------------
+    def _close(
+        self,
+        trade: dict,
+        price: float,
+        reason: str,
+        units: float = None,
+        exit_ns: int = None,
+    ):
+        sign = 1.0 if trade["units"] > 0 else -1.0
+        units = abs(trade["units"]) if units is None else units
+        pl = sign * units * (price - trade["price"])
+        self.balance += pl
+        self.closed.append(
+            (
+                trade["id"],
+                "buy" if sign > 0 else "sell",
+                units,
+                trade["price"],
+                price,
+                pl,
+                trade["time"],
+                self.now_ns if exit_ns is None else exit_ns,
+                reason,
+            )
+        )
+        trade["units"] -= sign * units
+        if trade["units"] == 0:
+            self.open_trades.remove(trade)
+
+    def trade_records(self) -> np.ndarray:
+        out = np.empty(len(self.closed), dtype=TRADE_DTYPE)
+        columns = zip(*self.closed) if self.closed else [()] * len(TRADE_DTYPE)
+        for name, values in zip(TRADE_DTYPE.names, columns):
+            if name.endswith("_time"):
+                values = np.asarray(values, dtype=np.int64).view("datetime64[ns]")
+            out[name] = values
+        return out
+
+
+# ======================== replayed time ===========================================
+class ReplayClock:
+    """
+    Replayed time of one strategy thread (core/candle_scheduler's thread
+    clock). sleep_until() parks the strategy until the engine's ticks reach
+    the deadline; the engine waits for it to park again before going on.
+    """
+
+    def __init__(self, now_ns: int = 0):
+        self.now_ns = now_ns
+        self.wake_ns = None  # deadline of the parked strategy
+        self.parks = 0
+        self.done = False  # no ticks left – stop_flag() turns true
+        self.exited = False  # run() returned
+        self._cond = threading.Condition()
+
+    def time(self) -> float:
+        return self.now_ns / 1e9
+
+    def stopped(self) -> bool:
+        return self.done
+
+    # ---- strategy thread ----
+    def sleep_until(self, deadline: float, stop_flag=None) -> bool:
+        with self._cond:
+            self.wake_ns = int(deadline * 1e9)
+            self.parks += 1
+            self._cond.notify_all()
+            while not self.done and self.now_ns < self.wake_ns:
+                self._cond.wait()
+            self.wake_ns = None
+        return not (self.done or (stop_flag and stop_flag()))
+
+    def exit(self):
+        with self._cond:
+            self.exited, self.wake_ns = True, None
+            self._cond.notify_all()
+
+    # ---- engine ----
+    def start(self, thread: threading.Thread, now_ns: int):
+        """Start the strategy thread at now_ns; returns once it first parks."""
+        self.now_ns = now_ns
+        thread.start()
+        with self._cond:
+            while self.parks == 0 and not self.exited:
+                self._cond.wait()
+
+    def due(self, now_ns: int) -> bool:
+        # lock-free: the strategy is parked whenever the engine runs
+        return self.wake_ns is not None and now_ns >= self.wake_ns
+
+    def resume(self, now_ns: int):
+        """Move to now_ns and block until the strategy parks again (or exits)."""
+        with self._cond:
+            self.now_ns = now_ns
+            parks = self.parks
+            self._cond.notify_all()
+            while self.parks == parks and not self.exited:
+                self._cond.wait()
+
+    def finish(self):
+        with self._cond:
+            self.done = True
+            self._cond.notify_all()
+
+
+class _ReplayCandles:
+    """Mid-price candles of the replayed ticks, built once per granularity."""
+
+    def __init__(self, ticks: Dict[str, np.ndarray]):
+        self.ticks = ticks
+        self._built = {}
+
+    def completed(self, granularity: str, now_ns: int, count: int):
+        cols = self._built.get(granularity)
+        if cols is None:
+            cols = self._built[granularity] = self._build(granularity)
+        k = int(np.searchsorted(cols["end"], now_ns, side="right"))
+        return to_frame(
+            {n: a[max(k - count, 0) : k] for n, a in cols.items() if n != "end"}
+        )
+
+    def _build(self, granularity: str) -> Dict[str, np.ndarray]:
+        time_ = self.ticks["time"]
+        n = len(time_)
+        starts, ends, first = [], [], []
+        i = 0
+        while i < n:  # one step per candle, not per tick
+            start, end = candle_bounds(granularity, int(time_[i]) / 1e9)
+            first.append(i)
+            starts.append(int(round(start)) * 10**9)
+            ends.append(int(round(end)) * 10**9)
+            i = max(int(np.searchsorted(time_, ends[-1], side="left")), i + 1)
+        mid = (np.asarray(self.ticks["bid"]) + np.asarray(self.ticks["ask"])) / 2
+        lo = np.asarray(first, dtype=np.int64)
+        if n == 0:
+            empty = np.empty(0)
+            return {"time": lo, "end": lo, "volume": lo, **dict.fromkeys(_OHLC, empty)}
+        return {
+            "time": np.asarray(starts, dtype=np.int64),
+            "volume": np.diff(np.r_[lo, n]),
+            "open": mid[lo],
+            "high": np.maximum.reduceat(mid, lo),
+            "low": np.minimum.reduceat(mid, lo),
+            "close": mid[np.r_[lo[1:], n] - 1],
+            "end": np.asarray(ends, dtype=np.int64),
+        }
+
+
+class _ReplayIndicators(IndicatorSet):
+    """Private indicator state; sync() feeds the candles completed so far."""
+
+    def __init__(self, instrument, granularity, candles: _ReplayCandles, clock):
+        super().__init__(instrument, granularity)
+        self._candles = candles
+        self._clock = clock
+
+    def sync(self, client, count: int = WARMUP_BARS) -> int:
+        now = self._clock.now_ns
+        return self.feed(self._candles.completed(self.granularity, now, count))
+
+
+class _Session:
+    """One live strategy's thread, simulated account and clock."""
+
+    def __init__(self, name, strategy, broker: ReplayBroker, clock, cache, log):
+        self.name = name
+        self.strategy = strategy
+        self.broker = broker
+        self.clock = clock
+        self.cache = cache
+        self.log = log
+        self.thread = None
+        self.error = None
+        self.curve_time: List[int] = []
+        self.curve: List[float] = []
+
+    def _main(self):
+        # everything the live code reaches for, served from the replay
+        set_thread_client(self.broker)
+        set_thread_clock(self.clock)
+        set_thread_quote_cache(self.cache)
+        set_thread_log_path(self.log)
+        try:
+            self.strategy.run(stop_flag=self.clock.stopped)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.clock.exit()
+
+    def step(self, now_ns: int) -> bool:
+        """Let the strategy make its pass if one is due; True if it ran."""
+        if self.thread is None:
+            self.thread = threading.Thread(
+                target=self._main, name=f"replay-{self.name}", daemon=True
+            )
+            self.clock.start(self.thread, now_ns)
+        elif self.clock.due(now_ns):
+            self.clock.resume(now_ns)
+        else:
+            return False
+        self.curve_time.append(now_ns)
+        self.curve.append(self.broker.equity())
+        return True
+
+    def finish(self):
+        self.clock.finish()
+        if self.thread is not None:
+            self.thread.join(JOIN_TIMEOUT)
+            if self.thread.is_alive():
+                print(f"[Replay] {self.name} did not leave run() after the replay")
+        if self.broker.quote is not None:
+            self.broker.close_all()
+            self.curve_time.append(self.broker.now_ns)
+            self.curve.append(self.broker.balance)
+
+
+class _BlockSession:
+    """
+    One on_ticks() strategy: its SIGNAL_* codes become MARKET orders on the
+    ReplayBroker, priced by the live TradePlan (stop, target, size).
+    """
+
+    def __init__(self, name, strategy, broker: ReplayBroker, config: dict):
+        self.name = name
+        self.strategy = strategy
+        self.broker = broker
+        sizing = "account_balance" in config and "risk_per_trade" in config
+        self.plan = TradePlan.from_config(config, sizing=sizing)
+        if self.plan.sl_rule == "EMA-Based SL":
+            raise ValueError(
+                f"[Replay] {name}: the EMA-Based SL needs the strategy's run() loop."
+            )
+        self.sizing = sizing
+        self.curve_time: List[int] = []
+        self.curve: List[float] = []
+
+    def step(self, time_, bid, ask) -> float:
+        """Replay one block; returns the seconds spent inside on_ticks()."""
+        began = time.perf_counter()
+        signals = np.asarray(self.strategy.on_ticks(time_, bid, ask))
+        took = time.perf_counter() - began
+        if signals.shape != (len(time_),):
+            raise ValueError(
+                f"[Replay] {self.name}.on_ticks() returned shape {signals.shape}, "
+                f"expected ({len(time_)},)"
+            )
+        done = 0
+        for i in np.flatnonzero(signals).tolist():
+            self.broker.advance(
+                time_[done : i + 1], bid[done : i + 1], ask[done : i + 1]
+            )
+            done = i + 1
+            self._act(int(signals[i]))
+        self.broker.advance(time_[done:], bid[done:], ask[done:])
+        self.curve_time.append(self.broker.now_ns)
+        self.curve.append(self.broker.equity())
+        return took
+
+    def _act(self, signal: int):
+        held = sum(t["units"] for t in self.broker.open_trades)
+        if signal == SIGNAL_EXIT:
+            if held:
+                self._order(-held)
+            return
+        if signal not in (SIGNAL_BUY, SIGNAL_SELL) or held * signal > 0:
+            return  # already positioned that way
+        quote, side = self.broker.quote, "Buy" if signal > 0 else "Sell"
+        price = quote.ask if signal > 0 else quote.bid
+        stop = self.plan.stop(price, side)
+        units = self.plan.size(price, stop) if self.sizing else 1
+        if units:  # the opposite position is closed by the same order
+            self._order(
+                signal * units - held, stop, self.plan.target(price, side, stop)
+            )
+
+    def _order(self, units, stop=None, target=None):
+        pair = self.broker.instrument
+        order = {"instrument": pair, "units": f"{units:g}", "type": "MARKET"}
+        if stop is not None:
+            order["stopLossOnFill"] = {"price": format_price(stop, pair)}
+            order["takeProfitOnFill"] = {"price": format_price(target, pair)}
+        self.broker.request(
+            OrderCreate(accountID=self.broker.account_id, data={"order": order})
+        )
+
+    def finish(self):
+        if self.broker.quote is not None:
+            self.broker.close_all()
+            self.curve_time.append(self.broker.now_ns)
+            self.curve.append(self.broker.balance)
+
+
+# ======================== replay engine ==========================================
+class ReplayEngine:
+    def __init__(
+        self,
+        ticks: Dict[str, np.ndarray],
+        strategies,
+        config: dict = None,
+        speed: float = 0.0,
+        block_size: int = BLOCK_SIZE,
+        cache: QuoteCache = None,
+        ring: TickRing = None,
+        trade_log: str = "",
+    ):
+        self.config = dict(config or {})
+        self.ticks = ticks
+        if isinstance(strategies, Mapping):
+            self.strategies = dict(strategies)
+        else:
+            self.strategies = {}
+            for s in strategies:
+                name = type(s).__name__
+                while name in self.strategies:
+                    name += "_"
+                self.strategies[name] = s
+        for name, s in self.strategies.items():
+            if not (hasattr(s, "on_ticks") or callable(getattr(s, "run", None))):
+                raise AttributeError(
+                    f"{name} must implement on_ticks() or run() to be replayed."
+                )
+        pairs = {getattr(s, "pair", None) for s in self.strategies.values()}
+        self.instrument = self.config.get("pair") or next(iter(pairs), None) or ""
+        if pairs - {self.instrument, None}:
+            raise ValueError(
+                f"[Replay] Strategies must all trade the replayed {self.instrument}"
+            )
+        self.speed = speed
+        self.block_size = block_size
+        # private by default: replayed prices never reach live readers
+        self.cache = QuoteCache() if cache is None else cache
+        self.ring = TickRing() if ring is None else ring
+        self.trade_log = trade_log  # "" → run() threads log no trades
+        self.initial_balance = float(self.config.get("starting_balance", 100_000))
+        self.latency = RequestMetrics()
+
+    # -------------------------------- public API ---------------------------
+    def run(self) -> dict:
+        """Replay every tick; {"results": {strategy: summary}, "stats": {...}}."""
+        time_ = self.ticks["time"]
+        n = len(time_)
+        candles = _ReplayCandles(self.ticks)
+        blocks, threads = [], []
+        for name, strategy in self.strategies.items():
+            if hasattr(strategy, "on_ticks"):
+                blocks.append(self._block_session(name, strategy))
+            else:
+                threads.append(self._session(name, strategy, candles))
+        busy = dict.fromkeys(self.strategies, 0.0)
+
+        started = time.perf_counter()
+        try:
+            for lo, hi in self._blocks(time_):
+                if self.speed > 0:
+                    self._pace(started, time_[0], time_[hi - 1])
+                t, bid, ask = (
+                    time_[lo:hi],
+                    self.ticks["bid"][lo:hi],
+                    self.ticks["ask"][lo:hi],
+                )
+                for session in blocks:
+                    took = session.step(t, bid, ask)
+                    self.latency.record(session.name, took)
+                    busy[session.name] += took
+                if threads:
+                    self._step_ticks(threads, t, bid, ask, busy)
+                else:  # block path: the cache only sees each block's last quote
+                    self.cache.put(Quote(self.instrument, int(t[-1]), bid[-1], ask[-1]))
+        finally:
+            for session in blocks + threads:
+                session.finish()
+        seconds = time.perf_counter() - started
+
+        for session in threads:
+            if session.error is not None:
+                raise RuntimeError(
+                    f"[Replay] {session.name} failed: {session.error}"
+                ) from session.error
+        results = {s.name: self._summary(s) for s in blocks + threads}
+        stats = {
+            "ticks": n,
+            "seconds": seconds,
+            "ticks_per_sec": n / seconds if seconds else float("inf"),
+            "latency": self.latency.snapshot(),
+            "us_per_tick": {
+                name: 1e6 * spent / n if n else 0.0 for name, spent in busy.items()
+            },
+        }
+        return {"results": results, "stats": stats}
+
+    # -------------------------------- internals ----------------------------
+    def _session(self, name, strategy, candles) -> _Session:
+        config = getattr(strategy, "config", None) or self.config
+        broker = ReplayBroker(config, self.instrument, self.initial_balance)
+        clock = ReplayClock()
+        # private indicator state – replayed candles never reach the live set
+        strategy.indicators = _ReplayIndicators(
+            self.instrument,
+            getattr(strategy, "chart_timeframe", None) or "M1",
+            candles,
+            clock,
+        )
+        return _Session(name, strategy, broker, clock, self.cache, self.trade_log)
+
+    def _block_session(self, name, strategy) -> _BlockSession:
+        config = {**self.config, **(getattr(strategy, "config", None) or {})}
+        broker = ReplayBroker(config, self.instrument, self.initial_balance)
+        return _BlockSession(name, strategy, broker, config)
+
+    def _step_ticks(self, sessions, t, bid, ask, busy):
+        """Per-tick path: publish like PriceStream, wake due run() loops."""
+        for ts, b, a in zip(t.tolist(), bid.tolist(), ask.tolist()):
+            quote = Quote(self.instrument, ts, b, a)
+            self.cache.put(quote)
+            self.ring.publish(quote)
+            for session in sessions:
+                session.broker.on_quote(quote)
+                began = time.perf_counter()
+                if session.step(ts):
+                    took = time.perf_counter() - began
+                    self.latency.record(session.name, took)
+                    busy[session.name] += took
+
+    def _blocks(self, time_):
+        """(lo, hi) slices: fixed-size flat out, time-sliced when paced."""
+        n = len(time_)
+        if self.speed <= 0:
+            for lo in range(0, n, self.block_size):
+                yield lo, min(lo + self.block_size, n)
+            return
+        span = int(self.speed * PACE_SECONDS * 1e9)
+        lo = 0
+        while lo < n:
+            hi = int(np.searchsorted(time_, time_[lo] + span, side="left"))
+            hi = min(max(hi, lo + 1), lo + self.block_size)
+            yield lo, hi
+            lo = hi
+
+    def _pace(self, started, first_ns, block_end_ns):
+        due = started + (int(block_end_ns) - int(first_ns)) / 1e9 / self.speed
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _summary(self, session) -> dict:
+        final = session.broker.balance
+        return {
+            "final_balance": final,
+            "profit": final - self.initial_balance,
+            "trades": session.broker.trade_records(),
+            "equity": equity_records(session.curve_time, session.curve),
+        }
+
+
+__all__ = [
+    "ReplayBroker",
+    "ReplayClock",
+    "ReplayEngine",
+    "TickRecorder",
+    "candle_ticks",
+    "load_ticks",
+    "TICK_STORE_DIR",
+]
@@ -0,0 +1,372 @@
+# backtest/results_store.py
+"""
+Persistent back-test results with a queryable SQLite index
+----------------------------------------------------------------
+• Every run is one .npz file next to the index:
+      .cache/results/<run_id>.npz   – equity_curve + trades record arrays
+                                      (backtest/metrics dtypes) and a JSON
+                                      "meta" entry: config, balances, range
+      .cache/results/index.sqlite   – one row per run: strategy, pair,
+                                      timeframe, params_hash, candle range
+                                      and the scalar metrics
+• params_hash covers everything in the config that changes a result
+  (secrets, GUI handles and live-only fields are dropped) plus a hash of
+  the strategy's source file; run_id adds the engine version (a hash of
+  the fill / metric / SL-TP-sizing sources in ENGINE_FILES), the candle
+  range and a hash of the candle values to it. The same strategy,
+  parameters, engine and candles therefore map to the same run_id, and
+  cached() returns it without running the back-test again.
+• query() reads index rows only – thousands of sweep results can be
+  ranked and filtered without opening a single .npz file.
+----------------------------------------------------------------
+Usage
+-----
+>>> from backtest.results_store import get_results_store
+>>> results = run_backtest(config, candle_count=5000, store=get_results_store())
+>>> get_results_store().query(pair="EUR_USD", order_by="sharpe", limit=20)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .metrics import summary
+
+# ------------------------ config -------------------------------------------------
+RESULTS_STORE_DIR = Path(".cache") / "results"
+INDEX_FILE = "index.sqlite"
+# config keys that never change a back-test's result
+IGNORED_KEYS = (
+    "token",
+    "account_id",
+    "environment",
+    "finnhub_api_key",
+    "stop_flag",
+    "current_price",
+    "run_mode",
+    "start_time",
+    "end_time",
+)
+# sources whose changes alter a stored result (paths from the repo root)
+ENGINE_FILES = (
+    "backtest/backtester.py",
+    "backtest/fills.py",
+    "backtest/metrics.py",
+    "core/trade_plan.py",
+    "core/sl_strategies.py",
+    "core/tp_strategies.py",
+    "core/risk_manager.py",
+    "utils/indicator_kernels.py",
+    "utils/price_tools.py",
+    "utils/instruments.py",
+)
+METRIC_COLUMNS = (
+    "sharpe",
+    "sortino",
+    "max_drawdown",
+    "max_drawdown_pct",
+    "drawdown_bars",
+    "profit_factor",
+    "expectancy",
+    "win_rate",
+    "exposure",
+)
+# positive magnitudes – the smallest value is the best run
+LOWER_IS_BETTER = ("max_drawdown", "max_drawdown_pct", "drawdown_bars")
+# ---------------------------------------------------------------------------------
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    run_id        TEXT PRIMARY KEY,
+    strategy      TEXT NOT NULL,
+    pair          TEXT NOT NULL,
+    timeframe     TEXT NOT NULL,
+    params_hash   TEXT NOT NULL,
+    params        TEXT NOT NULL,
+    start_ns      INTEGER,
+    end_ns        INTEGER,
+    candles       INTEGER NOT NULL,
+    created       REAL NOT NULL,
+    initial_balance REAL NOT NULL,
+    final_balance REAL NOT NULL,
+    profit        REAL NOT NULL,
+    trades        INTEGER NOT NULL,
+    {", ".join(f"{c} REAL" for c in METRIC_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS runs_market ON runs (strategy, pair, timeframe);
+CREATE INDEX IF NOT EXISTS runs_params ON runs (params_hash);
+"""
+
+
+def run_params(config: dict) -> dict:
+    """The part of a config that can change a back-test's result."""
+    return {
+        k: v
+        for k, v in config.items()
+        if k not in IGNORED_KEYS and not callable(v) and not k.startswith("_")
+    }
+
+
+def strategy_version(name: str) -> str:
+    """Hash of strategies/<name>.py as loaded (empty for in-memory modules)."""
+    module = sys.modules.get(f"strategies.{name}")
+    path = getattr(module, "__file__", None)
+    if not path or not os.path.exists(path):
+        return ""
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()[:12]
+
+
+@lru_cache(maxsize=1)
+def engine_version() -> str:
+    """Hash of the ENGINE_FILES sources (read once per process)."""
+    root = Path(__file__).resolve().parent.parent
+    sha = hashlib.sha1()
+    for name in ENGINE_FILES:
+        path = root / name
+        sha.update(name.encode())
+        if path.exists():
+            sha.update(path.read_bytes())
+    return sha.hexdigest()[:12]
+
+
+def _digest(obj) -> str:
+    text = json.dumps(obj, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def params_hash(config: dict) -> str:
+    return _digest(
+        [run_params(config), strategy_version(str(config.get("strategy", "")))]
+    )
+
+
+def candle_range(candles: pd.DataFrame):
+    """(first time ns, last time ns, count) of a candle frame."""
+    if not len(candles):
+        return None, None, 0
+    times = pd.DatetimeIndex(pd.to_datetime(candles["time"], utc=True))
+    times = times.as_unit("ns").asi8
+    return int(times[0]), int(times[-1]), len(times)
+
+
+def candle_digest(candles: pd.DataFrame) -> str:
+    """Hash of every candle column's values (a corrected candle changes it)."""
+    sha = hashlib.sha1()
+    for name in sorted(candles.columns):
+        if name == "time":
+            times = pd.DatetimeIndex(pd.to_datetime(candles["time"], utc=True))
+            values = times.as_unit("ns").asi8
+        else:
+            values = candles[name].to_numpy(dtype=np.float64)
+        sha.update(name.encode())
+        sha.update(np.ascontiguousarray(values).tobytes())
+    return sha.hexdigest()[:16]
+
+
+def run_id(config: dict, candles: pd.DataFrame) -> str:
+    return _digest(
+        [
+            params_hash(config),
+            engine_version(),
+            candle_range(candles),
+            candle_digest(candles),
+        ]
+    )
+
+
+def _plain(value):
+    """NumPy scalars → Python floats; NaN → NULL (SQLite keeps ±inf)."""
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+class ResultsStore:
+    def __init__(self, root: Path | str = RESULTS_STORE_DIR, compress: bool = True):
+        self.root = Path(root)
+        self.compress = compress
+        self._lock = threading.RLock()
+        self._ready = False
+
+    # -------------------------------- storage ------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.root / INDEX_FILE, timeout=30)
+        if not self._ready:
+            with self._lock:
+                con.executescript(_SCHEMA)
+                self._ready = True
+        return con
+
+    def _path(self, rid: str) -> Path:
+        return self.root / f"{rid}.npz"
+
+    def save(self, config: dict, results: dict, candles: pd.DataFrame) -> str:
+        """Write one run (file first, then its index row); returns its run_id."""
+        rid = run_id(config, candles)
+        start, end, count = candle_range(candles)
+        params = run_params(config)
+        meta = {
+            "config": params,
+            "initial_balance": results["initial_balance"],
+            "final_balance": results["final_balance"],
+            "profit": results["profit"],
+            "start_ns": start,
+            "end_ns": end,
+            "candles": count,
+        }
+        self.root.mkdir(parents=True, exist_ok=True)
+        buf = io.BytesIO()
+        (np.savez_compressed if self.compress else np.savez)(
+            buf,
+            equity_curve=results["equity_curve"],
+            trades=results["trades"],
+            meta=np.array(json.dumps(meta, default=str)),
+        )
+        with self._lock:
+            tmp = self._path(rid).with_suffix(".tmp")
+            tmp.write_bytes(buf.getbuffer())
+            os.replace(tmp, self._path(rid))
+
+        stats = results.get("metrics") or summary(
+            results["equity_curve"], results["trades"]
+        )
+        row = {
+            "run_id": rid,
+            "strategy": str(config.get("strategy", "")),
+            "pair": str(config.get("pair", "")),
+            "timeframe": str(config.get("timeframe", "")),
+            "params_hash": params_hash(config),
+            "params": json.dumps(params, sort_keys=True, default=str),
+            "start_ns": start,
+            "end_ns": end,
+            "candles": count,
+            "created": time.time(),
+            "initial_balance": float(results["initial_balance"]),
+            "final_balance": float(results["final_balance"]),
+            "profit": float(results["profit"]),
+            "trades": len(results["trades"]),
+            **{c: _plain(stats[c]) for c in METRIC_COLUMNS},
+        }
+        with closing(self._connect()) as con, con:
+            con.execute(
+                f"INSERT OR REPLACE INTO runs ({', '.join(row)}) "
+                f"VALUES ({', '.join('?' * len(row))})",
+                list(row.values()),
+            )
+        return rid
+
+    def load(self, rid: str) -> dict:
+        """One stored run in Backtester.run() result form."""
+        path = self._path(rid)
+        if not path.exists():
+            raise KeyError(f"[ResultsStore] No stored run {rid!r}")
+        with np.load(path) as z:
+            meta = json.loads(str(z["meta"]))
+            curve, trades = z["equity_curve"], z["trades"]
+        return {
+            "initial_balance": meta["initial_balance"],
+            "final_balance": meta["final_balance"],
+            "profit": meta["profit"],
+            "trades": trades,
+            "equity_curve": curve,
+            "metrics": summary(curve, trades),
+            "config": meta["config"],
+            "run_id": rid,
+        }
+
+    def cached(self, config: dict, candles: pd.DataFrame):
+        """The stored result of exactly this run, or None."""
+        path = self._path(run_id(config, candles))
+        return self.load(path.stem) if path.exists() else None
+
+    # -------------------------------- index --------------------------------
+    def query(
+        self,
+        strategy: str = None,
+        pair: str = None,
+        timeframe: str = None,
+        params_hash: str = None,
+        start=None,
+        end=None,
+        order_by: str = "profit",
+        limit: int = None,
+        ascending: bool = None,
+    ) -> pd.DataFrame:
+        """
+        Index rows (no trades / equity) filtered by market, parameters and
+        candle range (runs lying inside [start, end]); best `order_by` first –
+        smallest for LOWER_IS_BETTER columns (drawdowns), else largest.
+        `ascending` overrides the direction; NULL metrics always come last.
+        """
+        allowed = ("profit", "final_balance", "trades", "created", *METRIC_COLUMNS)
+        if order_by not in allowed:
+            raise ValueError(f"[ResultsStore] Cannot order by {order_by!r}")
+        where, args = [], []
+        for col, value in (
+            ("strategy", strategy),
+            ("pair", pair),
+            ("timeframe", timeframe),
+            ("params_hash", params_hash),
+        ):
+            if value is not None:
+                where.append(f"{col} = ?")
+                args.append(value)
+        if start is not None:
+            where.append("start_ns >= ?")
+            args.append(pd.to_datetime(start, utc=True).value)
+        if end is not None:
+            where.append("end_ns <= ?")
+            args.append(pd.to_datetime(end, utc=True).value)
+        sql = "SELECT * FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if ascending is None:
+            ascending = order_by in LOWER_IS_BETTER
+        direction = "ASC" if ascending else "DESC"
+        sql += f" ORDER BY {order_by} IS NULL, {order_by} {direction}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        if not (self.root / INDEX_FILE).exists():
+            return pd.DataFrame()
+        with closing(self._connect()) as con:
+            return pd.read_sql_query(sql, con, params=args)
+
+    def delete(self, rid: str):
+        with closing(self._connect()) as con, con:
+            con.execute("DELETE FROM runs WHERE run_id = ?", (rid,))
+        self._path(rid).unlink(missing_ok=True)
+
+
+_default_store = None
+
+
+def get_results_store() -> ResultsStore:
+    """Process-wide store used by run_backtest() and the GUI."""
+    global _default_store
+    if _default_store is None:
+        _default_store = ResultsStore()
+    return _default_store
+
+
+__all__ = [
+    "ResultsStore",
+    "LOWER_IS_BETTER",
+    "candle_digest",
+    "engine_version",
+    "get_results_store",
+    "params_hash",
+    "run_id",
+    "run_params",
+]
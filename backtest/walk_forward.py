@@ -0,0 +1,265 @@
+# backtest/walk_forward.py
+"""
+Walk-forward validation over one shared candle array
+----------------------------------------------------------------
+• A date range is read once through the candle store (missing history is
+  downloaded in chunks) and cut into consecutive windows
+      [ in-sample | out-of-sample ] → shift by `step` → repeat
+  rolling (fixed in-sample length) or anchored (in-sample grows from the
+  start). Lengths are candle counts (int) or time spans ("90D", "12h").
+• The candles are copied into shared memory once (optimizer.SharedCandles)
+  and every worker of one ProcessPoolExecutor attaches to them. All
+  in-sample sweeps of all windows are queued together; each window's best
+  parameters are then run on its out-of-sample slice, again in parallel.
+• Out-of-sample runs are stitched into one equity curve (each window's P/L
+  added on top of the previous ones) with stability metrics:
+    wfe                 – walk-forward efficiency: OOS profit per candle ÷
+                          IS profit per candle of the chosen parameters
+    profitable_windows  – share of OOS windows with profit > 0
+    oos_profit_mean / oos_profit_std, max_drawdown and sharpe of the
+                          stitched curve
+    param_stability     – per parameter: distinct values picked, and their
+                          coefficient of variation when numeric
+----------------------------------------------------------------
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import optimizer
+from .backtester import Backtester
+from .metrics import equity_records, max_drawdown, periods_per_year, returns, sharpe
+from .optimizer import SharedCandles, evaluate, parameter_grid, random_params
+
+Window = Tuple[int, int, int, int]  # in-sample lo/hi, out-of-sample lo/hi
+
+
+# ------------------------ windows ------------------------------------------------
+def walk_forward_windows(
+    times_ns: np.ndarray,
+    in_sample,
+    out_of_sample,
+    step=None,
+    anchored: bool = False,
+) -> List[Window]:
+    """
+    Half-open index windows (is_lo, is_hi, oos_lo, oos_hi) over sorted
+    `times_ns`. `in_sample` / `out_of_sample` / `step` (default: the
+    out-of-sample length) are all candle counts or all time spans.
+    """
+    n = len(times_ns)
+    step = out_of_sample if step is None else step
+    specs = (in_sample, out_of_sample, step)
+    if all(isinstance(s, (int, np.integer)) for s in specs):
+        starts = np.arange(n, dtype=np.int64)  # positions stand in for times
+    else:
+        specs = tuple(pd.Timedelta(s).value for s in specs)
+        starts = np.asarray(times_ns, dtype=np.int64)
+    is_len, oos_len, step_len = specs
+    if min(specs) <= 0:
+        raise ValueError("[WalkForward] Window lengths and step must be positive.")
+
+    windows = []
+    origin = starts[0] if n else 0
+    for k in itertools.count():
+        is_start = origin if anchored else origin + k * step_len
+        is_end = origin + is_len + k * step_len
+        oos_end = is_end + oos_len
+        is_lo, is_hi, oos_hi = np.searchsorted(starts, [is_start, is_end, oos_end])
+        if is_hi >= n:
+            break
+        if is_hi - is_lo >= 2 and oos_hi - is_hi >= 2:
+            windows.append((int(is_lo), int(is_hi), int(is_hi), int(oos_hi)))
+    return windows
+
+
+# ------------------------ worker side --------------------------------------------
+def _evaluate_in_sample(config, params, lo, hi, window, rank):
+    res = evaluate(config, params, optimizer._worker_candles.iloc[lo:hi])
+    res.update(window=window, rank=rank)
+    return res
+
+
+def _run_out_of_sample(config, params, lo, hi, window):
+    candles = optimizer._worker_candles.iloc[lo:hi]
+    results = Backtester({**config, **params}).run(candles=candles)
+    curve = results["equity_curve"]
+    return {
+        "window": window,
+        "profit": results["profit"],
+        "trades": len(results["trades"]),
+        "max_drawdown": results["metrics"]["max_drawdown"],
+        "time": curve["time"].view(np.int64),
+        "equity": curve["equity"] - results["initial_balance"],
+    }
+
+
+def _run_all(pool, fn, jobs: Iterable[tuple], max_pending: int):
+    """Submit with a bounded backlog and yield results in completion order."""
+    jobs, pending = iter(jobs), set()
+    while True:
+        for args in itertools.islice(jobs, max_pending - len(pending)):
+            pending.add(pool.submit(fn, *args))
+        if not pending:
+            return
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            yield fut.result()
+
+
+# ------------------------ metrics ------------------------------------------------
+def _param_stability(picks: List[dict]) -> Dict[str, dict]:
+    out = {}
+    for key in picks[0] if picks else ():
+        values = [p[key] for p in picks]
+        stats = {"distinct": len(set(map(str, values))), "values": values}
+        try:
+            nums = np.array(values, dtype=float)
+            mean = nums.mean()
+            stats["cv"] = float(nums.std() / abs(mean)) if mean else None
+        except (TypeError, ValueError):
+            stats["cv"] = None  # e.g. "1:2" ratios
+        out[key] = stats
+    return out
+
+
+def _stability(windows: List[dict], times: np.ndarray, curve: np.ndarray) -> dict:
+    oos = np.array([w["oos_profit"] for w in windows], dtype=float)
+    oos_rate = sum(w["oos_profit"] for w in windows) / max(
+        sum(w["oos_candles"] for w in windows), 1
+    )
+    is_rate = sum(w["is_profit"] for w in windows) / max(
+        sum(w["is_candles"] for w in windows), 1
+    )
+    return {
+        "windows": len(windows),
+        "wfe": oos_rate / is_rate if is_rate > 0 else None,
+        "profitable_windows": float((oos > 0).mean()) if len(oos) else 0.0,
+        "oos_profit_mean": float(oos.mean()) if len(oos) else 0.0,
+        "oos_profit_std": float(oos.std()) if len(oos) else 0.0,
+        "max_drawdown": max_drawdown(curve)[0],
+        "sharpe": sharpe(returns(curve), periods_per_year(times)),
+        "param_stability": _param_stability([w["params"] for w in windows]),
+    }
+
+
+# ------------------------ driver -------------------------------------------------
+def walk_forward(
+    config: dict,
+    param_grid: Dict[str, Iterable],
+    start=None,
+    end=None,
+    in_sample="90D",
+    out_of_sample="30D",
+    step=None,
+    anchored: bool = False,
+    method: str = "grid",
+    n_iter: int = 50,
+    objective: str = "profit",
+    candles: pd.DataFrame = None,
+    max_workers: int = None,
+    seed=None,
+) -> dict:
+    """
+    Optimise `param_grid` on every in-sample window and evaluate the winner
+    on the following out-of-sample window. Higher `objective` is better.
+
+    Returns {"windows": [...], "equity_curve": EQUITY_DTYPE records,
+             "initial_balance", "final_balance", "profit", "stability"}.
+    """
+    if method == "grid":
+        combos = parameter_grid(param_grid)
+    elif method == "random":
+        combos = random_params(param_grid, n_iter, seed)
+    else:
+        raise ValueError(f"[WalkForward] Unknown search method: {method}")
+
+    # GUI configs carry the stop_flag lambda – workers only need plain values
+    config = {k: v for k, v in config.items() if not callable(v)}
+    initial = float(config.get("starting_balance", 100_000))
+
+    if candles is None:
+        if start is None or end is None:
+            raise ValueError("[WalkForward] Pass start and end, or candles.")
+        candles = Backtester(config)._fetch_candle_range(start, end)
+    candles = candles.reset_index(drop=True)
+    times = pd.DatetimeIndex(pd.to_datetime(candles["time"], utc=True))
+    windows = walk_forward_windows(
+        times.as_unit("ns").asi8, in_sample, out_of_sample, step, anchored
+    )
+    if not windows:
+        raise ValueError(
+            f"[WalkForward] {len(candles)} candles are too few for one "
+            "in-sample + out-of-sample window."
+        )
+
+    workers = max_workers or os.cpu_count() or 1
+    best: Dict[int, dict] = {}
+    with SharedCandles(candles) as shared, ProcessPoolExecutor(
+        max_workers=workers, initializer=optimizer._init_worker, initargs=(shared.spec,)
+    ) as pool:
+        # ---- every in-sample sweep of every window in one queue
+        jobs = (
+            (config, params, is_lo, is_hi, w, rank)
+            for w, (is_lo, is_hi, _, _) in enumerate(windows)
+            for rank, params in enumerate(combos)
+        )
+        for res in _run_all(pool, _evaluate_in_sample, jobs, workers * 4):
+            cur = best.get(res["window"])
+            key = (res[objective], -res["rank"])  # ties → first combination
+            if cur is None or key > (cur[objective], -cur["rank"]):
+                best[res["window"]] = res
+
+        # ---- each winner on its out-of-sample slice
+        jobs = (
+            (config, best[w]["params"], oos_lo, oos_hi, w)
+            for w, (_, _, oos_lo, oos_hi) in enumerate(windows)
+        )
+        oos = {
+            res["window"]: res
+            for res in _run_all(pool, _run_out_of_sample, jobs, workers * 4)
+        }
+
+    # ---- stitch out-of-sample equity in window order
+    table, stamps, curve, offset = [], [], [], initial
+    for w, (is_lo, is_hi, oos_lo, oos_hi) in enumerate(windows):
+        res = oos[w]
+        stamps.append(res["time"])
+        curve.append(offset + res["equity"])
+        offset += res["profit"]
+        table.append(
+            {
+                "window": w,
+                "is_start": times[is_lo],
+                "is_end": times[is_hi - 1],
+                "oos_start": times[oos_lo],
+                "oos_end": times[oos_hi - 1],
+                "params": best[w]["params"],
+                "is_score": best[w][objective],
+                "is_profit": best[w]["profit"],
+                "is_candles": is_hi - is_lo,
+                "oos_profit": res["profit"],
+                "oos_trades": res["trades"],
+                "oos_max_drawdown": res["max_drawdown"],
+                "oos_candles": oos_hi - oos_lo,
+            }
+        )
+    curve = equity_records(np.concatenate(stamps), np.concatenate(curve))
+    return {
+        "windows": table,
+        "equity_curve": curve,
+        "initial_balance": initial,
+        "final_balance": offset,
+        "profit": offset - initial,
+        "stability": _stability(table, curve["time"], curve["equity"]),
+    }
+
+
+__all__ = ["walk_forward", "walk_forward_windows"]
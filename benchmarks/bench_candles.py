@@ -0,0 +1,147 @@
+# benchmarks/bench_candles.py
+"""
+Candle-ingest benchmark: utils/candle_store.parse_candles vs. the per-row
+DataFrame parsing it replaced.
+
+• Synthetic InstrumentsCandles payloads (JSON-decoded, like the API client's)
+• Best-of-N parse time and tracemalloc peak for
+    rows    – one dict per candle → DataFrame, string timestamps
+    columns – parse_candles() over the whole payload
+    paged   – parse_candles() per 5000-candle page + concat_columns()
+              (what CandleStore does while downloading)
+• Final size of the parsed result
+
+Usage
+-----
+$ python benchmarks/bench_candles.py
+$ python benchmarks/bench_candles.py --sizes 100000 500000 --price MBA
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.candle_store import (
+    MAX_CANDLES_PER_REQUEST,
+    PRICE_COMPONENTS,
+    concat_columns,
+    parse_candles,
+    to_oanda_time,
+)
+
+DEFAULT_SIZES = [10_000, 100_000, 500_000]
+
+
+def synthetic_payload(n: int, price: str, seed: int = 3) -> list:
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2020-01-01", tz="UTC").value
+    close = 1.1 + np.cumsum(rng.normal(0, 2e-4, n))
+    raw = []
+    for i, c in enumerate(close):
+        candle = {
+            "complete": True,
+            "volume": int(rng.integers(1, 1000)),
+            "time": to_oanda_time(start + i * 60 * 10**9),
+        }
+        for comp in price:
+            px = c + {"M": 0.0, "B": -5e-5, "A": 5e-5}[comp]
+            candle[PRICE_COMPONENTS[comp]] = {
+                "o": f"{px:.5f}",
+                "h": f"{px + 1e-4:.5f}",
+                "l": f"{px - 1e-4:.5f}",
+                "c": f"{px:.5f}",
+            }
+        raw.append(candle)
+    return json.loads(json.dumps(raw))  # plain decoded JSON, as from the API
+
+
+def parse_rows(raw: list, price: str) -> pd.DataFrame:
+    rows = []
+    for c in raw:
+        if not c["complete"]:
+            continue
+        row = {"time": c["time"], "volume": c["volume"]}
+        for comp in price:
+            q = c[PRICE_COMPONENTS[comp]]
+            row.update(
+                {
+                    f"{comp}_open": float(q["o"]),
+                    f"{comp}_high": float(q["h"]),
+                    f"{comp}_low": float(q["l"]),
+                    f"{comp}_close": float(q["c"]),
+                }
+            )
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def parse_paged(raw: list, price: str):
+    pages = [
+        parse_candles(raw[i : i + MAX_CANDLES_PER_REQUEST], price)
+        for i in range(0, len(raw), MAX_CANDLES_PER_REQUEST)
+    ]
+    return concat_columns(pages, price)
+
+
+def measure(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def result_bytes(result) -> int:
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    return sum(a.nbytes for a in result.values())
+
+
+def run(sizes, price: str, repeat: int):
+    print(f"[Bench] price={price}  repeat={repeat}")
+    print(
+        f"{'candles':>9} {'parser':<8} {'ms':>9} {'peak MiB':>9} "
+        f"{'result MiB':>10} {'speed-up':>8}"
+    )
+    for n in sizes:
+        raw = synthetic_payload(n, price)
+        baseline = None
+        for name, fn in (
+            ("rows", lambda: parse_rows(raw, price)),
+            ("columns", lambda: parse_candles(raw, price)),
+            ("paged", lambda: parse_paged(raw, price)),
+        ):
+            secs, peak, result = measure(fn, repeat)
+            baseline = baseline or secs
+            print(
+                f"{n:>9} {name:<8} {secs * 1e3:>9.1f} {peak / 2**20:>9.1f} "
+                f"{result_bytes(result) / 2**20:>10.1f} {baseline / secs:>7.1f}x"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--price", default="M")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    run(args.sizes, args.price.upper(), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# benchmarks/bench_metrics.py
+"""
+Performance statistics on long equity curves: backtest/metrics.
+
+• Synthetic random-walk equity curve (one point per M1 candle) with one
+  trade every 500 points, as EQUITY_DTYPE / TRADE_DTYPE record arrays
+• Times summary() and a set of rolling statistics per size
+• Memory: record arrays vs. the former list of {"ts", "time", "equity"}
+  dicts (measured on a 100k-point sample and scaled)
+
+Usage
+-----
+$ python benchmarks/bench_metrics.py
+$ python benchmarks/bench_metrics.py --sizes 1000000 10000000 --window 1440
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backtest import metrics
+
+DEFAULT_SIZES = [100_000, 1_000_000, 10_000_000]
+SAMPLE = 100_000
+TRADE_EVERY = 500
+
+
+def make_results(n: int, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    time_ns = 1_700_000_000 * 10**9 + np.arange(n, dtype=np.int64) * 60 * 10**9
+    equity = 100_000 + np.cumsum(rng.normal(0.01, 1.0, n))
+    curve = metrics.equity_records(time_ns, equity)
+    entries = np.arange(0, n - TRADE_EVERY // 2, TRADE_EVERY)
+    exits = entries + TRADE_EVERY // 2
+    sim = {
+        "entries": entries,
+        "exits": exits,
+        "dirs": np.ones(len(entries), dtype=np.int64),
+        "entry_price": equity[entries],
+        "exit_price": equity[exits],
+        "pl": equity[exits] - equity[entries],
+        "reason": np.full(len(entries), "signal"),
+    }
+    return curve, metrics.trade_records(sim, time_ns)
+
+
+def dict_bytes_per_point(curve: np.ndarray) -> float:
+    """Traced bytes of the old list-of-dicts curve, per point."""
+    sample = curve[:SAMPLE]
+    tracemalloc.start()
+    stamps = pd.to_datetime(sample["time"], utc=True)
+    old = [
+        {"ts": ts, "time": ts.isoformat(), "equity": eq}
+        for ts, eq in zip(stamps, sample["equity"].tolist())
+    ]
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del old
+    return used / len(sample)
+
+
+def timed(fn, *args):
+    began = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - began) * 1e3
+
+
+def run(sizes, window: int):
+    print(
+        f"{'points':>10} {'summary ms':>11} {'rolling ms':>11} "
+        f"{'records MB':>11} {'dicts MB':>9}"
+    )
+    for n in sizes:
+        curve, trades = make_results(n)
+        rets = metrics.returns(curve["equity"])
+        rolling = lambda: (
+            metrics.rolling_sharpe(rets, window),
+            metrics.rolling_sortino(rets, window),
+            metrics.rolling_drawdown(curve["equity"], window),
+            metrics.rolling_exposure(curve["time"], trades, window),
+        )
+        summary_ms = timed(metrics.summary, curve, trades)
+        rolling_ms = timed(rolling)
+        dicts_mb = dict_bytes_per_point(curve) * n / 2**20
+        print(
+            f"{n:>10} {summary_ms:>11.1f} {rolling_ms:>11.1f} "
+            f"{(curve.nbytes + trades.nbytes) / 2**20:>11.1f} {dicts_mb:>9.0f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--window", type=int, default=1440, help="rolling bars")
+    args = parser.parse_args(argv)
+    run(args.sizes, args.window)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_replay.py
+"""
+Tick-replay throughput: backtest/replay.ReplayEngine flat out.
+
+• Synthetic random-walk ticks (4 per second) written with TickRecorder's
+  file layout and replayed memory-mapped, like a real recording
+• Two strategies per size, both with a trailing stop
+    block – on_ticks(): one NumPy call per block of ticks, flipping long /
+            short every 5000 ticks (the fast path)
+    live  – strategies/ExampleStrategy's unchanged run() on M1 in lock-step,
+            its console output discarded (one Python step per tick)
+• Ticks/sec over the whole run, the strategy's p50 per call (block / candle
+  pass) and its share in µs per tick
+
+Usage
+-----
+$ python benchmarks/bench_replay.py
+$ python benchmarks/bench_replay.py --sizes 1000000 10000000 --live-max 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backtest.replay import TICK_COLUMNS, ReplayEngine, load_ticks
+from strategies.ExampleStrategy import Strategy
+from strategies.base_strategy import SIGNAL_BUY, SIGNAL_SELL
+
+DEFAULT_SIZES = [100_000, 1_000_000, 5_000_000]
+START = np.datetime64("2025-06-09T00:00:00", "ns")  # a Monday
+CONFIG = {
+    "token": "replay",
+    "environment": "practice",
+    "account_id": "replay",
+    "pair": "EUR_USD",
+    "direction": "Both",
+    "sl_strategy": "Trailing SL",
+    "trailing_distance": 10,
+    "tp_strategy": "Fixed TP (pips)",
+    "tp_pips": 30,
+    "account_balance": 100_000,
+    "risk_per_trade": 1,
+}
+
+
+class Flip:
+    """Buy / sell alternately every `every` ticks."""
+
+    def __init__(self, every: int = 5000):
+        self.every = every
+        self.seen = 0
+
+    def on_ticks(self, time, bid, ask):
+        idx = np.arange(self.seen, self.seen + len(bid))
+        self.seen += len(bid)
+        out = np.zeros(len(bid), dtype=np.int8)
+        out[idx % self.every == 0] = SIGNAL_BUY
+        out[idx % self.every == self.every // 2] = SIGNAL_SELL
+        return out
+
+
+def write_ticks(root: str, n: int, seed: int = 5):
+    rng = np.random.default_rng(seed)
+    bid = 1.1 + np.cumsum(rng.normal(0, 2e-5, n))
+    cols = {
+        "time": START.astype(np.int64) + np.arange(n, dtype=np.int64) * 250_000_000,
+        "bid": bid,
+        "ask": bid + 1.2e-4,
+    }
+    path = os.path.join(root, "EUR_USD")
+    os.makedirs(path, exist_ok=True)
+    for name, dtype in TICK_COLUMNS.items():
+        cols[name].astype(dtype).tofile(os.path.join(path, f"{name}.bin"))
+
+
+def run(sizes, live_max: int):
+    print(
+        f"{'ticks':>10} {'strategy':<8} {'ticks/s':>12} {'calls':>7} "
+        f"{'p50 ms':>7} {'µs/tick':>8} {'trades':>7}"
+    )
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as root:
+            write_ticks(root, n)
+            ticks = load_ticks("EUR_USD", root)
+            cases = [("block", Flip())]
+            if n <= live_max:
+                live = Strategy(dict(CONFIG), None, "Both", None, "EUR_USD", "M1")
+                cases.append(("live", live))
+            for name, strategy in cases:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    out = ReplayEngine(ticks, {name: strategy}, config=CONFIG).run()
+                stats = out["stats"]
+                latency = stats["latency"][name]
+                print(
+                    f"{n:>10} {name:<8} {stats['ticks_per_sec']:>12,.0f} "
+                    f"{latency['count']:>7} {latency['p50_ms']:>7.2f} "
+                    f"{stats['us_per_tick'][name]:>8.3f} "
+                    f"{len(out['results'][name]['trades']):>7}"
+                )
+            del ticks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--live-max",
+        type=int,
+        default=1_000_000,
+        help="skip the run() strategy above this many ticks (0 = never run it)",
+    )
+    args = parser.parse_args(argv)
+    run(args.sizes, args.live_max)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+# core/account_state.py
+"""
+In-memory account state kept current with AccountChanges deltas.
+
+• snapshot() loads the full account once (GET /v3/accounts/{id}: balance,
+  NAV, margin, open trades, positions, orders) and remembers its
+  lastTransactionID.
+• poll() asks only for what happened since then
+  (GET /v3/accounts/{id}/changes?sinceTransactionID=…): opened / reduced /
+  closed trades and changed positions are patched in, the balance follows
+  the accountBalance of the new transactions, and NAV / margin / unrealised
+  P/L come from the returned state. A rejected poll (e.g. the transaction
+  ID fell out of the server's window) falls back to a fresh snapshot.
+• Reads are served from memory. Bounded staleness: a read finding the data
+  older than `max_staleness` seconds syncs first, so no value is ever older
+  than that. start() additionally polls every `poll_interval` seconds in a
+  daemon thread, so reads normally never wait for a request.
+• on_change(callback) → callback(state, transactions) after every applied
+  delta (fills, closes, financing …) – for checks that must react to fills.
+• mark_to_market(quotes) → NAV with open trades re-marked at streamed
+  quotes, between polls (core/risk_guard).
+
+Usage
+-----
+>>> from core.account_state import get_account_state
+>>> state = get_account_state(client, account_id)      # snapshot + poller
+>>> state.balance, state.nav, state.margin_available
+>>> state.trades(), state.positions()
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from oandapyV20.endpoints.accounts import AccountChanges, AccountDetails
+from oandapyV20.exceptions import V20Error
+
+# ------------------------ config -------------------------------------------------
+MAX_STALENESS_S = 5.0  # reads never see data older than this
+POLL_INTERVAL_S = 2.0  # background poller (start())
+_LISTS = ("trades", "positions", "orders")
+# ---------------------------------------------------------------------------------
+
+
+def _float(value) -> float:
+    return float(value) if value not in (None, "") else 0.0
+
+
+class AccountState:
+    def __init__(
+        self,
+        client,
+        account_id: str,
+        max_staleness: float = MAX_STALENESS_S,
+        poll_interval: float = POLL_INTERVAL_S,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.client = client
+        self.account_id = account_id
+        self.max_staleness = max_staleness
+        self.poll_interval = poll_interval
+        self.clock = clock
+
+        self.last_transaction_id: Optional[str] = None
+        self.synced_at: Optional[float] = None  # clock() of the last good sync
+        self.snapshots = 0
+        self.polls = 0
+
+        self._account: dict = {}  # scalar fields, strings as sent by OANDA
+        self._trades: Dict[str, dict] = {}  # trade id → trade
+        self._positions: Dict[str, dict] = {}  # instrument → position
+        self._orders: Dict[str, dict] = {}  # order id → pending order
+        self._listeners: List[Callable] = []
+        self._lock = threading.RLock()
+        self._sync_lock = threading.RLock()  # one request in flight at a time
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -------------------------------- syncing ------------------------------
+    def snapshot(self):
+        """Replace everything with a full account read."""
+        response = self.client.request(AccountDetails(accountID=self.account_id))
+        account = response["account"]
+        with self._lock:
+            self._account = {k: v for k, v in account.items() if k not in _LISTS}
+            self._trades = {t["id"]: t for t in account.get("trades", [])}
+            self._positions = {
+                p["instrument"]: p for p in account.get("positions", []) if _is_open(p)
+            }
+            self._orders = {o["id"]: o for o in account.get("orders", [])}
+            self.last_transaction_id = response.get(
+                "lastTransactionID", account.get("lastTransactionID")
+            )
+            self.synced_at = self.clock()
+            self.snapshots += 1
+
+    def poll(self) -> int:
+        """Apply the changes since the last transaction seen; returns their count."""
+        if self.last_transaction_id is None:
+            self.snapshot()
+            return 0
+        response = self.client.request(
+            AccountChanges(
+                accountID=self.account_id,
+                params={"sinceTransactionID": self.last_transaction_id},
+            )
+        )
+        changes = response.get("changes", {})
+        transactions = changes.get("transactions", [])
+        with self._lock:
+            self._apply(changes, response.get("state", {}))
+            self.last_transaction_id = response.get(
+                "lastTransactionID", self.last_transaction_id
+            )
+            self.synced_at = self.clock()
+            self.polls += 1
+        if transactions:
+            for callback in list(self._listeners):
+                try:
+                    callback(self, transactions)
+                except Exception as e:
+                    print(f"[AccountState] Listener failed: {e}")
+        return len(transactions)
+
+    def sync(self):
+        """poll(), or a new snapshot when the server rejects the delta request."""
+        with self._sync_lock:
+            self._sync()
+
+    def _sync(self):
+        try:
+            self.poll()
+        except V20Error as e:
+            print(f"[AccountState] Changes poll failed ({e}); re-snapshotting.")
+            self.snapshot()
+
+    def ensure_fresh(self, max_age: float = None):
+        """Sync unless the data is younger than `max_age` (default max_staleness)."""
+        limit = self.max_staleness if max_age is None else max_age
+        if self.age > limit:
+            with self._sync_lock:
+                if self.age > limit:  # another reader may have just synced
+                    self._sync()
+
+    @property
+    def age(self) -> float:
+        """Seconds since the last successful sync (inf before the first)."""
+        if self.synced_at is None:
+            return float("inf")
+        return self.clock() - self.synced_at
+
+    def _apply(self, changes: dict, state: dict):
+        for trade in changes.get("tradesOpened", []) + changes.get("tradesReduced", []):
+            self._trades[trade["id"]] = trade
+        for trade in changes.get("tradesClosed", []):
+            self._trades.pop(trade["id"], None)
+        for position in changes.get("positions", []):
+            if _is_open(position):
+                self._positions[position["instrument"]] = position
+            else:
+                self._positions.pop(position["instrument"], None)
+        for order in changes.get("ordersCreated", []):
+            self._orders[order["id"]] = order
+        for key in ("ordersCancelled", "ordersFilled", "ordersTriggered"):
+            for order in changes.get(key, []):
+                self._orders.pop(order["id"], None)
+        for tx in changes.get("transactions", []):
+            if "accountBalance" in tx:  # fills, financing, transfers …
+                self._account["balance"] = tx["accountBalance"]
+
+        # dynamic state: prices moved since the last poll
+        for key, value in state.items():
+            if key not in _LISTS:
+                self._account[key] = value
+        for dyn in state.get("trades", []):
+            trade = self._trades.get(dyn["id"])
+            if trade is not None:
+                trade.update(dyn)
+        for dyn in state.get("positions", []):
+            position = self._positions.get(dyn["instrument"])
+            if position is not None:
+                position["unrealizedPL"] = dyn.get(
+                    "netUnrealizedPL", position.get("unrealizedPL")
+                )
+                position["marginUsed"] = dyn.get(
+                    "marginUsed", position.get("marginUsed")
+                )
+
+    # -------------------------------- reads --------------------------------
+    def _field(self, key: str) -> float:
+        self.ensure_fresh()
+        with self._lock:
+            return _float(self._account.get(key))
+
+    @property
+    def balance(self) -> float:
+        return self._field("balance")
+
+    @property
+    def nav(self) -> float:
+        return self._field("NAV")
+
+    @property
+    def unrealized_pl(self) -> float:
+        return self._field("unrealizedPL")
+
+    @property
+    def margin_used(self) -> float:
+        return self._field("marginUsed")
+
+    @property
+    def margin_available(self) -> float:
+        return self._field("marginAvailable")
+
+    def mark_to_market(self, quotes: Dict[str, object]) -> float:
+        """
+        NAV with open trades re-marked at `quotes` (instrument → Quote): longs
+        close at the bid, shorts at the ask. Only instruments quoted in the
+        account currency are re-marked; the others keep the polled P/L.
+        """
+        self.ensure_fresh()
+        with self._lock:
+            nav = _float(self._account.get("NAV"))
+            currency = self._account.get("currency")
+            if not currency:
+                return nav
+            for trade in self._trades.values():
+                quote = quotes.get(trade.get("instrument"))
+                if quote is None or not trade["instrument"].endswith("_" + currency):
+                    continue
+                units = _float(trade.get("currentUnits"))
+                close = quote.bid if units > 0 else quote.ask
+                live = units * (close - _float(trade.get("price")))
+                nav += live - _float(trade.get("unrealizedPL"))
+            return nav
+
+    def trades(self, instrument: str = None) -> List[dict]:
+        self.ensure_fresh()
+        with self._lock:
+            return [
+                copy.deepcopy(t)
+                for t in self._trades.values()
+                if instrument is None or t.get("instrument") == instrument
+            ]
+
+    def positions(self) -> List[dict]:
+        self.ensure_fresh()
+        with self._lock:
+            return copy.deepcopy(list(self._positions.values()))
+
+    def summary(self) -> dict:
+        """AccountSummary-shaped dict (numbers as strings, like the API)."""
+        self.ensure_fresh()
+        with self._lock:
+            out = dict(self._account)
+            out["openTradeCount"] = len(self._trades)
+            out["openPositionCount"] = len(self._positions)
+            out["pendingOrderCount"] = len(self._orders)
+            return out
+
+    def details(self) -> dict:
+        """AccountDetails-shaped dict: summary plus trades / positions / orders."""
+        out = self.summary()
+        with self._lock:
+            out["trades"] = copy.deepcopy(list(self._trades.values()))
+            out["positions"] = copy.deepcopy(list(self._positions.values()))
+            out["orders"] = copy.deepcopy(list(self._orders.values()))
+        return out
+
+    # -------------------------------- background poller --------------------
+    def on_change(self, callback: Callable[["AccountState", List[dict]], None]):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def start(self) -> "AccountState":
+        if self.synced_at is None:
+            self.snapshot()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.sync()
+            except Exception as e:  # network down: reads sync (and raise) themselves
+                print(f"[AccountState] Sync failed: {e}")
+
+
+def _is_open(position: dict) -> bool:
+    long_units = _float(position.get("long", {}).get("units"))
+    short_units = _float(position.get("short", {}).get("units"))
+    return long_units != 0 or short_units != 0
+
+
+# ------------------------ process-wide registry ----------------------------------
+_states: Dict[str, AccountState] = {}
+_states_lock = threading.Lock()
+
+
+def get_account_state(
+    client, account_id: str, start: bool = True, **options
+) -> AccountState:
+    """
+    Shared AccountState for the account (snapshotted, polling when `start`);
+    `options` (max_staleness, poll_interval …) apply when it is created.
+    """
+    with _states_lock:
+        state = _states.get(account_id)
+        if state is None or state.client is not client:
+            if state is not None:
+                state.stop()
+            state = _states[account_id] = AccountState(client, account_id, **options)
+    return state.start() if start else state
+
+
+def running_account_state(account_id: str) -> Optional[AccountState]:
+    """The shared state for `account_id` if one was set up, else None."""
+    return _states.get(account_id)
+
+
+def stop_account_states():
+    with _states_lock:
+        for state in _states.values():
+            state.stop()
+        _states.clear()
+
+
+__all__ = [
+    "AccountState",
+    "get_account_state",
+    "running_account_state",
+    "stop_account_states",
+]
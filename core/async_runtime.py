@@ -0,0 +1,414 @@
+# core/async_runtime.py
+"""
+asyncio runtime for live strategies.
+
+• StrategyRuntime owns one event loop in a daemon thread. Every launched
+  strategy becomes a task on that loop (`strategy.run_async(client)`), so a
+  hundred pair/timeframe combinations cost a hundred coroutines, not a hundred
+  blocked threads.
+• AsyncOandaClient speaks HTTP/1.1 to the v20 REST host over asyncio streams
+  (stdlib only): keep-alive connection pool, token-bucket rate limit, the same
+  retry rules and latency metrics as utils/api_client.PooledAPI. It accepts
+  the regular oandapyV20 endpoint objects. Only GETs are re-sent after a
+  dropped or stale connection – an order that may have reached the server is
+  never submitted twice – and malformed response framing surfaces as a
+  ConnectionError instead of a parser exception.
+• Stopping is cooperative: runtime.cancel() cancels the strategy tasks, which
+  unwind at their next await – no stop_flag polling.
+• Strategies wake on candle closes via core/candle_scheduler instead of
+  fixed sleeps.
+
+Usage
+-----
+>>> from core.async_runtime import get_runtime
+>>> runtime = get_runtime()
+>>> client = runtime.client(token, "practice")
+>>> runtime.submit(strategy.run_async(client), name="EUR_USD:M5")
+>>> runtime.cancel()                    # stop every strategy
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import ssl
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from typing import Dict, Optional
+from urllib.parse import urlencode, urlsplit
+
+import pandas as pd
+from oandapyV20.exceptions import V20Error
+from oandapyV20.oandapyV20 import TRADING_ENVIRONMENTS
+
+from utils.api_client import (
+    BACKOFF_BASE,
+    BACKOFF_MAX,
+    MAX_REQUESTS_PER_SECOND,
+    MAX_RETRIES,
+    POOL_SIZE,
+    RETRY_STATUS,
+    RequestMetrics,
+)
+from utils.streaming_indicators import WARMUP_BARS
+from core.candle_scheduler import fetch_candles_after
+
+# ------------------------ config -------------------------------------------------
+REQUEST_TIMEOUT = 10.0  # seconds per request (connect + response)
+
+
+# ------------------------ async HTTP client --------------------------------------
+class AsyncTokenBucket:
+    """Token bucket for one event loop (no locking needed)."""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else rate)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._stamp) * self.rate
+            )
+            self._stamp = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class _StaleConnection(ConnectionResetError):
+    """Server closed the connection before sending any response."""
+
+
+class _BadResponse(ConnectionError):
+    """Truncated or malformed HTTP framing; the connection is unusable."""
+
+
+class AsyncOandaClient:
+    def __init__(
+        self,
+        token: str,
+        environment: str = "practice",
+        rate: float = MAX_REQUESTS_PER_SECOND,
+        pool_size: int = POOL_SIZE,
+        max_retries: int = MAX_RETRIES,
+        backoff: float = BACKOFF_BASE,
+        timeout: float = REQUEST_TIMEOUT,
+    ):
+        try:
+            base = urlsplit(TRADING_ENVIRONMENTS[environment]["api"])
+        except KeyError:
+            raise ValueError(f"[AsyncClient] Unknown environment: {environment}")
+        self.environment = environment
+        self.host = base.hostname
+        self.ssl = ssl.create_default_context() if base.scheme == "https" else None
+        self.port = base.port or (443 if self.ssl else 80)
+        self.headers = {
+            "Host": base.netloc,
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        }
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = AsyncTokenBucket(rate)
+        self.metrics = RequestMetrics()
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle = []  # (reader, writer) kept alive between requests
+
+    # -------------------------------- public API ---------------------------
+    async def request(self, endpoint) -> dict:
+        """Send an oandapyV20 endpoint; returns the decoded JSON (like API.request)."""
+        method = endpoint.method.upper()
+        target = f"/{endpoint}"
+        params = getattr(endpoint, "params", None)
+        if method == "GET" and params:
+            target += "?" + urlencode(params)
+        data = getattr(endpoint, "data", None)
+        body = json.dumps(data).encode() if method != "GET" and data else b""
+
+        name = type(endpoint).__name__
+        attempt = 0
+        while True:
+            await self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                status, payload = await self._send(method, target, body)
+                if status >= 400:
+                    raise V20Error(status, payload.decode("utf-8"))
+            except (V20Error, OSError, asyncio.TimeoutError) as e:
+                elapsed = time.perf_counter() - start
+                if attempt >= self.max_retries or not self._retryable(method, e):
+                    self.metrics.record(name, elapsed, error=True, retries=attempt)
+                    raise
+                attempt += 1
+                delay = min(self.backoff * 2 ** (attempt - 1), BACKOFF_MAX)
+                print(
+                    f"[AsyncClient] {name} failed ({e!r}); retry {attempt}/"
+                    f"{self.max_retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+            self.metrics.record(name, time.perf_counter() - start, retries=attempt)
+            content = json.loads(payload) if payload else {}
+            endpoint.response = content
+            endpoint.status_code = status
+            return content
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+    # -------------------------------- internals ----------------------------
+    @staticmethod
+    def _retryable(method: str, error: Exception) -> bool:
+        if isinstance(error, V20Error):
+            code = int(getattr(error, "code", 0) or 0)
+            return code == 429 or (code in RETRY_STATUS and method == "GET")
+        return method == "GET"  # connection trouble: only reads are safe to repeat
+
+    async def _send(self, method: str, target: str, body: bytes):
+        async with self._slots:
+            while self._idle:
+                conn = self._idle.pop()
+                try:
+                    return await self._exchange(conn, method, target, body)
+                except (ConnectionResetError, BrokenPipeError):
+                    # usually closed while idle – but the request may have been
+                    # read, so only a GET moves on to the next connection
+                    if method != "GET":
+                        raise
+
+            conn = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=self.ssl),
+                self.timeout,
+            )
+            return await self._exchange(conn, method, target, body)
+
+    async def _exchange(self, conn, method, target, body):
+        """One round trip on `conn`: pooled again on success, closed on failure."""
+        try:
+            result, keep = await self._roundtrip(conn, method, target, body)
+        except asyncio.IncompleteReadError as e:
+            conn[1].close()
+            raise ConnectionResetError(f"connection closed mid-response: {e}")
+        except BaseException:
+            conn[1].close()
+            raise
+        self._release(conn, keep)
+        return result
+
+    def _release(self, conn, keep: bool):
+        if keep:
+            self._idle.append(conn)
+        else:
+            conn[1].close()
+
+    async def _roundtrip(self, conn, method, target, body):
+        reader, writer = conn
+        head = [f"{method} {target} HTTP/1.1"]
+        head += [f"{k}: {v}" for k, v in self.headers.items()]
+        head.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+        return await asyncio.wait_for(self._read_response(reader), self.timeout)
+
+    @staticmethod
+    async def _read_response(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise _StaleConnection("connection closed by server")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise _BadResponse(f"malformed status line {status_line[:80]!r}")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        keep = headers.get("connection", "").lower() != "close"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                line = await reader.readline()
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("truncated")
+                    size = int(line.split(b";")[0], 16)
+                except ValueError:
+                    raise _BadResponse(f"malformed chunk size line {line[:80]!r}")
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass  # trailers
+                    break
+                chunks.append(await reader.readexactly(size))
+                if await reader.readexactly(2) != b"\r\n":
+                    raise _BadResponse("chunk not followed by CRLF")
+            payload = b"".join(chunks)
+        elif "content-length" in headers:
+            try:
+                length = int(headers["content-length"])
+            except ValueError:
+                raise _BadResponse(f"bad Content-Length {headers['content-length']!r}")
+            payload = await reader.readexactly(length)
+        else:
+            payload, keep = await reader.read(), False
+
+        encoding = headers.get("content-encoding", "")
+        if encoding in ("gzip", "deflate"):
+            try:
+                payload = zlib.decompress(
+                    payload,
+                    16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS,
+                )
+            except zlib.error as e:
+                raise _BadResponse(f"undecodable {encoding} body: {e}")
+        return (status, payload), keep
+
+
+# ------------------------ candles for live strategies ----------------------------
+async def sync_indicators(
+    client: AsyncOandaClient, indicators, price: str = "M"
+) -> int:
+    """
+    Async counterpart of IndicatorSet.sync(): the first call pulls WARMUP_BARS,
+    later calls only candles completed after the last one fed.
+    """
+    after = None
+    if indicators.last_time is not None:
+        after = pd.Timestamp(indicators.last_time).value
+    candles = await fetch_candles_after(
+        client,
+        indicators.instrument,
+        indicators.granularity,
+        after,
+        WARMUP_BARS,
+        price,
+    )
+    return indicators.feed(candles)
+
+
+# ------------------------ runtime ------------------------------------------------
+class StrategyRuntime:
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._clients: Dict[tuple, AsyncOandaClient] = {}
+        self._lock = threading.Lock()
+
+    # -------------------------------- lifecycle ----------------------------
+    def start(self) -> "StrategyRuntime":
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self.loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(self.loop)
+                    self.loop.call_soon(ready.set)
+                    self.loop.run_forever()
+
+                self._thread = threading.Thread(target=run, daemon=True)
+                self._thread.start()
+                ready.wait()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """Cancel every strategy, close connections and stop the loop."""
+        if self.loop is None or not self.loop.is_running():
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+
+    async def _shutdown(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+
+    # -------------------------------- strategies ---------------------------
+    def client(self, token: str, environment: str = "practice") -> AsyncOandaClient:
+        """Shared async client for this runtime's loop."""
+        key = (token, environment)
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = AsyncOandaClient(token, environment)
+            return self._clients[key]
+
+    def submit(self, coro, name: str) -> Future:
+        """Schedule `coro` on the loop from any thread; `name` identifies it for cancel()."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._track(coro, name), self.loop)
+
+    async def _track(self, coro, name):
+        if name in self._tasks:
+            coro.close()
+            raise RuntimeError(f"[AsyncRuntime] '{name}' is already running")
+        self._tasks[name] = asyncio.current_task()
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            print(f"[AsyncRuntime] '{name}' stopped.")
+            raise
+        except Exception as e:
+            print(f"[AsyncRuntime] '{name}' failed: {e}")
+            raise
+        finally:
+            self._tasks.pop(name, None)
+
+    def cancel(self, name: str = None):
+        """Cancel one strategy by name, or all of them."""
+        if self.loop is None:
+            return
+
+        def _cancel():
+            for key, task in list(self._tasks.items()):
+                if name is None or key == name:
+                    task.cancel()
+
+        self.loop.call_soon_threadsafe(_cancel)
+
+    @property
+    def running(self):
+        return sorted(self._tasks)
+
+
+_runtime = StrategyRuntime()
+
+
+def get_runtime() -> StrategyRuntime:
+    """Process-wide runtime (loop thread started on first use)."""
+    return _runtime.start()
+
+
+def running_runtime() -> Optional[StrategyRuntime]:
+    """The process-wide runtime if its loop is up, else None – never starts it."""
+    loop = _runtime.loop
+    return _runtime if loop is not None and loop.is_running() else None
+
+
+__all__ = [
+    "AsyncOandaClient",
+    "StrategyRuntime",
+    "get_runtime",
+    "running_runtime",
+    "sync_indicators",
+]
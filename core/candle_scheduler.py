@@ -0,0 +1,413 @@
+# core/candle_scheduler.py
+"""
+Candle-close scheduling for live strategies.
+
+• Boundary maths for every OANDA granularity (S5 … M) with OANDA's default
+  alignment: minutes/H1 on the clock, H2–H12 and D from 17:00 New York,
+  W from Friday 17:00, M from 17:00 on the last day of the month.
+• The FX weekend (Friday 17:00 → Sunday 17:00 New York) is skipped: no
+  wake-ups for candles that cannot form.
+• CandleScheduler (asyncio) keeps one feed per instrument/granularity. After
+  each close it fetches the candles completed since the last delivery and
+  hands them to every subscriber as one DataFrame – exactly once per candle,
+  in bulk after a gap (sleep, reconnect) – so requests scale with the
+  timeframe, not with a fixed poll interval.
+• Close-to-callback latency is recorded per feed (`scheduler.latency`).
+• sleep_until_candle_close() is the blocking variant for thread-based run();
+  a thread given a simulated clock (set_thread_clock, used by
+  backtest/replay) sleeps on replayed time instead of the wall clock.
+
+Usage
+-----
+>>> scheduler = get_scheduler(async_client)
+>>> async for candles in scheduler.stream("EUR_USD", "M15", history=1000):
+...     indicators.feed(candles)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+import pytz
+from oandapyV20.endpoints.instruments import InstrumentsCandles
+
+from utils.api_client import RequestMetrics
+from utils.candle_store import (
+    MAX_CANDLES_PER_REQUEST,
+    parse_candles,
+    to_frame,
+    to_oanda_time,
+)
+
+# ------------------------ config -------------------------------------------------
+ALIGNMENT_TZ = pytz.timezone("America/New_York")
+DAILY_ALIGNMENT = 17  # hour (New York) at which D/W/M and H2+ candles start
+WEEKLY_ALIGNMENT = 4  # Friday
+CLOSE_GRACE = 1.0  # wait this long after a boundary so the candle is final
+MAX_CLOSE_WAIT = 15.0  # keep asking this long for a just-closed candle
+STOP_POLL = 1.0  # stop_flag check interval of sleep_until_candle_close()
+
+GRANULARITY_SECONDS = {
+    "S5": 5,
+    "S10": 10,
+    "S15": 15,
+    "S30": 30,
+    "M1": 60,
+    "M2": 120,
+    "M4": 240,
+    "M5": 300,
+    "M10": 600,
+    "M15": 900,
+    "M30": 1800,
+    "H1": 3600,
+    "H2": 7200,
+    "H3": 10800,
+    "H4": 14400,
+    "H6": 21600,
+    "H8": 28800,
+    "H12": 43200,
+    "D": 86400,
+    "W": 604800,
+}
+
+
+# ------------------------ boundary maths -----------------------------------------
+def _local(ts: float) -> datetime:
+    """epoch seconds → naive New York wall-clock time."""
+    return (
+        datetime.fromtimestamp(ts, pytz.utc)
+        .astimezone(ALIGNMENT_TZ)
+        .replace(tzinfo=None)
+    )
+
+
+def _epoch(local: datetime) -> float:
+    """naive New York wall-clock time → epoch seconds."""
+    return ALIGNMENT_TZ.localize(local).timestamp()
+
+
+def _daily_anchor(local: datetime) -> datetime:
+    """Start (17:00 New York) of the trading day containing `local`."""
+    anchor = local.replace(hour=DAILY_ALIGNMENT, minute=0, second=0, microsecond=0)
+    return anchor if local >= anchor else anchor - timedelta(days=1)
+
+
+def _month_end(year: int, month: int) -> datetime:
+    first_next = datetime(year + month // 12, month % 12 + 1, 1)
+    return (first_next - timedelta(days=1)).replace(hour=DAILY_ALIGNMENT)
+
+
+def candle_bounds(granularity: str, ts: float):
+    """(open, close) epoch seconds of the `granularity` candle containing ts."""
+    if granularity == "M":
+        local = _local(ts)
+        end = _month_end(local.year, local.month)
+        if local >= end:
+            nxt = end + timedelta(days=1)
+            return _epoch(end), _epoch(_month_end(nxt.year, nxt.month))
+        prev = local.replace(day=1) - timedelta(days=1)
+        return _epoch(_month_end(prev.year, prev.month)), _epoch(end)
+
+    try:
+        step = GRANULARITY_SECONDS[granularity]
+    except KeyError:
+        raise ValueError(f"[CandleScheduler] Unsupported granularity: {granularity}")
+
+    if step <= 3600:  # clock-aligned (New York is a whole-hour offset)
+        start = ts - ts % step
+        return start, start + step
+
+    local = _local(ts)
+    if granularity == "W":
+        day = _daily_anchor(local)
+        day -= timedelta(days=(day.weekday() - WEEKLY_ALIGNMENT) % 7)
+        return _epoch(day), _epoch(day + timedelta(days=7))
+    day = _daily_anchor(local)
+    if granularity == "D":
+        return _epoch(day), _epoch(day + timedelta(days=1))
+    anchor = _epoch(day)
+    start = anchor + (ts - anchor) // step * step
+    return start, min(start + step, _epoch(day + timedelta(days=1)))
+
+
+def market_closed(ts: float) -> bool:
+    """True inside the FX weekend (Friday 17:00 → Sunday 17:00 New York)."""
+    local = _local(ts)
+    wd, hour = local.weekday(), local.hour
+    return (
+        (wd == 4 and hour >= DAILY_ALIGNMENT)
+        or wd == 5
+        or (wd == 6 and hour < DAILY_ALIGNMENT)
+    )
+
+
+def next_market_open(ts: float) -> float:
+    """Epoch seconds of the next Sunday 17:00 New York at/after ts."""
+    local = _local(ts)
+    day = local.replace(hour=DAILY_ALIGNMENT, minute=0, second=0, microsecond=0)
+    day += timedelta(days=(6 - day.weekday()) % 7)
+    if day < local:
+        day += timedelta(days=7)
+    return _epoch(day)
+
+
+def next_candle_close(granularity: str, ts: float = None) -> float:
+    """Close time of the next candle that can actually form after ts."""
+    ts = time.time() if ts is None else ts
+    start, close = candle_bounds(granularity, ts)
+    if market_closed(start):
+        start, close = candle_bounds(granularity, next_market_open(start))
+    return close
+
+
+def seconds_until_close(granularity: str, now: float = None) -> float:
+    now = time.time() if now is None else now
+    return next_candle_close(granularity, now) - now
+
+
+async def wait_for_candle_close(granularity: str, grace: float = CLOSE_GRACE):
+    await asyncio.sleep(seconds_until_close(granularity) + grace)
+
+
+_thread_clock = threading.local()
+
+
+def set_thread_clock(clock=None):
+    """
+    Simulated clock for sleep_until_candle_close() in the calling thread –
+    any object with time() → epoch seconds and sleep_until(deadline,
+    stop_flag) → bool. None restores the wall clock.
+    """
+    _thread_clock.clock = clock
+
+
+def sleep_until_candle_close(
+    granularity: str, stop_flag: Callable = None, grace: float = CLOSE_GRACE
+) -> bool:
+    """Block until the running candle closes; False if stop_flag() fired first."""
+    clock = getattr(_thread_clock, "clock", None)
+    if clock is not None:
+        deadline = next_candle_close(granularity, clock.time()) + grace
+        return clock.sleep_until(deadline, stop_flag)
+    deadline = next_candle_close(granularity) + grace
+    while True:
+        if stop_flag and stop_flag():
+            return False
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return True
+        time.sleep(min(remaining, STOP_POLL))
+
+
+# ------------------------ candle fetch -------------------------------------------
+async def fetch_candles_after(
+    client, instrument: str, granularity: str, after=None, count: int = 1, price="M"
+) -> pd.DataFrame:
+    """
+    Completed candles newer than `after` (epoch-ns open time) through an
+    AsyncOandaClient; with after=None the latest `count` completed candles.
+    """
+    params = {"granularity": granularity, "price": price}
+    if after is None:
+        params["count"] = count + 1  # +1 for the running candle
+    else:
+        params["from"] = to_oanda_time(after)
+        params["includeFirst"] = False
+        params["count"] = MAX_CANDLES_PER_REQUEST
+    r = InstrumentsCandles(instrument=instrument, params=params)
+    raw = (await client.request(r))["candles"]
+    return to_frame(parse_candles(raw, price))
+
+
+# ------------------------ scheduler ----------------------------------------------
+class Subscription:
+    def __init__(self, feed, callback):
+        self.feed = feed
+        self.callback = callback
+        self.delivered = 0  # candles handed to the callback
+
+    def cancel(self):
+        if self in self.feed.subscribers:
+            self.feed.subscribers.remove(self)
+        if not self.feed.subscribers and self.feed.task is not None:
+            self.feed.task.cancel()
+
+
+class CandleFeed:
+    """Shared per instrument/granularity: one fetch per close for all subscribers."""
+
+    def __init__(self, instrument: str, granularity: str, history: int):
+        self.instrument = instrument
+        self.granularity = granularity
+        self.history = history
+        self.last: Optional[int] = None  # epoch-ns open time of newest delivered
+        self.subscribers = []
+        self.task: Optional[asyncio.Task] = None
+        self.requests = 0
+
+    @property
+    def key(self) -> str:
+        return f"{self.instrument}:{self.granularity}"
+
+
+class CandleScheduler:
+    def __init__(
+        self,
+        client,
+        price: str = "M",
+        grace: float = CLOSE_GRACE,
+        max_wait: float = MAX_CLOSE_WAIT,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.client = client
+        self.price = price
+        self.grace = grace
+        self.max_wait = max_wait
+        self.clock = clock
+        self.feeds: Dict[tuple, CandleFeed] = {}
+        self.latency = RequestMetrics()  # candle close → callback, per feed
+
+    # -------------------------------- public API ---------------------------
+    def subscribe(
+        self, instrument: str, granularity: str, callback, history: int = 0
+    ) -> Subscription:
+        """
+        callback(candles_df) – sync or async – runs once per batch of newly
+        completed candles. `history` candles are delivered first if the feed
+        is new; joining a running feed starts with its next close. Call from
+        the event loop.
+        """
+        candle_bounds(granularity, 0)  # validate granularity early
+        key = (instrument, granularity)
+        feed = self.feeds.get(key)
+        if feed is None or feed.task is None or feed.task.done():
+            feed = self.feeds[key] = CandleFeed(instrument, granularity, history)
+            feed.task = asyncio.get_running_loop().create_task(self._run_feed(feed))
+        sub = Subscription(feed, callback)
+        feed.subscribers.append(sub)
+        return sub
+
+    async def stream(self, instrument: str, granularity: str, history: int = 0):
+        """Async iterator of candle batches; batches a slow consumer missed are merged."""
+        queue: asyncio.Queue = asyncio.Queue()
+        sub = self.subscribe(instrument, granularity, queue.put_nowait, history)
+        try:
+            while True:
+                batch = [await queue.get()]
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+                yield (
+                    batch[0] if len(batch) == 1 else pd.concat(batch, ignore_index=True)
+                )
+        finally:
+            sub.cancel()
+
+    def stats(self) -> Dict[str, dict]:
+        """Per feed: requests made, candles delivered and close→callback latency."""
+        latency = self.latency.snapshot()
+        return {
+            feed.key: {
+                "requests": feed.requests,
+                "subscribers": len(feed.subscribers),
+                "latency": latency.get(feed.key),
+            }
+            for feed in self.feeds.values()
+        }
+
+    # -------------------------------- internals ----------------------------
+    async def _run_feed(self, feed: CandleFeed):
+        if feed.history:
+            try:
+                await self._deliver(feed, await self._fetch(feed, feed.history), None)
+            except Exception as e:
+                print(f"[CandleScheduler] {feed.key} history fetch failed: {e}")
+        while feed.subscribers:
+            now = self.clock()
+            close = next_candle_close(feed.granularity, now)
+            await asyncio.sleep(close - now + self.grace)
+            try:
+                candles = await self._fetch_closed(feed, close)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # next close fetches from feed.last again → catches up in bulk
+                print(f"[CandleScheduler] {feed.key} fetch failed: {e}")
+                continue
+            await self._deliver(feed, candles, close)
+
+    async def _fetch(self, feed: CandleFeed, count: int = 1) -> pd.DataFrame:
+        feed.requests += 1
+        return await fetch_candles_after(
+            self.client,
+            feed.instrument,
+            feed.granularity,
+            feed.last,
+            count,
+            self.price,
+        )
+
+    async def _fetch_closed(self, feed: CandleFeed, close: float) -> pd.DataFrame:
+        """Fetch until the candle ending at `close` is in (bounded by max_wait)."""
+        expected = candle_bounds(feed.granularity, close - 1e-3)[0]
+        deadline = self.clock() + self.max_wait
+        delay = 0.25
+        while True:
+            candles = await self._fetch(feed)
+            newest = candles["time"].iloc[-1].value / 1e9 if len(candles) else None
+            if (newest is not None and newest >= expected) or self.clock() > deadline:
+                return candles
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+    async def _deliver(self, feed: CandleFeed, candles: pd.DataFrame, close):
+        if not len(candles):
+            return
+        if feed.last is not None:  # never hand out a candle twice
+            candles = candles[candles["time"] > pd.Timestamp(feed.last, tz="UTC")]
+            if not len(candles):
+                return
+        feed.last = candles["time"].iloc[-1].value
+        for sub in list(feed.subscribers):
+            if close is not None:
+                self.latency.record(feed.key, self.clock() - close)
+            try:
+                result = sub.callback(candles)
+                if inspect.isawaitable(result):
+                    await result
+                sub.delivered += len(candles)
+            except Exception as e:
+                print(f"[CandleScheduler] {feed.key} callback failed: {e}")
+
+
+_schedulers = weakref.WeakKeyDictionary()
+
+
+def get_scheduler(client) -> CandleScheduler:
+    """Scheduler shared by every strategy using this AsyncOandaClient."""
+    scheduler = _schedulers.get(client)
+    if scheduler is None:
+        scheduler = _schedulers[client] = CandleScheduler(client)
+    return scheduler
+
+
+__all__ = [
+    "CandleScheduler",
+    "Subscription",
+    "candle_bounds",
+    "fetch_candles_after",
+    "get_scheduler",
+    "market_closed",
+    "next_candle_close",
+    "next_market_open",
+    "seconds_until_close",
+    "set_thread_clock",
+    "sleep_until_candle_close",
+    "wait_for_candle_close",
+]
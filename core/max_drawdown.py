@@ -1,43 +1,103 @@
 import os
 import json
+import threading
 from datetime import date
 from oandapyV20.endpoints.accounts import AccountSummary
 
+JOURNAL_PATH = "config/daily_balances.jsonl"
+LEGACY_PATH = "config/daily_balances.json"  # read-only now: {date: balance}
+
+
+class DayStartJournal:
+    """
+    Day-start balances as an append-only JSON-lines file: one
+    {"date", "account_id", "balance"} record per line, written with a single
+    O_APPEND write + fsync, so a crash never leaves a half-rewritten file and
+    concurrent writers never clobber each other. The last record wins.
+    """
+
+    def __init__(self, path=JOURNAL_PATH, legacy_path=LEGACY_PATH):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._balances = None  # (account_id, date) → balance, read once
+        self._legacy = {}  # date → balance from LEGACY_PATH
+        self._lock = threading.Lock()
+
+    def get(self, day, account_id):
+        with self._lock:
+            if self._balances is None:
+                self._balances, self._legacy = self._read()
+            balance = self._balances.get((account_id, str(day)))
+            return self._legacy.get(str(day)) if balance is None else balance
+
+    def record(self, day, account_id, balance):
+        line = json.dumps(
+            {"date": str(day), "account_id": account_id, "balance": float(balance)}
+        )
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, (line + "\n").encode())
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            if self._balances is not None:
+                self._balances[(account_id, str(day))] = float(balance)
+
+    def _read(self):
+        balances, legacy = {}, {}
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        key = (rec["account_id"], rec["date"])
+                        balances[key] = float(rec["balance"])
+                    except (ValueError, KeyError, TypeError):
+                        continue  # blank or torn line
+        # the old rewrite-in-place file (no account id) still answers for days
+        # recorded before the journal existed
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            try:
+                with open(self.legacy_path, "r") as f:
+                    legacy = {day: float(b) for day, b in json.load(f).items()}
+            except (OSError, ValueError) as e:
+                print(f"[DayStartJournal] Ignoring {self.legacy_path}: {e}")
+        return balances, legacy
+
 
 class MaxDrawdownChecker:
-    def __init__(self, config, client):
+    def __init__(self, config, client, account_state=None, journal=None):
         self.account_id = config["account_id"]
         self.max_drawdown_amount = float(config.get("max_drawdown"))
         self.client = client
-        self.storage_path = "config/daily_balances.json"
+        # core/account_state.AccountState → balance from memory, no request
+        self.account_state = account_state
+        self.journal = DayStartJournal() if journal is None else journal
+        self.storage_path = self.journal.path
         self.today = str(date.today())
         self._load_or_initialize_day_balance()
 
     def _load_or_initialize_day_balance(self):
-        if os.path.exists(self.storage_path):
-            with open(self.storage_path, "r") as f:
-                self.daily_data = json.load(f)
-        else:
-            self.daily_data = {}
-
-        if self.today not in self.daily_data:
-            current_balance = self._fetch_account_balance()
-            self.daily_data[self.today] = current_balance
-            self._save_data()
-        # print(f"Todays Starting Balance {self.daily_data}")
+        self.starting_balance = self.journal.get(self.today, self.account_id)
+        if self.starting_balance is None:
+            self.starting_balance = self._fetch_account_balance()
+            self.journal.record(self.today, self.account_id, self.starting_balance)
+        # print(f"Todays Starting Balance {self.starting_balance}")
 
     def _fetch_account_balance(self):
+        if self.account_state is not None:
+            return self.account_state.balance
         request = AccountSummary(accountID=self.account_id)
         response = self.client.request(request)
         return float(response["account"]["balance"])
 
-    def _save_data(self):
-        with open(self.storage_path, "w") as f:
-            json.dump(self.daily_data, f, indent=2)
-
     def is_drawdown_exceeded(self):
         current_balance = self._fetch_account_balance()
-        starting_balance = self.daily_data[self.today]
+        starting_balance = self.starting_balance
         drawdown = starting_balance - current_balance
         # print(f"Current drawdown {drawdown}")
         max = self.max_drawdown_amount / 100 * starting_balance
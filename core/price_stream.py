@@ -0,0 +1,317 @@
+# core/price_stream.py
+"""
+Streaming price feed for the OANDA v20 pricing stream.
+
+• PriceStream holds one chunked HTTP connection to
+  /v3/accounts/{id}/pricing/stream in a daemon thread, watches heartbeats
+  and reconnects with exponential back-off when the stream drops or goes
+  silent.
+• Every PRICE line updates `quote_cache` (last quote per instrument) and is
+  published to a TickRing – a fixed-size ring buffer with one writer and any
+  number of readers, each keeping its own cursor (no locks on the hot path).
+• is_market_open(), fetch_current_price() and the strategy loop read the
+  cache instead of issuing their own PricingInfo requests. A thread given
+  its own cache (set_thread_quote_cache, used by backtest/replay) reads
+  that one through `quote_cache` instead.
+
+Usage
+-----
+>>> from core.price_stream import get_price_stream, quote_cache
+>>> stream = get_price_stream(token, account_id, "practice", ["EUR_USD"])
+>>> ticks = stream.subscribe(["EUR_USD"])
+>>> for quote in ticks.poll(): ...
+>>> quote_cache.get("EUR_USD").mid
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import requests
+from oandapyV20.oandapyV20 import TRADING_ENVIRONMENTS
+
+
+class Quote:
+    __slots__ = ("instrument", "time", "bid", "ask", "tradeable", "received")
+
+    def __init__(self, instrument, time, bid, ask, tradeable=True, received=None):
+        self.instrument = instrument
+        self.time = time
+        self.bid = bid
+        self.ask = ask
+        self.tradeable = tradeable
+        self.received = time_now() if received is None else received
+
+    @property
+    def mid(self) -> float:
+        return (self.bid + self.ask) / 2
+
+    @classmethod
+    def from_stream(cls, msg: dict) -> "Quote":
+        return cls(
+            instrument=msg["instrument"],
+            time=msg["time"],
+            bid=float(msg["bids"][0]["price"]),
+            ask=float(msg["asks"][0]["price"]),
+            tradeable=msg.get("tradeable", msg.get("status") == "tradeable"),
+        )
+
+    def __repr__(self):
+        return f"Quote({self.instrument} {self.bid}/{self.ask} @ {self.time})"
+
+
+def time_now() -> float:
+    return time.monotonic()
+
+
+_thread_cache = threading.local()
+
+
+def set_thread_quote_cache(cache: "QuoteCache" = None):
+    """Serve `quote_cache` reads in the calling thread from `cache` (None → shared)."""
+    _thread_cache.cache = cache
+
+
+class QuoteCache:
+    """Last quote per instrument; single dict writes are atomic under the GIL."""
+
+    def __init__(self):
+        self._quotes: Dict[str, Quote] = {}
+
+    def put(self, quote: Quote):
+        self._quotes[quote.instrument] = quote
+
+    def get(self, instrument: str, max_age: float = None) -> Optional[Quote]:
+        """Latest quote, or None if missing or older than max_age seconds."""
+        if self is quote_cache:
+            override = getattr(_thread_cache, "cache", None)
+            if override is not None:
+                return override.get(instrument, max_age)
+        quote = self._quotes.get(instrument)
+        if quote is None:
+            return None
+        if max_age is not None and time_now() - quote.received > max_age:
+            return None
+        return quote
+
+    def clear(self):
+        self._quotes.clear()
+
+
+# shared by every stream in the process
+quote_cache = QuoteCache()
+
+
+# ------------------------ fan-out ring buffer ------------------------------------
+class TickRing:
+    """
+    Single-producer ring buffer. The writer fills a slot, then bumps `seq`;
+    readers copy slots up to the `seq` they saw and re-check for overruns.
+    """
+
+    def __init__(self, size: int = 4096):
+        if size & (size - 1):
+            raise ValueError("[TickRing] size must be a power of two")
+        self.size = size
+        self._mask = size - 1
+        self._slots: List[Optional[Quote]] = [None] * size
+        self.seq = 0  # total items ever published
+
+    def publish(self, item):
+        self._slots[self.seq & self._mask] = item
+        self.seq += 1
+
+    def read(self, cursor: int):
+        """Items from `cursor` to now → (items, new_cursor, dropped)."""
+        head = self.seq
+        dropped = 0
+        if head - cursor > self.size:  # reader was lapped
+            dropped = head - cursor - self.size
+            cursor = head - self.size
+        items = [self._slots[i & self._mask] for i in range(cursor, head)]
+        if self.seq - cursor > self.size:  # overwritten while copying
+            overrun = self.seq - cursor - self.size
+            items = items[overrun:]
+            dropped += overrun
+        return items, head, dropped
+
+
+class TickSubscriber:
+    def __init__(self, ring: TickRing, instruments: Iterable[str] = None):
+        self.ring = ring
+        self.instruments = set(instruments) if instruments else None
+        self.cursor = ring.seq  # only ticks published from now on
+        self.dropped = 0
+
+    def poll(self) -> List[Quote]:
+        items, self.cursor, dropped = self.ring.read(self.cursor)
+        self.dropped += dropped
+        if self.instruments is None:
+            return items
+        return [q for q in items if q.instrument in self.instruments]
+
+
+# ------------------------ stream connection --------------------------------------
+class PriceStream:
+    def __init__(
+        self,
+        token: str,
+        account_id: str,
+        environment: str = "practice",
+        instruments: Iterable[str] = (),
+        cache: QuoteCache = None,
+        ring_size: int = 4096,
+        heartbeat_timeout: float = 10.0,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        self.token = token
+        self.account_id = account_id
+        self.environment = environment
+        self.instruments = list(dict.fromkeys(instruments))
+        self.cache = quote_cache if cache is None else cache
+        self.ring = TickRing(ring_size)
+        self.heartbeat_timeout = heartbeat_timeout  # OANDA heartbeats every 5s
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.connected = threading.Event()
+        self.last_heartbeat = None
+        self.reconnects = 0
+        self.ticks = 0
+
+        self._session = requests.Session()
+        self._session.headers["Authorization"] = f"Bearer {token}"
+        self._response = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -------------------------------- public API ---------------------------
+    def start(self) -> "PriceStream":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 1.0):
+        """Signal the reader; it exits at the latest on the next heartbeat."""
+        self._stop.set()
+        self._drop_connection()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.connected.clear()
+
+    def add_instruments(self, instruments: Iterable[str]):
+        """Extend the subscription; reconnects once if anything new was added."""
+        new = [i for i in instruments if i not in self.instruments]
+        if new:
+            self.instruments.extend(new)
+            self._drop_connection()  # _run reconnects with the full list
+
+    def subscribe(self, instruments: Iterable[str] = None) -> TickSubscriber:
+        return TickSubscriber(self.ring, instruments)
+
+    # -------------------------------- internals ----------------------------
+    @property
+    def url(self) -> str:
+        base = TRADING_ENVIRONMENTS[self.environment]["stream"]
+        return f"{base}/v3/accounts/{self.account_id}/pricing/stream"
+
+    def _drop_connection(self):
+        resp = self._response
+        if resp is not None:
+            try:
+                resp.close()
+            except Exception:
+                pass
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                if self._consume():
+                    delay = self.reconnect_delay  # healthy session → reset back-off
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"[PriceStream] Stream dropped: {e}")
+            self.connected.clear()
+            if self._stop.wait(delay):
+                break
+            delay = min(delay * 2, self.max_reconnect_delay)
+            self.reconnects += 1
+
+    def _consume(self) -> bool:
+        """Read one connection until it ends; True if any message arrived."""
+        received = False
+        self._response = self._session.get(
+            self.url,
+            params={"instruments": ",".join(self.instruments)},
+            stream=True,
+            timeout=(10, self.heartbeat_timeout),  # read timeout = missed heartbeats
+        )
+        with self._response as resp:
+            if resp.status_code >= 400:
+                raise RuntimeError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+            self.connected.set()
+            for line in resp.iter_lines():
+                if self._stop.is_set():
+                    break
+                if not line:
+                    continue
+                received = True
+                msg = json.loads(line)
+                kind = msg.get("type")
+                if kind == "PRICE":
+                    quote = Quote.from_stream(msg)
+                    self.cache.put(quote)
+                    self.ring.publish(quote)
+                    self.ticks += 1
+                elif kind == "HEARTBEAT":
+                    self.last_heartbeat = msg.get("time")
+        self._response = None
+        return received
+
+
+# ------------------------ process-wide registry ----------------------------------
+_streams: Dict[tuple, PriceStream] = {}
+_streams_lock = threading.Lock()
+
+
+def get_price_stream(
+    token: str, account_id: str, environment: str, instruments: Iterable[str]
+) -> PriceStream:
+    """Shared, started PriceStream for the account, covering `instruments`."""
+    key = (token, account_id, environment)
+    with _streams_lock:
+        stream = _streams.get(key)
+        if stream is None:
+            stream = _streams[key] = PriceStream(
+                token, account_id, environment, instruments
+            )
+        else:
+            stream.add_instruments(instruments)
+        return stream.start()
+
+
+def stop_price_streams():
+    with _streams_lock:
+        for stream in _streams.values():
+            stream.stop()
+        _streams.clear()
+
+
+__all__ = [
+    "PriceStream",
+    "Quote",
+    "QuoteCache",
+    "TickRing",
+    "TickSubscriber",
+    "get_price_stream",
+    "set_thread_quote_cache",
+    "stop_price_streams",
+    "quote_cache",
+]
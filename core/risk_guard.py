@@ -0,0 +1,218 @@
+# core/risk_guard.py
+"""
+Continuous drawdown guard over the in-memory account state.
+
+• Equity comes from core/account_state: NAV from the last AccountChanges
+  poll, with open trades re-marked at the latest streamed quotes
+  (AccountState.mark_to_market) – no REST call per check.
+• Daily limit: equity at or below the day-start balance minus
+  `max_drawdown` % of it. The day-start balance is read from, or on the
+  first check of a day appended to, the DayStartJournal
+  (config/daily_balances.jsonl).
+• Trailing limit (optional): equity `trailing_drawdown` % below the highest
+  equity seen since the guard started.
+• Checked on every fill (AccountState.on_change) and on every streamed
+  tick: watch(stream) follows the pricing TickRing in a daemon thread, so a
+  breach is seen within `tick_interval` of the quote that caused it.
+• A breach sets `halted` once: stop_flag() turns true for synchronous
+  strategies, the named async strategy is cancelled on the shared runtime
+  and on_halt(reason) callbacks run (GUI message). It stays halted.
+
+Usage
+-----
+>>> from core.risk_guard import RiskGuard
+>>> guard = RiskGuard.from_config(config, account_state)
+>>> guard.watch(get_price_stream(token, account_id, env, [pair]))
+>>> strategy.run(stop_flag=guard.stop_flag(config.get("stop_flag")))
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import date
+from typing import Callable, Dict, List, Optional
+
+from core.max_drawdown import DayStartJournal
+
+# ------------------------ config -------------------------------------------------
+TICK_INTERVAL_S = 0.02  # TickRing poll period of watch()
+# ---------------------------------------------------------------------------------
+
+
+def _percent(value) -> Optional[float]:
+    """Config percentage → float, None when empty or not positive."""
+    if value in (None, ""):
+        return None
+    value = float(value)
+    return value if value > 0 else None
+
+
+class RiskGuard:
+    def __init__(
+        self,
+        account_state,
+        max_drawdown: float = None,
+        trailing_drawdown: float = None,
+        journal: DayStartJournal = None,
+        task_name: str = None,
+        tick_interval: float = TICK_INTERVAL_S,
+        today: Callable[[], date] = date.today,
+    ):
+        if max_drawdown is None and trailing_drawdown is None:
+            raise ValueError("[RiskGuard] Need max_drawdown or trailing_drawdown")
+        self.account_state = account_state
+        self.account_id = account_state.account_id
+        self.max_drawdown = max_drawdown
+        self.trailing_drawdown = trailing_drawdown
+        self.journal = DayStartJournal() if journal is None else journal
+        self.task_name = task_name  # async strategy to cancel on a breach
+        self.tick_interval = tick_interval
+        self.today = today
+
+        self.halted = threading.Event()
+        self.reason: Optional[str] = None
+        self.peak: Optional[float] = None
+        self.checks = 0
+
+        self._day = None
+        self._day_start: Optional[float] = None
+        self._quotes: Dict[str, object] = {}  # instrument → latest Quote
+        self._on_halt: List[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._closed = False
+        account_state.on_change(self._on_fill)
+
+    @classmethod
+    def from_config(cls, config: dict, account_state, **kwargs):
+        """Guard for the `max_drawdown` / `trailing_drawdown` % settings, or None."""
+        max_dd = _percent(config.get("max_drawdown"))
+        trailing = _percent(config.get("trailing_drawdown"))
+        if max_dd is None and trailing is None:
+            return None
+        return cls(account_state, max_dd, trailing, **kwargs)
+
+    # -------------------------------- checks -------------------------------
+    @property
+    def day_start_balance(self) -> float:
+        """Today's starting balance, appended to the journal on a new day."""
+        day = str(self.today())
+        if day != self._day:
+            balance = self.journal.get(day, self.account_id)
+            if balance is None:
+                # may sync, and a fill found by that sync re-enters check()
+                balance = self.account_state.balance
+                if day == self._day:  # … which already started the day
+                    return self._day_start
+                self.journal.record(day, self.account_id, balance)
+            self._day, self._day_start = day, balance
+        return self._day_start
+
+    def equity(self) -> float:
+        return self.account_state.mark_to_market(self._quotes)
+
+    def check(self, equity: float = None) -> Optional[str]:
+        """Evaluate both limits; halts and returns the reason on a breach."""
+        if self.halted.is_set() or self._closed:
+            return self.reason
+        # account reads may sync (and call _on_fill) – never under self._lock
+        if equity is None:
+            equity = self.equity()
+        if self.max_drawdown is not None:
+            start = self.day_start_balance
+        self.checks += 1
+        reason = None
+        with self._lock:
+            if self.max_drawdown is not None:
+                if start - equity >= self.max_drawdown / 100 * start:
+                    reason = (
+                        f"Daily drawdown {start - equity:.2f} reached "
+                        f"{self.max_drawdown:g}% of the day-start balance {start:.2f}"
+                    )
+            if self.trailing_drawdown is not None:
+                self.peak = equity if self.peak is None else max(self.peak, equity)
+                if reason is None and (
+                    self.peak - equity >= self.trailing_drawdown / 100 * self.peak
+                ):
+                    reason = (
+                        f"Trailing drawdown {self.peak - equity:.2f} reached "
+                        f"{self.trailing_drawdown:g}% of the equity peak "
+                        f"{self.peak:.2f}"
+                    )
+        if reason is not None:
+            self.halt(reason)
+        return reason
+
+    def on_quote(self, quote) -> Optional[str]:
+        self._quotes[quote.instrument] = quote
+        return self.check()
+
+    def _on_fill(self, state, transactions):
+        self.check()
+
+    # -------------------------------- halting ------------------------------
+    def on_halt(self, callback: Callable[[str], None]):
+        self._on_halt.append(callback)
+
+    def halt(self, reason: str):
+        with self._lock:
+            if self.halted.is_set():
+                return
+            self.reason = reason
+            self.halted.set()
+        print(f"[RiskGuard] HALT: {reason}")
+        if self.task_name is not None:
+            from core.async_runtime import get_runtime
+
+            get_runtime().cancel(self.task_name)
+        for callback in list(self._on_halt):
+            try:
+                callback(reason)
+            except Exception as e:
+                print(f"[RiskGuard] Halt callback failed: {e}")
+
+    def stop_flag(self, user_flag: Callable[[], bool] = None) -> Callable[[], bool]:
+        """stop_flag for strategy.run(): true once halted or when `user_flag()` is."""
+        halted = self.halted.is_set
+        if user_flag is None:
+            return halted
+        return lambda: halted() or bool(user_flag())
+
+    # -------------------------------- tick watcher --------------------------
+    def watch(self, stream, instruments=None) -> "RiskGuard":
+        """Check on every tick of `stream` (core/price_stream.PriceStream)."""
+        self.stop()
+        self._stop.clear()
+        ticks = stream.subscribe(instruments)
+        self._thread = threading.Thread(target=self._run, args=(ticks,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 1.0):
+        """Stop the tick watcher; fills are checked until close()."""
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def close(self):
+        """Detach from ticks and fills for good; a closed guard never halts."""
+        self._closed = True
+        self.stop()
+        self.account_state.remove_listener(self._on_fill)
+
+    def _run(self, ticks):
+        while not self._stop.wait(self.tick_interval):
+            if self.halted.is_set():
+                return
+            try:
+                quotes = ticks.poll()
+                for quote in quotes:
+                    self._quotes[quote.instrument] = quote
+                self.check()  # NAV moves between polls even without ticks
+            except Exception as e:
+                print(f"[RiskGuard] Check failed: {e}")
+
+
+__all__ = ["RiskGuard", "TICK_INTERVAL_S"]
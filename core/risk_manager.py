@@ -1,15 +1,47 @@
-from utils.price_tools import get_pip_value
+import numpy as np
+
 from utils.account_tools import get_account_details
+from utils.instruments import FALLBACK_MAX_UNITS, get_instrument
 
 """
 Use dynamic stop loss distance: by computing pip distance between entry_price and stop_loss_price.
 
 Raise detailed errors for missing or invalid config keys like account_balance and risk_per_trade.
 
-Return position size in units as expected by OANDA (not lots or fractional values).
+Return position size in units as expected by OANDA: capped at the instrument's
+maximumOrderUnits, truncated to its tradeUnitsPrecision, 0 below minimumTradeSize
+(utils/instruments.py).
 """
 
-MAX_POSITION_SIZE = 100000  # Cap to avoid OANDA rejection
+# cap for instruments the registry has not loaded (no account, back-tests)
+MAX_POSITION_SIZE = FALLBACK_MAX_UNITS
+
+
+def position_sizes(
+    entry_prices,
+    stop_loss_prices,
+    risk_amount,
+    pip_value,
+    max_units=MAX_POSITION_SIZE,
+    units_precision: int = 0,
+    min_units: float = 0.0,
+):
+    """
+    Units per entry risking `risk_amount` down to its stop, in one NumPy pass;
+    0 where the stop is missing (NaN), at the entry price or below `min_units`.
+    """
+    entry_prices = np.asarray(entry_prices, dtype=float)
+    pip_distance = np.abs(entry_prices - stop_loss_prices) / pip_value
+    with np.errstate(divide="ignore", invalid="ignore"):
+        units = risk_amount / (pip_distance * pip_value)
+    units = np.where(pip_distance > 0, np.minimum(units, max_units), 0.0)
+    if units_precision > 0:
+        scale = 10.0**units_precision
+        units = np.trunc(units * scale) / scale
+    else:
+        units = np.trunc(units).astype(np.int64)
+    units[units < min_units] = 0
+    return units
 
 
 class RiskManager:
@@ -38,7 +70,8 @@ class RiskManager:
                 "[RiskManager] Entry price and stop loss price must be provided."
             )
 
-        pip_value = get_pip_value(self.config.get("pair", ""))
+        instrument = get_instrument(self.config.get("pair", ""))
+        pip_value = instrument.pip
         pip_distance = abs(entry_price - stop_loss_price) / pip_value
 
         if pip_distance == 0:
@@ -49,4 +82,19 @@ class RiskManager:
         risk_amount = self.account_balance * self.risk_per_trade
         units = risk_amount / (pip_distance * pip_value)
 
-        return min(int(units), MAX_POSITION_SIZE)  # Cap position size
+        # Cap position size, then OANDA's unit precision / minimum
+        units = instrument.round_units(min(units, instrument.max_units))
+        return units if units >= instrument.min_units else 0
+
+    def calculate_position_sizes(self, entry_prices, stop_loss_prices):
+        """calculate_position_size() for whole arrays; 0 units where no stop."""
+        instrument = get_instrument(self.config.get("pair", ""))
+        return position_sizes(
+            entry_prices,
+            np.asarray(stop_loss_prices, dtype=float),
+            self.account_balance * self.risk_per_trade,
+            instrument.pip,
+            instrument.max_units,
+            instrument.trade_units_precision,
+            instrument.min_units,
+        )
@@ -1,25 +1,53 @@
 # core/sl_strategies.py
 
+import numpy as np
+
 from utils.price_tools import (
     get_pip_value,
-    fetch_candle_data,
-    calculate_ema,
+    price_decimals,
     calculate_trailing_stop,
+    round_price,
+    round_prices,
+    PRICE_DECIMALS,
 )
-from oandapyV20 import API
+from utils.streaming_indicators import indicator_set
+from utils.api_client import get_client
 from oandapyV20.exceptions import V20Error
 
 """
 TODO: Add logging inside each method (especially ema_based_sl) so you can inspect values during live runs or debugging.
 
-Cache EMA results inside the class or with memoization, if you're calling it repeatedly for the same candle data.
-
+get_stop_loss() prices one order; get_stop_losses() takes arrays of entry
+prices and directions (+1 / -1) and prices them all in one NumPy pass with
+the same float operations, so both give identical stops.
 """
 
 
+def fixed_stop_losses(
+    prices, dirs, distance: float, decimals: int = PRICE_DECIMALS
+) -> np.ndarray:
+    """Stops `distance` (price units) behind every entry – fixed and trailing SL."""
+    prices = np.asarray(prices, dtype=float)
+    dirs = np.asarray(dirs, dtype=float)
+    return round_prices(prices - dirs * distance, decimals)
+
+
+def ema_stop_losses(prices, dirs, ema, decimals: int = PRICE_DECIMALS) -> np.ndarray:
+    """EMA stop on the profit side of every entry; NaN where the EMA is NaN."""
+    prices = np.asarray(prices, dtype=float)
+    ema = np.asarray(ema, dtype=float)
+    dirs = np.asarray(dirs)
+    return round_prices(
+        np.where(dirs > 0, np.minimum(prices, ema), np.maximum(prices, ema)),
+        decimals,
+    )
+
+
 class StopLossStrategy:
-    def __init__(self, config):
+    def __init__(self, config, indicators=None):
         self.config = config
+        # already-synced IndicatorSet (async runtime); None → sync via REST here
+        self.indicators = indicators
 
     def get_stop_loss(self, current_price, direction):
         strategy = self.config.get("sl_strategy", "Fixed SL (pips)")
@@ -33,52 +61,95 @@ class StopLossStrategy:
         else:
             raise ValueError(f"[SL Strategy] Unknown stop loss strategy: {strategy}")
 
-    def fixed_sl(self, current_price, direction):
+    def get_stop_losses(self, prices, dirs, ema=None):
+        """
+        Stops for whole arrays of entries (dirs = +1 Buy / -1 Sell); the
+        EMA rule needs the EMA value at every entry in `ema`.
+        """
+        strategy = self.config.get("sl_strategy", "Fixed SL (pips)")
+        pair = self.config.get("pair", "")
+        pip_value, decimals = get_pip_value(pair), price_decimals(pair)
+
+        if strategy == "Fixed SL (pips)":
+            distance = self._sl_pips() * pip_value
+            return fixed_stop_losses(prices, dirs, distance, decimals)
+        elif strategy == "Trailing SL":
+            distance = self._trailing_pips() * pip_value
+            return fixed_stop_losses(prices, dirs, distance, decimals)
+        elif strategy == "EMA-Based SL":
+            if ema is None:
+                raise ValueError(
+                    f"[SL Strategy] EMA({self._ema_period()}) values are required."
+                )
+            return ema_stop_losses(prices, dirs, ema, decimals)
+        else:
+            raise ValueError(f"[SL Strategy] Unknown stop loss strategy: {strategy}")
+
+    def _sl_pips(self):
         try:
-            pips = float(self.config.get("sl_pips", 10))
+            return float(self.config.get("sl_pips", 10))
         except ValueError:
             raise ValueError("[SL Strategy] Invalid 'sl_pips' value in config.")
 
-        pip_value = get_pip_value(self.config.get("pair", ""))
-        if direction == "Buy":
-            return round(current_price - (pips * pip_value), 5)
-        else:
-            return round(current_price + (pips * pip_value), 5)
-
-    def trailing_sl(self, current_price, direction):
+    def _trailing_pips(self):
         try:
-            distance = float(self.config.get("trailing_distance", 10))
+            return float(self.config.get("trailing_distance", 10))
         except ValueError:
             raise ValueError(
                 "[SL Strategy] Invalid 'trailing_distance' value in config."
             )
 
-        pip_value = get_pip_value(self.config.get("pair", ""))
-        return calculate_trailing_stop(direction, current_price, distance, pip_value)
-
-    def ema_based_sl(self, current_price, direction):
+    def _ema_period(self):
         try:
-            ema_period = int(self.config.get("ema_period", 21))
+            return int(self.config.get("ema_period", 21))
         except ValueError:
             raise ValueError("[SL Strategy] Invalid EMA period provided.")
 
+    def fixed_sl(self, current_price, direction):
+        pips = self._sl_pips()
+        pair = self.config.get("pair", "")
+        pip_value, decimals = get_pip_value(pair), price_decimals(pair)
+        if direction == "Buy":
+            return round_price(current_price - (pips * pip_value), decimals)
+        else:
+            return round_price(current_price + (pips * pip_value), decimals)
+
+    def trailing_sl(self, current_price, direction):
+        distance = self._trailing_pips()
+        pair = self.config.get("pair", "")
+        return calculate_trailing_stop(
+            direction,
+            current_price,
+            distance,
+            get_pip_value(pair),
+            price_decimals(pair),
+        )
+
+    def ema_based_sl(self, current_price, direction):
+        ema_period = self._ema_period()
+
         pair = self.config.get("pair", "")
         granularity = self.config.get("timeframe", "M5")
         token = self.config.get("token", "")
         environment = self.config.get("environment", "")
-        account_id = self.config.get("account_id", "")
 
         try:
-            client = API(access_token=token, environment=environment)
-            price_series = fetch_candle_data(
-                client, pair, count=ema_period * 2, granularity=granularity
-            )
-            ema_value = calculate_ema(price_series, period=ema_period)
+            indicators = self.indicators
+            if indicators is None:
+                client = get_client(token, environment)  # pooled, reused per call
+                # shared per pair/timeframe state – only new candles are fed in
+                indicators = indicator_set(pair, granularity)
+                indicators.sync(client)
+            ema_value = indicators.get("EMA", length=ema_period).value
         except V20Error as e:
             raise RuntimeError(f"[SL Strategy] Failed to fetch data for EMA SL: {e}")
+        if ema_value is None:
+            raise RuntimeError(
+                f"[SL Strategy] Not enough history for EMA({ema_period}) on {pair}."
+            )
 
         # SL follows the EMA only on the profit side
         if direction == "Buy":
-            return round(min(current_price, ema_value), 5)
+            return round_price(min(current_price, ema_value), price_decimals(pair))
         else:
-            return round(max(current_price, ema_value), 5)
+            return round_price(max(current_price, ema_value), price_decimals(pair))
@@ -1,6 +1,33 @@
 # core/tp_strategies.py
 
-from utils.price_tools import get_pip_value
+import numpy as np
+
+from utils.price_tools import (
+    PRICE_DECIMALS,
+    get_pip_value,
+    price_decimals,
+    round_price,
+    round_prices,
+)
+
+
+def fixed_take_profits(
+    prices, dirs, distance: float, decimals: int = PRICE_DECIMALS
+) -> np.ndarray:
+    """Targets `distance` (price units) beyond every entry; dirs = +1 / -1."""
+    prices = np.asarray(prices, dtype=float)
+    dirs = np.asarray(dirs, dtype=float)
+    return round_prices(prices + dirs * distance, decimals)
+
+
+def risk_reward_take_profits(
+    prices, dirs, stops, ratio: float, pip_value: float, decimals=PRICE_DECIMALS
+):
+    """Targets `ratio` × the stop distance beyond every entry; NaN where no stop."""
+    prices = np.asarray(prices, dtype=float)
+    dirs = np.asarray(dirs, dtype=float)
+    reward_pips = ratio * (np.abs(prices - np.asarray(stops, dtype=float)) / pip_value)
+    return round_prices(prices + dirs * (reward_pips * pip_value), decimals)
 
 
 class TakeProfitStrategy:
@@ -17,17 +44,55 @@ class TakeProfitStrategy:
         else:
             raise ValueError(f"[TP Strategy] Unknown take profit strategy: {strategy}")
 
-    def fixed_tp(self, entry_price, direction):
+    def get_take_profits(self, entry_prices, dirs, stop_loss_prices=None):
+        """Targets for whole arrays of entries (dirs = +1 Buy / -1 Sell)."""
+        strategy = self.config.get("tp_strategy", "Fixed TP (pips)")
+        pair = self.config.get("pair", "")
+        pip_value, decimals = get_pip_value(pair), price_decimals(pair)
+
+        if strategy == "Fixed TP (pips)":
+            distance = self._tp_pips() * pip_value
+            return fixed_take_profits(entry_prices, dirs, distance, decimals)
+        elif strategy == "Risk:Reward Ratio":
+            if stop_loss_prices is None:
+                raise ValueError(
+                    "[TP Strategy] Stop loss prices are required for risk:reward TP."
+                )
+            return risk_reward_take_profits(
+                entry_prices,
+                dirs,
+                stop_loss_prices,
+                self._reward_ratio(),
+                pip_value,
+                decimals,
+            )
+        else:
+            raise ValueError(f"[TP Strategy] Unknown take profit strategy: {strategy}")
+
+    def _tp_pips(self):
         try:
-            pips = float(self.config.get("tp_pips", 20))
+            return float(self.config.get("tp_pips", 20))
         except ValueError:
             raise ValueError("[TP Strategy] Invalid 'tp_pips' value in config.")
 
-        pip_value = get_pip_value(self.config.get("pair", ""))
+    def _reward_ratio(self):
+        ratio_str = self.config.get("rr_ratio", "1:2")
+        try:
+            risk, reward = map(float, ratio_str.split(":"))
+        except Exception:
+            raise ValueError(
+                "[TP Strategy] Invalid Risk:Reward Ratio format (e.g., '1:2')"
+            )
+        return reward / risk
+
+    def fixed_tp(self, entry_price, direction):
+        pips = self._tp_pips()
+        pair = self.config.get("pair", "")
+        pip_value, decimals = get_pip_value(pair), price_decimals(pair)
         if direction == "Buy":
-            return round(entry_price + pips * pip_value, 5)
+            return round_price(entry_price + pips * pip_value, decimals)
         else:
-            return round(entry_price - pips * pip_value, 5)
+            return round_price(entry_price - pips * pip_value, decimals)
 
     def risk_reward_tp(self, entry_price, direction, stop_loss_price):
         if stop_loss_price is None:
@@ -35,19 +100,13 @@ class TakeProfitStrategy:
                 "[TP Strategy] Stop loss price is required for risk:reward TP."
             )
 
-        ratio_str = self.config.get("rr_ratio", "1:2")
-        try:
-            risk, reward = map(float, ratio_str.split(":"))
-        except Exception:
-            raise ValueError(
-                "[TP Strategy] Invalid Risk:Reward Ratio format (e.g., '1:2')"
-            )
-
-        pip_value = get_pip_value(self.config.get("pair", ""))
+        ratio = self._reward_ratio()
+        pair = self.config.get("pair", "")
+        pip_value, decimals = get_pip_value(pair), price_decimals(pair)
         risk_pips = abs(entry_price - stop_loss_price) / pip_value
-        reward_pips = (reward / risk) * risk_pips
+        reward_pips = ratio * risk_pips
 
         if direction == "Buy":
-            return round(entry_price + reward_pips * pip_value, 5)
+            return round_price(entry_price + reward_pips * pip_value, decimals)
         else:
-            return round(entry_price - reward_pips * pip_value, 5)
+            return round_price(entry_price - reward_pips * pip_value, decimals)
@@ -4,6 +4,7 @@ from oandapyV20 import API
 from oandapyV20.endpoints.trades import TradeCRCDO, TradeClose
 from typing import Optional, Dict
 from logs.trade_logger import log_trade
+from utils.price_tools import format_price
 from datetime import datetime
 
 
@@ -49,17 +50,24 @@ class TradeManager:
         )
 
     def update_stop_loss(
-        self, trade_id: str, new_sl_price: float = None, new_tp_price: float = None
+        self,
+        trade_id: str,
+        new_sl_price: float = None,
+        new_tp_price: float = None,
+        instrument: str = None,
     ) -> bool:
         if not new_sl_price and not new_tp_price:
             print("[TradeManager] No SL or TP update provided.")
             return False
 
+        # prices go out at the instrument's displayPrecision
+        if instrument is None:
+            instrument = self.active_trades.get(trade_id, {}).get("instrument", "")
         data = {}
         if new_sl_price:
-            data["stopLoss"] = {"price": str(round(new_sl_price, 5))}
+            data["stopLoss"] = {"price": format_price(new_sl_price, instrument)}
         if new_tp_price:
-            data["takeProfit"] = {"price": str(round(new_tp_price, 5))}
+            data["takeProfit"] = {"price": format_price(new_tp_price, instrument)}
 
         try:
             r = TradeCRCDO(accountID=self.account_id, tradeID=trade_id, data=data)
@@ -0,0 +1,284 @@
+# core/trade_plan.py
+"""
+Compiled SL / TP / position-size rules for one strategy run.
+
+• TradePlan.from_config() validates and parses the GUI strings once at
+  launch (sl_pips, trailing_distance, ema_period, tp_pips, rr_ratio,
+  account_balance, risk_per_trade) – with the same error messages as
+  StopLossStrategy / TakeProfitStrategy / RiskManager – and keeps typed
+  floats in __slots__. The per-candle path is then plain float arithmetic:
+  no config lookups, str→float parsing, rule dispatch or object creation.
+• stop() / target() / size() take one price ("Buy" / "Sell");
+  stops() / targets() / sizes() take whole arrays (dirs = +1 / -1) through
+  the array kernels of core/sl_strategies, tp_strategies and risk_manager,
+  and are what the back-tester calls for every trade at once. Both compute
+  with the same float operations and rounding, so they agree bit for bit.
+• Pip size, price decimals and unit limits come from the instrument
+  registry (utils/instruments.py) when the plan is built; an EMA-based
+  stop needs the EMA value passed in.
+
+Usage
+-----
+>>> plan = TradePlan.from_config(config)
+>>> sl = plan.stop(price, "Buy")        # EMA rule: plan.stop(price, "Buy", ema)
+>>> tp, units = plan.target(price, "Buy", sl), plan.size(price, sl)
+>>> sl_arr = plan.stops(entry_px, dirs, ema=ema_at_entries)
+"""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+from core.risk_manager import position_sizes
+from core.sl_strategies import ema_stop_losses, fixed_stop_losses
+from core.tp_strategies import fixed_take_profits, risk_reward_take_profits
+from utils.instruments import get_instrument
+from utils.price_tools import round_price
+
+# ------------------------ config -------------------------------------------------
+SL_RULES = ("Fixed SL (pips)", "Trailing SL", "EMA-Based SL")
+TP_RULES = ("Fixed TP (pips)", "Risk:Reward Ratio")
+_SIGN = {"Buy": 1.0, "Sell": -1.0}
+# ---------------------------------------------------------------------------------
+
+
+def _number(config, key, default, cast, error):
+    try:
+        return cast(config.get(key, default))
+    except (TypeError, ValueError):
+        raise ValueError(error)
+
+
+def _sign(direction: str) -> float:
+    try:
+        return _SIGN[direction]
+    except KeyError:
+        raise ValueError(f"[TradePlan] Invalid direction: {direction!r}")
+
+
+class TradePlan:
+    __slots__ = (
+        "pair",
+        "pip",
+        "sl_rule",
+        "sl_distance",
+        "ema_period",
+        "tp_rule",
+        "tp_distance",
+        "reward_ratio",
+        "account_balance",
+        "risk_fraction",
+        "risk_amount",
+        "max_units",
+        "min_units",
+        "units_precision",
+        "decimals",
+    )
+
+    def __init__(
+        self,
+        pair: str,
+        sl_rule: str = "Fixed SL (pips)",
+        sl_pips: float = 10.0,
+        ema_period: int = 21,
+        tp_rule: str = "Fixed TP (pips)",
+        tp_pips: float = 20.0,
+        reward_ratio: float = 2.0,
+        account_balance: float = None,
+        risk_fraction: float = None,
+        max_units: float = None,
+        decimals: int = None,
+    ):
+        if sl_rule not in SL_RULES:
+            raise ValueError(f"[SL Strategy] Unknown stop loss strategy: {sl_rule}")
+        if tp_rule not in TP_RULES:
+            raise ValueError(f"[TP Strategy] Unknown take profit strategy: {tp_rule}")
+        instrument = get_instrument(pair)  # utils/instruments registry
+        self.pair = pair
+        self.pip = instrument.pip
+        self.sl_rule = sl_rule
+        self.sl_distance = sl_pips * self.pip  # fixed and trailing alike
+        self.ema_period = ema_period
+        self.tp_rule = tp_rule
+        self.tp_distance = tp_pips * self.pip
+        self.reward_ratio = reward_ratio
+        self.risk_fraction = risk_fraction
+        self.set_balance(account_balance)
+        self.max_units = instrument.max_units if max_units is None else max_units
+        self.min_units = instrument.min_units
+        self.units_precision = instrument.trade_units_precision
+        self.decimals = instrument.display_precision if decimals is None else decimals
+
+    @classmethod
+    def from_config(cls, config: dict, sizing: bool = True) -> "TradePlan":
+        """
+        Parse the selected SL / TP rules' settings (defaults as in the rule
+        classes) and, with `sizing`, account_balance + risk_per_trade (%).
+        """
+        sl_rule = config.get("sl_strategy", "Fixed SL (pips)")
+        tp_rule = config.get("tp_strategy", "Fixed TP (pips)")
+        kwargs = {"sl_rule": sl_rule, "tp_rule": tp_rule}
+        if sl_rule == "Fixed SL (pips)":
+            kwargs["sl_pips"] = _number(
+                config,
+                "sl_pips",
+                10,
+                float,
+                "[SL Strategy] Invalid 'sl_pips' value in config.",
+            )
+        elif sl_rule == "Trailing SL":
+            kwargs["sl_pips"] = _number(
+                config,
+                "trailing_distance",
+                10,
+                float,
+                "[SL Strategy] Invalid 'trailing_distance' value in config.",
+            )
+        elif sl_rule == "EMA-Based SL":
+            kwargs["ema_period"] = _number(
+                config,
+                "ema_period",
+                21,
+                int,
+                "[SL Strategy] Invalid EMA period provided.",
+            )
+        if tp_rule == "Fixed TP (pips)":
+            kwargs["tp_pips"] = _number(
+                config,
+                "tp_pips",
+                20,
+                float,
+                "[TP Strategy] Invalid 'tp_pips' value in config.",
+            )
+        elif tp_rule == "Risk:Reward Ratio":
+            try:
+                risk, reward = map(float, config.get("rr_ratio", "1:2").split(":"))
+                kwargs["reward_ratio"] = reward / risk
+            except Exception:
+                raise ValueError(
+                    "[TP Strategy] Invalid Risk:Reward Ratio format (e.g., '1:2')"
+                )
+        if sizing:
+            if "account_balance" not in config:
+                raise ValueError(
+                    "[RiskManager] 'account_balance' is required in config."
+                )
+            if "risk_per_trade" not in config:
+                raise ValueError(
+                    "[RiskManager] 'risk_per_trade' is required in config."
+                )
+            kwargs["account_balance"] = _number(
+                config,
+                "account_balance",
+                None,
+                float,
+                "[RiskManager] 'account_balance' must be a valid number.",
+            )
+            kwargs["risk_fraction"] = (
+                _number(
+                    config,
+                    "risk_per_trade",
+                    None,
+                    float,
+                    "[RiskManager] 'risk_per_trade' must be a Percentage.",
+                )
+                / 100.0
+            )
+        return cls(config.get("pair", ""), **kwargs)
+
+    def set_balance(self, account_balance: float):
+        """New balance to size from (risk_per_trade % of it per trade)."""
+        self.account_balance = account_balance
+        self.risk_amount = (
+            None
+            if account_balance is None or self.risk_fraction is None
+            else account_balance * self.risk_fraction
+        )
+
+    # -------------------------------- one price ----------------------------
+    def _round(self, price: float) -> float:
+        return round_price(price, self.decimals)
+
+    def stop(self, price: float, direction: str, ema: float = None) -> float:
+        sign = _sign(direction)
+        if self.sl_rule != "EMA-Based SL":
+            return self._round(price - sign * self.sl_distance)
+        if ema is None:
+            raise RuntimeError(
+                f"[SL Strategy] Not enough history for EMA({self.ema_period}) "
+                f"on {self.pair}."
+            )
+        # SL follows the EMA only on the profit side
+        return self._round(min(price, ema) if sign > 0 else max(price, ema))
+
+    def target(self, price: float, direction: str, stop: float = None) -> float:
+        sign = _sign(direction)
+        if self.tp_rule == "Fixed TP (pips)":
+            return self._round(price + sign * self.tp_distance)
+        if stop is None:
+            raise ValueError(
+                "[TP Strategy] Stop loss price is required for risk:reward TP."
+            )
+        reward_pips = self.reward_ratio * (abs(price - stop) / self.pip)
+        return self._round(price + sign * (reward_pips * self.pip))
+
+    def size(self, price: float, stop: float) -> int:
+        """Units risking risk_per_trade % of the balance down to `stop`."""
+        if self.risk_amount is None:
+            raise ValueError("[RiskManager] Plan was compiled without sizing.")
+        pip_distance = abs(price - stop) / self.pip
+        if pip_distance == 0:
+            raise ValueError(
+                "[RiskManager] Stop loss pip distance is zero. "
+                "Cannot calculate position size."
+            )
+        units = min(self.risk_amount / (pip_distance * self.pip), self.max_units)
+        if self.units_precision > 0:
+            scale = 10.0**self.units_precision
+            units = math.trunc(units * scale) / scale
+        else:
+            units = int(units)
+        return units if units >= self.min_units else 0
+
+    # -------------------------------- whole arrays -------------------------
+    # the core/sl_strategies, tp_strategies and risk_manager array kernels
+    def stops(self, prices, dirs, ema=None) -> np.ndarray:
+        """Stop per entry; EMA rule: NaN where `ema` is NaN (still warming up)."""
+        if self.sl_rule != "EMA-Based SL":
+            return fixed_stop_losses(prices, dirs, self.sl_distance, self.decimals)
+        if ema is None:
+            raise RuntimeError(
+                f"[SL Strategy] EMA({self.ema_period}) values are required."
+            )
+        return ema_stop_losses(prices, dirs, ema, self.decimals)
+
+    def targets(self, prices, dirs, stops=None) -> np.ndarray:
+        """Target per entry; risk:reward gives NaN where the stop is NaN."""
+        if self.tp_rule == "Fixed TP (pips)":
+            return fixed_take_profits(prices, dirs, self.tp_distance, self.decimals)
+        if stops is None:
+            raise ValueError(
+                "[TP Strategy] Stop loss prices are required for risk:reward TP."
+            )
+        return risk_reward_take_profits(
+            prices, dirs, stops, self.reward_ratio, self.pip, self.decimals
+        )
+
+    def sizes(self, prices, stops) -> np.ndarray:
+        """Units per entry; 0 where the stop is missing or at the entry price."""
+        if self.risk_amount is None:
+            raise ValueError("[RiskManager] Plan was compiled without sizing.")
+        return position_sizes(
+            prices,
+            np.asarray(stops, dtype=float),
+            self.risk_amount,
+            self.pip,
+            self.max_units,
+            self.units_precision,
+            self.min_units,
+        )
+
+
+__all__ = ["TradePlan", "SL_RULES", "TP_RULES"]
@@ -1,6 +1,7 @@
 # gui/main_window.py
 
-from oandapyV20 import API
+from utils.api_client import get_client
+from core.async_runtime import running_runtime
 from oandapyV20.endpoints.accounts import AccountDetails, AccountInstruments
 from oandapyV20.endpoints.positions import OpenPositions
 from oandapyV20.exceptions import V20Error
@@ -23,6 +24,7 @@ from PySide6.QtWidgets import (
 import sys
 from launch_strategy import load_strategies, launch_strategy
 from utils.trade_tools import close_all_trades_by_id
+from backtest.monte_carlo import monte_carlo
 import json
 import os
 from threading import Thread
@@ -57,6 +59,7 @@ class MainWindow(QWidget):
     strategy_complete_signal = Signal(str)
     strategy_info_signal = Signal(str)
     backtest_results_signal = Signal(dict)
+    optimize_results_signal = Signal(list)
 
     def __init__(self):
         super().__init__()
@@ -66,6 +69,7 @@ class MainWindow(QWidget):
         self.stop_requested = False
         self.API_connected = False
         self.backtest_results_signal.connect(self.show_backtest_results)
+        self.optimize_results_signal.connect(self.show_optimize_results)
 
         self.setWindowTitle("OANDA Trading App")
 
@@ -110,7 +114,7 @@ class MainWindow(QWidget):
         load_strategies(self)
         self.run_mode_label = QLabel("Run Mode:")
         self.run_mode_dropdown = QComboBox()
-        self.run_mode_dropdown.addItems(["Live", "Backtest"])
+        self.run_mode_dropdown.addItems(["Live", "Backtest", "Optimize"])
         trade_layout.addWidget(self.pair_label, 0, 0)
         trade_layout.addWidget(self.pair_dropdown, 0, 1)
         trade_layout.addWidget(self.timeframe_label, 1, 0)
@@ -295,7 +299,7 @@ class MainWindow(QWidget):
             )
             return
         try:
-            client = API(access_token=token, environment=environment)
+            client = get_client(token, environment)
             response = client.request(AccountDetails(accountID=account_id))
             instruments = client.request(AccountInstruments(accountID=account_id))
             self.pair_dropdown.clear()
@@ -394,6 +398,9 @@ class MainWindow(QWidget):
     def handle_stop(self):
         if self.start_requested:  # Check if strategy launched
             self.stop_requested = True  # set stop flag
+            runtime = running_runtime()  # None when no async strategy ever ran
+            if runtime is not None:
+                runtime.cancel()  # async strategies stop at their next await
             QMessageBox.information(
                 self, "Strategy Halt", "Stop requested. Strategy terminate."
             )
@@ -457,7 +464,7 @@ class MainWindow(QWidget):
 
         def background_close():
             try:
-                client = API(access_token=token, environment=environment)
+                client = get_client(token, environment)
                 from core.trade_manager import (
                     TradeManager,
                 )  # Lazy import to avoid circularity
@@ -538,14 +545,35 @@ class MainWindow(QWidget):
             f"Final balance   : {results['final_balance']:.2f}\n"
             f"Total P/L       : {profit:+.2f}"
         )
+        stats = results.get("metrics")
+        if stats:
+            summary += (
+                f"\n\nSharpe / Sortino : {stats['sharpe']:.2f} / {stats['sortino']:.2f}\n"
+                f"Max drawdown    : {stats['max_drawdown']:.5f} "
+                f"({stats['max_drawdown_pct']:.2%}, {stats['drawdown_bars']} bars)\n"
+                f"Profit factor   : {stats['profit_factor']:.2f}\n"
+                f"Expectancy      : {stats['expectancy']:+.5f} per trade\n"
+                f"Win rate        : {stats['win_rate']:.1%}\n"
+                f"Exposure        : {stats['exposure']:.1%}"
+            )
+        if len(trades):  # robustness of the same trades in other orders / draws
+            mc = monte_carlo(trades, initial_balance=results["initial_balance"])
+            lo, hi = mc["final_balance"]["ci"]
+            summary += (
+                f"\n\nMonte Carlo ({mc['paths']:,} bootstrap paths)\n"
+                f"Final balance 95% CI : {lo:.2f} … {hi:.2f}\n"
+                f"Max drawdown p95     : {mc['max_drawdown']['percentiles'][95]:.5f}\n"
+                f"Probability of loss  : {mc['prob_loss']:.1%}\n"
+                f"Risk of ruin (-50%)  : {mc['risk_of_ruin']:.1%}"
+            )
 
         lay = QVBoxLayout(dlg)
         lay.addWidget(QLabel(summary))
 
         # ---------- equity curve plot ----------
-        if equity:  # safety
+        if len(equity):  # safety
             fig, ax = plt.subplots()
-            ax.plot([e["time"] for e in equity], [e["equity"] for e in equity])
+            ax.plot(equity["time"], equity["equity"])
             ax.set_title("Equity curve")
             fig.tight_layout()
             canvas = Canvas(fig)  # create the QWidget wrapper
@@ -553,6 +581,22 @@ class MainWindow(QWidget):
             lay.addWidget(canvas)  # add to the dialog’s layout
         dlg.exec()
 
+    def show_optimize_results(self, results: list):
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Optimization Results")
+
+        lines = [f"Combinations tested : {len(results)}", ""]
+        for rank, res in enumerate(results[:10], start=1):
+            params = ", ".join(f"{k}={v}" for k, v in res["params"].items())
+            lines.append(
+                f"{rank:>2}. {params}   P/L {res['profit']:+.5f}   "
+                f"trades {res['trades']}   max DD {res['max_drawdown']:.5f}"
+            )
+
+        lay = QVBoxLayout(dlg)
+        lay.addWidget(QLabel("\n".join(lines)))
+        dlg.exec()
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
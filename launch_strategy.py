@@ -6,7 +6,10 @@ from threading import Event
 from PySide6.QtCore import Qt
 from main import run_strategy
 from utils.price_tools import fetch_current_price
-from backtest import run_backtest
+from utils.api_client import get_client
+from utils.instruments import instruments
+from backtest import run_backtest, optimize, best_results, param_grid_from_config
+from backtest.results_store import get_results_store
 
 stop_flag = Event()
 
@@ -37,7 +40,15 @@ def launch_strategy(self, stop_flag=None, gui_parent=None):
     instrument = self.pair_dropdown.currentText()
 
     try:
-        current_price = fetch_current_price(token, account_id, environment, instrument)
+        # pip size / precision / unit limits – from disk unless a day old
+        instruments.load(get_client(token, environment), account_id)
+    except RuntimeError as e:
+        print(f"{e} – using default pip and precision rules.")
+
+    try:
+        current_price = fetch_current_price(
+            get_client(token, environment), account_id, instrument
+        )
     except Exception as e:
         if gui_parent and hasattr(gui_parent, "strategy_error_signal"):
             gui_parent.strategy_error_signal.emit(
@@ -90,8 +101,22 @@ def launch_strategy(self, stop_flag=None, gui_parent=None):
         try:
             if config["run_mode"] == "Live":
                 run_strategy(config, gui_parent=None)
+            elif config["run_mode"] == "Optimize":
+                grid = param_grid_from_config(config)
+                results = []
+                for res in optimize(config, grid, candle_count=1000):
+                    results.append(res)
+                    print(
+                        f"[Optimizer] {len(results)} done: {res['params']} → {res['profit']:+.5f}"
+                    )
+                # one row per combination (halving re-runs survivors)
+                ranked = best_results(results, "profit")
+                if hasattr(self, "optimize_results_signal"):
+                    self.optimize_results_signal.emit(ranked)
             else:  # --- NEW ---
-                results = run_backtest(config, candle_count=1000)
+                results = run_backtest(
+                    config, candle_count=1000, store=get_results_store()
+                )
 
                 # 👉 emit a Qt signal with `results`
                 if hasattr(self, "backtest_results_signal"):
@@ -2,10 +2,21 @@
 
 import csv
 import os
+import threading
 from datetime import datetime
 
 TRADE_LOG_PATH = os.path.join("logs", "trade_log.csv")
 
+_thread_log = threading.local()
+
+
+def set_thread_log_path(path=None):
+    """
+    Trade log file for the calling thread: "" drops its trades (simulated
+    fills of backtest/replay), None restores TRADE_LOG_PATH.
+    """
+    _thread_log.path = path
+
 
 def log_trade(trade_info):
     # Set default fallback values
@@ -35,10 +46,16 @@ def log_trade(trade_info):
         "closed",
     ]
 
-    file_exists = os.path.exists(TRADE_LOG_PATH)
-    write_header = not file_exists or os.path.getsize(TRADE_LOG_PATH) == 0
+    path = getattr(_thread_log, "path", None)
+    if path is None:
+        path = TRADE_LOG_PATH
+    elif not path:
+        return
+
+    file_exists = os.path.exists(path)
+    write_header = not file_exists or os.path.getsize(path) == 0
 
-    with open(TRADE_LOG_PATH, mode="a", newline="") as f:
+    with open(path, mode="a", newline="") as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames)
 
         if write_header:
@@ -3,10 +3,14 @@
 import importlib
 from strategies.base_strategy import StrategyBase
 from core.news_filter import NewsFilter
-from core.max_drawdown import MaxDrawdownChecker
-from oandapyV20 import API
+from core.risk_guard import RiskGuard
+from utils.api_client import get_client
 from core.trading_time import is_within_trading_window
 from utils.account_tools import account_balance
+from core.account_state import get_account_state
+from utils.instruments import instruments
+from core.price_stream import get_price_stream
+from core.async_runtime import get_runtime
 
 
 def run_strategy(config, gui_parent=None):
@@ -32,34 +36,41 @@ def run_strategy(config, gui_parent=None):
         if key not in config or not config[key]:
             raise ValueError(f"Missing required config key: {key}")
 
-    config["account_balance"] = account_balance(
-        token=config["token"],
-        account_id=config["account_id"],
-        environment=config["environment"],
-    )
-    # Step 1.5: OANDA API client setup
-    client = API(access_token=config["token"], environment=config["environment"])
+    # Step 1.5: OANDA API client setup (shared, keep-alive, rate limited)
+    client = get_client(config["token"], config["environment"])
+    # one account snapshot, then AccountChanges deltas – balance, NAV, trades
+    # and positions are read from memory from here on
+    account_state = get_account_state(client, config["account_id"])
+    config["account_balance"] = account_balance(client, config["account_id"])
+    try:
+        instruments.load(client, config["account_id"])  # no-op when still fresh
+    except RuntimeError as e:
+        print(f"{e} – using default pip and precision rules.")
 
-    # Step 1.6: Max drawdown check (only if value is provided)
-    max_dd_str = config.get("max_drawdown")
-    if max_dd_str:
-        try:
-            max_dd = float(max_dd_str)
-            if max_dd > 0:
-                drawdown_checker = MaxDrawdownChecker(config, client)
-                print(f"Current Account Balance {config['account_balance']}")
-                print(f"Max Drawdown input {drawdown_checker.max_drawdown_amount}")
-                print(f"Draw Down exceed {drawdown_checker.is_drawdown_exceeded()}")
+    # Step 1.6: Drawdown guard (only if a limit is provided): checked now and
+    # then on every fill and streamed tick while the strategy runs
+    def halt_message(reason):
+        msg = f"[HALT] {reason}. Trading suspended for today."
+        print(msg)
+        if gui_parent and hasattr(gui_parent, "strategy_error_signal"):
+            gui_parent.strategy_error_signal.emit(msg)
 
-                # check daily drawdown
-                if drawdown_checker.is_drawdown_exceeded():
-                    msg = "[HALT] Max drawdown amount reached. Trading suspended for today."
-                    print(msg)
-                    if gui_parent and hasattr(gui_parent, "strategy_error_signal"):
-                        gui_parent.strategy_error_signal.emit(msg)
-                    return
-        except ValueError:
-            print("[WARNING] Invalid max_drawdown value, skipping drawdown check.")
+    strategy_name = config["strategy"]
+    task_name = f"{strategy_name}:{config.get('pair')}:{config.get('timeframe')}"
+    try:
+        guard = RiskGuard.from_config(config, account_state)
+    except ValueError:
+        print("[WARNING] Invalid max_drawdown value, skipping drawdown check.")
+        guard = None
+    if guard is not None:
+        print(f"Current Account Balance {config['account_balance']}")
+        print(f"Day start balance {guard.day_start_balance}")
+        reason = guard.check()
+        if reason:
+            halt_message(reason)
+            guard.close()
+            return
+        guard.on_halt(halt_message)
 
     # Step 1.7: Trading Time check (only if both start and end times are provided)
     if config.get("start_time") and config.get("end_time"):
@@ -106,7 +117,6 @@ def run_strategy(config, gui_parent=None):
     direction = config["direction"]
 
     # --- Step 3: Load and validate strategy class dynamically ---
-    strategy_name = config["strategy"]
     try:
         strategy_module = importlib.import_module(f"strategies.{strategy_name}")
         StrategyClass = getattr(strategy_module, "Strategy")
@@ -126,9 +136,40 @@ def run_strategy(config, gui_parent=None):
         raise TypeError(f"{strategy_name} must inherit from StrategyBase")
 
     # --- Step 4: Run strategy ---
+    user_stop = config.get("stop_flag")
     try:
-        strategy.run(stop_flag=config.get("stop_flag"))
-        stop_requested = config.get("stop_flag")
+        # keep the last-quote cache fed from the pricing stream
+        stream = get_price_stream(
+            config["token"],
+            config["account_id"],
+            config["environment"],
+            [config["pair"]],
+        )
+        if hasattr(strategy, "run_async") and guard is not None:
+            guard.task_name = task_name  # a breach cancels this task
+        if guard is not None:
+            guard.watch(stream)
+        if hasattr(strategy, "run_async"):
+            # hosted on the shared event loop; stopped via get_runtime().cancel()
+            # (by the Stop button or the drawdown guard)
+            runtime = get_runtime()
+            task = runtime.submit(
+                strategy.run_async(
+                    runtime.client(config["token"], config["environment"])
+                ),
+                name=task_name,
+            )
+            if guard is not None:
+                # finished or cancelled → detach, so no stale guard outlives it
+                task.add_done_callback(lambda _: guard.close())
+        else:
+            stop_flag = guard.stop_flag(user_stop) if guard else user_stop
+            try:
+                strategy.run(stop_flag=stop_flag)
+            finally:
+                if guard is not None:
+                    guard.close()
+        stop_requested = user_stop
         if not stop_requested:
             print(f"[INFO] Strategy '{strategy_name}' launched successfully.")
             if gui_parent and hasattr(gui_parent, "strategy_error_signal"):
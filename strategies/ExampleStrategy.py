@@ -1,15 +1,20 @@
 # strategies/ExampleStrategy.py
 
-import time
-from strategies.base_strategy import StrategyBase
-from core.risk_manager import RiskManager
-from core.sl_strategies import StopLossStrategy
-from core.tp_strategies import TakeProfitStrategy
+import numpy as np
+from strategies.base_strategy import (
+    StrategyBase,
+    SIGNAL_NONE,
+    SIGNAL_BUY,
+    SIGNAL_SELL,
+)
+from core.trade_plan import TradePlan
 from core.trade_manager import TradeManager
-from oandapyV20 import API
+from utils.api_client import get_client
 from oandapyV20.endpoints.orders import OrderCreate
-from utils.price_tools import is_market_open
-from utils.indicators import get_indicator  # generic helper
+from utils.price_tools import format_price, is_market_open, is_market_open_async
+from core.price_stream import quote_cache
+from core.candle_scheduler import get_scheduler, sleep_until_candle_close
+from utils.streaming_indicators import WARMUP_BARS
 
 
 class Strategy(StrategyBase):
@@ -25,29 +30,59 @@ class Strategy(StrategyBase):
         self.config["direction"] = self.config.get("direction")
         direction = self.config["direction"]
 
-        # Init API client
-        client = API(access_token=token, environment=env)
+        # Shared API client (same pooled connections as the helpers)
+        client = get_client(token, env)
 
         # Init TradeManager
         trade_manager = TradeManager(client, id)
 
+        # SL / TP / sizing settings parsed and validated once, not per candle
+        plan = TradePlan.from_config(self.config)
+
+        FAST_LEN = 5
+        SLOW_LEN = 20
+
         # Run strategy logic while stop flag (Stop button pressed) is false
         while not (self.stop_flag and self.stop_flag()):
 
-            # Calculate Stop loss
-            sl_handler = StopLossStrategy(self.config)
-            tp_handler = TakeProfitStrategy(self.config)
+            # Refresh entry price from the streamed quote (set at launch otherwise)
+            quote = quote_cache.get(self.pair)
+            if quote is not None:
+                self.current_price = quote.mid
+
+            # ------------------------------------------------------------------
+            # EMA-cross signal engine on the shared streaming indicator state:
+            # sync() feeds only candles that closed since the last pass and
+            # each EMA updates in O(1).
+            # ------------------------------------------------------------------
 
-            stop_loss_price = sl_handler.get_stop_loss(self.current_price, direction)
-            take_profit_price = tp_handler.get_take_profit(
-                self.current_price, direction, stop_loss_price
-            )
+            # --- pull fast & slow EMA values ----------------------------------
+            self.indicators.sync(client)
+            fast_ema = self.indicators.get("EMA", length=FAST_LEN).value
+            slow_ema = self.indicators.get("EMA", length=SLOW_LEN).value
+
+            # indicators return **None** while data are still warming up
+            if fast_ema is None or slow_ema is None:
+                print("[EMA-CROSS] waiting for sufficient history …")
+                sleep_until_candle_close(self.chart_timeframe, self.stop_flag)
+                continue
+
+            print(f"[EMA-CROSS] fast {fast_ema:.5f}   slow {slow_ema:.5f}")
+
+            signal = None
+            if fast_ema > slow_ema and direction in ("Both", "Buy"):
+                signal = "Buy"
+            elif fast_ema < slow_ema and direction in ("Both", "Sell"):
+                signal = "Sell"
+            if signal is None:
+                # no actionable signal → wait for the next candle
+                sleep_until_candle_close(self.chart_timeframe, self.stop_flag)
+                continue
 
-            # Calculate position size per risk input
-            risk_manager = RiskManager(self.config)
-            position_size = risk_manager.calculate_position_size(
-                entry_price=self.current_price, stop_loss_price=stop_loss_price
-            )
+            # ------------- levels and size for the signalled side -------------
+            stop_loss_price = plan.stop(self.current_price, signal, self._sl_ema(plan))
+            take_profit_price = plan.target(self.current_price, signal, stop_loss_price)
+            position_size = plan.size(self.current_price, stop_loss_price)
 
             # Print check trade param prior to order
             print(f"Entry Price: {self.current_price}")
@@ -61,71 +96,20 @@ class Strategy(StrategyBase):
                     "units": str(
                         # positive = Buy, Negative = Sell
                         position_size
-                        if direction == "Buy"
+                        if signal == "Buy"
                         else -position_size
                     ),
                     "type": "MARKET",
                     "positionFill": "DEFAULT",
-                    "stopLossOnFill": {"price": str(round(stop_loss_price, 5))},
-                    "takeProfitOnFill": {"price": str(round(take_profit_price, 5))},
+                    "stopLossOnFill": {
+                        "price": format_price(stop_loss_price, self.pair)
+                    },
+                    "takeProfitOnFill": {
+                        "price": format_price(take_profit_price, self.pair)
+                    },
                 }
             }
 
-            # ------------------------------------------------------------------
-            # EMA-cross signal engine via get_indicator()
-            # Tries OANDA-Labs first; falls back to pandas_ta if Labs doesn’t
-            # support the request or is rate-limited.
-            # ------------------------------------------------------------------
-
-            FAST_LEN = 5
-            SLOW_LEN = 20
-
-            # --- pull fast & slow EMA values ----------------------------------
-            fast_ema = get_indicator(
-                "EMA",
-                instrument=self.pair,
-                length=FAST_LEN,
-                price="close",
-                granularity=self.chart_timeframe,  # e.g. "M15"
-            )
-
-            slow_ema = get_indicator(
-                "EMA",
-                instrument=self.pair,
-                length=SLOW_LEN,
-                price="close",
-                granularity=self.chart_timeframe,
-            )
-
-            # get_indicator returns **None** if data are still warming up
-            if fast_ema is None or slow_ema is None:
-                print("[EMA-CROSS] waiting for sufficient history …")
-                time.sleep(5)
-                continue
-
-            print(f"[EMA-CROSS] fast {fast_ema:.5f}   slow {slow_ema:.5f}")
-
-            signal = None
-            if fast_ema > slow_ema:
-                signal = "Buy"
-            elif fast_ema < slow_ema:
-                signal = "Sell"
-
-            # ------------- act on the signal ----------------------------------
-            if signal == "Buy" and direction in ("Both", "Buy"):
-                # keep everything already prepared (order_data, SL/TP, position_size …)
-                # simply let execution continue to the market-open check ↓
-                pass
-
-            elif signal == "Sell" and direction in ("Both", "Sell"):
-                # flip the units sign (negative = short) and update order_data
-                order_data["order"]["units"] = str(-abs(position_size))
-            else:
-                # no actionable signal → skip this loop iteration
-                time.sleep(10)  # small back-off
-                continue
-            # ------------------------------------------------------------------
-
             # check if market open
             if is_market_open(client, self.config["account_id"], self.pair):
 
@@ -137,46 +121,13 @@ class Strategy(StrategyBase):
                     # Store the response
                     response = client.request(r)
 
-                    # Check if order was created store the order information
-                    if "orderCreateTransaction" in response:
-                        trade_id = response["orderCreateTransaction"]["id"]
-                        print(f"[ORDER PLACED] Order created successfully: {trade_id}")
-                    timestamp = response["orderCreateTransaction"].get("time", "")
-                    order_type = response["orderCreateTransaction"].get("type", "")
-                    reason = response["orderCreateTransaction"].get("reason", "")
-                    timeInForce = response["orderCreateTransaction"].get(
-                        "timeInForce", ""
-                    )
-                    relatedTransactionIDs = response.get("relatedTransactionIDs", [])
-
-                    # Default to 'filled' unless explicitly canceled
-                    status = "filled"
-                    # Check if order was canceled
-                    if "orderCancelTransaction" in response:
-                        cancel_reason = response["orderCancelTransaction"].get(
-                            "reason", ""
-                        )
-                        # Update status print error
-                        status = f"canceled ({cancel_reason})"
-                        print(f"[ORDER CANCELED] {trade_id} ({cancel_reason})")
-
-                    # Register the trade to the trade manager
-                    trade_manager.register_trade(
-                        trade_id=trade_id,
-                        trade_info={
-                            "type": order_type,
-                            "reason": reason,
-                            "timestamp": timestamp,
-                            "instrument": self.pair,
-                            "units": position_size,
-                            "direction": direction,
-                            "entry_price": self.current_price,
-                            "stop_loss": stop_loss_price,
-                            "take_profit": take_profit_price,
-                            "timeInForce": timeInForce,
-                            "relatedTransactionIDs": relatedTransactionIDs,
-                            "status": status,
-                        },
+                    self._record_order(
+                        trade_manager,
+                        response,
+                        signal,
+                        position_size,
+                        stop_loss_price,
+                        take_profit_price,
                     )
 
                 except Exception as e:
@@ -184,7 +135,142 @@ class Strategy(StrategyBase):
             else:
                 print("[Market Closed] Trading skipped due to market closure.")
 
-            time.sleep(30)
+            # act once per completed candle instead of polling
+            sleep_until_candle_close(self.chart_timeframe, self.stop_flag)
+
+    async def run_async(self, client):
+        """
+        Event-loop twin of run() for core/async_runtime: wakes once per closed
+        candle (core/candle_scheduler) and stops when its task is cancelled.
+        """
+        print(f"[{self.__class__.__name__}] Async strategy initiated.")
+        print(f"Pair: {self.pair}, Timeframe: {self.chart_timeframe}")
+        account_id = self.config["account_id"]
+        direction = self.config.get("direction")
+        trade_manager = TradeManager(
+            get_client(self.config["token"], self.config["environment"]), account_id
+        )
+
+        plan = TradePlan.from_config(self.config)
+        FAST_LEN = 5
+        SLOW_LEN = 20
+
+        # one batch per completed candle (first batch = warm-up history)
+        scheduler = get_scheduler(client)
+        async for candles in scheduler.stream(
+            self.pair, self.chart_timeframe, history=WARMUP_BARS
+        ):
+            self.indicators.feed(candles)
+            fast_ema = self.indicators.get("EMA", length=FAST_LEN).value
+            slow_ema = self.indicators.get("EMA", length=SLOW_LEN).value
+
+            signal = None
+            if fast_ema is None or slow_ema is None:
+                print("[EMA-CROSS] waiting for sufficient history …")
+            elif fast_ema > slow_ema and direction in ("Both", "Buy"):
+                signal = "Buy"
+            elif fast_ema < slow_ema and direction in ("Both", "Sell"):
+                signal = "Sell"
+
+            if signal is not None:
+                quote = quote_cache.get(self.pair)
+                if quote is not None:
+                    self.current_price = quote.mid
+
+                stop_loss_price = plan.stop(
+                    self.current_price, signal, self._sl_ema(plan)
+                )
+                take_profit_price = plan.target(
+                    self.current_price, signal, stop_loss_price
+                )
+                position_size = plan.size(self.current_price, stop_loss_price)
+                order_data = {
+                    "order": {
+                        "instrument": self.pair,
+                        "units": str(
+                            position_size if signal == "Buy" else -position_size
+                        ),
+                        "type": "MARKET",
+                        "positionFill": "DEFAULT",
+                        "stopLossOnFill": {
+                            "price": format_price(stop_loss_price, self.pair)
+                        },
+                        "takeProfitOnFill": {
+                            "price": format_price(take_profit_price, self.pair)
+                        },
+                    }
+                }
+
+                if await is_market_open_async(client, account_id, self.pair):
+                    try:
+                        r = OrderCreate(accountID=account_id, data=order_data)
+                        response = await client.request(r)
+                        self._record_order(
+                            trade_manager,
+                            response,
+                            signal,
+                            position_size,
+                            stop_loss_price,
+                            take_profit_price,
+                        )
+                    except Exception as e:
+                        print(f"[REGISTER TRADE ERROR] Failed to place order: {e}")
+                else:
+                    print("[Market Closed] Trading skipped due to market closure.")
+
+    def _sl_ema(self, plan):
+        """EMA the "EMA-Based SL" rule trails (None for the other rules)."""
+        if plan.sl_rule != "EMA-Based SL":
+            return None
+        return self.indicators.get("EMA", length=plan.ema_period).value
+
+    def _record_order(
+        self,
+        trade_manager,
+        response,
+        direction,
+        position_size,
+        stop_loss_price,
+        take_profit_price,
+    ):
+        """Register an OrderCreate response with the TradeManager."""
+        # Check if order was created store the order information
+        if "orderCreateTransaction" in response:
+            trade_id = response["orderCreateTransaction"]["id"]
+            print(f"[ORDER PLACED] Order created successfully: {trade_id}")
+        timestamp = response["orderCreateTransaction"].get("time", "")
+        order_type = response["orderCreateTransaction"].get("type", "")
+        reason = response["orderCreateTransaction"].get("reason", "")
+        timeInForce = response["orderCreateTransaction"].get("timeInForce", "")
+        relatedTransactionIDs = response.get("relatedTransactionIDs", [])
+
+        # Default to 'filled' unless explicitly canceled
+        status = "filled"
+        # Check if order was canceled
+        if "orderCancelTransaction" in response:
+            cancel_reason = response["orderCancelTransaction"].get("reason", "")
+            # Update status print error
+            status = f"canceled ({cancel_reason})"
+            print(f"[ORDER CANCELED] {trade_id} ({cancel_reason})")
+
+        # Register the trade to the trade manager
+        trade_manager.register_trade(
+            trade_id=trade_id,
+            trade_info={
+                "type": order_type,
+                "reason": reason,
+                "timestamp": timestamp,
+                "instrument": self.pair,
+                "units": position_size,
+                "direction": direction,
+                "entry_price": self.current_price,
+                "stop_loss": stop_loss_price,
+                "take_profit": take_profit_price,
+                "timeInForce": timeInForce,
+                "relatedTransactionIDs": relatedTransactionIDs,
+                "status": status,
+            },
+        )
 
     def backtest_step(self, candle):
         """
@@ -201,3 +287,14 @@ class Strategy(StrategyBase):
         if close_below_open:
             return "sell"
         return None  # do nothing
+
+    def backtest_signals(self, candles):
+        """
+        Vectorised twin of backtest_step(): one SIGNAL_* code per candle,
+        letting the back-tester skip its per-candle loop.
+        """
+        close = candles["close"].to_numpy()
+        open_ = candles["open"].to_numpy()
+        return np.select(
+            [close > open_, close < open_], [SIGNAL_BUY, SIGNAL_SELL], SIGNAL_NONE
+        )
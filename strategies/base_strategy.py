@@ -1,5 +1,18 @@
 # strategies/base_strategy.py
 
+from utils.streaming_indicators import indicator_set
+
+# Integer signal codes returned by the optional batch hook
+# backtest_signals(candles) → np.ndarray (one code per candle).
+# BUY/SELL double as the position direction multiplier.
+SIGNAL_NONE = 0
+SIGNAL_BUY = 1
+SIGNAL_SELL = -1
+SIGNAL_EXIT = 2
+
+# backtest_step() action strings → signal codes
+ACTION_CODES = {"buy": SIGNAL_BUY, "sell": SIGNAL_SELL, "exit": SIGNAL_EXIT}
+
 
 class StrategyBase:
     def __init__(
@@ -12,5 +25,28 @@ class StrategyBase:
         self.direction = direction
         self.current_price = current_price
 
+    @property
+    def indicators(self):
+        """
+        Streaming indicator state for this pair/timeframe. Live runs share the
+        process-wide set; the back-tester assigns its own private one.
+        """
+        if getattr(self, "_indicators", None) is None:
+            self._indicators = indicator_set(self.pair, self.chart_timeframe)
+        return self._indicators
+
+    @indicators.setter
+    def indicators(self, value):
+        self._indicators = value
+
     def run(self):
         raise NotImplementedError("Subclasses must implement the run() method")
+
+    # backtest/replay.py replays recorded ticks through run() itself
+    # (get_client(), quote_cache and sleep_until_candle_close() are served
+    # from the replay). Optional fast path for it:
+    #   on_ticks(time, bid, ask) → np.ndarray of SIGNAL_* (one block of ticks)
+
+    # Optional: `async def run_async(self, client)` – when defined, run_strategy
+    # hosts it on the shared event loop (core/async_runtime) instead of calling
+    # run() in its own thread. `client` is an AsyncOandaClient.
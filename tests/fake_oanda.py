@@ -0,0 +1,132 @@
+# tests/fake_oanda.py
+"""
+Local stand-in for the OANDA v20 REST and streaming hosts.
+
+FakeOanda runs a threaded HTTP server on 127.0.0.1 and registers it as the
+"fake" entry of oandapyV20's TRADING_ENVIRONMENTS, so API(environment="fake")
+and the stream helpers talk to it unchanged.
+
+>>> with FakeOanda() as oanda:
+...     oanda.route("GET", r"/v3/accounts/(?P<account>[^/]+)/summary",
+...                 lambda req: {"account": {"balance": "1000"}})
+...     API(access_token="t", environment=oanda.environment).request(...)
+
+Handlers receive a FakeRequest and return a dict (200 JSON), a
+(status, dict) tuple, or a Stream of lines sent with chunked encoding.
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from oandapyV20.oandapyV20 import TRADING_ENVIRONMENTS
+
+
+class FakeRequest:
+    def __init__(self, method, path, query, body, match):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.body = body
+        self.match = match
+        self.params = {k: v[-1] for k, v in query.items()}
+
+
+class Stream:
+    """Chunked response: `lines` (dicts or str) sent `interval` seconds apart."""
+
+    def __init__(self, lines, interval=0.0, hold=0.0):
+        self.lines = lines
+        self.interval = interval
+        self.hold = hold  # keep the connection open this long after the last line
+
+
+class FakeOanda:
+    def __init__(self, environment="fake"):
+        self.environment = environment
+        self.routes = []
+        self.requests = []
+        self._server = None
+
+    def route(self, method, pattern, handler):
+        self.routes.append((method, re.compile(pattern + "$"), handler))
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    # ------------------------------------------------------------------
+    def __enter__(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                for method, pattern, handler in fake.routes:
+                    match = pattern.match(parsed.path)
+                    if method == self.command and match:
+                        req = FakeRequest(
+                            self.command,
+                            parsed.path,
+                            parse_qs(parsed.query),
+                            body,
+                            match,
+                        )
+                        fake.requests.append(req)
+                        return handler(req)
+                return 404, {"errorMessage": f"no route for {parsed.path}"}
+
+            def _reply(self):
+                result = self._dispatch()
+                if isinstance(result, Stream):
+                    return self._stream(result)
+                status, payload = result if isinstance(result, tuple) else (200, result)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, stream):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                try:
+                    for line in stream.lines:
+                        text = line if isinstance(line, str) else json.dumps(line)
+                        chunk = (text + "\n").encode()
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                        self.wfile.flush()
+                        time.sleep(stream.interval)
+                    time.sleep(stream.hold)
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                self.close_connection = True
+
+            do_GET = do_POST = do_PUT = do_PATCH = _reply
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        TRADING_ENVIRONMENTS[self.environment] = {"api": self.url, "stream": self.url}
+        return self
+
+    def __exit__(self, *exc):
+        TRADING_ENVIRONMENTS.pop(self.environment, None)
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,193 @@
+# tests/test_account_state.py
+"""
+core/account_state against a local fake OANDA server: one snapshot, then
+AccountChanges deltas; reads from memory within the staleness bound.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import core.account_state as account_state_module
+from fake_oanda import FakeOanda
+from core.account_state import AccountState, get_account_state
+from core.max_drawdown import MaxDrawdownChecker
+from utils.account_tools import account_balance, get_account_summary
+from utils.api_client import PooledAPI
+
+DETAILS = r"/v3/accounts/(?P<account>[^/]+)"
+CHANGES = r"/v3/accounts/(?P<account>[^/]+)/changes"
+
+TRADE = {
+    "id": "201",
+    "instrument": "EUR_USD",
+    "currentUnits": "1000",
+    "price": "1.10000",
+    "unrealizedPL": "0.0000",
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeAccount:
+    """Account server: a transaction log replayed as AccountChanges deltas."""
+
+    def __init__(self):
+        self.last_id = 200
+        self.deltas = {}  # sinceTransactionID → (changes, state, lastTransactionID)
+        self.reject_since = set()
+
+    def details(self, req):
+        return {
+            "account": {
+                "id": req.match["account"],
+                "balance": "10000.0000",
+                "NAV": "10000.0000",
+                "unrealizedPL": "0.0000",
+                "marginUsed": "0.0000",
+                "marginAvailable": "10000.0000",
+                "trades": [],
+                "positions": [],
+                "orders": [],
+                "lastTransactionID": str(self.last_id),
+            },
+            "lastTransactionID": str(self.last_id),
+        }
+
+    def changes(self, req):
+        since = req.params["sinceTransactionID"]
+        if since in self.reject_since:
+            return 416, {"errorMessage": "sinceTransactionID out of range"}
+        changes, state, last = self.deltas.get(since, ({}, {}, since))
+        return {"changes": changes, "state": state, "lastTransactionID": last}
+
+
+@pytest.fixture
+def server():
+    account = FakeAccount()
+    with FakeOanda() as oanda:
+        oanda.route("GET", DETAILS, account.details)
+        oanda.route("GET", CHANGES, account.changes)
+        client = PooledAPI("token", oanda.environment, backoff=0.01)
+        yield oanda, account, client
+
+
+def _count(oanda, suffix):
+    return sum(r.path.endswith(suffix) for r in oanda.requests)
+
+
+def test_snapshot_then_deltas(server):
+    oanda, account, client = server
+    account.deltas["200"] = (
+        {
+            "tradesOpened": [TRADE],
+            "positions": [
+                {
+                    "instrument": "EUR_USD",
+                    "long": {"units": "1000"},
+                    "short": {"units": "0"},
+                }
+            ],
+            "transactions": [
+                {"id": "201", "type": "ORDER_FILL", "accountBalance": "9999.8000"}
+            ],
+        },
+        {
+            "NAV": "10004.8000",
+            "unrealizedPL": "5.0000",
+            "marginUsed": "36.6000",
+            "trades": [{"id": "201", "unrealizedPL": "5.0000"}],
+        },
+        "201",
+    )
+    account.deltas["201"] = (
+        {
+            "tradesClosed": [{**TRADE, "state": "CLOSED"}],
+            "positions": [
+                {"instrument": "EUR_USD", "long": {"units": "0"}, "short": {}}
+            ],
+            "transactions": [
+                {"id": "202", "type": "ORDER_FILL", "accountBalance": "10007.1000"}
+            ],
+        },
+        {"NAV": "10007.1000", "unrealizedPL": "0.0000", "marginUsed": "0.0000"},
+        "202",
+    )
+    seen = []
+    clock = Clock()
+    state = AccountState(client, "101-001", max_staleness=5, clock=clock)
+    state.on_change(lambda st, txs: seen.append([t["id"] for t in txs]))
+
+    assert state.balance == 10000.0 and state.trades() == []
+    assert state.snapshots == 1 and _count(oanda, "/changes") == 0
+
+    clock.now += 6  # past the staleness bound → next read polls once
+    assert state.balance == pytest.approx(9999.8)
+    assert state.nav == pytest.approx(10004.8) and state.margin_used == 36.6
+    [trade] = state.trades("EUR_USD")
+    assert trade["unrealizedPL"] == "5.0000" and trade["currentUnits"] == "1000"
+    assert [p["instrument"] for p in state.positions()] == ["EUR_USD"]
+    assert state.last_transaction_id == "201" and seen == [["201"]]
+
+    # fresh reads never touch the server
+    requests_so_far = len(oanda.requests)
+    for _ in range(50):
+        state.balance, state.nav, state.trades()
+    assert len(oanda.requests) == requests_so_far
+
+    clock.now += 6
+    assert state.balance == pytest.approx(10007.1)
+    assert state.trades() == [] and state.positions() == []
+    assert state.summary()["openTradeCount"] == 0
+    assert state.snapshots == 1 and state.polls == 2 and seen[-1] == ["202"]
+
+
+def test_rejected_poll_falls_back_to_a_snapshot(server):
+    oanda, account, client = server
+    clock = Clock()
+    state = AccountState(client, "101-001", max_staleness=1, clock=clock)
+    state.snapshot()
+    account.reject_since.add("200")
+    account.last_id = 250
+    clock.now += 2
+    assert state.balance == 10000.0
+    assert state.snapshots == 2 and state.last_transaction_id == "250"
+
+
+def test_background_poller_and_shared_readers(server, monkeypatch):
+    oanda, account, client = server
+    monkeypatch.setattr(account_state_module, "_states", {})
+    account.deltas["200"] = (
+        {"transactions": [{"id": "201", "accountBalance": "9000.0000"}]},
+        {},
+        "201",
+    )
+    state = get_account_state(client, "101-001", poll_interval=0.05)
+    try:
+        assert get_account_state(client, "101-001") is state
+        deadline = time.time() + 3
+        while state.last_transaction_id != "201" and time.time() < deadline:
+            time.sleep(0.02)
+        assert state.last_transaction_id == "201"
+        summaries = _count(oanda, "/summary")
+        # the REST helpers and the drawdown checker read the shared state
+        assert account_balance(client, "101-001") == 9000.0
+        assert get_account_summary(client, "101-001")["balance"] == "9000.0000"
+        checker = MaxDrawdownChecker.__new__(MaxDrawdownChecker)
+        checker.account_state = state
+        assert checker._fetch_account_balance() == 9000.0
+        assert _count(oanda, "/summary") == summaries == 0
+    finally:
+        state.stop()
@@ -0,0 +1,88 @@
+# tests/test_api_client.py
+"""
+utils/api_client against a local fake OANDA server.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_oanda import FakeOanda
+from oandapyV20.endpoints.accounts import AccountSummary
+from oandapyV20.endpoints.orders import OrderCreate
+from oandapyV20.exceptions import V20Error
+from utils.account_tools import account_balance
+from utils.api_client import PooledAPI, TokenBucket, close_clients, get_client
+
+SUMMARY = r"/v3/accounts/(?P<account>[^/]+)/summary"
+ORDERS = r"/v3/accounts/(?P<account>[^/]+)/orders"
+
+
+def test_registry_shares_one_client_per_credentials():
+    try:
+        a = get_client("fake-token", "practice")
+        assert get_client("fake-token", "practice") is a
+        assert get_client("other-token", "practice") is not a
+    finally:
+        close_clients()
+
+
+def test_retries_throttled_get_and_records_metrics():
+    calls = []
+
+    def summary(req):
+        calls.append(1)
+        if len(calls) < 3:
+            return 429, {"errorMessage": "Too many requests"}
+        return {"account": {"balance": "1234.5"}}
+
+    with FakeOanda() as oanda:
+        oanda.route("GET", SUMMARY, summary)
+        client = PooledAPI("token", oanda.environment, backoff=0.01)
+        assert account_balance(client, "101-001") == 1234.5
+
+    assert len(calls) == 3
+    stats = client.metrics.snapshot()["AccountSummary"]
+    assert stats["count"] == 1 and stats["retries"] == 2 and stats["errors"] == 0
+    assert stats["max_ms"] >= stats["p50_ms"] > 0
+
+
+def test_server_error_on_order_is_not_retried():
+    calls = []
+
+    def orders(req):
+        calls.append(req.body)
+        return 503, {"errorMessage": "unavailable"}
+
+    with FakeOanda() as oanda:
+        oanda.route("POST", ORDERS, orders)
+        client = PooledAPI("token", oanda.environment, backoff=0.01)
+        with pytest.raises(V20Error):
+            client.request(OrderCreate("101-001", data={"order": {"units": "1"}}))
+
+    assert len(calls) == 1  # a repeated order could fill twice
+    assert client.metrics.snapshot()["OrderCreate"]["errors"] == 1
+
+
+def test_gives_up_after_max_retries():
+    with FakeOanda() as oanda:
+        oanda.route("GET", SUMMARY, lambda req: (500, {"errorMessage": "boom"}))
+        client = PooledAPI("token", oanda.environment, max_retries=2, backoff=0.01)
+        with pytest.raises(V20Error):
+            client.request(AccountSummary("101-001"))
+    assert len(oanda.requests) == 3
+
+
+def test_token_bucket_paces_bursts():
+    bucket = TokenBucket(rate=50, burst=5)
+    start = time.monotonic()
+    for _ in range(15):
+        bucket.acquire()
+    # 5 from the burst, 10 more at 50/s
+    assert time.monotonic() - start >= 0.18
@@ -0,0 +1,235 @@
+# tests/test_async_runtime.py
+"""
+core/async_runtime: async client against the local fake OANDA server,
+strategy hosting and cancellation.
+Run:  pytest -q
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_oanda import FakeOanda
+from oandapyV20.endpoints.accounts import AccountSummary
+from oandapyV20.endpoints.orders import OrderCreate
+from oandapyV20.exceptions import V20Error
+import core.async_runtime as async_runtime
+from core.async_runtime import (
+    AsyncOandaClient,
+    StrategyRuntime,
+    running_runtime,
+    sync_indicators,
+)
+from utils.streaming_indicators import IndicatorSet
+
+SUMMARY = r"/v3/accounts/(?P<account>[^/]+)/summary"
+ORDERS = r"/v3/accounts/(?P<account>[^/]+)/orders"
+CANDLES = r"/v3/instruments/(?P<instrument>[^/]+)/candles"
+
+
+def _candle(minute, close, complete=True):
+    c = f"{close:.5f}"
+    return {
+        "time": f"2025-06-12T09:{minute:02d}:00.000000000Z",
+        "volume": 10,
+        "complete": complete,
+        "mid": {"o": c, "h": c, "l": c, "c": c},
+    }
+
+
+def test_client_retries_and_reuses_connections():
+    calls = []
+
+    def summary(req):
+        calls.append(1)
+        if len(calls) == 1:
+            return 429, {"errorMessage": "Too many requests"}
+        return {"account": {"balance": str(len(calls))}}
+
+    async def main(env):
+        client = AsyncOandaClient("token", env, pool_size=4, backoff=0.01)
+        results = await asyncio.gather(
+            *[client.request(AccountSummary("101-001")) for _ in range(40)]
+        )
+        await client.close()
+        return client, results
+
+    with FakeOanda() as oanda:
+        oanda.route("GET", SUMMARY, summary)
+        client, results = asyncio.run(main(oanda.environment))
+
+    assert len(results) == 40 and all("account" in r for r in results)
+    stats = client.metrics.snapshot()["AccountSummary"]
+    assert stats["count"] == 40 and stats["retries"] == 1
+
+
+def test_client_does_not_repeat_failed_order():
+    with FakeOanda() as oanda:
+        oanda.route("POST", ORDERS, lambda req: (503, {"errorMessage": "down"}))
+
+        async def main():
+            client = AsyncOandaClient("token", oanda.environment, backoff=0.01)
+            with pytest.raises(V20Error):
+                await client.request(OrderCreate("101-001", data={"order": {}}))
+            await client.close()
+
+        asyncio.run(main())
+    assert len(oanda.requests) == 1
+    assert oanda.requests[0].body == {"order": {}}
+
+
+def _ok(status):
+    return f"HTTP/1.1 {status} OK\r\nContent-Length: 2\r\n\r\n{{}}".encode()
+
+
+async def _raw_server(replies, seen):
+    """
+    Hand-rolled HTTP server: one entry of `replies` per request received –
+    bytes are written back (closing after "Connection: close"), None drops
+    the connection without a response.
+    """
+
+    async def handle(reader, writer):
+        while replies:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+            await reader.readexactly(length)
+            seen.append(head.split(b" ")[0].decode())
+            reply = replies.pop(0)
+            if reply is None:
+                break
+            writer.write(reply)
+            await writer.drain()
+            if b"Connection: close" in reply:
+                break
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    client = AsyncOandaClient("token", "practice", backoff=0.01)
+    client.host, client.ssl = "127.0.0.1", None
+    client.port = server.sockets[0].getsockname()[1]
+    return server, client
+
+
+def test_stale_keep_alive_never_resends_an_order():
+    async def main(status, endpoint):
+        seen = []
+        server, client = await _raw_server([_ok(status), None, _ok(status)], seen)
+        async with server:
+            await client.request(endpoint())  # leaves the connection pooled
+            try:
+                return await client.request(endpoint()), seen
+            except OSError as e:
+                return e, seen
+            finally:
+                await client.close()
+
+    order = lambda: OrderCreate("101-001", data={"order": {"units": "1"}})
+    error, seen = asyncio.run(main(201, order))
+    assert isinstance(error, ConnectionResetError)
+    assert seen == ["POST", "POST"]  # the dropped order was not sent again
+
+    # a read is repeated on a fresh connection
+    response, seen = asyncio.run(main(200, lambda: AccountSummary("101-001")))
+    assert response == {} and seen == ["GET", "GET", "GET"]
+
+
+@pytest.mark.parametrize(
+    "framing",
+    [
+        b"Transfer-Encoding: chunked\r\n\r\n1",  # truncated size line
+        b"Transfer-Encoding: chunked\r\n\r\nzz\r\n",
+        b"Transfer-Encoding: chunked\r\n\r\n2\r\n{}XX0\r\n\r\n",
+        b"Content-Length: many\r\n\r\n{}",
+    ],
+)
+def test_malformed_framing_is_a_connection_error(framing):
+    bad = b"HTTP/1.1 200 OK\r\nConnection: close\r\n" + framing
+
+    async def main():
+        seen = []
+        server, client = await _raw_server([bad] * 4, seen)
+        async with server:
+            with pytest.raises(ConnectionError):
+                await client.request(AccountSummary("101-001"))
+            await client.close()
+        return seen
+
+    assert len(asyncio.run(main())) == 4  # a GET: first try + MAX_RETRIES
+
+
+def test_stop_without_a_runtime_starts_nothing(monkeypatch):
+    idle = StrategyRuntime()
+    monkeypatch.setattr(async_runtime, "_runtime", idle)
+    assert running_runtime() is None and idle.loop is None
+    idle.start()
+    try:
+        assert running_runtime() is idle
+    finally:
+        idle.stop()
+
+
+def test_sync_indicators_fetches_only_new_candles():
+    pages = [
+        [_candle(m, 1.1 + m * 1e-4) for m in range(30)] + [_candle(30, 9, False)],
+        [_candle(30, 1.103), _candle(31, 9, False)],
+    ]
+
+    def candles(req):
+        return {"candles": pages[len(oanda.requests) - 1]}
+
+    ind = IndicatorSet("EUR_USD", "M1")
+    with FakeOanda() as oanda:
+        oanda.route("GET", CANDLES, candles)
+
+        async def main():
+            client = AsyncOandaClient("token", oanda.environment)
+            fed = [await sync_indicators(client, ind) for _ in pages]
+            await client.close()
+            return fed
+
+        assert asyncio.run(main()) == [30, 1]
+
+    first, second = (r.params for r in oanda.requests)
+    assert "from" not in first and int(first["count"]) > 30
+    assert second["from"].startswith("2025-06-12T09:29:00")
+    assert second["includeFirst"] == "False"
+    assert ind.get("SMA", length=2).value == pytest.approx((1.1029 + 1.103) / 2)
+
+
+def test_runtime_hosts_and_cancels_many_strategies():
+    runtime = StrategyRuntime().start()
+    ticks = {}
+
+    async def strategy(i):
+        ticks[i] = 0
+        while True:
+            ticks[i] += 1
+            await asyncio.sleep(0.01)
+
+    futures = [runtime.submit(strategy(i), name=f"S{i}") for i in range(120)]
+    try:
+        deadline = time.monotonic() + 5
+        while len(runtime.running) < 120 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(runtime.running) == 120
+        assert threading.active_count() < 120  # one loop thread, not one per pair
+
+        runtime.cancel("S0")
+        time.sleep(0.1)
+        assert futures[0].cancelled() and "S0" not in runtime.running
+
+        runtime.cancel()
+        time.sleep(0.1)
+        assert runtime.running == []
+        assert all(f.cancelled() for f in futures)
+        assert all(ticks[i] > 1 for i in range(1, 120))  # all kept running
+    finally:
+        runtime.stop()
@@ -0,0 +1,123 @@
+# tests/test_backtester_vectorized.py
+"""
+Offline checks that the vectorised back-test engine reproduces the
+per-candle loop exactly.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backtest.backtester import Backtester
+from strategies.base_strategy import (
+    StrategyBase,
+    SIGNAL_NONE,
+    SIGNAL_BUY,
+    SIGNAL_SELL,
+    SIGNAL_EXIT,
+)
+
+_ACTIONS = {SIGNAL_BUY: "buy", SIGNAL_SELL: "sell", SIGNAL_EXIT: "exit"}
+
+
+def _signals_for(candles):
+    # deterministic pseudo-random mix of all four codes
+    rng = np.random.default_rng(len(candles))
+    return rng.choice(
+        [SIGNAL_NONE, SIGNAL_NONE, SIGNAL_BUY, SIGNAL_SELL, SIGNAL_EXIT],
+        size=len(candles),
+    )
+
+
+class StepStrategy(StrategyBase):
+    def backtest_step(self, candle):
+        return _ACTIONS.get(int(candle["signal"]))
+
+
+class BatchStrategy(StrategyBase):
+    def backtest_signals(self, candles):
+        return candles["signal"].to_numpy()
+
+
+# ----------------------------------------------------------------------
+# Test fixtures
+# ----------------------------------------------------------------------
+@pytest.fixture
+def candles():
+    n = 500
+    rng = np.random.default_rng(7)
+    close = 1.10 + np.cumsum(rng.normal(0, 0.0005, n))
+    df = pd.DataFrame(
+        {
+            "time": pd.date_range("2025-01-01", periods=n, freq="15min").strftime(
+                "%Y-%m-%dT%H:%M:%S.000000000Z"
+            ),
+            "open": close - rng.normal(0, 0.0003, n),
+            "high": close + 0.001,
+            "low": close - 0.001,
+            "close": close,
+        }
+    )
+    df["signal"] = _signals_for(df)
+    return df
+
+
+def _make_backtester(monkeypatch, strategy_cls, candles):
+    module = types.ModuleType("strategies._FakeStrategy")
+    module.Strategy = strategy_cls
+    monkeypatch.setitem(sys.modules, "strategies._FakeStrategy", module)
+    bt = Backtester(
+        {
+            "token": "fake-token",
+            "environment": "practice",
+            "pair": "EUR_USD",
+            "timeframe": "M15",
+            "strategy": "_FakeStrategy",
+            "starting_balance": 100_000,
+        }
+    )
+    monkeypatch.setattr(bt, "_fetch_candles", lambda count: candles)
+    return bt
+
+
+# ----------------------------------------------------------------------
+# Tests
+# ----------------------------------------------------------------------
+def test_vectorized_matches_loop(monkeypatch, candles):
+    loop = _make_backtester(monkeypatch, StepStrategy, candles).run()
+    vec = _make_backtester(monkeypatch, BatchStrategy, candles).run()
+
+    assert vec["final_balance"] == pytest.approx(loop["final_balance"], abs=1e-12)
+    assert len(vec["trades"]) == len(loop["trades"])
+    for a, b in zip(vec["trades"], loop["trades"]):
+        for key in ("direction", "entry_time", "exit_time"):
+            assert a[key] == b[key]
+        for key in ("entry_price", "exit_price", "pl"):
+            assert a[key] == pytest.approx(b[key], abs=1e-12)
+
+    vec_eq = vec["equity_curve"]["equity"]
+    loop_eq = loop["equity_curve"]["equity"]
+    assert np.allclose(vec_eq, loop_eq, rtol=0, atol=1e-9)
+    assert vec["equity_curve"][0]["time"] == loop["equity_curve"][0]["time"]
+
+
+def test_vectorized_final_balance_matches_equity(monkeypatch, candles):
+    candles = candles.copy()
+    candles.loc[candles.index[-1], "signal"] = SIGNAL_BUY  # leave a position open
+    results = _make_backtester(monkeypatch, BatchStrategy, candles).run()
+    last_equity = results["equity_curve"][-1]["equity"]
+    assert last_equity == pytest.approx(results["final_balance"])
+
+
+def test_vectorized_rejects_wrong_length(monkeypatch, candles):
+    bt = _make_backtester(monkeypatch, BatchStrategy, candles)
+    monkeypatch.setattr(bt.strategy, "backtest_signals", lambda df: np.zeros(3))
+    with pytest.raises(ValueError):
+        bt.run()
@@ -5,6 +5,7 @@ Run:  pytest -q
 """
 
 import json
+import numpy as np
 from pathlib import Path
 import pytest
 
@@ -49,16 +50,16 @@ def live_config():
 # ----------------------------------------------------------------------
 # Tests
 # ----------------------------------------------------------------------
-def test_equity_curve_has_ts(live_config):
+def test_equity_curve_has_time_column(live_config):
     from backtest.backtester import run_backtest
 
     results = run_backtest(live_config, candle_count=50)
 
-    assert results["equity_curve"], "equity_curve list is empty"
-    snap0 = results["equity_curve"][0]
-    assert "ts" in snap0, '"ts" key missing from equity snapshot'
-    # make sure it’s a pandas/NumPy timestamp-like object
-    assert snap0["ts"].__class__.__name__.endswith("Timestamp")
+    curve = results["equity_curve"]
+    assert len(curve), "equity_curve is empty"
+    assert "time" in curve.dtype.names, '"time" column missing from equity curve'
+    # one NumPy datetime64[ns] column, not a Timestamp per snapshot
+    assert curve["time"].dtype == np.dtype("datetime64[ns]")
 
 
 def test_final_balance_matches_equity(live_config):
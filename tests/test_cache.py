@@ -0,0 +1,126 @@
+# tests/test_cache.py
+"""
+utils/cache.TTLCache: LRU/TTL bounds, disk tier, request coalescing.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_and_ttl_bounds():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a is now most recent
+    cache.set("c", 3)  # evicts b
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+
+    clock.now += 11
+    assert cache.get("a") is None  # expired
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["expirations"] == 1
+    assert stats["hits"] == 3 and stats["misses"] == 2
+    assert stats["latency"]["lookup"]["count"] == 5
+
+
+def test_disk_tier_survives_restart_and_is_evicted(tmp_path):
+    first = TTLCache(ttl=60, disk_dir=tmp_path, disk_max_entries=10)
+    first.set(("RSI", "EUR_USD", 14), {"series": [1.0, 2.0]})
+
+    second = TTLCache(ttl=60, disk_dir=tmp_path, disk_max_entries=10)
+    assert second.get(("RSI", "EUR_USD", 14)) == {"series": [1.0, 2.0]}
+    assert second.stats()["disk_hits"] == 1
+    assert not list(tmp_path.glob("*.tmp"))  # atomic writes leave no temp files
+
+    for i in range(25):
+        second.set(i, {"v": i})
+    files = list(tmp_path.glob("*.json"))
+    assert len(files) <= 10
+    assert second.stats()["disk_evictions"] >= 16
+
+
+def test_disk_entries_expire(tmp_path):
+    clock = FakeClock()
+    clock.now = time.time()
+    cache = TTLCache(ttl=5, disk_dir=tmp_path, clock=clock)
+    cache.set("k", [1])
+    cache.clear()  # memory gone, disk remains
+    assert cache.get("k") == [1]
+    cache.clear()
+    clock.now += 10
+    assert cache.get("k") is None
+
+
+def test_concurrent_misses_fetch_once():
+    cache = TTLCache()
+    calls = []
+    gate = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        gate.wait(2)
+        return {"value": 42}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", fetch)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join(2)
+
+    assert len(calls) == 1
+    assert results == [{"value": 42}] * 8
+    stats = cache.stats()
+    assert stats["coalesced"] == 7 and stats["fetches"] == 1
+    assert stats["latency"]["fetch"]["max_ms"] >= 90
+
+
+def test_fetch_landing_after_the_miss_is_not_repeated():
+    cache = TTLCache()
+    lookup = cache.get
+
+    def racing_get(key, default=None):
+        value = lookup(key, default)
+        cache.set(key, "fresh")  # another caller's fetch completes right now
+        return value
+
+    cache.get = racing_get
+    calls = []
+    assert cache.get_or_fetch("k", lambda: calls.append(1) or "again") == "fresh"
+    assert calls == [] and cache.stats()["fetches"] == 0
+
+
+def test_fetch_error_is_shared_and_not_cached():
+    cache = TTLCache()
+
+    def boom():
+        raise RuntimeError("labs down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("k", boom)
+    assert cache.get_or_fetch("k", lambda: "ok") == "ok"
+    assert cache.stats()["fetch_errors"] == 1
@@ -0,0 +1,154 @@
+# tests/test_candle_downloader.py
+"""
+utils/candle_downloader against the local fake OANDA candle server:
+chunking, concurrency, boundary de-duplication and checkpoint resume.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_oanda import FakeOanda
+from utils.api_client import PooledAPI
+from utils.candle_downloader import CandleDownloader, chunk_range
+from utils.candle_store import CandleStore, to_oanda_time
+
+CANDLES = r"/v3/instruments/(?P<instrument>[^/]+)/candles"
+MINUTE = 60 * 10**9
+START = pd.Timestamp("2024-03-04", tz="UTC").value  # Monday
+END = START + 3 * 24 * 60 * MINUTE  # three days of M1 → 4321 candles
+
+
+def _ns(text):
+    return int(np.datetime64(text[:-1], "ns").astype(np.int64))
+
+
+class CandleServer:
+    """M1 candles on a regular grid; `to` is inclusive, as on OANDA."""
+
+    def __init__(self, delay=0.02, fail_from=None):
+        self.delay = delay
+        self.fail_from = set(fail_from or ())
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, req):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            lo, hi = _ns(req.params["from"]), _ns(req.params["to"])
+            if lo in self.fail_from:
+                self.fail_from.discard(lo)
+                return 400, {"errorMessage": "simulated failure"}
+            first = -(-lo // MINUTE) * MINUTE
+            times = np.arange(first, hi + 1, MINUTE)
+            if len(times) > 5000:
+                return 400, {"errorMessage": "Maximum value for 'count' exceeded"}
+            return {
+                "candles": [
+                    {
+                        "time": to_oanda_time(t),
+                        "complete": True,
+                        "volume": 1,
+                        "mid": {"o": "1.1", "h": "1.2", "l": "1.0", "c": "1.1"},
+                    }
+                    for t in times
+                ]
+            }
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_chunks_are_aligned_and_within_the_limit():
+    chunks = chunk_range("M1", START + 30 * 10**9, END, chunk_candles=1000)
+    assert chunks[0][0] == START  # aligned to the candle open
+    assert all(hi - lo <= 1000 * MINUTE for lo, hi in chunks)
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))  # contiguous
+    assert chunks[-1][1] == END + 1  # end is inclusive
+    assert chunk_range("H4", START, START + 10**9)[0][0] <= START
+    with pytest.raises(ValueError):
+        chunk_range("M7", START, END)
+
+
+def test_concurrent_download_fills_the_store_once(tmp_path):
+    server = CandleServer()
+    store = CandleStore(tmp_path)
+    with FakeOanda() as oanda:
+        oanda.route("GET", CANDLES, server)
+        client = PooledAPI("token", oanda.environment, backoff=0.01)
+        downloader = CandleDownloader(
+            client, store, workers=6, chunk_candles=500, flush_every=3
+        )
+        stats = downloader.download("EUR_USD", "M1", START, END)
+
+    assert stats["chunks"] == stats["requests"] == 9
+    assert server.peak > 1  # requests overlapped
+    cols = store.load("EUR_USD", "M1", "M")
+    assert len(cols["time"]) == stats["candles"] == 4321
+    assert np.all(np.diff(cols["time"]) == MINUTE)
+    assert store.coverage("EUR_USD", "M1", "M") == [[START, END + 1]]
+    assert downloader.plan("EUR_USD", "M1", START, END) == []  # nothing left
+
+
+def test_default_chunk_size_stays_within_the_count_limit(tmp_path):
+    server = CandleServer(delay=0)
+    store = CandleStore(tmp_path)
+    end = START + 11_999 * MINUTE  # 12 000 M1 candles → 3 full-size chunks
+    with FakeOanda() as oanda:
+        oanda.route("GET", CANDLES, server)
+        client = PooledAPI("token", oanda.environment, backoff=0.01)
+        stats = CandleDownloader(client, store).download("EUR_USD", "M1", START, end)
+
+    assert stats["chunks"] == stats["requests"] == 3
+    times = store.load("EUR_USD", "M1", "M")["time"]
+    assert len(times) == stats["candles"] == 12_000
+    assert np.all(np.diff(times) == MINUTE)
+
+
+def test_resumes_from_checkpoint_after_failure(tmp_path):
+    chunks = chunk_range("M1", START, END, chunk_candles=500)
+    server = CandleServer(fail_from=[chunks[4][0]])
+    store = CandleStore(tmp_path)
+    with FakeOanda() as oanda:
+        oanda.route("GET", CANDLES, server)
+        client = PooledAPI("token", oanda.environment, backoff=0.01)
+        downloader = CandleDownloader(client, store, workers=2, chunk_candles=500)
+        with pytest.raises(Exception):
+            downloader.download("EUR_USD", "M1", START, END)
+
+        remaining = downloader.plan("EUR_USD", "M1", START, END)
+        assert chunks[4] in remaining and len(remaining) < len(chunks)
+        oanda.requests.clear()
+        stats = downloader.download("EUR_USD", "M1", START, END)
+
+    assert stats["requests"] == len(remaining)
+    cols = store.load("EUR_USD", "M1", "M")
+    assert len(cols["time"]) == 4321 and len(np.unique(cols["time"])) == 4321
+
+
+def test_overlap_with_stored_range_is_deduplicated(tmp_path):
+    server = CandleServer(delay=0)
+    store = CandleStore(tmp_path)
+    middle = START + 1000 * MINUTE + 30 * 10**9  # mid-candle gap boundary
+    with FakeOanda() as oanda:
+        oanda.route("GET", CANDLES, server)
+        client = PooledAPI("token", oanda.environment, backoff=0.01)
+        downloader = CandleDownloader(client, store, chunk_candles=700)
+        downloader.download("EUR_USD", "M1", START, middle)
+        downloader.download("EUR_USD", "M1", START, END)
+
+    times = store.load("EUR_USD", "M1", "M")["time"]
+    assert len(times) == 4321
+    assert np.all(np.diff(times) == MINUTE)
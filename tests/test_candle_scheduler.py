@@ -0,0 +1,169 @@
+# tests/test_candle_scheduler.py
+"""
+core/candle_scheduler: OANDA boundary alignment, weekend skipping and
+exactly-once bulk delivery against the local fake OANDA server.
+Run:  pytest -q
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_oanda import FakeOanda
+from core.async_runtime import AsyncOandaClient
+from core.candle_scheduler import (
+    CandleScheduler,
+    candle_bounds,
+    market_closed,
+    next_candle_close,
+    next_market_open,
+    seconds_until_close,
+    sleep_until_candle_close,
+)
+from utils.candle_store import to_oanda_time
+
+CANDLES = r"/v3/instruments/(?P<instrument>[^/]+)/candles"
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+# ----------------------------------------------------------------------
+# boundary maths
+# ----------------------------------------------------------------------
+def test_intraday_boundaries_are_clock_aligned():
+    now = utc(2024, 6, 12, 9, 3, 20)  # Wednesday
+    assert candle_bounds("M5", now) == (utc(2024, 6, 12, 9, 0), utc(2024, 6, 12, 9, 5))
+    assert seconds_until_close("M5", now) == pytest.approx(100)
+    assert seconds_until_close("H1", now) == pytest.approx(3600 - 200)
+    assert seconds_until_close("S5", now + 1) == pytest.approx(4)
+    with pytest.raises(ValueError):
+        seconds_until_close("M7", now)
+
+
+def test_daily_family_aligns_to_new_york_five_pm():
+    summer = utc(2024, 6, 12, 9, 3)  # EDT: 17:00 NY = 21:00 UTC
+    winter = utc(2024, 1, 10, 9, 3)  # EST: 17:00 NY = 22:00 UTC
+    assert candle_bounds("D", summer) == (utc(2024, 6, 11, 21), utc(2024, 6, 12, 21))
+    assert candle_bounds("D", winter) == (utc(2024, 1, 9, 22), utc(2024, 1, 10, 22))
+    assert candle_bounds("H4", summer) == (utc(2024, 6, 12, 9), utc(2024, 6, 12, 13))
+    assert candle_bounds("W", summer) == (utc(2024, 6, 7, 21), utc(2024, 6, 14, 21))
+    assert candle_bounds("M", summer) == (utc(2024, 5, 31, 21), utc(2024, 6, 30, 21))
+
+
+def test_weekend_is_skipped():
+    friday_close = utc(2024, 6, 14, 21)  # Friday 17:00 NY
+    assert not market_closed(friday_close - 1)
+    assert market_closed(friday_close)
+    assert not market_closed(utc(2024, 6, 16, 21))  # Sunday 17:00 NY
+
+    # last M5 candle of the week closes at the Friday close …
+    assert next_candle_close("M5", friday_close - 60) == friday_close
+    # … the next one 5 minutes after the Sunday open
+    assert next_candle_close("M5", friday_close + 60) == utc(2024, 6, 16, 21, 5)
+    assert next_candle_close("D", utc(2024, 6, 15, 12)) == utc(2024, 6, 17, 21)
+    assert next_candle_close("W", utc(2024, 6, 15, 12)) == utc(2024, 6, 21, 21)
+
+
+def test_blocking_wait_honours_stop_flag():
+    start = time.monotonic()
+    assert sleep_until_candle_close("D", stop_flag=lambda: True) is False
+    assert time.monotonic() - start < 0.5
+
+
+# ----------------------------------------------------------------------
+# scheduler against the fake server
+# ----------------------------------------------------------------------
+class ShiftedClock:
+    """Wall clock moved so that an S5 boundary is `lead` seconds away."""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def __call__(self):
+        return time.time() + self.offset
+
+    def jump(self, at_least: float, lead: float = 0.3):
+        now = self() + at_least
+        self.offset += at_least + (5 - now % 5) - lead
+
+
+def _candles_handler(clock):
+    def handler(req):
+        now = clock()
+        running = now - now % 5
+        if "from" in req.params:
+            start = np.datetime64(req.params["from"][:-1], "ns").astype(np.int64)
+            first = start / 1e9 + 5  # includeFirst=False
+        else:
+            first = running - 5 * (int(req.params["count"]) - 1)
+        opens = np.arange(first, running + 1, 5)
+        return {
+            "candles": [
+                {
+                    "time": to_oanda_time(int(t * 1e9)),
+                    "volume": 1,
+                    "complete": bool(t < running),
+                    "mid": {"o": "1.1", "h": "1.1", "l": "1.1", "c": "1.1"},
+                }
+                for t in opens
+            ]
+        }
+
+    return handler
+
+
+async def _until(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+def test_delivers_each_candle_once_and_in_bulk_after_a_gap():
+    clock = ShiftedClock()
+    if market_closed(time.time()):
+        clock.offset = next_market_open(time.time()) + 60 - time.time()
+    clock.jump(0)
+    batches_a, batches_b = [], []
+
+    async def main(env):
+        client = AsyncOandaClient("token", env)
+        scheduler = CandleScheduler(client, grace=0.05, clock=clock)
+        sub_a = scheduler.subscribe("EUR_USD", "S5", batches_a.append, history=3)
+
+        async def slow_b(candles):
+            batches_b.append(candles)
+
+        await _until(lambda: len(batches_a) == 1)
+        sub_b = scheduler.subscribe("EUR_USD", "S5", slow_b)  # joins running feed
+        await _until(lambda: len(batches_a) == 2)
+        clock.jump(20)  # process "slept" through four candles
+        await _until(lambda: len(batches_a) == 3, timeout=8)
+        sub_a.cancel()
+        sub_b.cancel()
+        await client.close()
+        return scheduler
+
+    with FakeOanda() as oanda:
+        oanda.route("GET", CANDLES, _candles_handler(clock))
+        scheduler = asyncio.run(main(oanda.environment))
+
+    assert [len(b) for b in batches_a] == [3, 1, 5]
+    times = np.concatenate([[t.value for t in b["time"]] for b in batches_a])
+    assert np.all(np.diff(times) == 5e9)  # every candle exactly once, in order
+    assert [len(b) for b in batches_b] == [1, 5]  # no history for late joiners
+    stats = scheduler.stats()["EUR_USD:S5"]
+    assert stats["requests"] == 3  # shared feed: one fetch per close
+    latency = stats["latency"]  # close → callback, one sample per subscriber
+    assert latency["count"] == 4
+    assert latency["max_ms"] > 20_000  # the simulated gap shows up as lateness
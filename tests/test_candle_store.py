@@ -0,0 +1,190 @@
+# tests/test_candle_store.py
+"""
+Unit-tests for utils/candle_store.CandleStore against an in-memory fake client.
+Run:  pytest -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import utils.candle_store as candle_store
+from utils.candle_store import (
+    CandleStore,
+    candle_dtype,
+    parse_candles,
+    to_oanda_time,
+    to_records,
+)
+
+
+class FakeCandleClient:
+    """Serves InstrumentsCandles requests from a synthetic M15 history."""
+
+    def __init__(self, n=3000):
+        times = pd.date_range("2025-01-01", periods=n, freq="15min", tz="UTC")
+        self.times = [to_oanda_time(t.value) for t in times]
+        self.requests = []
+
+    def _candle(self, i):
+        px = 1.1 + i * 1e-5
+        return {
+            "time": self.times[i],
+            "complete": i < len(self.times) - 1,  # last one still forming
+            "volume": 10 + i,
+            "mid": {
+                "o": f"{px:.5f}",
+                "h": f"{px + 1e-4:.5f}",
+                "l": f"{px - 1e-4:.5f}",
+                "c": f"{px:.5f}",
+            },
+        }
+
+    def request(self, endpoint):
+        params = dict(endpoint.params)
+        self.requests.append(params)
+        count = params.get("count", 500)
+        if "from" in params:
+            lo = np.searchsorted(self.times, params["from"], side="left")
+            if params.get("includeFirst") is False and lo < len(self.times):
+                lo += self.times[lo] == params["from"]
+            idx = range(lo, min(lo + count, len(self.times)))
+        else:
+            hi = len(self.times)
+            if "to" in params:
+                hi = np.searchsorted(self.times, params["to"], side="left")
+            idx = range(max(0, hi - count), hi)
+        return {"candles": [self._candle(i) for i in idx]}
+
+
+# ----------------------------------------------------------------------
+# Tests
+# ----------------------------------------------------------------------
+def test_latest_count_then_incremental(tmp_path):
+    store, client = CandleStore(tmp_path), FakeCandleClient()
+
+    df = store.candles(client, "EUR_USD", "M15", count=200)
+    assert len(df) == 200
+    assert df["time"].iloc[-1] == pd.Timestamp(client.times[-2])  # last complete
+    assert df["time"].is_monotonic_increasing
+
+    # asking for more history only pages further back
+    client.requests.clear()
+    df = store.candles(client, "EUR_USD", "M15", count=900)
+    assert len(df) == 900
+    assert any("to" in p for p in client.requests)
+    assert df["time"].is_unique
+
+
+def test_range_is_fetched_once_and_served_offline(tmp_path):
+    store, client = CandleStore(tmp_path), FakeCandleClient()
+    start, end = client.times[100], client.times[1600]
+
+    first = store.candles_range(client, "EUR_USD", "M15", start, end)
+    assert len(first) == 1501
+    assert len(client.requests) == 1
+
+    client.requests.clear()
+    again = store.candles_range(client, "EUR_USD", "M15", start, end)
+    assert client.requests == []  # fully covered → no network
+    pd.testing.assert_frame_equal(first, again)
+
+    offline = store.candles_range(None, "EUR_USD", "M15", start, end)
+    pd.testing.assert_frame_equal(first, offline)
+
+
+def test_only_missing_gap_is_requested(tmp_path):
+    store, client = CandleStore(tmp_path), FakeCandleClient()
+    store.candles_range(client, "EUR_USD", "M15", client.times[0], client.times[500])
+    client.requests.clear()
+
+    df = store.candles_range(
+        client, "EUR_USD", "M15", client.times[400], client.times[900]
+    )
+    assert len(df) == 501
+    assert [p["from"] for p in client.requests] == [client.times[500]]
+
+
+def test_empty_store_without_client_raises(tmp_path):
+    with pytest.raises(RuntimeError):
+        CandleStore(tmp_path).candles(None, "EUR_USD", "M15", count=10)
+
+
+def test_parse_candles_columns_and_components():
+    raw = [
+        {
+            "time": "2025-01-01T00:00:00.000000000Z",
+            "complete": True,
+            "volume": 7,
+            "mid": {"o": "1.10000", "h": "1.10020", "l": "1.09990", "c": "1.10010"},
+            "bid": {"o": "1.09990", "h": "1.10010", "l": "1.09980", "c": "1.10000"},
+            "ask": {"o": "1.10010", "h": "1.10030", "l": "1.10000", "c": "1.10020"},
+        },
+        {"time": "2025-01-01T00:15:00.000000000Z", "complete": False},
+    ]
+    cols = parse_candles(raw, price="MBA")
+    assert tuple(cols) == candle_dtype("MBA").names
+    assert cols["time"].dtype == np.int64 and cols["volume"].dtype == np.int64
+    assert cols["time"][0] == pd.Timestamp("2025-01-01", tz="UTC").value
+    assert cols["bid_close"][0] == 1.1 and cols["ask_high"][0] == 1.1003
+    assert all(len(a) == 1 for a in cols.values())  # incomplete candle dropped
+
+    empty = parse_candles([], price="B")
+    assert list(empty) == [
+        "time",
+        "volume",
+        "bid_open",
+        "bid_high",
+        "bid_low",
+        "bid_close",
+    ]
+
+
+def test_pages_are_parsed_as_they_arrive(tmp_path, monkeypatch):
+    store, client = CandleStore(tmp_path), FakeCandleClient()
+    monkeypatch.setattr(candle_store, "MAX_CANDLES_PER_REQUEST", 500)
+    sizes = []
+    real_parse = candle_store.parse_candles
+
+    def spy(raw, price="M"):
+        sizes.append(len(raw))
+        return real_parse(raw, price)
+
+    monkeypatch.setattr(candle_store, "parse_candles", spy)
+    cols = store.columns_range(
+        client, "EUR_USD", "M15", client.times[0], client.times[1999]
+    )
+    assert len(cols["time"]) == 2000
+    assert np.all(np.diff(cols["time"]) == 15 * 60 * 10**9)
+    assert max(sizes) <= 500 and len(sizes) == len(client.requests)
+
+
+def test_structured_records(tmp_path):
+    store, client = CandleStore(tmp_path), FakeCandleClient()
+    records = to_records(store.columns(client, "EUR_USD", "M15", count=300))
+    assert records.dtype == candle_dtype("M") and len(records) == 300
+    assert records.dtype.itemsize == 6 * 8  # compact: no object columns
+    assert np.all(records["high"] > records["low"])
+
+
+def test_failed_sync_raises_unless_offline(tmp_path):
+    client = FakeCandleClient()
+    store = CandleStore(tmp_path)
+    store.candles(client, "EUR_USD", "M15", count=100)
+
+    def down(endpoint):
+        raise ConnectionError("network down")
+
+    client.request = down
+    with pytest.raises(ConnectionError):
+        store.columns(client, "EUR_USD", "M15", count=100)
+    with pytest.raises(ConnectionError):
+        store.candles_range(client, "EUR_USD", "M15", client.times[0], client.times[-1])
+    stale = store.columns(client, "EUR_USD", "M15", count=100, offline=True)
+    assert len(stale["time"]) == 100
+    assert not isinstance(stale["time"], np.memmap)  # no map held past the call
@@ -0,0 +1,240 @@
+# tests/test_fills.py
+"""
+backtest/fills.FillModel: spread, slippage, intrabar SL/TP and the
+back-tester running through it.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backtest.backtester import Backtester
+from backtest.fills import FillModel, distribution, spans
+from strategies.base_strategy import (
+    StrategyBase,
+    SIGNAL_NONE,
+    SIGNAL_BUY,
+    SIGNAL_SELL,
+    SIGNAL_EXIT,
+)
+
+PIP = 0.0001
+
+
+def _candles(ohlc, spread_pips=0.0, start="2025-01-01", freq="15min"):
+    """Mid OHLC rows → frame with bid_/ask_ columns `spread_pips` apart."""
+    o, h, l, c = (np.array(x, dtype=float) for x in zip(*ohlc))
+    df = pd.DataFrame(
+        {
+            "time": pd.date_range(start, periods=len(o), freq=freq, tz="UTC"),
+            "open": o,
+            "high": h,
+            "low": l,
+            "close": c,
+        }
+    )
+    half = spread_pips * PIP / 2
+    for field in ("open", "high", "low", "close"):
+        df[f"bid_{field}"] = df[field] - half
+        df[f"ask_{field}"] = df[field] + half
+    return df
+
+
+def _fixed_levels(sl_pips, tp_pips):
+    def levels(candles, entries, dirs, entry_px):
+        return entry_px - dirs * sl_pips * PIP, entry_px + dirs * tp_pips * PIP
+
+    return levels
+
+
+def _exits(model, df, entry, end, direction):
+    entries, ends = np.array([entry]), np.array([end])
+    dirs = np.array([direction])
+    px = model.entry_prices(df, entries, dirs)
+    sl, tp = model.levels(df, entries, dirs, px)
+    bars, fill, reason = model.intrabar_exits(df, entries, ends, dirs, sl, tp)
+    return px[0], int(bars[0]), fill[0], reason[0]
+
+
+# ----------------------------------------------------------------------
+# Prices
+# ----------------------------------------------------------------------
+def test_spans_lists_each_range():
+    bars, owner = spans(np.array([2, 5, 9]), np.array([4, 5, 11]))
+    assert bars.tolist() == [2, 3, 9, 10]
+    assert owner.tolist() == [0, 0, 2, 2]
+
+
+def test_bid_ask_and_spread_modes_pay_the_spread():
+    df = _candles([(1.1, 1.1, 1.1, 1.1)] * 3, spread_pips=2)
+    idx, dirs = np.array([0, 1]), np.array([1, -1])
+
+    bid_ask = FillModel("bid_ask", pip=PIP)
+    assert bid_ask.entry_prices(df, idx, dirs) == pytest.approx([1.1001, 1.0999])
+    assert bid_ask.exit_prices(df, idx, dirs) == pytest.approx([1.0999, 1.1001])
+
+    spread = FillModel("spread", spread_pips=2, pip=PIP)
+    mid_only = df[["time", "open", "high", "low", "close"]]
+    assert spread.entry_prices(mid_only, idx, dirs) == pytest.approx([1.1001, 1.0999])
+    with pytest.raises(ValueError):
+        bid_ask.entry_prices(mid_only, idx, dirs)
+
+
+def test_slippage_is_adverse_and_seeded():
+    df = _candles([(1.1, 1.1, 1.1, 1.1)] * 50)
+    idx, dirs = np.arange(50), np.where(np.arange(50) % 2, 1, -1)
+    spec = {"dist": "exponential", "mean": 0.5}
+    a = FillModel(slippage_pips=spec, pip=PIP, seed=3).entry_prices(df, idx, dirs)
+    b = FillModel(slippage_pips=spec, pip=PIP, seed=3).entry_prices(df, idx, dirs)
+    assert np.array_equal(a, b)
+    assert np.all((a - 1.1) * dirs >= 0)  # buys pay more, sells receive less
+    with pytest.raises(ValueError):
+        distribution({"dist": "cauchy"})
+
+
+def test_latency_moves_fill_towards_next_close():
+    df = _candles([(1.1, 1.1, 1.1, 1.1), (1.1, 1.102, 1.1, 1.102)])
+    model = FillModel(latency_ms=450_000, pip=PIP, bar_seconds=900)  # half a candle
+    assert model.entry_prices(df, np.array([0]), np.array([1]))[0] == pytest.approx(
+        1.101
+    )
+
+
+# ----------------------------------------------------------------------
+# Intrabar SL / TP
+# ----------------------------------------------------------------------
+def test_stop_loss_and_take_profit_hits():
+    bars = [
+        (1.1000, 1.1000, 1.1000, 1.1000),
+        (1.1000, 1.1005, 1.0995, 1.1000),  # inside both levels
+        (1.1000, 1.1004, 1.0978, 1.0990),  # long stop, short target
+        (1.0990, 1.1050, 1.0990, 1.1040),
+    ]
+    model = FillModel(pip=PIP, levels=_fixed_levels(10, 20))
+    _, bar, fill, reason = _exits(model, _candles(bars), 0, 3, 1)
+    assert (bar, reason) == (2, "sl") and fill == pytest.approx(1.0990)
+
+    _, bar, fill, reason = _exits(model, _candles(bars), 0, 3, -1)  # short
+    assert (bar, reason) == (2, "tp") and fill == pytest.approx(1.0980)
+
+
+def test_gap_through_stop_fills_at_open():
+    bars = [(1.1, 1.1, 1.1, 1.1), (1.0950, 1.0960, 1.0940, 1.0955)]
+    model = FillModel(pip=PIP, levels=_fixed_levels(10, 20))
+    _, bar, fill, reason = _exits(model, _candles(bars), 0, 1, 1)
+    assert reason == "sl" and fill == pytest.approx(1.0950)
+
+
+def test_both_levels_in_one_candle_assume_stop_unless_drilled_down():
+    bars = [(1.1, 1.1, 1.1, 1.1), (1.1, 1.1030, 1.0980, 1.1)]
+    df = _candles(bars)
+    model = FillModel(pip=PIP, bar_seconds=900, levels=_fixed_levels(10, 20))
+    assert _exits(model, df, 0, 1, 1)[3] == "sl"
+
+    # M1 replay of the ambiguous candle: target first, stop later
+    minutes = [(1.1, 1.1025, 1.1, 1.1020)] + [(1.1, 1.1, 1.0980, 1.0985)] * 14
+    sub = _candles(minutes, start=df["time"].iloc[1], freq="1min")
+    calls = []
+
+    def drill(start_ns, end_ns):
+        calls.append((start_ns, end_ns))
+        return {k: sub[k].to_numpy() for k in sub.columns}
+
+    model.drill_down = drill
+    px, bar, fill, reason = _exits(model, df, 0, 1, 1)
+    assert (bar, reason) == (1, "tp") and fill == pytest.approx(1.1020)
+    assert len(calls) == 1
+
+
+def test_trailing_stop_ratchets_behind_best_price():
+    bars = [
+        (1.1000, 1.1000, 1.1000, 1.1000),
+        (1.1000, 1.1030, 1.0995, 1.1025),  # best high 1.1030
+        (1.1025, 1.1026, 1.1018, 1.1020),  # trail at 1.1020 → hit
+    ]
+    model = FillModel(pip=PIP, levels=_fixed_levels(10, 100), trailing_pips=10)
+    _, bar, fill, reason = _exits(model, _candles(bars), 0, 2, 1)
+    assert (bar, reason) == (2, "sl") and fill == pytest.approx(1.1020)
+
+
+# ----------------------------------------------------------------------
+# Back-tester integration
+# ----------------------------------------------------------------------
+class BatchStrategy(StrategyBase):
+    def backtest_signals(self, candles):
+        return candles["signal"].to_numpy()
+
+
+def _run(monkeypatch, candles, **cfg):
+    module = types.ModuleType("strategies._FillStrategy")
+    module.Strategy = BatchStrategy
+    monkeypatch.setitem(sys.modules, "strategies._FillStrategy", module)
+    bt = Backtester(
+        {
+            "token": "fake-token",
+            "environment": "practice",
+            "pair": "EUR_USD",
+            "timeframe": "M15",
+            "strategy": "_FillStrategy",
+            "starting_balance": 100_000,
+            **cfg,
+        }
+    )
+    monkeypatch.setattr(bt, "_fetch_candles", lambda count: candles)
+    return bt.run()
+
+
+@pytest.fixture
+def walk():
+    n = 400
+    rng = np.random.default_rng(11)
+    close = 1.10 + np.cumsum(rng.normal(0, 0.0008, n))
+    rows = [
+        (o, max(o, c) + 0.0006, min(o, c) - 0.0006, c)
+        for o, c in zip(np.r_[close[0], close[:-1]], close)
+    ]
+    df = _candles(rows, spread_pips=1.5)
+    df["signal"] = rng.choice(
+        [SIGNAL_NONE] * 6 + [SIGNAL_BUY, SIGNAL_SELL, SIGNAL_EXIT], size=n
+    )
+    return df
+
+
+def test_costs_make_results_less_optimistic(monkeypatch, walk):
+    mid = _run(monkeypatch, walk)
+    costly = _run(
+        monkeypatch, walk, fill_model="bid_ask", slippage_pips=0.3, fill_seed=1
+    )
+    assert len(costly["trades"]) == len(mid["trades"])
+    spread_cost = sum(
+        m["pl"] - c["pl"] for m, c in zip(mid["trades"], costly["trades"])
+    )
+    assert spread_cost == pytest.approx(len(mid["trades"]) * 2.1 * PIP, rel=1e-6)
+    assert costly["final_balance"] < mid["final_balance"]
+
+
+def test_sl_tp_exits_flatten_until_next_signal(monkeypatch, walk):
+    res = _run(
+        monkeypatch,
+        walk,
+        sl_strategy="Fixed SL (pips)",
+        sl_pips=8,
+        tp_strategy="Risk:Reward Ratio",
+        rr_ratio="1:2",
+    )
+    reasons = {t["exit_reason"] for t in res["trades"]}
+    assert {"sl", "tp"} <= reasons
+    tick = 1e-5  # levels are rounded to 5 decimals like live orders
+    for t in res["trades"]:
+        if t["exit_reason"] == "sl":  # at the stop, or worse on a gap
+            assert t["pl"] <= -8 * PIP + tick
+        if t["exit_reason"] == "tp":
+            assert t["pl"] >= 16 * PIP - 2 * tick
+    assert res["equity_curve"][-1]["equity"] == pytest.approx(res["final_balance"])
@@ -0,0 +1,237 @@
+# tests/test_indicator_kernels.py
+"""
+utils/indicator_kernels vs. plain-pandas restatements of the pandas_ta
+default formulas, for every Labs indicator; checked against pandas_ta
+itself when it is installed.
+Run:  pytest -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils import indicator_kernels as k
+from utils.indicators import INDICATORS
+
+
+@pytest.fixture(scope="module")
+def candles():
+    rng = np.random.default_rng(11)
+    n = 1500
+    close = 1.1 + np.cumsum(rng.normal(0, 1e-3, n))
+    spread = np.abs(rng.normal(0, 6e-4, n))
+    return pd.DataFrame(
+        {
+            "time": pd.date_range("2025-03-03", periods=n, freq="15min", tz="UTC"),
+            "open": close + rng.normal(0, 2e-4, n),
+            "high": close + spread,
+            "low": close - spread,
+            "close": close,
+            "volume": rng.integers(1, 500, n).astype(float),
+        }
+    )
+
+
+def close_enough(actual, expected):
+    np.testing.assert_allclose(
+        actual, np.asarray(expected, float), rtol=1e-7, atol=1e-9
+    )
+
+
+# ----------------------------------------------------------------------
+# pandas references (pandas_ta defaults)
+# ----------------------------------------------------------------------
+def ref_ema(s, n):
+    s = s.copy()
+    s.iloc[n - 1] = s.iloc[:n].mean()
+    s.iloc[: n - 1] = np.nan
+    return s.ewm(span=n, adjust=False).mean()
+
+
+def ref_rma(s, n):
+    return s.ewm(alpha=1 / n, min_periods=n).mean()
+
+
+def ref_wma(s, n):
+    w = np.arange(1, n + 1)
+    return s.rolling(n).apply(lambda x: (x * w).sum() / w.sum(), raw=True)
+
+
+def ref_tr(df):
+    pc = df["close"].shift()
+    tr = (
+        pd.concat([df["high"] - df["low"], df["high"] - pc, pc - df["low"]], axis=1)
+        .abs()
+        .max(axis=1)
+    )
+    tr.iloc[0] = np.nan
+    return tr
+
+
+def ref_rsi(s, n=14):
+    d = s.diff()
+    up, down = ref_rma(d.clip(lower=0), n), ref_rma(-d.clip(upper=0), n)
+    return 100 * up / (up + down)
+
+
+def test_every_labs_indicator_has_a_kernel():
+    assert set(k.KERNELS) == INDICATORS
+
+
+def test_moving_averages(candles):
+    c = candles["close"]
+    out = k.compute_many(
+        candles, ["SMA", "EMA", "WMA", "DEMA", "TEMA", ("HMA", {"length": 16})]
+    )
+    e1 = ref_ema(c, 10)
+    e2 = ref_ema(e1, 10)
+    close_enough(out["SMA_10"], c.rolling(10).mean())
+    close_enough(out["EMA_10"], e1)
+    close_enough(out["WMA_10"], ref_wma(c, 10))
+    close_enough(out["DEMA_10"], 2 * e1 - e2)
+    close_enough(out["TEMA_10"], 3 * (e1 - e2) + ref_ema(e2, 10))
+    close_enough(out["HMA_16"], ref_wma(2 * ref_wma(c, 8) - ref_wma(c, 16), 4))
+
+
+def test_volatility_and_channels(candles):
+    h, l, c = candles["high"], candles["low"], candles["close"]
+    out = k.compute_many(candles, ["ATR", "BBANDS", "DONCH", "KELTNER"])
+    close_enough(out["ATRr_14"], ref_rma(ref_tr(candles), 14))
+
+    mid, std = c.rolling(5).mean(), c.rolling(5).std(ddof=0)
+    close_enough(out["BBL_5_2.0"], mid - 2 * std)
+    close_enough(out["BBU_5_2.0"], mid + 2 * std)
+    close_enough(out["BBB_5_2.0"], 100 * 4 * std / mid)
+    close_enough(out["BBP_5_2.0"], (c - (mid - 2 * std)) / (4 * std))
+
+    close_enough(out["DCL_20_20"], l.rolling(20).min())
+    close_enough(out["DCU_20_20"], h.rolling(20).max())
+    basis, band = ref_ema(c, 20), ref_ema(ref_tr(candles), 20)
+    close_enough(out["KCBe_20_2"], basis)
+    close_enough(out["KCUe_20_2"], basis + 2 * band)
+
+
+def test_momentum(candles):
+    h, l, c = candles["high"], candles["low"], candles["close"]
+    out = k.compute_many(
+        candles, ["RSI", "STOCHRSI", "WILLR", "CCI", "ROC", "MOM", "TRIX", "ADX"]
+    )
+    rsi = ref_rsi(c)
+    close_enough(out["RSI_14"], rsi)
+
+    lo, hi = rsi.rolling(14).min(), rsi.rolling(14).max()
+    srsi_k = (100 * (rsi - lo) / (hi - lo)).rolling(3).mean()
+    close_enough(out["STOCHRSIk_14_14_3_3"], srsi_k)
+    close_enough(out["STOCHRSId_14_14_3_3"], srsi_k.rolling(3).mean())
+
+    lo, hi = l.rolling(14).min(), h.rolling(14).max()
+    close_enough(out["WILLR_14"], 100 * ((c - lo) / (hi - lo) - 1))
+
+    tp = (h + l + c) / 3
+    mad = tp.rolling(14).apply(lambda x: np.abs(x - x.mean()).mean(), raw=True)
+    close_enough(out["CCI_14_0.015"], (tp - tp.rolling(14).mean()) / (0.015 * mad))
+
+    close_enough(out["ROC_10"], 100 * c.diff(10) / c.shift(10))
+    close_enough(out["MOM_10"], c.diff(10))
+
+    e3 = ref_ema(ref_ema(ref_ema(c, 30), 30), 30)
+    trix = 100 * e3.pct_change()
+    close_enough(out["TRIX_30_9"], trix)
+    close_enough(out["TRIXs_30_9"], trix.rolling(9).mean())
+
+    up, dn = h.diff(), -l.diff()
+    pos = ((up > dn) & (up > 0)) * up
+    neg = ((dn > up) & (dn > 0)) * dn
+    pos[up.isna()] = neg[up.isna()] = np.nan
+    atr = ref_rma(ref_tr(candles), 14)
+    dmp, dmn = 100 * ref_rma(pos, 14) / atr, 100 * ref_rma(neg, 14) / atr
+    close_enough(out["DMP_14"], dmp)
+    close_enough(out["DMN_14"], dmn)
+    close_enough(out["ADX_14"], ref_rma(100 * (dmp - dmn).abs() / (dmp + dmn), 14))
+
+
+def test_macd_family(candles):
+    c = candles["close"]
+    out = k.compute_many(candles, ["MACD", "MACDEXT"])
+    line = ref_ema(c, 12) - ref_ema(c, 26)
+    sig = pd.Series(np.nan, index=c.index)
+    sig.iloc[25:] = ref_ema(line.iloc[25:].reset_index(drop=True), 9).to_numpy()
+    close_enough(out["MACD_12_26_9"], line)
+    close_enough(out["MACDs_12_26_9"], sig)
+    close_enough(out["MACDh_12_26_9"], line - sig)
+
+    line = c.rolling(12).mean() - c.rolling(26).mean()
+    close_enough(out["MACDEXT_12_26_9"], line)
+    close_enough(out["MACDEXTs_12_26_9"], line.rolling(9).mean())
+
+
+def test_volume(candles):
+    c, v = candles["close"], candles["volume"]
+    out = k.compute_many(candles, ["OBV", "VWAP", "VOL"])
+    sign = np.sign(c.diff()).fillna(1)
+    close_enough(out["OBV"], (sign * v).cumsum())
+
+    tp = (candles["high"] + candles["low"] + c) / 3
+    day = candles["time"].dt.floor("D")
+    vwap = (tp * v).groupby(day).cumsum() / v.groupby(day).cumsum()
+    close_enough(out["VWAP_D"], vwap)
+    close_enough(out["VOL_SMA_20"], v.rolling(20).mean())
+
+
+def test_psar_and_ichimoku(candles):
+    h, l, c = candles["high"], candles["low"], candles["close"]
+    out = k.compute_many(candles, ["PSAR", "SAR", "ICHIMOKU"])
+    long, short = out["PSARl_0.02_0.2"], out["PSARs_0.02_0.2"]
+    assert np.all(np.isnan(long[1:]) ^ np.isnan(short[1:]))  # one side per bar
+    assert np.nanmax(long - l) <= 1e-12 and np.nanmin(short - h) >= -1e-12
+    assert out["PSARaf_0.02_0.2"].max() <= 0.2
+    close_enough(out["SAR_0.02_0.2"][1:], np.fmax(long, short)[1:])
+
+    mid = lambda n: 0.5 * (h.rolling(n).max() + l.rolling(n).min())  # noqa: E731
+    close_enough(out["ITS_9"], mid(9))
+    close_enough(out["ISA_9"], (0.5 * (mid(9) + mid(26))).shift(26))
+    close_enough(out["ISB_26"], mid(52).shift(26))
+    close_enough(out["ICS_26"], c.shift(-26))
+
+
+def test_loop_kernels_match_pandas():
+    """The numba-compiled loops (plain Python without numba) agree with pandas."""
+    rng = np.random.default_rng(5)
+    x = rng.normal(size=400)
+    x[:7] = np.nan
+    s = pd.Series(x)
+    close_enough(k._rma_loop(x, 14), ref_rma(s, 14))
+    close_enough(k._ewma_loop(x, 0.2), s.ewm(alpha=0.2, adjust=False).mean())
+    close_enough(k._rolling_extreme_loop(x, 9, True), s.rolling(9).max())
+    close_enough(k._rolling_extreme_loop(x, 9, False), s.rolling(9).min())
+
+
+def test_window_chunks_do_not_change_results(candles, monkeypatch):
+    expected = k.compute("CCI", candles)["CCI_14_0.015"]
+    monkeypatch.setattr(k, "WINDOW_CHUNK", 7)
+    close_enough(k.compute("CCI", candles)["CCI_14_0.015"], expected)
+
+
+def test_matches_pandas_ta_when_installed(candles):
+    ta = pytest.importorskip("pandas_ta")
+    h, l, c, v = (candles[n] for n in ("high", "low", "close", "volume"))
+    references = {
+        "EMA_10": ta.ema(c),
+        "DEMA_10": ta.dema(c),
+        "HMA_10": ta.hma(c),
+        "RSI_14": ta.rsi(c),
+        "ATRr_14": ta.atr(h, l, c),
+        "WILLR_14": ta.willr(h, l, c),
+        "CCI_14_0.015": ta.cci(h, l, c),
+        "OBV": ta.obv(c, v),
+    }
+    out = k.compute_many(
+        candles, ["EMA", "DEMA", "HMA", "RSI", "ATR", "WILLR", "CCI", "OBV"]
+    )
+    for name, ref in references.items():
+        close_enough(out[name], ref)
@@ -0,0 +1,179 @@
+# tests/test_indicators_batch.py
+"""
+utils/indicators.get_indicators: one candle fetch for many indicators,
+pandas_ta-style columns, values equal to pandas_ta's default formulas.
+Run:  pytest -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import utils.candle_store as candle_store
+from utils import indicators
+from utils.indicators import get_indicators
+
+
+class CountingStore:
+    """Stands in for the shared CandleStore; counts candle reads."""
+
+    def __init__(self, n=400, seed=3):
+        rng = np.random.default_rng(seed)
+        close = 1.1 + np.cumsum(rng.normal(0, 1e-3, n))
+        spread = np.abs(rng.normal(0, 5e-4, n))
+        self.frame = pd.DataFrame(
+            {
+                "time": pd.date_range("2025-01-01", periods=n, freq="5min", tz="UTC"),
+                "open": close + rng.normal(0, 2e-4, n),
+                "high": close + spread,
+                "low": close - spread,
+                "close": close,
+                "volume": rng.integers(1, 100, n),
+            }
+        )
+        self.calls = []
+
+    def candles(self, client, instrument, granularity, count, price="M"):
+        self.calls.append((instrument, granularity, count, price))
+        return self.frame.tail(count).reset_index(drop=True)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = CountingStore()
+    monkeypatch.setattr(candle_store, "get_candle_store", lambda: store)
+    return store
+
+
+CLIENT = object()  # CountingStore never uses it
+
+
+def ref_ema(s, n):
+    s = s.copy()
+    s.iloc[n - 1] = s.iloc[:n].mean()
+    s.iloc[: n - 1] = np.nan
+    return s.ewm(span=n, adjust=False).mean()
+
+
+def ref_rma(s, n):
+    return s.ewm(alpha=1 / n, min_periods=n).mean()
+
+
+def test_one_fetch_for_many_indicators(store):
+    specs = [
+        ("EMA", {"length": 5}),
+        ("EMA", {"length": 20}),
+        "rsi",
+        {"indicator": "ATR", "length": 10},
+        "MACD",
+        "STOCH",
+        ("WMA", {"length": 8}),
+        ("SMA", {"length": 30, "price": "high"}),
+    ]
+    frame = get_indicators("EUR_USD", "M5", specs, count=300, client=CLIENT)
+
+    assert store.calls == [("EUR_USD", "M5", 300, "M")]
+    assert len(frame) == 300
+    assert list(frame.columns) == [
+        "time",
+        "EMA_5",
+        "EMA_20",
+        "RSI_14",
+        "ATRr_10",
+        "MACD_12_26_9",
+        "MACDh_12_26_9",
+        "MACDs_12_26_9",
+        "STOCHk_14_3_3",
+        "STOCHd_14_3_3",
+        "WMA_8",
+        "SMA_30",
+    ]
+
+
+def test_values_match_pandas_ta_defaults(store):
+    frame = get_indicators(
+        "EUR_USD",
+        "M5",
+        [
+            ("EMA", {"length": 20}),
+            "RSI",
+            "ATR",
+            "MACD",
+            "STOCH",
+            ("WMA", {"length": 8}),
+        ],
+        client=CLIENT,
+    )
+    df = store.frame
+    h, l, c = df["high"], df["low"], df["close"]
+
+    pd.testing.assert_series_equal(frame["EMA_20"], ref_ema(c, 20), check_names=False)
+
+    d = c.diff()
+    up, down = ref_rma(d.clip(lower=0), 14), ref_rma(-d.clip(upper=0), 14)
+    np.testing.assert_allclose(frame["RSI_14"], 100 * up / (up + down))
+
+    pc = c.shift()
+    tr = pd.concat([h - l, h - pc, pc - l], axis=1).abs().max(axis=1)
+    tr.iloc[0] = np.nan
+    np.testing.assert_allclose(frame["ATRr_14"], ref_rma(tr, 14))
+
+    line = ref_ema(c, 12) - ref_ema(c, 26)
+    sig = line.copy()
+    sig.iloc[25:] = ref_ema(line.iloc[25:].reset_index(drop=True), 9).to_numpy()
+    np.testing.assert_allclose(frame["MACD_12_26_9"], line)
+    np.testing.assert_allclose(frame["MACDs_12_26_9"], sig)
+
+    raw = 100 * (c - l.rolling(14).min()) / (h.rolling(14).max() - l.rolling(14).min())
+    k = raw.rolling(3).mean()
+    np.testing.assert_allclose(frame["STOCHk_14_3_3"], k)
+    np.testing.assert_allclose(frame["STOCHd_14_3_3"], k.rolling(3).mean())
+
+    w = np.arange(1, 9)
+    wma = c.rolling(8).apply(lambda x: (x * w).sum() / w.sum(), raw=True)
+    np.testing.assert_allclose(frame["WMA_8"], wma)
+
+
+def test_matches_pandas_ta_when_installed(store):
+    ta = pytest.importorskip("pandas_ta")
+    frame = get_indicators(
+        "EUR_USD", "M5", ["RSI", "ATR", "MACD", "STOCH"], client=CLIENT
+    )
+    df = store.frame
+    np.testing.assert_allclose(frame["RSI_14"], ta.rsi(df["close"]))
+    np.testing.assert_allclose(
+        frame["ATRr_14"], ta.atr(df["high"], df["low"], df["close"])
+    )
+    macd = ta.macd(df["close"])
+    np.testing.assert_allclose(frame[macd.columns], macd)
+
+
+def test_unknown_indicator_is_rejected_before_fetching(store):
+    with pytest.raises(NotImplementedError):
+        get_indicators("EUR_USD", "M5", ["EMA", "ZIGZAG"], client=CLIENT)
+    with pytest.raises(ValueError, match="client"):
+        get_indicators("EUR_USD", "M5", ["EMA"])  # stored candles alone won't do
+    assert store.calls == []
+
+
+def test_single_indicator_fallback_uses_batch(store, monkeypatch):
+    monkeypatch.setattr(indicators, "indicator_cache", indicators.TTLCache())
+
+    def labs_down(ind, params):
+        raise ConnectionError("labs down")
+
+    monkeypatch.setattr(indicators, "_fetch_from_labs", labs_down)
+    with pytest.raises(indicators.LabsError):
+        indicators.get_indicator("ATR", instrument="EUR_USD", granularity="M5")
+    assert store.calls == []  # and nothing was cached
+    out = indicators.get_indicator(
+        "ATR", client=CLIENT, instrument="EUR_USD", granularity="M5"
+    )
+    assert out["source"] == "local"
+    assert len(out["series"]) == len(store.frame) - 14  # first TR has no prior close
+    assert store.calls == [("EUR_USD", "M5", indicators.LOCAL_LOOKBACK, "M")]
@@ -0,0 +1,141 @@
+# tests/test_instruments.py
+"""
+utils/instruments: registry loading, on-disk refresh policy and the price /
+unit rules that now come from it. Offline – instruments come from
+tests/fixtures/instruments.json.
+Run:  pytest -q
+"""
+
+import json
+import os
+import sys
+
+import pytest
+from oandapyV20.exceptions import V20Error
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import utils.instruments as instruments_module
+from core.risk_manager import RiskManager
+from core.sl_strategies import StopLossStrategy
+from core.tp_strategies import TakeProfitStrategy
+from core.trade_manager import TradeManager
+from core.trade_plan import TradePlan
+from utils.instruments import InstrumentRegistry
+from utils.price_tools import format_price, get_pip_value
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "instruments.json")
+
+
+class FakeClient:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.requests = []
+
+    def request(self, endpoint):
+        self.requests.append(endpoint)
+        if self.fail:
+            raise V20Error(503, "unavailable")
+        with open(FIXTURE) as f:
+            payload = json.load(f)
+        endpoint.response = payload
+        return payload
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    reg = InstrumentRegistry()
+    reg.load_file(FIXTURE)
+    monkeypatch.setattr(instruments_module, "instruments", reg)
+    return reg
+
+
+def test_load_persists_and_follows_the_refresh_policy(tmp_path):
+    path, clock = tmp_path / "instruments.json", Clock()
+    client = FakeClient()
+    reg = InstrumentRegistry(path, max_age=3600, clock=clock)
+    assert reg.load(client, "001-001") == 4
+    assert len(client.requests) == 1 and path.exists()
+    assert "v3/accounts/001-001/instruments" in str(client.requests[0])
+    reg.load(client, "001-001")  # fresh in memory → no request
+    assert len(client.requests) == 1
+
+    # new process: the saved file (mtime "now") is fresh
+    clock.now = os.path.getmtime(path) + 60
+    other = InstrumentRegistry(path, max_age=3600, clock=clock)
+    assert other.load(client, "001-001") == 4 and len(client.requests) == 1
+
+    # a day later the file is refreshed; when that fails it is still used
+    clock.now += 86_400
+    assert InstrumentRegistry(path, 3600, clock).load(client, "001-001") == 4
+    assert len(client.requests) == 2
+    offline = FakeClient(fail=True)
+    clock.now += 86_400
+    stale = InstrumentRegistry(path, 3600, clock)
+    assert stale.load(offline, "001-001") == 4 and "XAU_USD" in stale
+    with pytest.raises(RuntimeError):
+        InstrumentRegistry(tmp_path / "none.json", 3600, clock).load(offline, "x")
+
+
+def test_lookups_and_fallback(registry):
+    gold, dax = registry.get("XAU_USD"), registry.get("DE30_EUR")
+    assert (gold.pip, gold.display_precision, gold.max_units) == (0.01, 3, 5000)
+    assert gold.type == "METAL" and gold.margin_rate == 0.05
+    assert (dax.pip, dax.trade_units_precision, dax.min_units) == (1.0, 1, 0.1)
+    assert dax.round_units(12.37) == 12.3 and gold.round_units(12.9) == 12
+
+    unknown = registry.get("GBP_JPY")
+    assert "GBP_JPY" not in registry
+    assert (unknown.pip, unknown.display_precision, unknown.max_units) == (
+        0.01,
+        5,
+        100000,
+    )
+    assert registry.get("GBP_JPY") is unknown
+
+
+def test_price_and_unit_rules_follow_the_instrument(registry):
+    assert get_pip_value("XAU_USD") == 0.01 and get_pip_value("DE30_EUR") == 1.0
+    assert format_price(151.23456, "USD_JPY") == "151.235"
+    assert format_price(18234.26, "DE30_EUR") == "18234.3"
+
+    jpy = {"pair": "USD_JPY", "sl_pips": "15", "tp_pips": "30"}
+    assert StopLossStrategy(jpy).get_stop_loss(151.23456, "Buy") == 151.085
+    assert TakeProfitStrategy(jpy).get_take_profit(151.23456, "Sell") == 150.935
+
+    gold = {"pair": "XAU_USD", "account_balance": 1_000_000, "risk_per_trade": 5}
+    assert RiskManager(gold).calculate_position_size(2400.0, 2399.0) == 5000
+    dax = {"pair": "DE30_EUR", "account_balance": 1000, "risk_per_trade": 1}
+    assert RiskManager(dax).calculate_position_size(18000.0, 17970.0) == 0.3
+    assert RiskManager(dax).calculate_position_size(18000.0, 16000.0) == 0
+    assert RiskManager(dax).calculate_position_sizes(
+        [18000.0, 18000.0], [17970.0, 16000.0]
+    ).tolist() == [0.3, 0.0]
+
+    plan = TradePlan.from_config({**dax, "sl_strategy": "Fixed SL (pips)"})
+    assert plan.decimals == 1 and plan.max_units == 2500
+    assert plan.size(18000.0, 17970.0) == 0.3
+
+
+def test_trade_manager_sends_instrument_precision(registry, monkeypatch):
+    monkeypatch.setattr("core.trade_manager.log_trade", lambda row: None)
+    client = FakeClient()
+    sent = []
+    client.request = lambda r: sent.append(r.data) or {}
+    manager = TradeManager(client, "001-001")
+    manager.register_trade("7", {"instrument": "USD_JPY"})
+    assert manager.update_stop_loss("7", new_sl_price=151.23456)
+    assert manager.update_stop_loss("8", 2400.12345, 2410.5, instrument="XAU_USD")
+    assert sent[0] == {"stopLoss": {"price": "151.235"}}
+    assert sent[1] == {
+        "stopLoss": {"price": "2400.123"},
+        "takeProfit": {"price": "2410.500"},
+    }
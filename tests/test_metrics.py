@@ -0,0 +1,161 @@
+# tests/test_metrics.py
+"""
+backtest/metrics: whole-curve and rolling statistics against plain
+pandas / Python references, and the columnar results of the Backtester.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backtest import metrics
+from backtest.backtester import Backtester
+from strategies.base_strategy import StrategyBase, SIGNAL_BUY, SIGNAL_EXIT
+
+HOUR = np.timedelta64(1, "h")
+
+
+@pytest.fixture
+def curve():
+    rng = np.random.default_rng(5)
+    equity = 1_000 + np.cumsum(rng.normal(0.1, 2.0, 2_000))
+    time = np.datetime64("2025-01-01T00:00", "ns") + np.arange(2_000) * HOUR
+    return metrics.equity_records(time.view(np.int64), equity)
+
+
+def test_whole_curve_statistics(curve):
+    equity = pd.Series(curve["equity"])
+    rets = equity.pct_change().dropna()
+    periods = metrics.periods_per_year(curve["time"])
+    assert periods == pytest.approx(365.25 * 24)
+
+    assert metrics.sharpe(rets.to_numpy(), periods) == pytest.approx(
+        rets.mean() / rets.std() * np.sqrt(periods)
+    )
+    downside = np.sqrt((rets.clip(upper=0) ** 2).mean())
+    assert metrics.sortino(rets.to_numpy(), periods) == pytest.approx(
+        rets.mean() / downside * np.sqrt(periods)
+    )
+
+    drop = equity.cummax() - equity
+    dd, dd_pct = metrics.max_drawdown(curve["equity"])
+    assert dd == pytest.approx(drop.max())
+    assert dd_pct == pytest.approx((drop / equity.cummax()).max())
+
+    # longest run below a previous peak, counted the slow way
+    longest = run = 0
+    for under in drop > 0:
+        run = run + 1 if under else 0
+        longest = max(longest, run)
+    bars, elapsed = metrics.drawdown_duration(curve["equity"], curve["time"])
+    assert bars == longest and elapsed == longest * HOUR
+
+
+def test_trade_statistics_and_exposure():
+    pl = np.array([3.0, -1.0, 2.0, -2.0, 0.0])
+    assert metrics.profit_factor(pl) == pytest.approx(5 / 3)
+    assert metrics.expectancy(pl) == pytest.approx(0.4)
+    assert metrics.win_rate(pl) == pytest.approx(0.4)
+    assert metrics.profit_factor(np.array([1.0])) == float("inf")
+    assert metrics.profit_factor(np.array([-1.0])) == 0.0
+
+    time = np.datetime64("2025-01-01", "ns") + np.arange(11) * HOUR
+    trades = np.zeros(2, metrics.TRADE_DTYPE)
+    trades["entry_time"] = time[[1, 6]]
+    trades["exit_time"] = time[[3, 10]]
+    assert metrics.exposure(time, trades) == pytest.approx(0.6)
+    mask = metrics.in_market(time, trades)
+    assert mask.tolist() == [False, True, True] + [False] * 3 + [True] * 4 + [False]
+
+
+def test_rolling_statistics_match_pandas(curve):
+    window = 50
+    equity = pd.Series(curve["equity"])
+    rets = metrics.returns(curve["equity"])
+    r = pd.Series(rets)
+
+    expected = r.rolling(window).mean() / r.rolling(window).std()
+    np.testing.assert_allclose(
+        metrics.rolling_sharpe(rets, window), expected, rtol=1e-8, equal_nan=True
+    )
+    downside = np.sqrt((r.clip(upper=0) ** 2).rolling(window).mean())
+    np.testing.assert_allclose(
+        metrics.rolling_sortino(rets, window),
+        r.rolling(window).mean() / downside,
+        rtol=1e-8,
+        equal_nan=True,
+    )
+    for w in (1, 7, 50, 1_999, 2_000):
+        np.testing.assert_array_equal(
+            metrics.rolling_max(curve["equity"], w), equity.rolling(w).max()
+        )
+    np.testing.assert_allclose(
+        metrics.rolling_drawdown(curve["equity"], window),
+        equity.rolling(window).max() - equity,
+    )
+
+    pl = np.diff(curve["equity"][:200])
+    gains = pd.Series(pl.clip(min=0)).rolling(20).sum()
+    losses = pd.Series((-pl).clip(min=0)).rolling(20).sum()
+    np.testing.assert_allclose(
+        metrics.rolling_profit_factor(pl, 20), gains / losses, equal_nan=True
+    )
+    np.testing.assert_allclose(
+        metrics.rolling_expectancy(pl, 20), pd.Series(pl).rolling(20).mean()
+    )
+    with pytest.raises(ValueError):
+        metrics.rolling_max(rets, 0)
+
+
+class EveryTenth(StrategyBase):
+    def backtest_signals(self, candles):
+        signals = np.zeros(len(candles), dtype=np.int8)
+        signals[::10] = SIGNAL_BUY
+        signals[5::10] = SIGNAL_EXIT
+        return signals
+
+
+def test_backtester_emits_columnar_results(monkeypatch):
+    module = types.ModuleType("strategies._EveryTenth")
+    module.Strategy = EveryTenth
+    monkeypatch.setitem(sys.modules, "strategies._EveryTenth", module)
+    close = 1.1 + np.cumsum(np.random.default_rng(1).normal(0, 1e-4, 100))
+    candles = pd.DataFrame(
+        {
+            "time": pd.date_range("2025-01-01", periods=100, freq="h", tz="UTC"),
+            "open": close,
+            "high": close,
+            "low": close,
+            "close": close,
+        }
+    )
+    results = Backtester(
+        {
+            "token": "fake-token",
+            "environment": "practice",
+            "pair": "EUR_USD",
+            "timeframe": "H1",
+            "strategy": "_EveryTenth",
+        }
+    ).run(candles=candles)
+
+    curve, trades = results["equity_curve"], results["trades"]
+    assert curve.dtype == metrics.EQUITY_DTYPE and trades.dtype == metrics.TRADE_DTYPE
+    assert curve.nbytes == 16 * len(candles)
+    assert curve["time"][0] == np.datetime64("2025-01-01T00:00", "ns")
+    assert len(trades) == 10 and set(trades["direction"]) == {"buy"}
+    assert trades["pl"].sum() == pytest.approx(results["profit"])
+
+    stats = results["metrics"]
+    assert stats["trades"] == 10 and stats["bars"] == 100
+    assert stats["exposure"] == pytest.approx(50 / 99)
+    assert stats["max_drawdown"] == pytest.approx(
+        metrics.max_drawdown(curve["equity"])[0]
+    )
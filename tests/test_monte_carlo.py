@@ -0,0 +1,75 @@
+# tests/test_monte_carlo.py
+"""
+backtest/monte_carlo: bootstrap / permutation resampling of trade P/L,
+chunk-size invariance and the ruin / drawdown statistics.
+Run:  pytest -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backtest.monte_carlo import monte_carlo, trade_pls
+
+PLS = np.random.default_rng(3).normal(2.0, 50.0, 120)
+
+
+def test_trade_dicts_and_arrays_agree():
+    trades = [{"pl": p, "direction": "buy"} for p in PLS]
+    assert trade_pls(trades).tolist() == PLS.tolist()
+    a = monte_carlo(trades, 500, seed=4)
+    b = monte_carlo(PLS, 500, seed=4)
+    assert a["final_balance"] == b["final_balance"]
+
+
+def test_permutation_keeps_final_balance_but_not_drawdown():
+    out = monte_carlo(PLS, 2_000, "permutation", initial_balance=1_000, seed=1)
+    final = out["final_balance"]
+    assert final["ci"][0] == pytest.approx(1_000 + PLS.sum())
+    assert final["ci"][1] == pytest.approx(1_000 + PLS.sum())
+    assert out["max_drawdown"]["std"] > 0
+
+    # the original order's drawdown lies inside the resampled distribution
+    equity = 1_000 + np.cumsum(PLS)
+    dd = (np.maximum.accumulate(np.r_[1_000, equity])[1:] - equity).max()
+    pct = out["max_drawdown"]["percentiles"]
+    assert pct[1] <= dd <= pct[99]
+
+
+def test_bootstrap_matches_analytic_moments():
+    out = monte_carlo(PLS, 40_000, initial_balance=1e6, seed=2)
+    n, mean, std = len(PLS), PLS.mean(), PLS.std()
+    assert out["final_balance"]["mean"] - 1e6 == pytest.approx(n * mean, abs=5 * std)
+    assert out["final_balance"]["std"] == pytest.approx(np.sqrt(n) * std, rel=0.03)
+
+
+def test_chunking_does_not_change_results():
+    kwargs = dict(n_paths=1_001, seed=7, keep_samples=True)
+    for method in ("bootstrap", "permutation"):
+        whole = monte_carlo(PLS, method=method, **kwargs)
+        chunked = monte_carlo(PLS, method=method, max_cells=len(PLS) * 37, **kwargs)
+        for key, values in whole["samples"].items():
+            np.testing.assert_array_equal(values, chunked["samples"][key])
+
+
+def test_ruin_and_loss_probabilities():
+    losers = np.full(10, -100.0)
+    out = monte_carlo(losers, 200, initial_balance=1_000, ruin_fraction=0.5, seed=0)
+    assert out["risk_of_ruin"] == 1.0 and out["prob_loss"] == 1.0
+    assert out["max_drawdown_pct"]["mean"] == pytest.approx(1.0)
+
+    winners = np.full(10, 100.0)
+    out = monte_carlo(winners, 200, initial_balance=1_000, scale=2.0, seed=0)
+    assert out["risk_of_ruin"] == 0.0 and out["max_drawdown"]["mean"] == 0.0
+    assert out["final_balance"]["mean"] == pytest.approx(3_000)
+
+
+def test_bad_input_raises():
+    with pytest.raises(ValueError):
+        monte_carlo(PLS, method="jackknife")
+    with pytest.raises(ValueError):
+        monte_carlo([])
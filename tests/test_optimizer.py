@@ -0,0 +1,132 @@
+# tests/test_optimizer.py
+"""
+Offline tests for backtest/optimizer – sweeps over synthetic candles.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backtest.optimizer import (
+    best_results,
+    evaluate,
+    halving_rungs,
+    optimize,
+    param_grid_from_config,
+    parameter_grid,
+)
+from strategies.base_strategy import StrategyBase, SIGNAL_BUY, SIGNAL_SELL
+
+
+class MomentumStrategy(StrategyBase):
+    """Long above the N-candle mean, short below – N comes from config."""
+
+    def backtest_signals(self, candles):
+        close = candles["close"]
+        mean = close.rolling(int(self.config["lookback"]), min_periods=1).mean()
+        return np.where(close > mean, SIGNAL_BUY, SIGNAL_SELL)
+
+
+@pytest.fixture
+def config(monkeypatch):
+    module = types.ModuleType("strategies._SweepStrategy")
+    module.Strategy = MomentumStrategy
+    monkeypatch.setitem(sys.modules, "strategies._SweepStrategy", module)
+    return {
+        "token": "fake-token",
+        "environment": "practice",
+        "pair": "EUR_USD",
+        "timeframe": "M15",
+        "strategy": "_SweepStrategy",
+        "stop_flag": lambda: False,  # must not break pickling
+    }
+
+
+@pytest.fixture
+def candles():
+    n = 2000
+    close = 1.1 + np.cumsum(np.random.default_rng(3).normal(0, 5e-4, n))
+    return pd.DataFrame(
+        {
+            "time": pd.date_range("2025-01-01", periods=n, freq="15min", tz="UTC"),
+            "open": close,
+            "high": close,
+            "low": close,
+            "close": close,
+        }
+    )
+
+
+def test_parameter_grid_and_gui_parsing():
+    assert len(parameter_grid({"a": [1, 2, 3], "b": ["x", "y"]})) == 6
+    grid = param_grid_from_config({"sl_pips": "10, 20", "rr_ratio": "1:1,1:2"})
+    assert grid == {"sl_pips": ["10", "20"], "rr_ratio": ["1:1", "1:2"]}
+    with pytest.raises(ValueError):
+        param_grid_from_config({"sl_pips": "10"})
+
+
+def test_grid_sweep_matches_serial(config, candles):
+    grid = {"lookback": [5, 10, 20, 40]}
+    results = list(optimize(config, grid, candles=candles, max_workers=2))
+
+    assert sorted(r["params"]["lookback"] for r in results) == [5, 10, 20, 40]
+    for res in results:
+        serial = evaluate(config, res["params"], candles)
+        assert res["final_balance"] == pytest.approx(serial["final_balance"])
+        assert res["trades"] == serial["trades"]
+
+
+def test_successive_halving_narrows_field(config, candles):
+    grid = {"lookback": list(range(2, 20))}
+    results = list(
+        optimize(config, grid, method="halving", eta=3, candles=candles, max_workers=2)
+    )
+    rungs = [r["rung"] for r in results]
+    assert rungs.count(0) == 18
+    assert rungs.count(max(rungs)) < 18
+    final = [r for r in results if r["rung"] == max(rungs)]
+    assert all(r["candles"] == len(candles) for r in final)
+
+    ranked = best_results(results)
+    assert len(ranked) == 18  # each combination once, at its last rung
+    assert ranked[0]["rung"] == max(rungs)
+
+
+def test_halving_rungs_are_exact_on_powers():
+    assert [halving_rungs(n, 3) for n in (0, 1, 2, 3, 8, 9, 26, 27, 243)] == [
+        0,
+        0,
+        0,
+        1,
+        1,
+        2,
+        2,
+        3,
+        5,
+    ]
+    assert halving_rungs(1000, 10) == 3  # int(math.log(1000, 10)) == 2
+
+
+def test_swept_sl_tp_keys_change_the_result(config, candles):
+    wick = np.abs(np.random.default_rng(4).normal(0, 8e-4, len(candles)))
+    candles = candles.assign(
+        open=candles["close"].shift(fill_value=1.1),
+        high=candles["close"] + wick,
+        low=candles["close"] - wick,
+    )
+    config = {
+        **config,
+        "lookback": 10,
+        "sl_strategy": "Fixed SL (pips)",
+        "tp_strategy": "Fixed TP (pips)",
+    }
+    grid = param_grid_from_config({"sl_pips": "3,30", "tp_pips": "6,60"})
+    results = list(optimize(config, grid, candles=candles, max_workers=2))
+    assert len({round(r["profit"], 10) for r in results}) == 4
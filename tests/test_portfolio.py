@@ -0,0 +1,158 @@
+# tests/test_portfolio.py
+"""
+Offline tests for backtest/portfolio.PortfolioBacktester.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backtest.backtester import Backtester
+from backtest.portfolio import PortfolioBacktester
+from core.trade_plan import TradePlan
+from utils.instruments import InstrumentRegistry
+from strategies.base_strategy import StrategyBase, SIGNAL_BUY, SIGNAL_SELL
+
+
+class CandleColourStrategy(StrategyBase):
+    def backtest_signals(self, candles):
+        close, open_ = candles["close"].to_numpy(), candles["open"].to_numpy()
+        return np.where(close >= open_, SIGNAL_BUY, SIGNAL_SELL)
+
+
+@pytest.fixture
+def config(monkeypatch):
+    module = types.ModuleType("strategies._ColourStrategy")
+    module.Strategy = CandleColourStrategy
+    monkeypatch.setitem(sys.modules, "strategies._ColourStrategy", module)
+    return {
+        "token": "fake-token",
+        "environment": "practice",
+        "timeframe": "M15",
+        "strategy": "_ColourStrategy",
+        "starting_balance": 10_000,
+    }
+
+
+def _candles(seed, start, n, level=1.0):
+    rng = np.random.default_rng(seed)
+    close = level * (1.0 + np.cumsum(rng.normal(0, 1e-3, n)))
+    return pd.DataFrame(
+        {
+            "time": pd.date_range(start, periods=n, freq="15min", tz="UTC"),
+            "open": close + level * rng.normal(0, 5e-4, n),
+            "high": close,
+            "low": close,
+            "close": close,
+        }
+    )
+
+
+@pytest.fixture
+def candles():
+    # staggered, partially overlapping timelines
+    return {
+        "EUR_USD": _candles(1, "2025-01-01 00:00", 300),
+        "GBP_USD": _candles(2, "2025-01-01 10:00", 300),
+        "AUD_USD": _candles(3, "2025-01-02 00:00", 100),
+    }
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_portfolio_sums_instrument_results(config, candles, workers):
+    results = PortfolioBacktester(config, list(candles), max_workers=workers).run(
+        candles=candles
+    )
+
+    singles = {
+        pair: Backtester({**config, "pair": pair}).run(candles=df)
+        for pair, df in candles.items()
+    }
+    expected = sum(r["profit"] for r in singles.values())
+    assert results["profit"] == pytest.approx(expected)
+    assert len(results["trades"]) == sum(len(r["trades"]) for r in singles.values())
+    assert results["equity_curve"][-1]["equity"] == pytest.approx(
+        results["final_balance"]
+    )
+
+
+def test_portfolio_curve_is_merged_timeline(config, candles):
+    results = PortfolioBacktester(config, list(candles)).run(candles=candles)
+    ts = [pd.Timestamp(t, tz="UTC") for t in results["equity_curve"]["time"]]
+    union = pd.DatetimeIndex(pd.concat([df["time"] for df in candles.values()]))
+    assert ts == sorted(ts)
+    assert len(ts) == union.nunique()
+    exits = [pd.Timestamp(t["exit_time"]) for t in results["trades"]]
+    assert exits == sorted(exits)
+
+
+def test_long_instrument_names(config, candles):
+    candles = {"SPX500_USD": candles["EUR_USD"], "AUD_USD": candles["AUD_USD"]}
+    results = PortfolioBacktester(config, list(candles)).run(candles=candles)
+    assert set(results["trades"]["instrument"]) == {"SPX500_USD", "AUD_USD"}
+
+
+def test_position_sizing_uses_the_shared_balance(config, candles):
+    config = {
+        **config,
+        "position_sizing": True,
+        "sl_strategy": "Fixed SL (pips)",
+        "sl_pips": 20,
+        "risk_per_trade": 1,
+    }
+    results = PortfolioBacktester(config, list(candles)).run(candles=candles)
+    trades = results["trades"]
+
+    plan = TradePlan.from_config({**config, "pair": "EUR_USD", "account_balance": 0})
+    for trade in np.sort(trades, order="entry_time"):
+        # everything closed by this entry – across all pairs – is in the balance
+        done = trades["exit_time"] <= trade["entry_time"]
+        plan.set_balance(config["starting_balance"] + trades["pl"][done].sum())
+        dirs = np.array([1 if trade["direction"] == "buy" else -1])
+        entry = np.array([trade["entry_price"]])
+        assert trade["units"] == plan.sizes(entry, plan.stops(entry, dirs))[0]
+    assert trades["units"].min() > 1
+    assert results["final_balance"] == pytest.approx(
+        config["starting_balance"] + trades["pl"].sum()
+    )
+    assert results["equity_curve"][-1]["equity"] == pytest.approx(
+        results["final_balance"]
+    )
+    with pytest.raises(ValueError, match="sl_strategy"):
+        del config["sl_strategy"]
+        PortfolioBacktester(config, ["EUR_USD"])
+
+
+def test_pl_is_converted_to_the_account_currency(config, candles, monkeypatch):
+    monkeypatch.setattr(
+        "backtest.portfolio.instruments", InstrumentRegistry(path="missing.json")
+    )
+    jpy = {
+        "EUR_JPY": _candles(4, "2025-01-01 00:00", 300, level=160.0),
+        "USD_JPY": _candles(5, "2025-01-01 00:00", 300, level=150.0),
+    }
+    results = PortfolioBacktester(config, ["EUR_JPY", "EUR_USD"]).run(
+        candles={**jpy, "EUR_USD": candles["EUR_USD"]}
+    )
+
+    single = Backtester({**config, "pair": "EUR_JPY"}).run(candles=jpy["EUR_JPY"])
+    usd_jpy = jpy["USD_JPY"].set_index("time")["close"]
+    expected = [
+        t["pl"] / usd_jpy[pd.Timestamp(t["exit_time"], tz="UTC")]
+        for t in single["trades"]
+    ]
+    converted = results["trades"][results["trades"]["instrument"] == "EUR_JPY"]
+    assert converted["pl"] == pytest.approx(expected)
+    assert results["instruments"]["EUR_JPY"]["profit"] == pytest.approx(sum(expected))
+
+    with pytest.raises(ValueError, match="Cannot convert EUR_JPY"):
+        PortfolioBacktester(config, ["EUR_JPY"]).run(
+            candles={"EUR_JPY": jpy["EUR_JPY"]}
+        )
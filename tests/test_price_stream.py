@@ -0,0 +1,126 @@
+# tests/test_price_stream.py
+"""
+core/price_stream against a local fake stream server replaying recorded ticks.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_oanda import FakeOanda, Stream
+from core.price_stream import PriceStream, QuoteCache, TickRing, TickSubscriber
+
+STREAM_PATH = r"/v3/accounts/(?P<account>[^/]+)/pricing/stream"
+
+
+def _tick(i, instrument="EUR_USD", tradeable=True):
+    bid = 1.14500 + i * 1e-5
+    return {
+        "type": "PRICE",
+        "time": f"2025-06-12T09:21:{i:02d}.433675162Z",
+        "bids": [{"price": f"{bid:.5f}", "liquidity": 1000000}],
+        "asks": [{"price": f"{bid + 0.00014:.5f}", "liquidity": 1000000}],
+        "closeoutBid": f"{bid:.5f}",
+        "closeoutAsk": f"{bid + 0.00014:.5f}",
+        "status": "tradeable" if tradeable else "non-tradeable",
+        "tradeable": tradeable,
+        "instrument": instrument,
+    }
+
+
+HEARTBEAT = {"type": "HEARTBEAT", "time": "2025-06-12T09:21:00.000000000Z"}
+RECORDED = [_tick(0), HEARTBEAT, _tick(1), _tick(2, "USD_JPY"), _tick(3)]
+RECORDED_AFTER_DROP = [_tick(4), HEARTBEAT, _tick(5, tradeable=False)]
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_replay_with_reconnect_and_fan_out():
+    connections = []
+
+    def stream(req):
+        connections.append(req.params["instruments"])
+        if len(connections) == 1:
+            return Stream(RECORDED)  # server drops the connection afterwards
+        return Stream(RECORDED_AFTER_DROP, hold=1)
+
+    with FakeOanda() as oanda:
+        oanda.route("GET", STREAM_PATH, stream)
+        cache = QuoteCache()
+        feed = PriceStream(
+            "token",
+            "101-001",
+            oanda.environment,
+            ["EUR_USD", "USD_JPY"],
+            cache=cache,
+            reconnect_delay=0.05,
+        )
+        eur = feed.subscribe(["EUR_USD"])
+        every = feed.subscribe()
+        feed.start()
+        try:
+            assert _wait_for(lambda: feed.ticks == 6)
+        finally:
+            feed.stop()
+
+    assert connections[0] == "EUR_USD,USD_JPY"
+    assert feed.reconnects >= 1
+    assert feed.last_heartbeat == HEARTBEAT["time"]
+
+    assert [q.time[17:19] for q in eur.poll()] == ["00", "01", "03", "04", "05"]
+    assert len(every.poll()) == 6
+
+    last = cache.get("EUR_USD")
+    assert last.bid == pytest.approx(1.14505)
+    assert last.mid == pytest.approx(1.14512)
+    assert last.tradeable is False
+    assert cache.get("USD_JPY").tradeable is True
+
+
+def test_silent_stream_triggers_reconnect():
+    calls = []
+
+    def stream(req):
+        calls.append(1)
+        return Stream([HEARTBEAT], hold=3)  # heartbeat, then silence
+
+    with FakeOanda() as oanda:
+        oanda.route("GET", STREAM_PATH, stream)
+        feed = PriceStream(
+            "token",
+            "101-001",
+            oanda.environment,
+            ["EUR_USD"],
+            cache=QuoteCache(),
+            heartbeat_timeout=0.3,
+            reconnect_delay=0.05,
+        )
+        feed.start()
+        try:
+            assert _wait_for(lambda: len(calls) >= 2)
+        finally:
+            feed.stop()
+
+
+def test_ring_reader_lapped_counts_drops():
+    ring = TickRing(8)
+    sub = TickSubscriber(ring)
+    for i in range(20):
+        ring.publish(i)
+    assert sub.poll() == list(range(12, 20))
+    assert sub.dropped == 12
+    ring.publish(20)
+    assert sub.poll() == [20]
@@ -0,0 +1,300 @@
+# tests/test_replay.py
+"""
+backtest/replay: recorded tick files, candle → tick expansion, live run()
+loops driven on replayed time against the simulated broker (isolated from
+the live quote cache and trade log), the on_ticks() block path, trailing
+stops through the live SL code, pacing and stats.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+from oandapyV20.endpoints.orders import OrderCreate
+from oandapyV20.endpoints.trades import TradeCRCDO
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import core.sl_strategies as sl_strategies
+import logs.trade_logger as trade_logger
+from backtest.replay import (
+    ReplayBroker,
+    ReplayEngine,
+    TickRecorder,
+    candle_ticks,
+    load_ticks,
+)
+from core.candle_scheduler import sleep_until_candle_close
+from core.price_stream import Quote, TickRing, quote_cache
+from core.sl_strategies import StopLossStrategy
+from strategies.ExampleStrategy import Strategy as ExampleStrategy
+from strategies.base_strategy import SIGNAL_BUY, SIGNAL_SELL, StrategyBase
+from utils.api_client import PooledAPI, get_client
+from utils.price_tools import format_price
+
+PIP = 0.0001
+T0 = int(np.datetime64("2025-06-11T09:00:00", "ns").astype(np.int64))  # Wednesday
+CONFIG = {
+    "token": "token",
+    "environment": "practice",
+    "account_id": "101-001",
+    "pair": "EUR_USD",
+    "direction": "Both",
+    "sl_strategy": "Fixed SL (pips)",
+    "sl_pips": 10,
+    "tp_strategy": "Fixed TP (pips)",
+    "tp_pips": 20,
+    "account_balance": 10000,
+    "risk_per_trade": 1,
+}
+
+
+@pytest.fixture(autouse=True)
+def live_log(tmp_path, monkeypatch):
+    path = tmp_path / "live_trades.csv"
+    monkeypatch.setattr(trade_logger, "TRADE_LOG_PATH", str(path))
+    yield path
+    assert not path.exists()  # simulated fills never reach the live log
+
+
+def _ticks(bids, spread=1e-4, step_ns=10**8):
+    bid = np.round(np.asarray(bids, dtype=float), 5)
+    return {
+        "time": T0 + np.arange(len(bid), dtype=np.int64) * step_ns,
+        "bid": bid,
+        "ask": bid + spread,
+    }
+
+
+class BuyOnce(StrategyBase):
+    """Live-style run(): one market buy with the configured stop, then idle."""
+
+    def run(self, stop_flag=False):
+        client = get_client(self.config["token"], self.config["environment"])
+        price = quote_cache.get(self.pair).ask
+        stop = StopLossStrategy(self.config).get_stop_loss(price, "Buy")
+        order = {
+            "instrument": self.pair,
+            "units": "1",
+            "type": "MARKET",
+            "stopLossOnFill": {"price": format_price(stop, self.pair)},
+        }
+        client.request(
+            OrderCreate(accountID=self.config["account_id"], data={"order": order})
+        )
+        while not stop_flag():
+            sleep_until_candle_close(self.chart_timeframe, stop_flag)
+
+
+class BuyFirst:
+    """on_ticks() twin of BuyOnce: one buy on the very first tick."""
+
+    def __init__(self):
+        self.blocks = 0
+
+    def on_ticks(self, time_, bid, ask):
+        out = np.zeros(len(bid), dtype=np.int8)
+        if self.blocks == 0:
+            out[0] = SIGNAL_BUY
+        self.blocks += 1
+        return out
+
+
+class Flip:
+    """Buy / sell alternately every `every` ticks."""
+
+    def __init__(self, every):
+        self.every = every
+        self.seen = 0
+
+    def on_ticks(self, time_, bid, ask):
+        idx = np.arange(self.seen, self.seen + len(bid))
+        self.seen += len(bid)
+        out = np.zeros(len(bid), dtype=np.int8)
+        out[idx % self.every == 0] = SIGNAL_BUY
+        out[idx % self.every == self.every // 2] = SIGNAL_SELL
+        return out
+
+
+class Broken(StrategyBase):
+    def run(self, stop_flag=False):
+        raise KeyError("account_id")
+
+
+def _strategy(cls, config, timeframe="S5"):
+    return cls(dict(config), None, "Both", None, "EUR_USD", timeframe)
+
+
+def test_recorder_round_trip(tmp_path):
+    rec = TickRecorder("EUR_USD", root=tmp_path, flush_every=2)
+    rec.record(
+        [
+            Quote("EUR_USD", "2025-06-12T09:21:00.433675162Z", 1.1, 1.1001),
+            Quote("USD_JPY", "2025-06-12T09:21:00.5Z", 150.0, 150.01),
+            Quote("EUR_USD", T0, 1.2, 1.2001),
+        ]
+    )
+    rec.record([Quote("EUR_USD", T0 + 1, 1.3, 1.3001)])
+    rec.flush()
+
+    ticks = load_ticks("EUR_USD", root=tmp_path)
+    assert isinstance(ticks["bid"], np.memmap)
+    assert ticks["bid"].tolist() == [1.1, 1.2, 1.3]
+    assert ticks["time"][0] == np.datetime64(
+        "2025-06-12T09:21:00.433675162", "ns"
+    ).astype(np.int64)
+    with pytest.raises(ValueError):
+        load_ticks("GBP_USD", root=tmp_path)
+
+
+def test_candle_ticks_walk_open_extremes_close():
+    cols = {"time": np.array([T0, T0 + 5 * 10**9])}
+    for side, shift in (("bid", 0.0), ("ask", 1e-4)):
+        cols[f"{side}_open"] = np.array([1.0, 2.0]) + shift
+        cols[f"{side}_high"] = np.array([1.5, 2.5]) + shift
+        cols[f"{side}_low"] = np.array([0.5, 1.5]) + shift
+        cols[f"{side}_close"] = np.array([1.2, 1.8]) + shift  # up, then down
+    ticks = candle_ticks(cols, "S5")
+    assert ticks["bid"].tolist() == [1.0, 0.5, 1.5, 1.2, 2.0, 2.5, 1.5, 1.8]
+    assert np.diff(ticks["time"]).min() > 0
+    assert ticks["ask"] - ticks["bid"] == pytest.approx(np.full(8, 1e-4))
+
+
+def test_example_strategy_runs_its_live_loop(tmp_path):
+    path = 1.1 + 0.002 * np.sin(np.linspace(0, 12, 3 * 3600))
+    ticks = _ticks(path, step_ns=10**9)  # three hours, one tick per second
+    ring = TickRing(1 << 16)
+    strategy = _strategy(ExampleStrategy, CONFIG, "M1")
+    log = tmp_path / "replay_trades.csv"
+    engine = ReplayEngine(
+        ticks, [strategy], config=CONFIG, ring=ring, trade_log=str(log)
+    )
+    out = engine.run()
+
+    result = out["results"]["Strategy"]
+    trades = result["trades"]
+    assert len(trades) > 10 and set(trades["exit_reason"]) <= {
+        "signal",
+        "sl",
+        "tp",
+        "end",
+    }
+    assert result["profit"] == pytest.approx(trades["pl"].sum())
+    # entries fill on the replayed side: buys at the ask, sells at the bid
+    bid_at = dict(zip(ticks["time"].tolist(), ticks["bid"].tolist()))
+    for trade in trades[:20]:
+        bid = bid_at[int(trade["entry_time"].astype(np.int64))]
+        spread = 1e-4 if trade["direction"] == "buy" else 0.0
+        assert trade["entry_price"] == pytest.approx(bid + spread)
+    # orders went through TradeManager → trade log, one pass per M1 close
+    assert log.read_text().count("\n") > len(trades) // 2
+    assert out["stats"]["latency"]["Strategy"]["count"] == 180
+    assert ring.seq == len(path) and engine.cache.get("EUR_USD").bid == ticks["bid"][-1]
+    assert quote_cache.get("EUR_USD") is None  # the live cache never saw them
+    assert isinstance(get_client("token", "practice"), PooledAPI)  # other threads
+
+    again = ReplayEngine(
+        ticks, [_strategy(ExampleStrategy, CONFIG, "M1")], config=CONFIG
+    ).run()
+    assert again["results"]["Strategy"]["profit"] == pytest.approx(result["profit"])
+
+
+def test_trailing_stop_ratchets_through_the_live_sl(monkeypatch):
+    calls = []
+
+    def spy(*args):
+        calls.append(args)
+        return trailing(*args)
+
+    trailing = sl_strategies.calculate_trailing_stop
+    monkeypatch.setattr(sl_strategies, "calculate_trailing_stop", spy)
+
+    # up 30 pips, then back down: a 10-pip trail must exit 20 pips up
+    path = np.r_[np.linspace(1.1, 1.1030, 31), np.linspace(1.1029, 1.0990, 40)]
+    cfg = {**CONFIG, "sl_strategy": "Trailing SL", "trailing_distance": 10}
+    out = ReplayEngine(_ticks(path), [_strategy(BuyOnce, cfg)], config=cfg).run()
+
+    (trade,) = out["results"]["BuyOnce"]["trades"]
+    assert trade["exit_reason"] == "sl"
+    assert trade["entry_price"] == pytest.approx(1.1001)  # bought at the ask
+    assert trade["exit_price"] == pytest.approx(1.1020)
+    assert out["results"]["BuyOnce"]["profit"] == pytest.approx(19 * PIP)
+    assert len(calls) > 40  # re-priced on every held tick
+
+
+def test_block_path_matches_the_live_loop():
+    path = np.r_[np.linspace(1.1, 1.1030, 31), np.linspace(1.1029, 1.0990, 40)]
+    cfg = {"pair": "EUR_USD", "sl_strategy": "Trailing SL", "trailing_distance": 10}
+    cfg["tp_pips"] = 50  # out of reach – BuyOnce sets no target
+    live = ReplayEngine(
+        _ticks(path), [_strategy(BuyOnce, {**CONFIG, **cfg})], config=cfg
+    ).run()
+    fast = ReplayEngine(_ticks(path), [BuyFirst()], config=cfg, block_size=16).run()
+
+    a, b = live["results"]["BuyOnce"]["trades"], fast["results"]["BuyFirst"]["trades"]
+    assert b.tolist()[0][1:] == a.tolist()[0][1:]  # same fill, same trailed exit
+    assert fast["results"]["BuyFirst"]["profit"] == pytest.approx(19 * PIP)
+    assert fast["stats"]["latency"]["BuyFirst"]["count"] == 5  # one per block
+
+
+def test_block_path_orders_through_the_broker_and_plan():
+    path = 1.1 + np.sin(np.linspace(0, 40, 20_000)) * 0.003
+    cfg = {**CONFIG, "tp_pips": 30}
+    out = ReplayEngine(_ticks(path), {"flip": Flip(1000)}, config=cfg).run()
+
+    trades = out["results"]["flip"]["trades"]
+    assert set(trades["exit_reason"]) >= {"signal", "sl"}
+    # TradePlan.size: 1 % of 10 000 over 10 pips, truncated to whole units
+    assert np.all(np.abs(trades["units"] - 100_000) <= 1)
+    buys = trades[trades["direction"] == "buy"]
+    assert np.all(buys["exit_reason"][buys["exit_price"] > buys["entry_price"]] != "sl")
+    assert out["results"]["flip"]["profit"] == pytest.approx(trades["pl"].sum())
+    assert out["stats"]["us_per_tick"]["flip"] > 0
+
+
+def test_broker_nets_orders_and_updates_stops():
+    broker = ReplayBroker(CONFIG, "EUR_USD", 1000.0)
+    broker.on_quote(Quote("EUR_USD", T0, 1.1000, 1.1001))
+
+    def order(units, **extra):
+        data = {"order": {"instrument": "EUR_USD", "units": units, **extra}}
+        return broker.request(OrderCreate(accountID="101-001", data=data))
+
+    opened = order("10", takeProfitOnFill={"price": "1.10500"})
+    trade_id = opened["orderFillTransaction"]["tradeOpened"]["tradeID"]
+    broker.on_quote(Quote("EUR_USD", T0 + 1, 1.1010, 1.1011))
+    reduced = order("-4")  # positionFill DEFAULT: closes 4 of the 10
+    assert reduced["orderFillTransaction"]["tradesClosed"][0]["tradeID"] == trade_id
+    assert "tradeOpened" not in reduced["orderFillTransaction"]
+
+    r = TradeCRCDO("101-001", trade_id, data={"stopLoss": {"price": "1.10050"}})
+    broker.request(r)
+    assert r.response["stopLossOrderTransaction"]["tradeID"] == trade_id
+    broker.on_quote(Quote("EUR_USD", T0 + 2, 1.1004, 1.1005))
+
+    trades = broker.trade_records()
+    assert trades["units"].tolist() == [4, 6]
+    assert trades["exit_reason"].tolist() == ["signal", "sl"]
+    assert trades["pl"] == pytest.approx([4 * 9 * PIP, 6 * 3 * PIP])
+    assert broker.balance == pytest.approx(1000 + 54 * PIP)
+    assert not broker.open_trades
+
+
+def test_paced_replay_follows_tick_clock():
+    ticks = _ticks(np.full(11, 1.1), step_ns=10**8)  # one second of ticks
+    started = time.perf_counter()
+    ReplayEngine(ticks, [_strategy(BuyOnce, CONFIG)], speed=5.0).run()
+    assert time.perf_counter() - started >= 0.18  # 1 s at 5x
+
+
+def test_unreplayable_strategies_are_rejected():
+    with pytest.raises(AttributeError):
+        ReplayEngine(_ticks([1.1, 1.2]), [object()])
+    with pytest.raises(ValueError, match="EMA"):
+        cfg = {"pair": "EUR_USD", "sl_strategy": "EMA-Based SL"}
+        ReplayEngine(_ticks([1.1, 1.2]), [Flip(2)], config=cfg).run()
+    with pytest.raises(RuntimeError, match="account_id"):
+        ReplayEngine(_ticks([1.1, 1.2]), [_strategy(Broken, CONFIG)]).run()
@@ -0,0 +1,156 @@
+# tests/test_results_store.py
+"""
+Offline tests for backtest/results_store – .npz round trips, run keys,
+cached re-runs through run_backtest() and the SQLite index.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backtest.backtester import Backtester, run_backtest
+import backtest.results_store as results_store
+from backtest.results_store import ResultsStore, params_hash, run_id
+from strategies.base_strategy import StrategyBase, SIGNAL_BUY, SIGNAL_SELL
+
+
+class MomentumStrategy(StrategyBase):
+    def backtest_signals(self, candles):
+        close = candles["close"]
+        mean = close.rolling(int(self.config["lookback"]), min_periods=1).mean()
+        return np.where(close > mean, SIGNAL_BUY, SIGNAL_SELL)
+
+
+@pytest.fixture
+def config(monkeypatch):
+    module = types.ModuleType("strategies._StoredStrategy")
+    module.Strategy = MomentumStrategy
+    monkeypatch.setitem(sys.modules, "strategies._StoredStrategy", module)
+    return {
+        "token": "fake-token",
+        "environment": "practice",
+        "pair": "EUR_USD",
+        "timeframe": "H1",
+        "strategy": "_StoredStrategy",
+        "lookback": 10,
+        "stop_flag": lambda: False,
+    }
+
+
+@pytest.fixture
+def candles():
+    n = 500
+    close = 1.1 + np.cumsum(np.random.default_rng(4).normal(0, 5e-4, n))
+    return pd.DataFrame(
+        {
+            "time": pd.date_range("2025-01-01", periods=n, freq="h", tz="UTC"),
+            "open": close,
+            "high": close,
+            "low": close,
+            "close": close,
+        }
+    )
+
+
+def test_save_load_round_trip(tmp_path, config, candles):
+    store = ResultsStore(tmp_path)
+    results = Backtester(config).run(candles=candles)
+    rid = store.save(config, results, candles)
+
+    loaded = store.load(rid)
+    np.testing.assert_array_equal(loaded["equity_curve"], results["equity_curve"])
+    np.testing.assert_array_equal(loaded["trades"], results["trades"])
+    assert loaded["profit"] == pytest.approx(results["profit"])
+    assert loaded["metrics"]["sharpe"] == pytest.approx(results["metrics"]["sharpe"])
+    assert loaded["config"]["lookback"] == 10 and "token" not in loaded["config"]
+    with pytest.raises(KeyError):
+        store.load("missing")
+
+
+def test_run_keys_ignore_secrets_but_not_parameters(config, candles):
+    same = {**config, "token": "other", "account_id": "001", "stop_flag": None}
+    assert params_hash(same) == params_hash(config)
+    assert params_hash({**config, "lookback": 11}) != params_hash(config)
+    assert run_id(config, candles) != run_id(config, candles.iloc[1:])
+    corrected = candles.copy()
+    corrected.loc[100, "close"] += 1e-5  # same range, one revised candle
+    assert run_id(config, corrected) != run_id(config, candles)
+    assert run_id(config, candles.copy()) == run_id(config, candles)
+
+
+def test_engine_changes_invalidate_stored_runs(monkeypatch, config, candles):
+    before = run_id(config, candles)
+    results_store.engine_version.cache_clear()
+    monkeypatch.setattr(results_store, "ENGINE_FILES", ("backtest/fills.py",))
+    try:
+        assert run_id(config, candles) != before
+    finally:
+        results_store.engine_version.cache_clear()
+
+
+def test_identical_run_comes_from_the_store(tmp_path, monkeypatch, config, candles):
+    fetches, runs = [], []
+    real_run = Backtester.run
+    monkeypatch.setattr(
+        Backtester,
+        "_fetch_candles",
+        lambda self, count: fetches.append(count) or candles,
+    )
+    monkeypatch.setattr(
+        Backtester,
+        "run",
+        lambda self, *a, **k: runs.append(1) or real_run(self, *a, **k),
+    )
+    store = ResultsStore(tmp_path)
+
+    first = run_backtest(config, 500, store=store)
+    second = run_backtest(config, 500, store=store)
+    assert len(fetches) == 2 and len(runs) == 1
+    assert second["run_id"] == first["run_id"]
+    np.testing.assert_array_equal(second["trades"], first["trades"])
+
+    run_backtest({**config, "lookback": 30}, 500, store=store)
+    assert len(runs) == 2
+
+    # drill-down candles aren't in the run_id → never served from the store
+    drill = {**config, "drill_down": "M1"}
+    run_backtest(drill, 500, store=store)
+    run_backtest(drill, 500, store=store)
+    assert len(runs) == 4
+
+
+def test_index_query_filters_and_ranks(tmp_path, config, candles):
+    store = ResultsStore(tmp_path, compress=False)
+    assert store.query().empty
+    for lookback in (3, 10, 30, 60):
+        cfg = {**config, "lookback": lookback}
+        store.save(cfg, Backtester(cfg).run(candles=candles), candles)
+    gbp = {**config, "pair": "GBP_USD"}
+    store.save(gbp, Backtester(gbp).run(candles=candles), candles)
+
+    rows = store.query(pair="EUR_USD", order_by="sharpe")
+    assert len(rows) == 4
+    assert rows["sharpe"].is_monotonic_decreasing
+    assert {"profit", "max_drawdown", "profit_factor"} <= set(rows.columns)
+
+    drawdowns = store.query(pair="EUR_USD", order_by="max_drawdown")
+    assert drawdowns["max_drawdown"].is_monotonic_increasing  # smallest = best
+    worst = store.query(pair="EUR_USD", order_by="max_drawdown", ascending=False)
+    assert worst["max_drawdown"].is_monotonic_decreasing
+
+    top = store.query(strategy="_StoredStrategy", limit=2)
+    assert len(top) == 2 and top["profit"].iloc[0] >= top["profit"].iloc[1]
+    assert len(store.query(start=candles["time"].iloc[1])) == 0
+    assert len(store.query(end=candles["time"].iloc[-1])) == 5
+
+    store.delete(rows["run_id"].iloc[0])
+    assert len(store.query(pair="EUR_USD")) == 3
+    with pytest.raises(ValueError):
+        store.query(order_by="profit; DROP TABLE runs")
@@ -0,0 +1,210 @@
+# tests/test_risk_guard.py
+"""
+core/risk_guard: daily and trailing drawdown checked against the in-memory
+account state on fills and streamed ticks, halting through the stop flag;
+day-start balances kept in the append-only DayStartJournal.
+Run:  pytest -q
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_oanda import FakeOanda
+from core.account_state import AccountState
+from core.max_drawdown import DayStartJournal, MaxDrawdownChecker
+from core.price_stream import PriceStream, Quote
+from core.risk_guard import RiskGuard
+from utils.api_client import PooledAPI
+
+DETAILS = r"/v3/accounts/(?P<account>[^/]+)"
+CHANGES = r"/v3/accounts/(?P<account>[^/]+)/changes"
+
+
+class FakeAccount:
+    """10 000 USD account long 10 000 EUR_USD from 1.10000, flat P/L."""
+
+    def __init__(self):
+        self.deltas = {}
+
+    def details(self, req):
+        return {
+            "account": {
+                "id": req.match["account"],
+                "currency": "USD",
+                "balance": "10000.0000",
+                "NAV": "10000.0000",
+                "unrealizedPL": "0.0000",
+                "trades": [
+                    {
+                        "id": "301",
+                        "instrument": "EUR_USD",
+                        "currentUnits": "10000",
+                        "price": "1.10000",
+                        "unrealizedPL": "0.0000",
+                    }
+                ],
+                "positions": [],
+                "orders": [],
+            },
+            "lastTransactionID": "300",
+        }
+
+    def changes(self, req):
+        since = req.params["sinceTransactionID"]
+        changes, state, last = self.deltas.get(since, ({}, {}, since))
+        return {"changes": changes, "state": state, "lastTransactionID": last}
+
+
+@pytest.fixture
+def server():
+    account = FakeAccount()
+    with FakeOanda() as oanda:
+        oanda.route("GET", DETAILS, account.details)
+        oanda.route("GET", CHANGES, account.changes)
+        client = PooledAPI("token", oanda.environment, backoff=0.01)
+        state = AccountState(client, "101-001", max_staleness=60)
+        state.snapshot()
+        yield oanda, account, state
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return DayStartJournal(tmp_path / "balances.jsonl", legacy_path=None)
+
+
+def test_journal_appends_and_reads_back(tmp_path):
+    legacy = tmp_path / "balances.json"
+    legacy.write_text(json.dumps({"2025-06-04": 100000.0}))
+    path = tmp_path / "config" / "balances.jsonl"
+    journal = DayStartJournal(path, legacy)
+    assert journal.get("2025-06-04", "101-001") == 100000.0  # legacy day
+    assert journal.get("2025-06-05", "101-001") is None
+
+    writers = [
+        threading.Thread(target=journal.record, args=(f"2025-07-{d:02d}", "a", d))
+        for d in range(1, 21)
+    ]
+    for w in writers:
+        w.start()
+    for w in writers:
+        w.join()
+    journal.record("2025-06-05", "101-001", 99988.85)
+    with open(path, "a") as f:
+        f.write('{"date": "2025-06-06", "acc')  # torn tail from a crash
+
+    again = DayStartJournal(path, legacy)
+    assert again.get("2025-06-05", "101-001") == 99988.85
+    assert again.get("2025-06-05", "other") is None
+    assert [again.get(f"2025-07-{d:02d}", "a") for d in range(1, 21)] == list(
+        range(1, 21)
+    )
+    assert json.loads(legacy.read_text()) == {"2025-06-04": 100000.0}  # untouched
+
+    # MaxDrawdownChecker keeps its interface on top of the journal
+    class State:
+        balance = 99000.0
+
+    checker = MaxDrawdownChecker(
+        {"account_id": "101-001", "max_drawdown": "1"}, None, State(), again
+    )
+    assert checker.starting_balance == again.get(date.today(), "101-001") == 99000.0
+    assert not checker.is_drawdown_exceeded()
+
+
+def test_tick_breach_halts_the_stop_flag(server, journal):
+    oanda, account, state = server
+    halts = []
+    guard = RiskGuard(state, max_drawdown=2, journal=journal, tick_interval=0.005)
+    guard.on_halt(halts.append)
+    user_stop = [False]
+    stop_flag = guard.stop_flag(lambda: user_stop[0])
+
+    assert guard.check() is None and guard.day_start_balance == 10000.0
+    assert journal.get(date.today(), "101-001") == 10000.0
+
+    stream = PriceStream("token", "101-001", "practice", ["EUR_USD"])
+    guard.watch(stream)
+    requests_so_far = len(oanda.requests)
+    try:
+        stream.ring.publish(Quote("EUR_USD", "t1", 1.08500, 1.08510))
+        time.sleep(0.05)
+        assert guard.equity() == pytest.approx(9850.0)  # 10 000 × −0.015
+        assert not stop_flag()
+
+        breached = time.perf_counter()
+        stream.ring.publish(Quote("EUR_USD", "t2", 1.07900, 1.07910))
+        assert guard.halted.wait(1.0)
+        assert time.perf_counter() - breached < 0.1
+    finally:
+        guard.close()
+    assert stop_flag() and len(halts) == 1 and "Daily drawdown" in halts[0]
+    assert len(oanda.requests) == requests_so_far  # ticks never hit REST
+
+    # halted stays halted; the user flag alone still stops a fresh guard
+    assert guard.check(equity=20000.0) == guard.reason
+    fresh = RiskGuard(state, max_drawdown=50, journal=journal)
+    user_stop[0] = True
+    assert fresh.stop_flag(lambda: user_stop[0])() and not fresh.halted.is_set()
+
+
+def test_fill_and_trailing_checks(server, journal):
+    oanda, account, state = server
+    account.deltas["300"] = (
+        {
+            "tradesClosed": [{"id": "301", "instrument": "EUR_USD"}],
+            "transactions": [
+                {"id": "301", "type": "ORDER_FILL", "accountBalance": "9700.0000"}
+            ],
+        },
+        {"NAV": "9700.0000", "unrealizedPL": "0.0000"},
+        "301",
+    )
+    guard = RiskGuard(state, max_drawdown=2.5, journal=journal)
+    assert guard.check() is None
+    state.poll()  # the fill is applied → listener checks at once
+    assert guard.halted.is_set() and guard.checks == 2
+    guard.close()
+
+    trailing = RiskGuard(state, trailing_drawdown=5, journal=journal)
+    for equity in (9700.0, 10400.0, 10000.0):
+        assert trailing.check(equity) is None
+    assert trailing.peak == 10400.0
+    assert "Trailing drawdown" in trailing.check(9880.0)
+    trailing.close()
+
+    assert RiskGuard.from_config({"max_drawdown": ""}, state) is None
+    with pytest.raises(ValueError):
+        RiskGuard.from_config({"max_drawdown": "two"}, state)
+
+
+def test_sync_during_a_check_does_not_deadlock(server, journal):
+    oanda, account, state = server
+    account.deltas["300"] = (
+        {"transactions": [{"id": "301", "accountBalance": "9990.0000"}]},
+        {},
+        "301",
+    )
+    guard = RiskGuard(state, max_drawdown=2, journal=journal)
+    state.synced_at -= 120  # stale: the day-start read syncs and finds a fill
+    done = threading.Thread(target=guard.check, args=(10000.0,), daemon=True)
+    done.start()
+    done.join(2.0)
+    assert not done.is_alive()
+    assert state.polls == 1 and guard.checks == 2  # outer + the fill listener
+    assert guard.day_start_balance == journal.get(date.today(), "101-001") == 9990.0
+    with open(journal.path) as f:
+        assert len(f.readlines()) == 1  # the day was started once
+
+    # a closed guard is detached and never halts (or cancels its task) again
+    guard.close()
+    assert guard._on_fill not in state._listeners
+    assert guard.check(equity=0.0) is None and not guard.halted.is_set()
@@ -0,0 +1,158 @@
+# tests/test_risk_vectors.py
+"""
+Array versions of the SL / TP / sizing rules: StopLossStrategy,
+TakeProfitStrategy and RiskManager give identical values per order and per
+array, and the Backtester sizes trades with them when asked to.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backtest.backtester import Backtester
+from core.risk_manager import RiskManager
+from core.sl_strategies import StopLossStrategy
+from core.tp_strategies import TakeProfitStrategy
+from strategies.base_strategy import StrategyBase, SIGNAL_BUY, SIGNAL_SELL
+
+
+class _Ema:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self, name, **params):
+        return self
+
+
+@pytest.fixture
+def entries():
+    rng = np.random.default_rng(11)
+    prices = 1.08 + rng.normal(0, 0.02, 2_000)
+    dirs = rng.choice([-1, 1], 2_000)
+    emas = prices + rng.normal(0, 0.003, 2_000)
+    return prices, dirs, emas
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {"sl_strategy": "Fixed SL (pips)", "sl_pips": "17.5"},
+        {"sl_strategy": "Trailing SL", "trailing_distance": "9"},
+        {"sl_strategy": "EMA-Based SL", "ema_period": "34"},
+    ],
+)
+def test_stop_losses_scalar_equals_vector(config, entries):
+    prices, dirs, emas = entries
+    config = {"pair": "EUR_USD", **config}
+    stops = StopLossStrategy(config).get_stop_losses(prices, dirs, emas)
+    for price, d, ema, stop in zip(prices, dirs, emas, stops):
+        scalar = StopLossStrategy(config, _Ema(ema)).get_stop_loss(
+            price, "Buy" if d > 0 else "Sell"
+        )
+        assert scalar == stop
+
+
+@pytest.mark.parametrize("pair", ["EUR_USD", "USD_JPY"])
+def test_take_profits_and_sizes_scalar_equal_vector(pair, entries):
+    prices, dirs, _ = entries
+    if pair == "USD_JPY":
+        prices = prices * 140
+    config = {
+        "pair": pair,
+        "sl_pips": "12",
+        "tp_pips": "31",
+        "rr_ratio": "2:7",
+        "account_balance": "48000",
+        "risk_per_trade": "0.75",
+    }
+    stops = StopLossStrategy(config).get_stop_losses(prices, dirs)
+    fixed = TakeProfitStrategy(config).get_take_profits(prices, dirs)
+    rr_config = {**config, "tp_strategy": "Risk:Reward Ratio"}
+    rr = TakeProfitStrategy(rr_config).get_take_profits(prices, dirs, stops)
+    risk = RiskManager(config)
+    sizes = risk.calculate_position_sizes(prices, stops)
+    for k, (price, d, stop) in enumerate(zip(prices, dirs, stops)):
+        side = "Buy" if d > 0 else "Sell"
+        assert TakeProfitStrategy(config).get_take_profit(price, side) == fixed[k]
+        assert TakeProfitStrategy(rr_config).get_take_profit(price, side, stop) == rr[k]
+        assert risk.calculate_position_size(price, stop) == sizes[k]
+
+
+def test_vector_edge_cases():
+    config = {"pair": "EUR_USD", "account_balance": 10_000, "risk_per_trade": 1}
+    risk = RiskManager(config)
+    sizes = risk.calculate_position_sizes(
+        [1.1, 1.1, 1.1, 1.1], [np.nan, 1.1, 1.0999999, 1.09]
+    )
+    # no stop / zero distance → 0 units; tiny distance → capped
+    assert sizes.tolist() == [0, 0, 100_000, risk.calculate_position_size(1.1, 1.09)]
+    with pytest.raises(ValueError):
+        StopLossStrategy({"sl_strategy": "EMA-Based SL"}).get_stop_losses([1.1], [1])
+    with pytest.raises(ValueError):
+        TakeProfitStrategy({"tp_strategy": "Risk:Reward Ratio"}).get_take_profits(
+            [1.1], [1]
+        )
+
+
+class Alternating(StrategyBase):
+    def backtest_signals(self, candles):
+        signals = np.zeros(len(candles), dtype=np.int8)
+        signals[::20] = SIGNAL_BUY
+        signals[10::20] = SIGNAL_SELL
+        return signals
+
+
+def test_backtester_sizes_trades_like_the_risk_manager(monkeypatch):
+    module = types.ModuleType("strategies._Alternating")
+    module.Strategy = Alternating
+    monkeypatch.setitem(sys.modules, "strategies._Alternating", module)
+    close = 1.1 + np.cumsum(np.random.default_rng(6).normal(0, 2e-4, 400))
+    candles = pd.DataFrame(
+        {
+            "time": pd.date_range("2025-01-01", periods=400, freq="h", tz="UTC"),
+            "open": close,
+            "high": close + 1e-4,
+            "low": close - 1e-4,
+            "close": close,
+        }
+    )
+    config = {
+        "token": "fake-token",
+        "environment": "practice",
+        "pair": "EUR_USD",
+        "timeframe": "H1",
+        "strategy": "_Alternating",
+        "sl_strategy": "Fixed SL (pips)",
+        "sl_pips": "30",
+        "starting_balance": 50_000,
+        "risk_per_trade": "2",
+    }
+    unsized = Backtester(config).run(candles=candles)["trades"]
+    trades = Backtester({**config, "position_sizing": True}).run(candles=candles)[
+        "trades"
+    ]
+    assert (unsized["units"] == 1).all()
+
+    risk = RiskManager({**config, "account_balance": 50_000})
+    stops = StopLossStrategy(config)
+    for trade in trades:
+        side = "Buy" if trade["direction"] == "buy" else "Sell"
+        stop = stops.get_stop_loss(trade["entry_price"], side)
+        assert trade["units"] == risk.calculate_position_size(
+            trade["entry_price"], stop
+        )
+    sign = np.where(trades["direction"] == "buy", 1, -1)
+    np.testing.assert_allclose(
+        trades["pl"],
+        (trades["exit_price"] - trades["entry_price"]) * sign * trades["units"],
+    )
+    no_stop = {k: v for k, v in config.items() if k != "sl_strategy"}
+    with pytest.raises(ValueError, match="position_sizing"):
+        Backtester({**no_stop, "position_sizing": True})
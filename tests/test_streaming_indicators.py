@@ -0,0 +1,161 @@
+# tests/test_streaming_indicators.py
+"""
+Streaming indicators vs. full-series references.
+The references re-state pandas_ta's default formulas in plain pandas so the
+suite runs without pandas_ta; when it is installed it is checked directly.
+Run:  pytest -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.streaming_indicators import (
+    ATR,
+    BBANDS,
+    DONCH,
+    EMA,
+    MACD,
+    RSI,
+    SMA,
+    STOCH,
+    WMA,
+    IndicatorSet,
+)
+
+
+# ----------------------------------------------------------------------
+# pandas references (pandas_ta defaults)
+# ----------------------------------------------------------------------
+def ref_ema(s, n):
+    s = s.copy()
+    s.iloc[n - 1] = s.iloc[:n].mean()
+    s.iloc[: n - 1] = np.nan
+    return s.ewm(span=n, adjust=False).mean()
+
+
+def ref_rma(s, n):
+    return s.ewm(alpha=1 / n, min_periods=n).mean()
+
+
+def ref_rsi(s, n):
+    d = s.diff()
+    return (
+        100
+        * ref_rma(d.clip(lower=0), n)
+        / (ref_rma(d.clip(lower=0), n) + ref_rma(-d.clip(upper=0), n))
+    )
+
+
+def ref_atr(h, l, c, n):
+    pc = c.shift()
+    tr = pd.concat([h - l, h - pc, pc - l], axis=1).abs().max(axis=1)
+    tr.iloc[0] = np.nan
+    return ref_rma(tr, n)
+
+
+def ref_wma(s, n):
+    w = np.arange(1, n + 1)
+    return s.rolling(n).apply(lambda x: (x * w).sum() / w.sum(), raw=True)
+
+
+@pytest.fixture(scope="module")
+def ohlc():
+    rng = np.random.default_rng(11)
+    n = 1500
+    close = pd.Series(1.1 + np.cumsum(rng.normal(0, 5e-4, n)))
+    high = close + rng.uniform(0, 1e-3, n)
+    low = close - rng.uniform(0, 1e-3, n)
+    return high, low, close
+
+
+def _stream(ind, high, low, close):
+    out = []
+    for h, l, c in zip(high, low, close):
+        v = ind.update(c, h, l)
+        out.append(np.nan if v is None else v)
+    return out
+
+
+def _assert_series(streamed, expected):
+    streamed = np.asarray(streamed, dtype=float)
+    expected = np.asarray(expected, dtype=float)
+    assert np.array_equal(np.isnan(streamed), np.isnan(expected))
+    mask = ~np.isnan(expected)
+    assert np.allclose(streamed[mask], expected[mask], rtol=1e-9, atol=1e-10)
+
+
+# ----------------------------------------------------------------------
+# Tests
+# ----------------------------------------------------------------------
+def test_moving_averages(ohlc):
+    h, l, c = ohlc
+    _assert_series(_stream(SMA(20), h, l, c), c.rolling(20).mean())
+    _assert_series(_stream(EMA(20), h, l, c), ref_ema(c, 20))
+    _assert_series(_stream(WMA(10), h, l, c), ref_wma(c, 10))
+
+
+def test_rsi_and_atr(ohlc):
+    h, l, c = ohlc
+    _assert_series(_stream(RSI(14), h, l, c), ref_rsi(c, 14))
+    _assert_series(_stream(ATR(14), h, l, c), ref_atr(h, l, c, 14))
+
+
+def test_multi_line_indicators(ohlc):
+    h, l, c = ohlc
+
+    macd = np.array(_stream(MACD(12, 26, 9), h, l, c), dtype=object)
+    line = ref_ema(c, 12) - ref_ema(c, 26)
+    signal = line.copy()
+    signal.iloc[25:] = ref_ema(line.iloc[25:].reset_index(drop=True), 9).values
+    signal.iloc[:25] = np.nan
+    got = [v[2] if isinstance(v, tuple) else np.nan for v in macd]
+    _assert_series(got, signal)
+
+    raw = 100 * (c - l.rolling(14).min()) / (h.rolling(14).max() - l.rolling(14).min())
+    k = raw.rolling(3).mean()
+    got = [v[0] if isinstance(v, tuple) else np.nan for v in _stream(STOCH(), h, l, c)]
+    _assert_series(got, k.where(k.rolling(3).mean().notna()))
+
+    mid, std = c.rolling(5).mean(), c.rolling(5).std(ddof=0)
+    got = _stream(BBANDS(5, 2.0), h, l, c)
+    _assert_series(
+        [v[2] if isinstance(v, tuple) else np.nan for v in got], mid + 2 * std
+    )
+
+    got = _stream(DONCH(20, 20), h, l, c)
+    _assert_series(
+        [v[1] if isinstance(v, tuple) else np.nan for v in got],
+        0.5 * (l.rolling(20).min() + h.rolling(20).max()),
+    )
+
+
+def test_indicator_set_warm_start_and_dedupe(ohlc):
+    h, l, c = ohlc
+    times = pd.date_range("2025-01-01", periods=len(c), freq="min", tz="UTC")
+    ind = IndicatorSet("EUR_USD", "M1")
+    for t, hh, ll, cc in zip(times, h, l, c):
+        ind.update({"time": t, "high": hh, "low": ll, "close": cc})
+
+    # replaying an old candle is ignored
+    assert not ind.update({"time": times[5], "high": 9, "low": 9, "close": 9})
+
+    # created late → warm-started from the kept history
+    ema = ind.get("EMA", length=10)
+    assert ema.value == pytest.approx(
+        ref_ema(c.iloc[-1000:].reset_index(drop=True), 10).iloc[-1]
+    )
+    assert ind.get("EMA", length=10) is ema
+
+
+def test_matches_pandas_ta(ohlc):
+    ta = pytest.importorskip("pandas_ta")
+    h, l, c = ohlc
+    _assert_series(_stream(EMA(20), h, l, c), ta.ema(c, length=20))
+    _assert_series(_stream(RSI(14), h, l, c), ta.rsi(c, length=14))
+    _assert_series(_stream(ATR(14), h, l, c), ta.atr(h, l, c, length=14))
@@ -0,0 +1,127 @@
+# tests/test_trade_plan.py
+"""
+core/trade_plan: the compiled SL / TP / sizing rules against the legacy
+StopLossStrategy / TakeProfitStrategy / RiskManager, and the array path
+against the scalar one.
+Run:  pytest -q
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.risk_manager import RiskManager
+from core.sl_strategies import StopLossStrategy
+from core.tp_strategies import TakeProfitStrategy
+from core.trade_plan import TradePlan
+
+
+class _Ema:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self, name, **params):
+        return self
+
+
+def _config(**overrides):
+    return {
+        "pair": "EUR_USD",
+        "sl_strategy": "Fixed SL (pips)",
+        "sl_pips": "15",
+        "tp_strategy": "Risk:Reward Ratio",
+        "rr_ratio": "1:3",
+        "account_balance": "25000",
+        "risk_per_trade": "1.5",
+        **overrides,
+    }
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {},
+        {"sl_strategy": "Trailing SL", "trailing_distance": "12"},
+        {"tp_strategy": "Fixed TP (pips)", "tp_pips": "40"},
+        {"pair": "USD_JPY", "sl_pips": "25", "rr_ratio": "2:5"},
+    ],
+)
+def test_matches_legacy_rule_classes(overrides):
+    config = _config(**overrides)
+    plan = TradePlan.from_config(config)
+    sl_rule, tp_rule = StopLossStrategy(config), TakeProfitStrategy(config)
+    risk = RiskManager(config)
+    base = 151.23457 if config["pair"] == "USD_JPY" else 1.083417
+    for price in base + np.linspace(-0.01, 0.01, 7):
+        for side in ("Buy", "Sell"):
+            sl = plan.stop(price, side)
+            assert sl == pytest.approx(sl_rule.get_stop_loss(price, side), abs=1e-9)
+            assert plan.target(price, side, sl) == pytest.approx(
+                tp_rule.get_take_profit(price, side, sl), abs=1e-9
+            )
+            assert plan.size(price, sl) == risk.calculate_position_size(price, sl)
+
+
+def test_ema_rule_matches_legacy_and_needs_a_value():
+    config = _config(sl_strategy="EMA-Based SL", ema_period="30")
+    plan = TradePlan.from_config(config)
+    assert plan.ema_period == 30
+    for ema, side in ((1.0812, "Buy"), (1.0855, "Buy"), (1.0855, "Sell")):
+        legacy = StopLossStrategy(config, _Ema(ema)).get_stop_loss(1.08341, side)
+        assert plan.stop(1.08341, side, ema) == pytest.approx(legacy, abs=1e-9)
+    with pytest.raises(RuntimeError):
+        plan.stop(1.08341, "Buy")
+
+
+def test_arrays_agree_with_single_prices():
+    rng = np.random.default_rng(2)
+    prices = 1.1 + rng.normal(0, 0.01, 500)
+    dirs = rng.choice([-1, 1], 500)
+    emas = prices + rng.normal(0, 0.002, 500)
+    emas[:20] = np.nan
+    for config in (
+        _config(),
+        _config(sl_strategy="EMA-Based SL", tp_strategy="Fixed TP (pips)"),
+    ):
+        plan = TradePlan.from_config(config)
+        stops = plan.stops(prices, dirs, emas)
+        targets = plan.targets(prices, dirs, stops)
+        sizes = plan.sizes(prices, stops)
+        for k in range(len(prices)):
+            side = "Buy" if dirs[k] > 0 else "Sell"
+            if np.isnan(stops[k]):  # EMA warm-up: no stop, no size
+                assert k < 20 and sizes[k] == 0
+                continue
+            assert stops[k] == plan.stop(prices[k], side, emas[k])
+            assert targets[k] == plan.target(prices[k], side, stops[k])
+            if stops[k] != prices[k]:
+                assert sizes[k] == plan.size(prices[k], stops[k])
+            else:
+                assert sizes[k] == 0
+
+
+def test_invalid_settings_raise_the_legacy_errors():
+    with pytest.raises(ValueError, match="sl_pips"):
+        TradePlan.from_config(_config(sl_pips="ten"))
+    with pytest.raises(ValueError, match="Risk:Reward"):
+        TradePlan.from_config(_config(rr_ratio="3"))
+    with pytest.raises(ValueError, match="Unknown stop loss"):
+        TradePlan.from_config(_config(sl_strategy="Chandelier"))
+    with pytest.raises(ValueError, match="account_balance"):
+        TradePlan.from_config({"pair": "EUR_USD", "risk_per_trade": "1"})
+    with pytest.raises(ValueError, match="Invalid direction"):
+        TradePlan.from_config(_config()).stop(1.1, "Long")
+
+    plan = TradePlan.from_config({"pair": "EUR_USD"}, sizing=False)
+    with pytest.raises(ValueError, match="without sizing"):
+        plan.size(1.1, 1.099)
+    plan.risk_fraction = 0.01
+    plan.set_balance(10_000)
+    legacy = RiskManager(
+        {"pair": "EUR_USD", "account_balance": 10_000, "risk_per_trade": 1}
+    )
+    assert plan.size(1.1, 1.095) == legacy.calculate_position_size(1.1, 1.095)
@@ -0,0 +1,129 @@
+# tests/test_walk_forward.py
+"""
+Offline tests for backtest/walk_forward – windows and the parallel
+optimise-in-sample / evaluate-out-of-sample pipeline on synthetic candles.
+Run:  pytest -q
+"""
+
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backtest.optimizer import evaluate
+from backtest.walk_forward import walk_forward, walk_forward_windows
+from strategies.base_strategy import StrategyBase, SIGNAL_BUY, SIGNAL_SELL
+
+
+class MomentumStrategy(StrategyBase):
+    """Long above the N-candle mean, short below – N comes from config."""
+
+    def backtest_signals(self, candles):
+        close = candles["close"]
+        mean = close.rolling(int(self.config["lookback"]), min_periods=1).mean()
+        return np.where(close > mean, SIGNAL_BUY, SIGNAL_SELL)
+
+
+@pytest.fixture
+def config(monkeypatch):
+    module = types.ModuleType("strategies._WalkStrategy")
+    module.Strategy = MomentumStrategy
+    monkeypatch.setitem(sys.modules, "strategies._WalkStrategy", module)
+    return {
+        "token": "fake-token",
+        "environment": "practice",
+        "pair": "EUR_USD",
+        "timeframe": "H1",
+        "strategy": "_WalkStrategy",
+        "stop_flag": lambda: False,  # must not break pickling
+    }
+
+
+@pytest.fixture
+def candles():
+    n = 1200
+    close = 1.1 + np.cumsum(np.random.default_rng(9).normal(0, 5e-4, n))
+    return pd.DataFrame(
+        {
+            "time": pd.date_range("2025-01-01", periods=n, freq="h", tz="UTC"),
+            "open": close,
+            "high": close,
+            "low": close,
+            "close": close,
+        }
+    )
+
+
+def test_rolling_anchored_and_time_span_windows():
+    times = np.arange(100, dtype=np.int64) * 3600 * 10**9
+    rolling = walk_forward_windows(times, 40, 20)
+    assert rolling == [(0, 40, 40, 60), (20, 60, 60, 80), (40, 80, 80, 100)]
+
+    anchored = walk_forward_windows(times, 40, 20, anchored=True)
+    assert [w[0] for w in anchored] == [0, 0, 0]
+    assert [w[1] for w in anchored] == [40, 60, 80]
+
+    assert walk_forward_windows(times, "40h", "20h") == rolling
+    with pytest.raises(ValueError):
+        walk_forward_windows(times, 0, 20)
+
+
+def test_out_of_sample_uses_in_sample_winner(config, candles):
+    grid = {"lookback": [3, 8, 20, 50]}
+    out = walk_forward(
+        config, grid, candles=candles, in_sample=400, out_of_sample=200, max_workers=2
+    )
+    assert len(out["windows"]) == 4
+
+    for w in out["windows"]:
+        is_slice = candles[
+            (candles["time"] >= w["is_start"]) & (candles["time"] <= w["is_end"])
+        ]
+        scores = [
+            evaluate(config, {"lookback": v}, is_slice)["profit"]
+            for v in grid["lookback"]
+        ]
+        assert w["params"] == {"lookback": grid["lookback"][int(np.argmax(scores))]}
+
+        oos_slice = candles[
+            (candles["time"] >= w["oos_start"]) & (candles["time"] <= w["oos_end"])
+        ]
+        serial = evaluate(config, w["params"], oos_slice)
+        assert w["oos_profit"] == pytest.approx(serial["profit"])
+        assert w["oos_trades"] == serial["trades"]
+
+
+def test_stitched_equity_and_stability(config, candles):
+    out = walk_forward(
+        config,
+        {"lookback": [5, 10, 30]},
+        candles=candles,
+        in_sample="300h",
+        out_of_sample="150h",
+        max_workers=2,
+    )
+    curve = out["equity_curve"]
+    oos_total = sum(w["oos_profit"] for w in out["windows"])
+    assert out["profit"] == pytest.approx(oos_total)
+    assert curve[-1]["equity"] == pytest.approx(out["final_balance"])
+    assert len(curve) == sum(w["oos_candles"] for w in out["windows"])
+    assert (np.diff(curve["time"]) > np.timedelta64(0)).all()
+
+    stability = out["stability"]
+    assert stability["windows"] == len(out["windows"])
+    assert 0.0 <= stability["profitable_windows"] <= 1.0
+    assert stability["max_drawdown"] >= 0.0
+    picks = stability["param_stability"]["lookback"]
+    assert 1 <= picks["distinct"] <= 3 and picks["cv"] is not None
+
+
+def test_too_few_candles_raise(config, candles):
+    with pytest.raises(ValueError):
+        walk_forward(
+            config, {"lookback": [5]}, candles=candles.iloc[:50], in_sample=400
+        )
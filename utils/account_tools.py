@@ -4,15 +4,19 @@ from oandapyV20 import API
 from oandapyV20.endpoints.accounts import AccountDetails, AccountSummary
 from oandapyV20.exceptions import V20Error
 
+from core.account_state import running_account_state
 
-def get_account_details(
-    token: str, account_id: str, environment: str = "practice"
-) -> dict:
+
+def get_account_details(client: API, account_id: str) -> dict:
     """
     Fetch detailed account information including margin, NAV, balance, etc.
+    `client` is the shared client from utils.api_client.get_client().
+    Served from memory while core/account_state tracks the account.
     """
+    state = running_account_state(account_id)
+    if state is not None:
+        return state.details()
     try:
-        client = API(access_token=token, environment=environment)
         request = AccountDetails(accountID=account_id)
         response = client.request(request)
         return response.get("account", {})
@@ -21,14 +25,14 @@ def get_account_details(
         return {}
 
 
-def get_account_summary(
-    token: str, account_id: str, environment: str = "practice"
-) -> dict:
+def get_account_summary(client: API, account_id: str) -> dict:
     """
     Fetch summary of the account: balance, NAV, margin info.
     """
+    state = running_account_state(account_id)
+    if state is not None:
+        return state.summary()
     try:
-        client = API(access_token=token, environment=environment)
         request = AccountSummary(accountID=account_id)
         response = client.request(request)
         return response.get("account", {})
@@ -37,8 +41,10 @@ def get_account_summary(
         return {}
 
 
-def account_balance(token: str, account_id: str, environment: str):
-    client = API(access_token=token, environment=environment)
-    r = AccountDetails(accountID=account_id)
+def account_balance(client: API, account_id: str):
+    state = running_account_state(account_id)
+    if state is not None:
+        return state.balance
+    r = AccountSummary(accountID=account_id)
     response = client.request(r)
     return float(response["account"]["balance"])
@@ -0,0 +1,228 @@
+# utils/api_client.py
+"""
+Shared OANDA v20 REST clients.
+
+• get_client(token, environment) returns one PooledAPI per credential pair for
+  the whole process, so every helper reuses the same keep-alive connections
+  instead of paying a TCP+TLS handshake per call. set_thread_client() swaps
+  in another client for one thread (backtest/replay's simulated broker).
+• PooledAPI is a drop-in oandapyV20.API with
+    – a pooled HTTPAdapter (keep-alive, bounded pool size),
+    – a token bucket held below OANDA's 120 req/s per-connection limit,
+    – retry with exponential back-off on 429 / 5xx / connection errors
+      (orders and other non-GET calls are only retried on 429, which OANDA
+      rejects before processing),
+    – per-endpoint latency metrics (`client.metrics.snapshot()`).
+
+Usage
+-----
+>>> from utils.api_client import get_client
+>>> client = get_client(token, "practice")
+>>> client.request(AccountSummary(accountID=account_id))
+>>> client.metrics.snapshot()["AccountSummary"]["p95_ms"]
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+from oandapyV20 import API
+from oandapyV20.exceptions import V20Error
+
+# ------------------------ config -------------------------------------------------
+MAX_REQUESTS_PER_SECOND = 100  # OANDA allows 120/s per connection; keep headroom
+POOL_SIZE = 10
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5  # seconds; doubles per attempt
+BACKOFF_MAX = 8.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+LATENCY_WINDOW = 1000  # samples kept per endpoint for percentiles
+
+
+# ------------------------ rate limiting ------------------------------------------
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `burst` saved."""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else rate)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._stamp) * self.rate
+                )
+                self._stamp = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+# ------------------------ metrics ------------------------------------------------
+class RequestMetrics:
+    """Request counts and latency percentiles, keyed by endpoint class name."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._stats: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, error: bool = False, retries: int = 0):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = {
+                    "count": 0,
+                    "errors": 0,
+                    "retries": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "samples": deque(maxlen=self.window),
+                }
+            stats["count"] += 1
+            stats["errors"] += int(error)
+            stats["retries"] += retries
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["samples"].append(seconds)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """{endpoint: {count, errors, retries, mean_ms, p50_ms, p95_ms, max_ms}}"""
+        out = {}
+        with self._lock:
+            for name, s in self._stats.items():
+                samples = sorted(s["samples"])
+                out[name] = {
+                    "count": s["count"],
+                    "errors": s["errors"],
+                    "retries": s["retries"],
+                    "mean_ms": 1000 * s["total"] / s["count"],
+                    "p50_ms": 1000 * _percentile(samples, 0.50),
+                    "p95_ms": 1000 * _percentile(samples, 0.95),
+                    "max_ms": 1000 * s["max"],
+                }
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def _percentile(sorted_samples, q: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))]
+
+
+# ------------------------ client -------------------------------------------------
+class PooledAPI(API):
+    def __init__(
+        self,
+        access_token: str,
+        environment: str = "practice",
+        rate: float = MAX_REQUESTS_PER_SECOND,
+        max_retries: int = MAX_RETRIES,
+        backoff: float = BACKOFF_BASE,
+        pool_size: int = POOL_SIZE,
+        **kwargs,
+    ):
+        super().__init__(access_token=access_token, environment=environment, **kwargs)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.client.mount("https://", adapter)
+        self.client.mount("http://", adapter)
+        self.limiter = TokenBucket(rate)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.metrics = RequestMetrics()
+
+    def _retryable(self, endpoint, error: Exception) -> bool:
+        if isinstance(error, V20Error):
+            code = int(getattr(error, "code", 0) or 0)
+            if code == 429:
+                return True
+            return code in RETRY_STATUS and endpoint.method.upper() == "GET"
+        # connection dropped / timed out – safe to repeat only for reads
+        return endpoint.method.upper() == "GET"
+
+    def request(self, endpoint):
+        if getattr(endpoint, "STREAM", False):
+            return super().request(endpoint)  # long-lived; not rate limited
+
+        name = type(endpoint).__name__
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = super().request(endpoint)
+            except (V20Error, requests.RequestException) as e:
+                elapsed = time.perf_counter() - start
+                if attempt >= self.max_retries or not self._retryable(endpoint, e):
+                    self.metrics.record(name, elapsed, error=True, retries=attempt)
+                    raise
+                attempt += 1
+                delay = min(self.backoff * 2 ** (attempt - 1), BACKOFF_MAX)
+                print(
+                    f"[APIClient] {name} failed ({e}); retry {attempt}/"
+                    f"{self.max_retries} in {delay:.1f}s"
+                )
+                time.sleep(delay)
+                continue
+            self.metrics.record(name, time.perf_counter() - start, retries=attempt)
+            return response
+
+
+# ------------------------ process-wide registry ----------------------------------
+_clients: Dict[tuple, PooledAPI] = {}
+_clients_lock = threading.Lock()
+_thread_client = threading.local()
+
+
+def set_thread_client(client=None):
+    """Make get_client() return `client` in the calling thread (None → shared)."""
+    _thread_client.client = client
+
+
+def get_client(token: str, environment: str = "practice") -> PooledAPI:
+    """Shared PooledAPI for this token/environment (created on first use)."""
+    client = getattr(_thread_client, "client", None)
+    if client is not None:
+        return client
+    key = (token, environment)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = PooledAPI(token, environment)
+        return client
+
+
+def close_clients():
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+__all__ = [
+    "PooledAPI",
+    "RequestMetrics",
+    "TokenBucket",
+    "get_client",
+    "close_clients",
+    "set_thread_client",
+]
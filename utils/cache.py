@@ -0,0 +1,280 @@
+# utils/cache.py
+"""
+Two-tier cache for expensive lookups (indicator payloads, Labs responses).
+
+• Memory tier: LRU ordered dict with per-entry TTL and an entry bound.
+• Disk tier (optional): one JSON file per key, written atomically
+  (tmp file + os.replace), same TTL, evicted oldest-first when the directory
+  exceeds `disk_max_entries` / `disk_max_bytes`.
+• get_or_fetch() coalesces concurrent misses: threads asking for the same
+  key while a fetch is running wait for that result instead of fetching too.
+• stats() → hits / misses / disk hits / coalesced waits / evictions and
+  lookup + fetch latency percentiles.
+
+Usage
+-----
+>>> cache = TTLCache(maxsize=512, ttl=900, disk_dir=".cache/labs_indicators")
+>>> payload = cache.get_or_fetch(("RSI", "EUR_USD", 14), lambda: fetch(...))
+>>> cache.stats()["hits"]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable
+
+from utils.api_client import RequestMetrics
+
+_MISSING = object()
+
+
+class _Flight:
+    """A fetch in progress; followers wait on `done`."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 900.0,
+        disk_dir: Path | str = None,
+        disk_max_entries: int = 10_000,
+        disk_max_bytes: int = 256 * 1024 * 1024,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+        self.disk_max_entries = disk_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.clock = clock
+
+        # key → (expires, value), least recently used first
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_usage = None  # (entries, bytes); scanned on first write
+        self._counts = dict.fromkeys(
+            (
+                "hits",
+                "misses",
+                "disk_hits",
+                "coalesced",
+                "fetches",
+                "fetch_errors",
+                "evictions",
+                "expirations",
+                "disk_evictions",
+            ),
+            0,
+        )
+        self.latency = RequestMetrics()  # "lookup" and "fetch" timings
+
+    # -------------------------------- public API ---------------------------
+    def get(self, key: Hashable, default=None):
+        """Value from memory, then disk (promoted to memory); `default` if absent."""
+        start = time.perf_counter()
+        with self._lock:
+            value = self._get_memory(key)
+        if value is _MISSING:
+            value, remaining = self._get_disk(key)
+            if value is not _MISSING:
+                with self._lock:
+                    self._counts["disk_hits"] += 1
+                    self._put_memory(key, value, remaining)
+        with self._lock:
+            self._counts["hits" if value is not _MISSING else "misses"] += 1
+        self.latency.record("lookup", time.perf_counter() - start)
+        return default if value is _MISSING else value
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._put_memory(key, value, ttl)
+        self._put_disk(key, value)
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any], ttl: float = None):
+        """
+        Cached value for `key`, or fetch() it once – concurrent callers for the
+        same key share that single fetch (and its exception).
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            # a fetch may have finished between the miss above and here
+            value = self._get_memory(key)
+            if value is not _MISSING:
+                return value
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self._counts["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        start = time.perf_counter()
+        try:
+            flight.value = fetch()
+            self.set(key, flight.value, ttl)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._counts["fetch_errors"] += 1
+            raise
+        finally:
+            self.latency.record("fetch", time.perf_counter() - start)
+            with self._lock:
+                self._counts["fetches"] += 1
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+        if self.disk_dir is not None:
+            try:
+                os.remove(self._disk_path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._counts)
+            out["entries"] = len(self._data)
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = out["hits"] / lookups if lookups else 0.0
+        out["latency"] = self.latency.snapshot()
+        return out
+
+    def __len__(self):
+        return len(self._data)
+
+    # -------------------------------- memory tier --------------------------
+    def _get_memory(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return _MISSING
+        expires, value = item
+        if expires < self.clock():
+            del self._data[key]
+            self._counts["expirations"] += 1
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _put_memory(self, key, value, ttl):
+        self._data[key] = (self.clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._counts["evictions"] += 1
+
+    # -------------------------------- disk tier ----------------------------
+    def _disk_path(self, key) -> Path:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return self.disk_dir / f"{digest}.json"
+
+    def _get_disk(self, key):
+        """(value, seconds of freshness left) or (_MISSING, 0)."""
+        if self.disk_dir is None:
+            return _MISSING, 0
+        path = self._disk_path(key)
+        try:
+            remaining = self.ttl - (self.clock() - path.stat().st_mtime)
+            if remaining <= 0:
+                return _MISSING, 0
+            return json.loads(path.read_text()), remaining
+        except (OSError, ValueError):
+            return _MISSING, 0  # absent, or removed/replaced mid-read
+
+    def _put_disk(self, key, value):
+        if self.disk_dir is None:
+            return
+        try:
+            data = json.dumps(value)
+        except TypeError:
+            return  # not JSON-serialisable → memory only
+        path = self._disk_path(key)
+        with self._disk_lock:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            if self._disk_usage is None:
+                self._disk_usage = self._scan_disk()
+            existed = path.exists()
+            old_size = path.stat().st_size if existed else 0
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(data)
+            os.replace(tmp, path)
+            entries, size = self._disk_usage
+            self._disk_usage = (
+                entries + (not existed),
+                size - old_size + len(data.encode()),
+            )
+            if (
+                self._disk_usage[0] > self.disk_max_entries
+                or self._disk_usage[1] > self.disk_max_bytes
+            ):
+                self._evict_disk()
+
+    def _scan_disk(self):
+        files = [p.stat() for p in self.disk_dir.glob("*.json")]
+        return len(files), sum(s.st_size for s in files)
+
+    def _evict_disk(self):
+        """Drop expired files, then oldest-first down to 90 % of the bounds."""
+        now = self.clock()
+        files = []
+        for p in self.disk_dir.glob("*.json"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        files.sort()
+        entries, size = len(files), sum(f[1] for f in files)
+        target_entries = int(self.disk_max_entries * 0.9)
+        target_bytes = int(self.disk_max_bytes * 0.9)
+        evicted = 0
+        for mtime, fsize, p in files:
+            expired = now - mtime >= self.ttl
+            if not expired and entries <= target_entries and size <= target_bytes:
+                break
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            entries -= 1
+            size -= fsize
+            evicted += 1
+        self._disk_usage = (entries, size)
+        with self._lock:
+            self._counts["disk_evictions"] += evicted
+
+
+__all__ = ["TTLCache"]
@@ -0,0 +1,230 @@
+# utils/candle_downloader.py
+"""
+Concurrent bulk download of long candle histories into the candle store.
+
+• [start, end] is split into granularity-aligned chunks of at most
+  MAX_CANDLES_PER_REQUEST candles, one InstrumentsCandles(from, to) each.
+• Chunks are fetched by a thread pool through the shared PooledAPI
+  (utils/api_client.get_client), whose token bucket keeps the whole download
+  inside the account rate limit.
+• Finished chunks are merged into the store every `flush_every` chunks,
+  together with the interval they cover. That coverage is the checkpoint:
+  ranges already covered are skipped, so an interrupted download resumes
+  where it stopped. Candles fetched twice at chunk/gap boundaries are
+  de-duplicated by the store's merge.
+
+Usage
+-----
+>>> from utils.candle_downloader import download_range
+>>> stats = download_range(client, "EUR_USD", "M1", "2024-01-01", "2025-01-01")
+>>> stats["candles"], stats["requests"], stats["seconds"]
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from oandapyV20.endpoints.instruments import InstrumentsCandles
+
+from core.candle_scheduler import GRANULARITY_SECONDS, candle_bounds
+from utils.candle_store import (
+    MAX_CANDLES_PER_REQUEST,
+    CandleStore,
+    _missing,
+    _to_ns,
+    concat_columns,
+    get_candle_store,
+    parse_candles,
+    to_oanda_time,
+)
+
+# ------------------------ config -------------------------------------------------
+DOWNLOAD_WORKERS = 8  # concurrent chunk requests (the client's bucket still rules)
+FLUSH_EVERY = 8  # chunks merged into the store per checkpoint
+_MONTH_SECONDS = 31 * 86400  # longest "M" candle, for chunk sizing
+_NS = 10**9
+# ---------------------------------------------------------------------------------
+
+
+def _step_seconds(granularity: str) -> int:
+    if granularity == "M":
+        return _MONTH_SECONDS
+    try:
+        return GRANULARITY_SECONDS[granularity]
+    except KeyError:
+        raise ValueError(f"[Downloader] Unsupported granularity: {granularity}")
+
+
+def chunk_range(
+    granularity: str,
+    start_ns: int,
+    end_ns: int,
+    chunk_candles: int = MAX_CANDLES_PER_REQUEST,
+) -> List[Tuple[int, int]]:
+    """
+    Half-open [from, to) epoch-ns chunks covering [start, end]; the first one
+    starts on the open of the candle containing `start` and each spans at
+    most `chunk_candles` candles.
+    """
+    span = _step_seconds(granularity) * chunk_candles * _NS
+    lo = int(round(candle_bounds(granularity, start_ns / _NS)[0])) * _NS
+    chunks = []
+    while lo <= end_ns:
+        hi = min(lo + span, end_ns + 1)
+        chunks.append((lo, hi))
+        lo = hi
+    return chunks
+
+
+def estimate_start(granularity: str, count: int, end_ns: int) -> int:
+    """Epoch-ns far enough back for `count` candles, allowing for weekends."""
+    return int(end_ns - count * _step_seconds(granularity) * _NS * 7 / 5 * 1.05)
+
+
+class CandleDownloader:
+    def __init__(
+        self,
+        client,
+        store: CandleStore = None,
+        workers: int = DOWNLOAD_WORKERS,
+        chunk_candles: int = MAX_CANDLES_PER_REQUEST,
+        flush_every: int = FLUSH_EVERY,
+        clock: Callable[[], float] = time.time,
+    ):
+        if not 0 < chunk_candles <= MAX_CANDLES_PER_REQUEST:
+            raise ValueError(
+                f"[Downloader] chunk_candles must be 1…{MAX_CANDLES_PER_REQUEST}"
+            )
+        self.client = client
+        self.store = store if store is not None else get_candle_store()
+        self.workers = workers
+        self.chunk_candles = chunk_candles
+        self.flush_every = flush_every
+        self.clock = clock
+
+    # -------------------------------- public API ---------------------------
+    def plan(
+        self, instrument: str, granularity: str, start, end, price: str = "M"
+    ) -> List[Tuple[int, int]]:
+        """Chunks still to download for [start, end] (future clipped to now)."""
+        start_ns = _to_ns(start)
+        end_ns = min(_to_ns(end), int(self.clock() * _NS))
+        chunks = []
+        for gap_start, gap_end in _missing(
+            self.store.coverage(instrument, granularity, price), start_ns, end_ns
+        ):
+            chunks.extend(
+                chunk_range(granularity, gap_start, gap_end, self.chunk_candles)
+            )
+        return chunks
+
+    def download(
+        self,
+        instrument: str,
+        granularity: str,
+        start,
+        end,
+        price: str = "M",
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict[str, float]:
+        """
+        Fetch every missing chunk of [start, end] into the store.
+        On error or interrupt the chunks already finished are still
+        checkpointed before the exception propagates.
+        """
+        chunks = self.plan(instrument, granularity, start, end, price)
+        stats = {"chunks": len(chunks), "requests": 0, "candles": 0, "seconds": 0.0}
+        started = time.perf_counter()
+        pending_cols, pending_cov, consumed = [], [], set()
+
+        def take(future):
+            cols, covered = future.result()
+            consumed.add(future)
+            pending_cols.append(cols)
+            pending_cov.append(covered)
+            stats["requests"] += 1
+            stats["candles"] += len(cols["time"])
+
+        def flush():
+            if pending_cov:
+                self.store.merge(
+                    instrument,
+                    granularity,
+                    price,
+                    concat_columns(pending_cols, price),
+                    list(pending_cov),
+                )
+                pending_cols.clear()
+                pending_cov.clear()
+
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        futures = [
+            pool.submit(self._fetch_chunk, instrument, granularity, price, lo, hi)
+            for lo, hi in chunks
+        ]
+        try:
+            for future in as_completed(futures):
+                take(future)
+                if progress is not None:
+                    progress(len(consumed), len(chunks))
+                if len(pending_cov) >= self.flush_every:
+                    flush()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            for future in futures:  # finished while we were failing → keep them
+                if (
+                    future not in consumed
+                    and future.done()
+                    and not future.cancelled()
+                    and future.exception() is None
+                ):
+                    take(future)
+            flush()
+            stats["seconds"] = time.perf_counter() - started
+        return stats
+
+    # -------------------------------- network ------------------------------
+    def _fetch_chunk(self, instrument, granularity, price, lo, hi):
+        """Candles with lo <= time < hi and the interval they prove covered."""
+        params = {
+            "granularity": granularity,
+            "price": price,
+            "from": to_oanda_time(lo),
+            "to": to_oanda_time(hi - 1),  # `to` is inclusive: at most chunk_candles
+        }
+        raw = self.client.request(
+            InstrumentsCandles(instrument=instrument, params=params)
+        )["candles"]
+        cols = parse_candles(raw, price)
+        keep = (cols["time"] >= lo) & (cols["time"] < hi)
+        cols = {n: a[keep] for n, a in cols.items()}
+
+        covered_end = min(hi, int(self.clock() * _NS))
+        forming = [c["time"] for c in raw if not c["complete"]]
+        if forming:  # live edge: only up to the candle still forming
+            covered_end = min(
+                covered_end,
+                int(np.datetime64(forming[0][:-1], "ns").astype(np.int64)),
+            )
+        return cols, (lo, max(lo, covered_end))
+
+
+def download_range(
+    client, instrument: str, granularity: str, start, end, price: str = "M", **kwargs
+) -> Dict[str, float]:
+    """One-shot CandleDownloader(client, **kwargs).download(…)."""
+    return CandleDownloader(client, **kwargs).download(
+        instrument, granularity, start, end, price
+    )
+
+
+__all__ = [
+    "CandleDownloader",
+    "chunk_range",
+    "download_range",
+    "estimate_start",
+    "DOWNLOAD_WORKERS",
+]
@@ -0,0 +1,463 @@
+# utils/candle_store.py
+"""
+Persistent on-disk candle store with incremental sync.
+
+• One directory per  instrument / granularity / price component:
+      .cache/candles/EUR_USD/M15/M/{time,volume,open,high,low,close}.npy
+  Columns are plain NumPy .npy files, opened memory-mapped on read.
+• time is int64 epoch-nanoseconds; prices are float64; volume is int64.
+• Price columns: "M" → open/high/low/close, "B" → bid_open …, "A" → ask_open …
+• meta.json keeps the list of [from, to] intervals already downloaded, so a
+  sync only requests the gaps. Without a client the store serves whatever
+  was recorded before; a failed sync raises unless `offline=True`
+  (back-tests), so live callers never trade on stale candles unknowingly.
+
+• parse_candles() turns an API payload straight into those columns; pages are
+  parsed as they arrive, so only one page of JSON is alive at a time.
+
+Usage
+-----
+>>> from utils.candle_store import get_candle_store
+>>> df = get_candle_store().candles(client, "EUR_USD", "M15", count=1000)
+>>> cols = get_candle_store().columns(client, "EUR_USD", "M15", count=100_000)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from oandapyV20.endpoints.instruments import InstrumentsCandles
+
+# ------------------------ config -------------------------------------------------
+CANDLE_STORE_DIR = Path(".cache") / "candles"
+MAX_CANDLES_PER_REQUEST = 5000  # OANDA hard limit per InstrumentsCandles call
+PRICE_COMPONENTS = {"M": "mid", "B": "bid", "A": "ask"}
+_COLUMN_PREFIX = {"M": "", "B": "bid_", "A": "ask_"}
+_OHLC = (("o", "open"), ("h", "high"), ("l", "low"), ("c", "close"))
+_TIME, _VOLUME = itemgetter("time"), itemgetter("volume")
+# ---------------------------------------------------------------------------------
+
+
+def price_columns(price: str = "M") -> List[str]:
+    """Column names stored for a price-component string such as "M" or "BA"."""
+    cols = ["time", "volume"]
+    for comp in price:
+        if comp not in PRICE_COMPONENTS:
+            raise ValueError(f"[CandleStore] Unknown price component: {comp!r}")
+        cols.extend(f"{_COLUMN_PREFIX[comp]}{name}" for _, name in _OHLC)
+    return cols
+
+
+def to_oanda_time(ts_ns: int) -> str:
+    """int64 epoch-ns → RFC3339 string accepted by the v20 REST API."""
+    return np.datetime_as_string(np.datetime64(int(ts_ns), "ns"), unit="ns") + "Z"
+
+
+def candle_dtype(price: str = "M") -> np.dtype:
+    """Record layout of one candle: int64 time/volume + float64 price columns."""
+    return np.dtype(
+        [
+            (n, np.int64 if n in ("time", "volume") else np.float64)
+            for n in price_columns(price)
+        ]
+    )
+
+
+def parse_candles(raw: List[dict], price: str = "M") -> Dict[str, np.ndarray]:
+    """
+    Complete candles of an InstrumentsCandles payload → dict of column arrays.
+    Times (RFC3339 strings, "Z" cut off) and prices are streamed into their
+    columns with np.fromiter – no per-row records or string lists; only the
+    quote dicts of each price component are gathered once for the OHLC passes.
+    """
+    names = price_columns(price)  # validates the components
+    raw = [c for c in raw if c["complete"]]
+    n = len(raw)
+    cols = {
+        "time": np.fromiter(
+            (t[:-1] for t in map(_TIME, raw)), dtype="datetime64[ns]", count=n
+        ).astype(np.int64),
+        "volume": np.fromiter(map(_VOLUME, raw), dtype=np.int64, count=n),
+    }
+    for comp in price:
+        quotes = list(map(itemgetter(PRICE_COMPONENTS[comp]), raw))
+        prefix = _COLUMN_PREFIX[comp]
+        for short, name in _OHLC:
+            cols[prefix + name] = np.fromiter(
+                map(float, map(itemgetter(short), quotes)), dtype=np.float64, count=n
+            )
+    return {name: cols[name] for name in names}
+
+
+def concat_columns(pages: List[Dict[str, np.ndarray]], price: str = "M"):
+    """Join parsed pages (oldest first) into one set of columns."""
+    if not pages:
+        return parse_candles([], price)
+    return {n: np.concatenate([p[n] for p in pages]) for n in pages[0]}
+
+
+def to_records(cols: Dict[str, np.ndarray]) -> np.ndarray:
+    """Column arrays → one NumPy structured array (fields in column order)."""
+    dtype = np.dtype([(n, np.asarray(a).dtype) for n, a in cols.items()])
+    out = np.empty(len(cols["time"]), dtype=dtype)
+    for n, a in cols.items():
+        out[n] = a
+    return out
+
+
+def to_frame(cols: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Column arrays → DataFrame with a tz-aware UTC `time` column."""
+    df = pd.DataFrame({k: np.asarray(v) for k, v in cols.items() if k != "time"})
+    df.insert(0, "time", pd.to_datetime(np.asarray(cols["time"]), unit="ns", utc=True))
+    return df
+
+
+class CandleStore:
+    def __init__(self, root: Path | str = CANDLE_STORE_DIR):
+        self.root = Path(root)
+        self._lock = threading.RLock()
+
+    # -------------------------------- storage ------------------------------
+    def _dir(self, instrument: str, granularity: str, price: str) -> Path:
+        return self.root / instrument / granularity / price
+
+    def _load_meta(self, path: Path) -> dict:
+        meta_f = path / "meta.json"
+        if meta_f.exists():
+            return json.loads(meta_f.read_text())
+        return {"coverage": []}
+
+    def load(
+        self, instrument: str, granularity: str, price: str = "M", mmap: bool = True
+    ) -> Dict[str, np.ndarray]:
+        """Memory-mapped column arrays (in memory with mmap=False; empty if none)."""
+        path = self._dir(instrument, granularity, price)
+        names = price_columns(price)
+        if not all((path / f"{n}.npy").exists() for n in names):
+            return {
+                n: np.empty(0, dtype=np.int64 if n in ("time", "volume") else float)
+                for n in names
+            }
+        mode = "r" if mmap else None
+        cols = {n: np.load(path / f"{n}.npy", mmap_mode=mode) for n in names}
+        # a crash between column writes can leave unequal lengths – trim safely
+        size = min(len(a) for a in cols.values())
+        return {n: a[:size] for n, a in cols.items()}
+
+    def coverage(self, instrument: str, granularity: str, price: str = "M"):
+        """Intervals [from_ns, to_ns] already downloaded for this key."""
+        return self._load_meta(self._dir(instrument, granularity, price))["coverage"]
+
+    def merge(
+        self,
+        instrument: str,
+        granularity: str,
+        price: str,
+        new: Dict[str, np.ndarray],
+        covered: Optional[tuple | list] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Merge `new` rows (newest wins on duplicate time) and persist atomically.
+        `covered` – one (from_ns, to_ns) interval, or a list of them, to record.
+        """
+        with self._lock:
+            path = self._dir(instrument, granularity, price)
+            path.mkdir(parents=True, exist_ok=True)
+            # read without a memory map: a mapped .npy cannot be replaced on Windows
+            old = self.load(instrument, granularity, price, mmap=False)
+            names = price_columns(price)
+
+            merged = {n: np.concatenate([new[n], old[n]]) for n in names}
+            del old
+            _, keep = np.unique(merged["time"], return_index=True)  # sorted, first wins
+            merged = {n: a[keep] for n, a in merged.items()}
+
+            for n in names:
+                tmp = path / f"{n}.tmp.npy"
+                np.save(tmp, merged[n])
+                os.replace(tmp, path / f"{n}.npy")
+
+            intervals = [covered] if isinstance(covered, tuple) else covered or []
+            if intervals:
+                meta = self._load_meta(path)
+                for lo, hi in intervals:
+                    meta["coverage"] = _add_interval(meta["coverage"], lo, hi)
+                tmp = path / "meta.tmp.json"
+                tmp.write_text(json.dumps(meta))
+                os.replace(tmp, path / "meta.json")
+        return self.load(instrument, granularity, price)
+
+    # -------------------------------- network ------------------------------
+    def _request(self, client, instrument: str, params: dict) -> List[dict]:
+        r = InstrumentsCandles(instrument=instrument, params=params)
+        return client.request(r)["candles"]
+
+    def _fetch_forward(self, client, instrument, granularity, price, start, end=None):
+        """Page forward from `start` until `end` (or the live candle)."""
+        params = {
+            "granularity": granularity,
+            "price": price,
+            "from": to_oanda_time(start),
+            "count": MAX_CANDLES_PER_REQUEST,
+        }
+        pages, last_seen = [], None  # parsed page by page: no payload kept alive
+        while True:
+            raw = self._request(client, instrument, params)
+            if not raw:
+                break
+            pages.append(parse_candles(raw, price))
+            last_seen = int(np.datetime64(raw[-1]["time"][:-1], "ns").astype(np.int64))
+            if (
+                len(raw) < MAX_CANDLES_PER_REQUEST
+                or not raw[-1]["complete"]
+                or (end is not None and last_seen >= end)
+            ):
+                break
+            params["from"] = raw[-1]["time"]
+            params["includeFirst"] = False
+
+        cols = concat_columns(pages, price)
+        if end is not None:
+            mask = cols["time"] <= end
+            cols = {n: a[mask] for n, a in cols.items()}
+        return cols, last_seen
+
+    def _fetch_backward(self, client, instrument, granularity, price, count, to=None):
+        """Page backwards from `to` (exclusive, or now) until `count` complete candles."""
+        params = {"granularity": granularity, "price": price}
+        pages, have = [], 0  # newest page first
+        while have < count:
+            params["count"] = min(count - have + 1, MAX_CANDLES_PER_REQUEST)
+            if to is not None:
+                params["to"] = to_oanda_time(to)
+            raw = self._request(client, instrument, params)
+            if to is not None:
+                cutoff = to_oanda_time(to)  # same fixed-width format → sortable
+                raw = [c for c in raw if c["time"] < cutoff]
+            page = parse_candles(raw, price)
+            if not len(page["time"]):
+                break
+            pages.append(page)
+            have += len(page["time"])
+            to = int(page["time"][0])
+        cols = concat_columns(pages[::-1], price)
+        # copies: no memory map outlives the call (merge() replaces the files)
+        return {n: np.array(a[-count:]) for n, a in cols.items()}
+
+    # -------------------------------- sync ---------------------------------
+    def sync_range(self, client, instrument, granularity, start, end, price="M"):
+        """Download only the parts of [start, end] (epoch-ns) not yet covered."""
+        with self._lock:
+            for gap_start, gap_end in _missing(
+                self.coverage(instrument, granularity, price), start, end
+            ):
+                cols, last_seen = self._fetch_forward(
+                    client, instrument, granularity, price, gap_start, gap_end
+                )
+                covered = None
+                if last_seen is not None:
+                    covered = (gap_start, min(gap_end, last_seen))
+                self.merge(instrument, granularity, price, cols, covered)
+
+    def sync_latest(self, client, instrument, granularity, count, price="M"):
+        """Make sure the newest `count` completed candles are stored."""
+        with self._lock:
+            cov = self.coverage(instrument, granularity, price)
+            if cov:
+                head_start, head_end = cov[-1]
+                cols, last_seen = self._fetch_forward(
+                    client, instrument, granularity, price, head_end
+                )
+                self.merge(
+                    instrument,
+                    granularity,
+                    price,
+                    cols,
+                    (head_end, last_seen) if last_seen is not None else None,
+                )
+                times = self.load(instrument, granularity, price)["time"]
+                have = int(np.count_nonzero(times >= head_start))
+                if have >= count:
+                    return
+                cols = self._fetch_backward(
+                    client, instrument, granularity, price, count - have, head_start
+                )
+                if len(cols["time"]):
+                    self.merge(
+                        instrument,
+                        granularity,
+                        price,
+                        cols,
+                        (int(cols["time"][0]), head_start),
+                    )
+            else:
+                cols = self._fetch_backward(
+                    client, instrument, granularity, price, count
+                )
+                if len(cols["time"]):
+                    self.merge(
+                        instrument,
+                        granularity,
+                        price,
+                        cols,
+                        (int(cols["time"][0]), int(cols["time"][-1])),
+                    )
+
+    # -------------------------------- public API ---------------------------
+    def columns(
+        self,
+        client,
+        instrument: str,
+        granularity: str,
+        count: int,
+        price: str = "M",
+        offline: bool = False,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Last `count` completed candles as column arrays, syncing when a client
+        is given. A failed sync raises unless `offline` (stored candles then).
+        """
+        if client is not None:
+            try:
+                self.sync_latest(client, instrument, granularity, count, price)
+            except Exception as e:
+                if not offline:
+                    raise
+                print(f"[CandleStore] Sync failed, using stored candles: {e}")
+        cols = self.load(instrument, granularity, price)
+        if not len(cols["time"]):
+            raise RuntimeError(
+                f"No candle data available for {instrument} {granularity}. "
+                "Check instrument code or network connectivity."
+            )
+        # copies: no memory map outlives the call (merge() replaces the files)
+        return {n: np.array(a[-count:]) for n, a in cols.items()}
+
+    def columns_range(
+        self,
+        client,
+        instrument: str,
+        granularity: str,
+        start,
+        end,
+        price: str = "M",
+        offline: bool = False,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Completed candles with start <= time <= end (anything pd.Timestamp
+        takes). A failed sync raises unless `offline` (stored candles then).
+        """
+        start_ns, end_ns = _to_ns(start), _to_ns(end)
+        if client is not None:
+            try:
+                self.sync_range(
+                    client, instrument, granularity, start_ns, end_ns, price
+                )
+            except Exception as e:
+                if not offline:
+                    raise
+                print(f"[CandleStore] Sync failed, using stored candles: {e}")
+        cols = self.load(instrument, granularity, price)
+        lo = np.searchsorted(cols["time"], start_ns, side="left")
+        hi = np.searchsorted(cols["time"], end_ns, side="right")
+        return {n: np.array(a[lo:hi]) for n, a in cols.items()}
+
+    def candles(
+        self,
+        client,
+        instrument: str,
+        granularity: str,
+        count: int,
+        price: str = "M",
+        offline: bool = False,
+    ) -> pd.DataFrame:
+        """columns() as a DataFrame with a tz-aware `time` column."""
+        return to_frame(
+            self.columns(client, instrument, granularity, count, price, offline)
+        )
+
+    def candles_range(
+        self,
+        client,
+        instrument: str,
+        granularity: str,
+        start,
+        end,
+        price: str = "M",
+        offline: bool = False,
+    ) -> pd.DataFrame:
+        """columns_range() as a DataFrame with a tz-aware `time` column."""
+        return to_frame(
+            self.columns_range(
+                client, instrument, granularity, start, end, price, offline
+            )
+        )
+
+
+# ======================== internal helpers =======================================
+
+
+def _to_ns(ts) -> int:
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return int(ts.value)
+
+
+def _add_interval(intervals, start, end):
+    """Insert [start, end] and coalesce overlapping/adjacent intervals."""
+    merged = []
+    for lo, hi in sorted([*map(tuple, intervals), (int(start), int(end))]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+
+def _missing(intervals, start, end):
+    """Sub-ranges of [start, end] not covered by `intervals`."""
+    gaps, cursor = [], start
+    for lo, hi in intervals:
+        if hi < cursor:
+            continue
+        if lo > end:
+            break
+        if lo > cursor:
+            gaps.append((cursor, lo))
+        cursor = max(cursor, hi)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+_default_store: Optional[CandleStore] = None
+
+
+def get_candle_store() -> CandleStore:
+    """Process-wide store shared by the back-tester and utils.price_tools."""
+    global _default_store
+    if _default_store is None:
+        _default_store = CandleStore()
+    return _default_store
+
+
+__all__ = [
+    "CandleStore",
+    "get_candle_store",
+    "candle_dtype",
+    "concat_columns",
+    "parse_candles",
+    "price_columns",
+    "to_frame",
+    "to_records",
+    "to_oanda_time",
+    "CANDLE_STORE_DIR",
+]
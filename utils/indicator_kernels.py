@@ -0,0 +1,637 @@
+# utils/indicator_kernels.py
+"""
+Native kernels for every Labs indicator (INDICATORS in utils/indicators.py),
+computed from full OHLCV arrays.
+
+• Windowed statistics are vectorised NumPy (cumulative sums, convolutions,
+  chunked sliding-window views), so memory stays bounded at 10M+ bars.
+• Recursive ones (EMA/RMA, rolling extremes, PSAR …) are written as plain
+  loops and JIT-compiled with numba when it is installed; without numba the
+  EMA/RMA family runs on pandas' compiled ewm and PSAR stays a Python loop.
+• Outputs reproduce the pandas_ta (0.3.14b) default formulas and column
+  names, e.g. EMA_10, ATRr_14, MACD_12_26_9 / MACDh_… / MACDs_…, so results
+  can be checked against pandas_ta directly (see benchmarks/bench_indicators.py).
+
+Every kernel takes a mapping of arrays (open/high/low/close/volume, plus
+`time` in epoch-ns for VWAP) – a candle DataFrame works too – and returns
+{column name: float64 array} aligned with the input.
+
+Usage
+-----
+>>> from utils.indicator_kernels import compute, compute_many
+>>> cols = compute("ADX", candles, length=14)       # {"ADX_14": …, "DMP_14": …}
+>>> cols = compute_many(candles, [("EMA", {"length": 5}), "RSI", "PSAR"])
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Any, Callable, Dict, Iterable, Mapping
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+except ImportError:  # optional – NumPy/pandas paths are used instead
+    njit = None
+
+NUMBA = njit is not None
+WINDOW_CHUNK = 1 << 18  # rows per sliding-window block (bounds temp memory)
+_EPS = sys.float_info.epsilon
+
+
+def _jit(fn):
+    return njit(cache=True, nogil=True)(fn) if NUMBA else fn
+
+
+# ======================== loop kernels (numba when available) ====================
+@_jit
+def _ewma_loop(x, alpha):
+    """pandas ewm(alpha, adjust=False).mean() starting at the first valid value."""
+    out = np.full(x.size, np.nan)
+    i = 0
+    while i < x.size and np.isnan(x[i]):
+        i += 1
+    if i == x.size:
+        return out
+    out[i] = x[i]
+    for j in range(i + 1, x.size):
+        out[j] = alpha * x[j] + (1.0 - alpha) * out[j - 1]
+    return out
+
+
+@_jit
+def _rma_loop(x, n):
+    """pandas ewm(alpha=1/n, adjust=True, min_periods=n).mean()."""
+    out = np.full(x.size, np.nan)
+    decay = 1.0 - 1.0 / n
+    num = den = 0.0
+    count = 0
+    for j in range(x.size):
+        if np.isnan(x[j]):
+            if count == 0:
+                continue
+            num *= decay
+            den *= decay
+        else:
+            num = x[j] + decay * num
+            den = 1.0 + decay * den
+            count += 1
+        if count >= n:
+            out[j] = num / den
+    return out
+
+
+@_jit
+def _rolling_extreme_loop(x, n, is_max):
+    """Rolling max/min over n values via a monotonic deque; NaN in window → NaN."""
+    out = np.full(x.size, np.nan)
+    dq = np.empty(x.size, dtype=np.int64)
+    head = tail = 0
+    last_nan = -1
+    for j in range(x.size):
+        v = x[j]
+        if np.isnan(v):
+            last_nan = j
+            head = tail = 0
+        else:
+            while tail > head and (
+                (is_max and x[dq[tail - 1]] <= v)
+                or (not is_max and x[dq[tail - 1]] >= v)
+            ):
+                tail -= 1
+            dq[tail] = j
+            tail += 1
+        while tail > head and dq[head] <= j - n:
+            head += 1
+        if j >= n - 1 and last_nan <= j - n:
+            out[j] = x[dq[head]]
+    return out
+
+
+@_jit
+def _psar_loop(high, low, first_sar, falling, af0, af_step, max_af):
+    m = high.size
+    long = np.full(m, np.nan)
+    short = np.full(m, np.nan)
+    afs = np.zeros(m)
+    reversal = np.zeros(m)
+    afs[: min(2, m)] = af0
+    af = af0
+    sar = first_sar
+    ep = low[0] if falling else high[0]
+    for i in range(1, m):
+        nxt = sar + af * (ep - sar)
+        if falling:
+            reverse = high[i] > nxt
+            if low[i] < ep:
+                ep = low[i]
+                af = min(af + af_step, max_af)
+            nxt = max(high[i - 1], nxt)
+        else:
+            reverse = low[i] < nxt
+            if high[i] > ep:
+                ep = high[i]
+                af = min(af + af_step, max_af)
+            nxt = min(low[i - 1], nxt)
+        if reverse:
+            nxt = ep
+            af = af0
+            falling = not falling
+            ep = low[i] if falling else high[i]
+        sar = nxt
+        if falling:
+            short[i] = sar
+        else:
+            long[i] = sar
+        afs[i] = af
+        reversal[i] = 1.0 if reverse else 0.0
+    return long, short, afs, reversal
+
+
+# ======================== primitives =============================================
+def _windowed(x: np.ndarray, n: int, reduce: Callable) -> np.ndarray:
+    """reduce(windows) over every full n-window, in bounded-memory chunks."""
+    out = np.full(x.size, np.nan)
+    last = x.size - n + 1
+    for start in range(0, max(last, 0), WINDOW_CHUNK):
+        stop = min(start + WINDOW_CHUNK, last)
+        out[start + n - 1 : stop + n - 1] = reduce(
+            sliding_window_view(x[start : stop + n - 1], n)
+        )
+    return out
+
+
+def shift(x: np.ndarray, k: int = 1) -> np.ndarray:
+    out = np.full(x.size, np.nan)
+    if k >= 0:
+        out[k:] = x[: x.size - k]
+    else:
+        out[:k] = x[-k:]
+    return out
+
+
+def rolling_sum(x: np.ndarray, n: int) -> np.ndarray:
+    """Sum of the last n values (NaN while any of them is NaN)."""
+    out = np.full(x.size, np.nan)
+    if x.size < n:
+        return out
+    missing = np.isnan(x)
+    valid = x[~missing]
+    offset = valid[0] if valid.size else 0.0  # keeps cumulative sums small
+    cs = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, x - offset))))
+    cn = np.concatenate(([0], np.cumsum(missing)))
+    sums = cs[n:] - cs[:-n] + n * offset
+    sums[(cn[n:] - cn[:-n]) > 0] = np.nan
+    out[n - 1 :] = sums
+    return out
+
+
+def sma(x: np.ndarray, n: int) -> np.ndarray:
+    return rolling_sum(x, n) / n
+
+
+def rolling_max(x: np.ndarray, n: int) -> np.ndarray:
+    if NUMBA:
+        return _rolling_extreme_loop(x, n, True)
+    return _windowed(x, n, lambda w: w.max(axis=1))
+
+
+def rolling_min(x: np.ndarray, n: int) -> np.ndarray:
+    if NUMBA:
+        return _rolling_extreme_loop(x, n, False)
+    return _windowed(x, n, lambda w: w.min(axis=1))
+
+
+def rolling_std(x: np.ndarray, n: int, ddof: int = 0) -> np.ndarray:
+    return _windowed(x, n, lambda w: w.std(axis=1, ddof=ddof))
+
+
+def rolling_mad(x: np.ndarray, n: int) -> np.ndarray:
+    """Mean absolute deviation from the window mean."""
+    return _windowed(x, n, lambda w: np.abs(w - w.mean(axis=1, keepdims=True)).mean(1))
+
+
+def ewma(x: np.ndarray, alpha: float) -> np.ndarray:
+    if NUMBA:
+        return _ewma_loop(x, alpha)
+    return pd.Series(x).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def ema(x: np.ndarray, n: int) -> np.ndarray:
+    """EMA seeded with the mean of the first n values (pandas_ta default)."""
+    x = np.array(x, dtype=np.float64)
+    if x.size < n:
+        return np.full(x.size, np.nan)
+    head = x[:n]
+    head = head[~np.isnan(head)]
+    x[n - 1] = head.mean() if head.size else np.nan
+    x[: n - 1] = np.nan
+    return ewma(x, 2.0 / (n + 1))
+
+
+def rma(x: np.ndarray, n: int) -> np.ndarray:
+    """Wilder's moving average (pandas_ta rma)."""
+    if NUMBA:
+        return _rma_loop(np.asarray(x, dtype=np.float64), n)
+    return pd.Series(x).ewm(alpha=1.0 / n, min_periods=n).mean().to_numpy()
+
+
+def wma(x: np.ndarray, n: int) -> np.ndarray:
+    out = np.full(x.size, np.nan)
+    if x.size >= n:
+        w = np.arange(1, n + 1, dtype=np.float64)
+        out[n - 1 :] = np.convolve(x, w[::-1], mode="valid") / w.sum()
+    return out
+
+
+def true_range(high, low, close) -> np.ndarray:
+    pc = shift(close)
+    tr = np.fmax(high - low, np.fmax(np.abs(high - pc), np.abs(pc - low)))
+    tr[:1] = np.nan
+    return tr
+
+
+def _non_zero_range(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    diff = a - b
+    if np.any(diff == 0):
+        diff = diff + _EPS
+    return diff
+
+
+def _ma(mode: str, x: np.ndarray, n: int) -> np.ndarray:
+    try:
+        return {"sma": sma, "ema": ema, "wma": wma, "rma": rma}[mode.lower()](x, n)
+    except KeyError:
+        raise ValueError(f"[Indicators] Unknown moving-average mode: {mode}")
+
+
+# ======================== kernels ================================================
+def _series(ohlcv, price: str) -> np.ndarray:
+    return np.asarray(ohlcv[str(price).lower()], dtype=np.float64)
+
+
+def _hlc(ohlcv):
+    return _series(ohlcv, "high"), _series(ohlcv, "low"), _series(ohlcv, "close")
+
+
+def _k_sma(ohlcv, length=10, price="close"):
+    return {f"SMA_{length}": sma(_series(ohlcv, price), int(length))}
+
+
+def _k_ema(ohlcv, length=10, price="close"):
+    return {f"EMA_{length}": ema(_series(ohlcv, price), int(length))}
+
+
+def _k_wma(ohlcv, length=10, price="close"):
+    return {f"WMA_{length}": wma(_series(ohlcv, price), int(length))}
+
+
+def _k_dema(ohlcv, length=10, price="close"):
+    n = int(length)
+    e1 = ema(_series(ohlcv, price), n)
+    return {f"DEMA_{length}": 2 * e1 - ema(e1, n)}
+
+
+def _k_tema(ohlcv, length=10, price="close"):
+    n = int(length)
+    e1 = ema(_series(ohlcv, price), n)
+    e2 = ema(e1, n)
+    return {f"TEMA_{length}": 3 * (e1 - e2) + ema(e2, n)}
+
+
+def _k_hma(ohlcv, length=10, price="close"):
+    n = int(length)
+    x = _series(ohlcv, price)
+    raw = 2 * wma(x, n // 2) - wma(x, n)
+    return {f"HMA_{length}": wma(raw, int(np.sqrt(n)))}
+
+
+def _k_bbands(ohlcv, length=5, std=2.0, ddof=0, mamode="sma", price="close"):
+    n = int(length)
+    x = _series(ohlcv, price)
+    dev = float(std) * rolling_std(x, n, int(ddof))
+    mid = _ma(mamode, x, n)
+    lower, upper = mid - dev, mid + dev
+    width = _non_zero_range(upper, lower)
+    tag = f"{length}_{float(std)}"
+    return {
+        f"BBL_{tag}": lower,
+        f"BBM_{tag}": mid,
+        f"BBU_{tag}": upper,
+        f"BBB_{tag}": 100 * width / mid,
+        f"BBP_{tag}": _non_zero_range(x, lower) / width,
+    }
+
+
+def _k_atr(ohlcv, length=14, mamode="rma"):
+    return {f"ATRr_{length}": _ma(mamode, true_range(*_hlc(ohlcv)), int(length))}
+
+
+def _k_adx(ohlcv, length=14, lensig=None, scalar=100):
+    n = int(length)
+    lensig = n if lensig is None else int(lensig)
+    h, l, c = _hlc(ohlcv)
+    atr = rma(true_range(h, l, c), n)
+    up, dn = h - shift(h), shift(l) - l
+    with np.errstate(invalid="ignore"):
+        pos = ((up > dn) & (up > 0)) * up
+        neg = ((dn > up) & (dn > 0)) * dn
+    pos[np.abs(pos) < _EPS] = 0.0
+    neg[np.abs(neg) < _EPS] = 0.0
+    k = scalar / atr
+    dmp, dmn = k * rma(pos, n), k * rma(neg, n)
+    dx = scalar * np.abs(dmp - dmn) / (dmp + dmn)
+    return {
+        f"ADX_{lensig}": rma(dx, lensig),
+        f"DMP_{length}": dmp,
+        f"DMN_{length}": dmn,
+    }
+
+
+def _rsi(x: np.ndarray, n: int, scalar=100) -> np.ndarray:
+    d = x - shift(x)
+    up = rma(np.where(d > 0, d, np.where(np.isnan(d), np.nan, 0.0)), n)
+    down = rma(np.where(d < 0, -d, np.where(np.isnan(d), np.nan, 0.0)), n)
+    return scalar * up / (up + down)
+
+
+def _k_rsi(ohlcv, length=14, scalar=100, price="close"):
+    return {f"RSI_{length}": _rsi(_series(ohlcv, price), int(length), scalar)}
+
+
+def _k_stoch(ohlcv, k=14, d=3, smooth_k=3):
+    h, l, c = _hlc(ohlcv)
+    lo, hi = rolling_min(l, int(k)), rolling_max(h, int(k))
+    stoch_k = sma(100 * (c - lo) / _non_zero_range(hi, lo), int(smooth_k))
+    tag = f"{k}_{d}_{smooth_k}"
+    return {f"STOCHk_{tag}": stoch_k, f"STOCHd_{tag}": sma(stoch_k, int(d))}
+
+
+def _k_stochrsi(ohlcv, length=14, rsi_length=14, k=3, d=3, price="close"):
+    r = _rsi(_series(ohlcv, price), int(rsi_length))
+    lo, hi = rolling_min(r, int(length)), rolling_max(r, int(length))
+    stoch_k = sma(100 * (r - lo) / _non_zero_range(hi, lo), int(k))
+    tag = f"{length}_{rsi_length}_{k}_{d}"
+    return {f"STOCHRSIk_{tag}": stoch_k, f"STOCHRSId_{tag}": sma(stoch_k, int(d))}
+
+
+def _k_willr(ohlcv, length=14):
+    h, l, c = _hlc(ohlcv)
+    lo, hi = rolling_min(l, int(length)), rolling_max(h, int(length))
+    return {f"WILLR_{length}": 100 * ((c - lo) / (hi - lo) - 1)}
+
+
+def _k_cci(ohlcv, length=14, c=0.015):
+    n = int(length)
+    tp = sum(_hlc(ohlcv)) / 3.0
+    return {f"CCI_{length}_{c}": (tp - sma(tp, n)) / (c * rolling_mad(tp, n))}
+
+
+def _k_roc(ohlcv, length=10, scalar=100, price="close"):
+    x = _series(ohlcv, price)
+    prev = shift(x, int(length))
+    return {f"ROC_{length}": scalar * (x - prev) / prev}
+
+
+def _k_mom(ohlcv, length=10, price="close"):
+    x = _series(ohlcv, price)
+    return {f"MOM_{length}": x - shift(x, int(length))}
+
+
+def _k_trix(ohlcv, length=30, signal=9, scalar=100, price="close"):
+    n = int(length)
+    e3 = ema(ema(ema(_series(ohlcv, price), n), n), n)
+    trix = scalar * (e3 / shift(e3) - 1)
+    return {
+        f"TRIX_{length}_{signal}": trix,
+        f"TRIXs_{length}_{signal}": sma(trix, int(signal)),
+    }
+
+
+def _macd(x, fast, slow, signal, mode):
+    line = _ma(mode, x, fast) - _ma(mode, x, slow)
+    sig = np.full(x.size, np.nan)
+    valid = np.flatnonzero(~np.isnan(line))
+    if valid.size:  # signal starts where the MACD line does
+        sig[valid[0] :] = _ma(mode, line[valid[0] :], signal)
+    return line, line - sig, sig
+
+
+def _k_macd(ohlcv, fast=12, slow=26, signal=9, price="close"):
+    line, hist, sig = _macd(
+        _series(ohlcv, price), int(fast), int(slow), int(signal), "ema"
+    )
+    tag = f"{fast}_{slow}_{signal}"
+    return {f"MACD_{tag}": line, f"MACDh_{tag}": hist, f"MACDs_{tag}": sig}
+
+
+def _k_macdext(ohlcv, fast=12, slow=26, signal=9, mamode="sma", price="close"):
+    """MACD over any moving average (TA-Lib MACDEXT; its default MA is SMA)."""
+    line, hist, sig = _macd(
+        _series(ohlcv, price), int(fast), int(slow), int(signal), mamode
+    )
+    tag = f"{fast}_{slow}_{signal}"
+    return {f"MACDEXT_{tag}": line, f"MACDEXTh_{tag}": hist, f"MACDEXTs_{tag}": sig}
+
+
+def _k_obv(ohlcv):
+    c = _series(ohlcv, "close")
+    sign = np.sign(c - shift(c))
+    sign[:1] = 1
+    return {"OBV": np.cumsum(sign * _series(ohlcv, "volume"))}
+
+
+def _k_vwap(ohlcv, anchor="D"):
+    if "time" not in ohlcv:
+        raise ValueError("[Indicators] VWAP needs a `time` column (epoch-ns).")
+    h, l, c = _hlc(ohlcv)
+    vol = _series(ohlcv, "volume")
+    times = pd.DatetimeIndex(_epoch_ns(ohlcv["time"]).astype("datetime64[ns]"))
+    period = times.to_period(anchor).asi8
+    starts = np.flatnonzero(np.r_[True, period[1:] != period[:-1]])
+    lengths = np.diff(np.r_[starts, period.size])
+
+    def anchored_cumsum(x):
+        cs = np.cumsum(x)
+        before = np.r_[0.0, cs[starts[1:] - 1]]
+        return cs - np.repeat(before, lengths)
+
+    return {
+        f"VWAP_{anchor}": anchored_cumsum((h + l + c) / 3.0 * vol)
+        / anchored_cumsum(vol)
+    }
+
+
+def _k_vol(ohlcv, length=20):
+    vol = _series(ohlcv, "volume")
+    return {"VOL": vol, f"VOL_SMA_{length}": sma(vol, int(length))}
+
+
+def _psar(ohlcv, af0, af, max_af):
+    h, l, c = _hlc(ohlcv)
+    if not h.size:
+        empty = np.full(0, np.nan)
+        return empty, empty, empty, empty
+    falling = False
+    if h.size > 1:  # pandas_ta _falling(): is the first move a down-move?
+        up, dn = h[1] - h[0], l[0] - l[1]
+        falling = bool(dn > up and dn > 0)
+    return _psar_loop(h, l, c[0], falling, float(af0), float(af), float(max_af))
+
+
+def _k_psar(ohlcv, af0=0.02, af=0.02, max_af=0.2):
+    long, short, afs, reversal = _psar(ohlcv, af0, af, max_af)
+    tag = f"{af0}_{max_af}"
+    return {
+        f"PSARl_{tag}": long,
+        f"PSARs_{tag}": short,
+        f"PSARaf_{tag}": afs,
+        f"PSARr_{tag}": reversal,
+    }
+
+
+def _k_sar(ohlcv, af0=0.02, af=0.02, max_af=0.2):
+    """PSAR as one line: the long value in up-trends, the short one otherwise."""
+    long, short, _, _ = _psar(ohlcv, af0, af, max_af)
+    return {f"SAR_{af0}_{max_af}": np.where(np.isnan(long), short, long)}
+
+
+def _k_donch(ohlcv, lower_length=20, upper_length=20):
+    lo = rolling_min(_series(ohlcv, "low"), int(lower_length))
+    hi = rolling_max(_series(ohlcv, "high"), int(upper_length))
+    tag = f"{lower_length}_{upper_length}"
+    return {f"DCL_{tag}": lo, f"DCM_{tag}": 0.5 * (lo + hi), f"DCU_{tag}": hi}
+
+
+def _k_keltner(ohlcv, length=20, scalar=2, mamode="ema", tr=True):
+    n = int(length)
+    h, l, c = _hlc(ohlcv)
+    basis = _ma(mamode, c, n)
+    band = _ma(mamode, true_range(h, l, c) if tr else h - l, n)
+    tag = f"{mamode.lower()[0]}_{length}_{scalar}"
+    return {
+        f"KCL{tag}": basis - scalar * band,
+        f"KCB{tag}": basis,
+        f"KCU{tag}": basis + scalar * band,
+    }
+
+
+def _k_ichimoku(ohlcv, tenkan=9, kijun=26, senkou=52):
+    h, l, c = _hlc(ohlcv)
+
+    def midprice(n):
+        return 0.5 * (rolling_max(h, n) + rolling_min(l, n))
+
+    conv, base = midprice(int(tenkan)), midprice(int(kijun))
+    return {
+        f"ISA_{tenkan}": shift(0.5 * (conv + base), int(kijun)),
+        f"ISB_{kijun}": shift(midprice(int(senkou)), int(kijun)),
+        f"ITS_{tenkan}": conv,
+        f"IKS_{kijun}": base,
+        f"ICS_{kijun}": shift(c, -int(kijun)),  # lagging span (looks ahead)
+    }
+
+
+KERNELS: Dict[str, Callable[..., Dict[str, np.ndarray]]] = {
+    "SMA": _k_sma,
+    "EMA": _k_ema,
+    "WMA": _k_wma,
+    "DEMA": _k_dema,
+    "TEMA": _k_tema,
+    "HMA": _k_hma,
+    "BBANDS": _k_bbands,
+    "ATR": _k_atr,
+    "ADX": _k_adx,
+    "RSI": _k_rsi,
+    "STOCH": _k_stoch,
+    "STOCHRSI": _k_stochrsi,
+    "WILLR": _k_willr,
+    "CCI": _k_cci,
+    "ROC": _k_roc,
+    "MOM": _k_mom,
+    "TRIX": _k_trix,
+    "MACD": _k_macd,
+    "MACDEXT": _k_macdext,
+    "OBV": _k_obv,
+    "VWAP": _k_vwap,
+    "VOL": _k_vol,
+    "PSAR": _k_psar,
+    "DONCH": _k_donch,
+    "KELTNER": _k_keltner,
+    "ICHIMOKU": _k_ichimoku,
+    "SAR": _k_sar,
+}
+
+
+# ======================== public helpers =========================================
+def as_arrays(candles) -> Dict[str, Any]:
+    """
+    Candle DataFrame / column mapping / structured array → {name: float64
+    ndarray}. `time` is passed through and only converted where needed.
+    """
+    names = getattr(getattr(candles, "dtype", None), "names", None) or candles
+    cols = {}
+    for name in ("open", "high", "low", "close", "volume"):
+        if name in names:
+            cols[name] = np.asarray(candles[name], dtype=np.float64)
+    if "time" in names:
+        cols["time"] = candles["time"]
+    return cols
+
+
+def _epoch_ns(t) -> np.ndarray:
+    if isinstance(t, pd.Series) or np.asarray(t).dtype.kind == "M":
+        return pd.DatetimeIndex(t).as_unit("ns").asi8
+    return np.asarray(t, dtype=np.int64)
+
+
+def normalise_spec(spec) -> tuple:
+    """ "EMA" | ("EMA", {"length": 5}) | {"indicator": "EMA", "length": 5} → (name, params)."""
+    if isinstance(spec, str):
+        name, params = spec, {}
+    elif isinstance(spec, Mapping):
+        params = dict(spec)
+        name = params.pop("indicator")
+    else:
+        name, params = spec
+    name = name.upper()
+    if name not in KERNELS:
+        raise NotImplementedError(
+            f"Local fallback for {name} not implemented – request Labs instead."
+        )
+    return name, dict(params)
+
+
+def compute(indicator: str, candles, **params) -> Dict[str, np.ndarray]:
+    name, _ = normalise_spec(indicator)
+    return KERNELS[name](as_arrays(candles), **params)
+
+
+def compute_many(candles, specs: Iterable) -> Dict[str, np.ndarray]:
+    """All specs over one candle window, as a single {column: array} dict."""
+    specs = [normalise_spec(spec) for spec in specs]
+    ohlcv = as_arrays(candles)
+    out: Dict[str, Any] = {}
+    for name, params in specs:
+        out.update(KERNELS[name](ohlcv, **params))
+    return out
+
+
+__all__ = [
+    "KERNELS",
+    "NUMBA",
+    "as_arrays",
+    "compute",
+    "compute_many",
+    "normalise_spec",
+    "ema",
+    "rma",
+    "sma",
+    "wma",
+    "true_range",
+    "rolling_max",
+    "rolling_min",
+]
@@ -27,27 +27,37 @@ Usage
 ...                         price="close",
 ...                         granularity="H1")
 
-The call tries Labs first → falls back to pandas_ta if needed.
+The call tries Labs first → falls back to a local computation if needed;
+the fallback fetches candles, so it needs `client=` (an OANDA API client).
+
+get_indicators() computes several indicators for one instrument/timeframe
+from a single candle window and returns them as one DataFrame:
+
+>>> frame = get_indicators("EUR_USD", "M5", [("EMA", {"length": 5}),
+...                                          ("EMA", {"length": 20}), "RSI"],
+...                        client=client)
+>>> frame[["EMA_5", "EMA_20", "RSI_14"]].iloc[-1]
 """
 
 from __future__ import annotations
 
-import hashlib
+import inspect
 import json
-import os
-import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable
 
 import pandas as pd
-import pandas_ta as ta
 import requests
 
+from utils.cache import TTLCache
+from utils.indicator_kernels import KERNELS, compute_many, normalise_spec
+
 # ------------------------ config -------------------------------------------------
 CACHE_DIR = Path(".cache") / "labs_indicators"
-CACHE_DIR.mkdir(parents=True, exist_ok=True)
-
 CACHE_TTL_S = 15 * 60  # 15-minute freshness
+CACHE_MAX_ENTRIES = 512  # in-memory LRU bound
+CACHE_DISK_MAX_ENTRIES = 5000  # on-disk tier, evicted oldest-first
+LOCAL_LOOKBACK = 500  # candles behind every local computation
 LABS_URL = "https://labs.oanda.com/api/technicals/{ind}"
 INDICATORS = {
     "SMA",
@@ -85,8 +95,17 @@ class LabsError(RuntimeError):
     """Raised when a Labs request fails and no local fallback is possible."""
 
 
+# shared by every strategy thread; concurrent identical requests fetch once
+indicator_cache = TTLCache(
+    maxsize=CACHE_MAX_ENTRIES,
+    ttl=CACHE_TTL_S,
+    disk_dir=CACHE_DIR,
+    disk_max_entries=CACHE_DISK_MAX_ENTRIES,
+)
+
+
 # ------------------------ public helper ------------------------------------------
-def get_indicator(indicator: str, **params) -> Dict[str, Any]:
+def get_indicator(indicator: str, client=None, **params) -> Dict[str, Any]:
     """
     Fetch <indicator> values from OANDA Labs – OR compute locally on fallback.
 
@@ -94,6 +113,8 @@ def get_indicator(indicator: str, **params) -> Dict[str, Any]:
     ----------
     indicator : str
         One of the names in INDICATORS (case-insensitive).
+    client    : OANDA API client for the local fallback's candles; without
+                one a failed Labs call raises LabsError.
     **params  : key/value
         Whatever the Labs endpoint expects (instrument, length, price …)
 
@@ -108,21 +129,23 @@ def get_indicator(indicator: str, **params) -> Dict[str, Any]:
     if ind not in INDICATORS:
         raise ValueError(f"{indicator} not in supported list {sorted(INDICATORS)}")
 
-    cache_f = _cache_file(ind, params)
-    if cache_f.exists() and (time.time() - cache_f.stat().st_mtime) < CACHE_TTL_S:
-        return json.loads(cache_f.read_text())
+    key = f"{ind}:{json.dumps(params, sort_keys=True)}"
+    return indicator_cache.get_or_fetch(
+        key, lambda: _fetch_or_compute(ind, params, client)
+    )
+
+
+# ======================== internal helpers =======================================
 
+
+def _fetch_or_compute(ind: str, params: Dict[str, Any], client=None) -> Dict[str, Any]:
     # ---------- try Labs first ---------------------------------------------------
     try:
-        payload = _fetch_from_labs(ind, params)
-        cache_f.write_text(json.dumps(payload))
-        return payload
+        return _fetch_from_labs(ind, params)
     except Exception as exc:
         # ---------- fallback -----------------------------------------------------
         try:
-            payload = _compute_locally(ind, params)
-            cache_f.write_text(json.dumps(payload))
-            return payload
+            return _compute_locally(ind, params, client)
         except Exception as fallback_exc:
             raise LabsError(
                 f"Labs call failed ({exc!s}) and local fallback errored "
@@ -130,15 +153,6 @@ def get_indicator(indicator: str, **params) -> Dict[str, Any]:
             ) from fallback_exc
 
 
-# ======================== internal helpers =======================================
-
-
-def _cache_file(ind: str, params: Dict[str, Any]) -> Path:
-    key = f"{ind}:{json.dumps(params, sort_keys=True)}"
-    digest = hashlib.sha1(key.encode()).hexdigest()
-    return CACHE_DIR / f"{digest}.json"
-
-
 def _fetch_from_labs(ind: str, params: Dict[str, Any]) -> Dict[str, Any]:
     url = LABS_URL.format(ind=ind.lower())
     resp = requests.get(url, params=params, timeout=10)
@@ -146,48 +160,64 @@ def _fetch_from_labs(ind: str, params: Dict[str, Any]) -> Dict[str, Any]:
     return resp.json()
 
 
-def _compute_locally(ind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+def _compute_locally(ind: str, params: Dict[str, Any], client=None) -> Dict[str, Any]:
     """
-    Very small local implementation set based on pandas_ta.
-    Extend this dispatcher as needed.
+    Local fallback for one indicator – a one-spec get_indicators() call over
+    full OHLCV, passing on whichever Labs params the kernel understands.
     """
-    instrument = params.get("instrument")
-    gran = params.get("granularity", "D")
-    length = int(params.get("length", 14))
-    price_fld = params.get("price", "close").lower()
-
-    # --- you would normally fetch candles from OANDA REST here ------------------
-    from utils.price_tools import fetch_candle_data, get_pip_value  # lazy import
-
-    # Dummy token/env/account_id are irrelevant – price_tools handles auth.
-    # Fill these with real values in your app-context.
-    candles = fetch_candle_data(
-        client=None,  # sentinel – price_tools will build its own
-        instrument=instrument,
-        count=500,  # enough look-back for most studies
-        granularity=gran,
+    accepted = inspect.signature(KERNELS[ind]).parameters
+    spec = {k: v for k, v in params.items() if k in accepted}
+    spec["indicator"] = ind
+    frame = get_indicators(
+        params.get("instrument"), params.get("granularity", "D"), [spec], client=client
     )
+    values = frame.iloc[:, 1].dropna().tolist()  # first output column
+    return {"indicator": ind, "series": values, "source": "local"}
 
-    series = pd.Series(candles.values, name=price_fld)
-
-    dispatch = {
-        "SMA": lambda: ta.sma(series, length=length),
-        "EMA": lambda: ta.ema(series, length=length),
-        "WMA": lambda: ta.wma(series, length=length),
-        "RSI": lambda: ta.rsi(series, length=length),
-        "ATR": lambda: ta.atr(high=series, low=series, close=series, length=length),
-        "MACD": lambda: ta.macd(series).iloc[:, 0],  # MACD line
-        "STOCH": lambda: ta.stoch(high=series, low=series, close=series).iloc[:, 0],
-        # add more local fall-backs here …
-    }
-
-    if ind not in dispatch:
-        raise NotImplementedError(
-            f"Local fallback for {ind} not implemented – request Labs instead."
-        )
 
-    values = dispatch[ind]().dropna().tolist()
-    return {"indicator": ind, "series": values, "source": "local"}
+# ======================== batch API ==============================================
+def get_indicators(
+    instrument: str,
+    granularity: str,
+    specs: Iterable,
+    count: int = LOCAL_LOOKBACK,
+    client=None,
+) -> pd.DataFrame:
+    """
+    Several indicators for one instrument/timeframe from a single candle window.
+
+    specs : iterable of "EMA", ("EMA", {"length": 5}) or {"indicator": "EMA",
+            "length": 5}. Optional "price" picks the source column (close).
+
+    Returns one DataFrame: `time` plus one column per output, named like
+    pandas_ta (EMA_5, RSI_14, MACD_12_26_9 / MACDh_… / MACDs_…, …).
+    Values come from utils/indicator_kernels, over candles synced through
+    `client` first – never over whatever happens to be stored.
 
+    >>> get_indicators("EUR_USD", "M5", [("EMA", {"length": 5}),
+    ...                                  ("EMA", {"length": 20}), "RSI"],
+    ...                client=client)
+    """
+    from utils.candle_store import get_candle_store  # lazy import
 
-__all__ = ["get_indicator", "INDICATORS", "LabsError"]
+    specs = [normalise_spec(spec) for spec in specs]
+    if client is None:
+        raise ValueError(
+            "[Indicators] get_indicators needs an OANDA client to sync candles "
+            "(utils.api_client.get_client(token, environment))."
+        )
+    candles = get_candle_store().candles(
+        client, instrument, granularity, count, price="M"
+    )
+    frame = pd.DataFrame(compute_many(candles, specs), index=candles.index)
+    frame.insert(0, "time", candles["time"])
+    return frame
+
+
+__all__ = [
+    "get_indicator",
+    "get_indicators",
+    "INDICATORS",
+    "LabsError",
+    "indicator_cache",
+]
@@ -0,0 +1,220 @@
+# utils/instruments.py
+"""
+Instrument metadata registry: pip size, price precision and unit limits.
+
+• load() reads the account's instruments (GET /v3/accounts/{id}/instruments)
+  once and keeps them in a dict keyed by name – every lookup afterwards is
+  one dict get, no request.
+• The raw payload is persisted to .cache/instruments.json (tmp file +
+  os.replace). Within `max_age` (default a day) load() serves the file
+  instead of calling the API; an older file is refreshed, and still used
+  when the refresh fails (offline / rate limited).
+• Instruments the registry has not seen (back-tests without an account,
+  tests) fall back to the previous rules: pip 0.01 for JPY pairs else
+  0.0001, 5 decimals, whole units, at most MAX_POSITION_SIZE units.
+
+Usage
+-----
+>>> from utils.instruments import instruments
+>>> instruments.load(client, account_id)
+>>> inst = instruments.get("XAU_USD")
+>>> inst.pip, inst.display_precision, inst.max_units, inst.margin_rate
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+from oandapyV20.endpoints.accounts import AccountInstruments
+from oandapyV20.exceptions import V20Error
+
+# ------------------------ config -------------------------------------------------
+INSTRUMENTS_FILE = Path(".cache") / "instruments.json"
+REFRESH_AFTER_S = 24 * 3600  # instrument specs rarely change
+FALLBACK_DECIMALS = 5
+FALLBACK_MAX_UNITS = 100000  # former RiskManager cap, used for unknown instruments
+# ---------------------------------------------------------------------------------
+
+
+class Instrument:
+    __slots__ = (
+        "name",
+        "type",
+        "pip_location",
+        "pip",
+        "display_precision",
+        "trade_units_precision",
+        "min_units",
+        "max_units",
+        "margin_rate",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        type: str = "CURRENCY",
+        pip_location: int = -4,
+        display_precision: int = FALLBACK_DECIMALS,
+        trade_units_precision: int = 0,
+        min_units: float = 1.0,
+        max_units: float = FALLBACK_MAX_UNITS,
+        margin_rate: float = None,
+    ):
+        self.name = name
+        self.type = type
+        self.pip_location = pip_location
+        self.pip = 10.0**pip_location
+        self.display_precision = display_precision
+        self.trade_units_precision = trade_units_precision
+        self.min_units = min_units
+        self.max_units = max_units
+        self.margin_rate = margin_rate
+
+    @classmethod
+    def from_api(cls, spec: dict) -> "Instrument":
+        """One entry of the v20 instruments payload (numbers arrive as strings)."""
+        margin = spec.get("marginRate")
+        return cls(
+            name=spec["name"],
+            type=spec.get("type", "CURRENCY"),
+            pip_location=int(spec["pipLocation"]),
+            display_precision=int(spec["displayPrecision"]),
+            trade_units_precision=int(spec.get("tradeUnitsPrecision", 0)),
+            min_units=float(spec.get("minimumTradeSize", 1)),
+            max_units=float(spec.get("maximumOrderUnits", FALLBACK_MAX_UNITS)),
+            margin_rate=None if margin is None else float(margin),
+        )
+
+    @classmethod
+    def guess(cls, name: str) -> "Instrument":
+        """Stand-in for an instrument the registry has no data for."""
+        return cls(name, pip_location=-2 if "JPY" in name else -4)
+
+    def round_units(self, units: float) -> float:
+        """Units truncated towards zero to tradeUnitsPrecision (int when whole)."""
+        if self.trade_units_precision <= 0:
+            return int(units)
+        scale = 10.0**self.trade_units_precision
+        return math.trunc(units * scale) / scale
+
+    def __repr__(self):
+        return (
+            f"Instrument({self.name} pip={self.pip:g} "
+            f"precision={self.display_precision} units≤{self.max_units:g})"
+        )
+
+
+class InstrumentRegistry:
+    def __init__(
+        self,
+        path: Path | str = INSTRUMENTS_FILE,
+        max_age: float = REFRESH_AFTER_S,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.clock = clock
+        self._by_name: Dict[str, Instrument] = {}
+        self._guessed: Dict[str, Instrument] = {}
+        self._lock = threading.Lock()
+        self.loaded_at = None  # time of the payload in use (fetch or file mtime)
+
+    # -------------------------------- loading ------------------------------
+    def load(self, client, account_id: str, force: bool = False) -> int:
+        """
+        Instruments already in memory or in the file when fresh, else from the
+        API (and saved); a stale file is kept when the API call fails.
+        Returns the number of instruments.
+        """
+        if not force and self._by_name and not self.is_stale():
+            return len(self._by_name)
+        cached = self._read_file()
+        if cached is not None and not force:
+            payload, mtime = cached
+            if self.clock() - mtime < self.max_age:
+                return self._use(payload, mtime)
+        try:
+            payload = client.request(AccountInstruments(accountID=account_id))
+        except (V20Error, OSError) as e:
+            if cached is None:
+                raise RuntimeError(f"[Instruments] Could not load instruments: {e}")
+            print(f"[Instruments] Refresh failed, using saved instruments: {e}")
+            return self._use(*cached)
+        self._write_file(payload)
+        return self._use(payload, self.clock())
+
+    def load_file(self, path: Path | str = None) -> int:
+        """Instruments from a saved payload (fixtures, offline runs), no API call."""
+        payload = json.loads(Path(path or self.path).read_text())
+        return self._use(payload, self.clock())
+
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or self.clock() - self.loaded_at >= self.max_age
+
+    def _use(self, payload: dict, loaded_at: float) -> int:
+        parsed = {
+            spec["name"]: Instrument.from_api(spec)
+            for spec in payload.get("instruments", [])
+        }
+        with self._lock:
+            self._by_name = parsed
+            self._guessed = {}
+            self.loaded_at = loaded_at
+        return len(parsed)
+
+    def _read_file(self):
+        try:
+            return json.loads(self.path.read_text()), self.path.stat().st_mtime
+        except (OSError, ValueError):
+            return None
+
+    def _write_file(self, payload: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(payload))
+        os.replace(tmp, self.path)
+
+    # -------------------------------- lookups ------------------------------
+    def get(self, name: str) -> Instrument:
+        inst = self._by_name.get(name)
+        if inst is not None:
+            return inst
+        inst = self._guessed.get(name)
+        if inst is None:
+            inst = self._guessed[name] = Instrument.guess(name)
+        return inst
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def clear(self):
+        with self._lock:
+            self._by_name = {}
+            self._guessed = {}
+            self.loaded_at = None
+
+
+# shared by the live runtime, the back-tester and the price helpers
+instruments = InstrumentRegistry()
+
+
+def get_instrument(name: str) -> Instrument:
+    return instruments.get(name)
+
+
+__all__ = [
+    "Instrument",
+    "InstrumentRegistry",
+    "instruments",
+    "get_instrument",
+    "INSTRUMENTS_FILE",
+]
@@ -1,60 +1,117 @@
 # utils/price_tools.py
 
+import numpy as np
 import pandas as pd
-from oandapyV20.endpoints.instruments import InstrumentsCandles
+from utils.candle_store import get_candle_store, to_records
+from core.price_stream import quote_cache
+from utils.instruments import get_instrument
 from oandapyV20 import API
 from PySide6.QtWidgets import QMessageBox
 from oandapyV20.exceptions import V20Error
 from oandapyV20.endpoints.pricing import PricingInfo
 import sys
 
+# quotes pushed by core/price_stream are trusted for this long (seconds)
+STREAM_QUOTE_MAX_AGE = 60
+PRICE_DECIMALS = 5  # fallback when the instrument is unknown
+
 
 def get_pip_value(pair):
-    return 0.01 if "JPY" in pair else 0.0001
+    """10^pipLocation from the instrument registry (utils/instruments.py)."""
+    return get_instrument(pair).pip
+
+
+def price_decimals(pair) -> int:
+    """Decimals OANDA accepts on order prices for `pair` (displayPrecision)."""
+    return get_instrument(pair).display_precision
+
+
+def round_price(price: float, decimals: int = PRICE_DECIMALS) -> float:
+    """Order price rounding (half to even on price·10^decimals)."""
+    scale = 10.0**decimals
+    return round(price * scale) / scale
+
+
+def round_prices(prices: np.ndarray, decimals: int = PRICE_DECIMALS) -> np.ndarray:
+    """round_price() for a float array, in place – equal element for element."""
+    scale = 10.0**decimals
+    prices *= scale
+    np.rint(prices, out=prices)
+    prices /= scale
+    return prices
+
+
+def fetch_candles(
+    client: API,
+    instrument: str,
+    count: int = 100,
+    granularity: str = "M5",
+    price: str = "M",
+) -> np.ndarray:
+    """
+    Last `count` completed candles as one structured array: int64 epoch-ns
+    `time`, int64 `volume`, float64 open/high/low/close (plus bid_*/ask_*
+    fields for price="MBA" …). Reads through the shared candle store, so only
+    candles not yet recorded are requested; client=None serves stored data.
+    """
+    return to_records(
+        get_candle_store().columns(client, instrument, granularity, count, price)
+    )
+
+
+def fetch_candle_range(
+    client: API, instrument: str, start, end, granularity: str = "M5", price: str = "M"
+) -> np.ndarray:
+    """fetch_candles() for start <= time <= end; missing pages are downloaded in bulk."""
+    return to_records(
+        get_candle_store().columns_range(
+            client, instrument, granularity, start, end, price
+        )
+    )
 
 
 def fetch_candle_data(
     client: API, instrument: str, count: int = 100, granularity: str = "M5"
 ):
-    params = {"granularity": granularity, "count": count, "price": "M"}
-    r = InstrumentsCandles(instrument=instrument, params=params)
-    response = client.request(r)
-    if not response["candles"]:
-        raise RuntimeError(
-            f"No candle data returned for {instrument}. "
-            "Check instrument code or network connectivity."
-        )
-
-    closes = [
-        float(candle["mid"]["c"])
-        for candle in response["candles"]
-        if candle["complete"]
-    ]
-    return pd.Series(closes)
+    """Close prices of the last `count` completed candles (see fetch_candles)."""
+    cols = get_candle_store().columns(client, instrument, granularity, count, "M")
+    return pd.Series(np.array(cols["close"]))
 
 
 def calculate_ema(series: pd.Series, period: int):
     return series.ewm(span=period).mean().iloc[-1]
 
 
+def format_price(price: float, pair) -> str:
+    """Order-ready price string rounded to the instrument's precision."""
+    decimals = price_decimals(pair)
+    return f"{round_price(float(price), decimals):.{decimals}f}"
+
+
 def calculate_trailing_stop(
-    direction: str, current_price: float, pip_distance: float, pip_value: float
+    direction: str,
+    current_price: float,
+    pip_distance: float,
+    pip_value: float,
+    decimals: int = PRICE_DECIMALS,
 ):
     """
     Adjust the SL only in the profit direction
     """
     if direction == "Buy":
-        return round(current_price - pip_distance * pip_value, 5)
+        return round_price(current_price - pip_distance * pip_value, decimals)
     elif direction == "Sell":
-        return round(current_price + pip_distance * pip_value, 5)
+        return round_price(current_price + pip_distance * pip_value, decimals)
     else:
         raise ValueError("[Trailing SL] Invalid direction provided.")
 
 
 # Feth current price
-def fetch_current_price(token, account_id, environment, instrument):
+def fetch_current_price(client, account_id, instrument):
+    quote = quote_cache.get(instrument, max_age=STREAM_QUOTE_MAX_AGE)
+    if quote is not None:
+        return round_price(quote.mid, price_decimals(instrument))
     try:
-        client = API(access_token=token, environment=environment)
         params = {"instruments": instrument}
         r = PricingInfo(accountID=account_id, params=params)
         # utils/price_tools.py  – replace the bottom of fetch_current_price()
@@ -70,7 +127,7 @@ def fetch_current_price(token, account_id, environment, instrument):
 
         bid = float(prices[0]["bids"][0]["price"])
         ask = float(prices[0]["asks"][0]["price"])
-        return round((bid + ask) / 2, 5)
+        return round_price((bid + ask) / 2, price_decimals(instrument))
 
     except V20Error as e:
         if "PySide6" in sys.modules:
@@ -83,6 +140,9 @@ def fetch_current_price(token, account_id, environment, instrument):
 
 
 def is_market_open(client, account_id, instrument):
+    quote = quote_cache.get(instrument, max_age=STREAM_QUOTE_MAX_AGE)
+    if quote is not None:
+        return quote.tradeable
     try:
         params = {"instruments": instrument}
         r = PricingInfo(accountID=account_id, params=params)
@@ -95,3 +155,17 @@ def is_market_open(client, account_id, instrument):
     except V20Error as e:
         print(f"[Market Check] V20Error: {e}")
         return False
+
+
+async def is_market_open_async(client, account_id, instrument):
+    """is_market_open() for core/async_runtime.AsyncOandaClient."""
+    quote = quote_cache.get(instrument, max_age=STREAM_QUOTE_MAX_AGE)
+    if quote is not None:
+        return quote.tradeable
+    try:
+        r = PricingInfo(accountID=account_id, params={"instruments": instrument})
+        prices = (await client.request(r)).get("prices", [])
+        return bool(prices and "bids" in prices[0] and "asks" in prices[0])
+    except V20Error as e:
+        print(f"[Market Check] V20Error: {e}")
+        return False
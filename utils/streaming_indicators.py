@@ -0,0 +1,418 @@
+# utils/streaming_indicators.py
+"""
+Incremental (streaming) technical indicators.
+
+Every indicator is updated one candle at a time in O(1) time and memory
+(rolling max/min use monotonic deques → amortised O(1)) and reproduces the
+pandas_ta defaults it is named after:
+
+    EMA  SMA  WMA  RSI  ATR  MACD  STOCH  BBANDS  DONCH
+
+• update(close, high=None, low=None) → current value (None while warming up)
+• warm(closes, highs=None, lows=None) replays history once
+• multi-line indicators return tuples in pandas_ta column order
+
+IndicatorSet bundles the state for one instrument/timeframe so the live
+strategy loop, StopLossStrategy.ema_based_sl and the back-tester share it:
+
+>>> from utils.streaming_indicators import indicator_set
+>>> ind = indicator_set("EUR_USD", "M15")
+>>> ind.sync(client)                        # feeds only candles not seen yet
+>>> ind.get("EMA", length=20).value
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+WARMUP_BARS = 1000  # history kept per IndicatorSet for warm-starting new indicators
+
+
+class StreamingIndicator:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = None
+
+    @property
+    def ready(self) -> bool:
+        return self.value is not None
+
+    def update(self, close: float, high: float = None, low: float = None):
+        raise NotImplementedError
+
+    def warm(self, closes, highs=None, lows=None):
+        highs = closes if highs is None else highs
+        lows = closes if lows is None else lows
+        for c, h, l in zip(closes, highs, lows):
+            self.update(c, h, l)
+        return self.value
+
+
+# ------------------------ building blocks ----------------------------------------
+class _RMA:
+    """pandas ewm(alpha=1/length, adjust=True, min_periods=length).mean()."""
+
+    __slots__ = ("decay", "length", "num", "den", "count")
+
+    def __init__(self, length: int):
+        self.decay = 1.0 - 1.0 / length
+        self.length = length
+        self.num = self.den = 0.0
+        self.count = 0
+
+    def update(self, x: float) -> Optional[float]:
+        self.num = x + self.decay * self.num
+        self.den = 1.0 + self.decay * self.den
+        self.count += 1
+        return self.num / self.den if self.count >= self.length else None
+
+
+class _RollingExtreme:
+    """Rolling max (or min) over `length` values via a monotonic deque."""
+
+    __slots__ = ("length", "is_max", "items", "index")
+
+    def __init__(self, length: int, is_max: bool):
+        self.length = length
+        self.is_max = is_max
+        self.items = deque()  # (index, value), values monotonic
+        self.index = 0
+
+    def update(self, x: float) -> Optional[float]:
+        items = self.items
+        if self.is_max:
+            while items and items[-1][1] <= x:
+                items.pop()
+        else:
+            while items and items[-1][1] >= x:
+                items.pop()
+        items.append((self.index, x))
+        if items[0][0] <= self.index - self.length:
+            items.popleft()
+        self.index += 1
+        return items[0][1] if self.index >= self.length else None
+
+
+# ------------------------ moving averages ----------------------------------------
+class SMA(StreamingIndicator):
+    __slots__ = ("length", "window", "total", "count")
+
+    def __init__(self, length: int = 10):
+        super().__init__()
+        self.length = int(length)
+        self.window = deque(maxlen=self.length)
+        self.total = 0.0
+        self.count = 0
+
+    def update(self, close, high=None, low=None):
+        if len(self.window) == self.length:
+            self.total -= self.window[0]
+        self.window.append(close)
+        self.total += close
+        self.count += 1
+        if self.count % (self.length * 64) == 0:
+            self.total = sum(self.window)  # shed accumulated rounding drift
+        if len(self.window) == self.length:
+            self.value = self.total / self.length
+        return self.value
+
+
+class EMA(StreamingIndicator):
+    """pandas_ta ema(): SMA of the first `length` closes seeds ewm(adjust=False)."""
+
+    __slots__ = ("length", "alpha", "seed")
+
+    def __init__(self, length: int = 10):
+        super().__init__()
+        self.length = int(length)
+        self.alpha = 2.0 / (self.length + 1)
+        self.seed = []
+
+    def update(self, close, high=None, low=None):
+        if self.value is None:
+            self.seed.append(close)
+            if len(self.seed) == self.length:
+                self.value = sum(self.seed) / self.length
+                self.seed = []
+        else:
+            self.value += self.alpha * (close - self.value)
+        return self.value
+
+
+class WMA(StreamingIndicator):
+    """Linearly weighted (1..length, newest heaviest) moving average."""
+
+    __slots__ = ("length", "window", "total", "weighted", "divisor")
+
+    def __init__(self, length: int = 10):
+        super().__init__()
+        self.length = int(length)
+        self.window = deque(maxlen=self.length)
+        self.total = 0.0
+        self.weighted = 0.0
+        self.divisor = self.length * (self.length + 1) / 2.0
+
+    def update(self, close, high=None, low=None):
+        if len(self.window) == self.length:
+            # slide: every weight drops by one, the oldest value falls out
+            self.weighted += self.length * close - self.total
+            self.total += close - self.window[0]
+        else:
+            self.weighted += (len(self.window) + 1) * close
+            self.total += close
+        self.window.append(close)
+        if len(self.window) == self.length:
+            self.value = self.weighted / self.divisor
+        return self.value
+
+
+# ------------------------ oscillators / volatility -------------------------------
+class RSI(StreamingIndicator):
+    __slots__ = ("gains", "losses", "prev")
+
+    def __init__(self, length: int = 14):
+        super().__init__()
+        self.gains = _RMA(int(length))
+        self.losses = _RMA(int(length))
+        self.prev = None
+
+    def update(self, close, high=None, low=None):
+        if self.prev is not None:
+            change = close - self.prev
+            gain = self.gains.update(max(change, 0.0))
+            loss = self.losses.update(max(-change, 0.0))
+            if gain is not None:
+                denom = gain + loss
+                self.value = 100.0 * gain / denom if denom else None
+        self.prev = close
+        return self.value
+
+
+class ATR(StreamingIndicator):
+    __slots__ = ("rma", "prev_close")
+
+    def __init__(self, length: int = 14):
+        super().__init__()
+        self.rma = _RMA(int(length))
+        self.prev_close = None
+
+    def update(self, close, high=None, low=None):
+        high = close if high is None else high
+        low = close if low is None else low
+        if self.prev_close is not None:
+            hl = high - low
+            if hl == 0:
+                hl = sys.float_info.epsilon  # pandas_ta non_zero_range()
+            tr = max(abs(hl), abs(high - self.prev_close), abs(self.prev_close - low))
+            self.value = self.rma.update(tr)
+        self.prev_close = close
+        return self.value
+
+
+class MACD(StreamingIndicator):
+    """value → (macd, histogram, signal) like pandas_ta MACD_/MACDh_/MACDs_."""
+
+    __slots__ = ("fast", "slow", "signal")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        super().__init__()
+        if slow < fast:
+            fast, slow = slow, fast
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def update(self, close, high=None, low=None):
+        fast = self.fast.update(close)
+        slow = self.slow.update(close)
+        if slow is not None:
+            macd = fast - slow
+            signal = self.signal.update(macd)
+            if signal is not None:
+                self.value = (macd, macd - signal, signal)
+        return self.value
+
+
+class STOCH(StreamingIndicator):
+    """value → (%K, %D) like pandas_ta STOCHk_/STOCHd_."""
+
+    __slots__ = ("highest", "lowest", "smooth", "signal")
+
+    def __init__(self, k: int = 14, d: int = 3, smooth_k: int = 3):
+        super().__init__()
+        self.highest = _RollingExtreme(int(k), is_max=True)
+        self.lowest = _RollingExtreme(int(k), is_max=False)
+        self.smooth = SMA(smooth_k)
+        self.signal = SMA(d)
+
+    def update(self, close, high=None, low=None):
+        hh = self.highest.update(close if high is None else high)
+        ll = self.lowest.update(close if low is None else low)
+        if hh is not None:
+            rng = (hh - ll) or sys.float_info.epsilon
+            k = self.smooth.update(100.0 * (close - ll) / rng)
+            if k is not None:
+                d = self.signal.update(k)
+                if d is not None:
+                    self.value = (k, d)
+        return self.value
+
+
+class BBANDS(StreamingIndicator):
+    """value → (lower, mid, upper); population std (ddof=0) like pandas_ta."""
+
+    __slots__ = ("length", "std", "window", "shift", "total", "total_sq")
+
+    def __init__(self, length: int = 5, std: float = 2.0):
+        super().__init__()
+        self.length = int(length)
+        self.std = float(std)
+        self.window = deque(maxlen=self.length)
+        self.shift = None  # sums of (x - shift) avoid catastrophic cancellation
+        self.total = self.total_sq = 0.0
+
+    def update(self, close, high=None, low=None):
+        if self.shift is None:
+            self.shift = close
+        x = close - self.shift
+        if len(self.window) == self.length:
+            old = self.window[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.window.append(x)
+        self.total += x
+        self.total_sq += x * x
+        if len(self.window) == self.length:
+            mean = self.total / self.length
+            var = max(self.total_sq / self.length - mean * mean, 0.0)
+            mid = mean + self.shift
+            band = self.std * var**0.5
+            self.value = (mid - band, mid, mid + band)
+        return self.value
+
+
+class DONCH(StreamingIndicator):
+    """value → (lower, mid, upper) like pandas_ta DCL_/DCM_/DCU_."""
+
+    __slots__ = ("lowest", "highest")
+
+    def __init__(self, lower_length: int = 20, upper_length: int = 20):
+        super().__init__()
+        self.lowest = _RollingExtreme(int(lower_length), is_max=False)
+        self.highest = _RollingExtreme(int(upper_length), is_max=True)
+
+    def update(self, close, high=None, low=None):
+        lower = self.lowest.update(close if low is None else low)
+        upper = self.highest.update(close if high is None else high)
+        if lower is not None and upper is not None:
+            self.value = (lower, 0.5 * (lower + upper), upper)
+        return self.value
+
+
+INDICATOR_CLASSES = {
+    "SMA": SMA,
+    "EMA": EMA,
+    "WMA": WMA,
+    "RSI": RSI,
+    "ATR": ATR,
+    "MACD": MACD,
+    "STOCH": STOCH,
+    "BBANDS": BBANDS,
+    "DONCH": DONCH,
+}
+
+
+# ------------------------ per instrument/timeframe state -------------------------
+class IndicatorSet:
+    """All indicator state for one instrument/timeframe, fed candle by candle."""
+
+    def __init__(self, instrument: str, granularity: str):
+        self.instrument = instrument
+        self.granularity = granularity
+        self.last_time = None
+        self._history = deque(maxlen=WARMUP_BARS)  # (close, high, low)
+        self._indicators: Dict[Tuple, StreamingIndicator] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._indicators)
+
+    def get(self, name: str, **params) -> StreamingIndicator:
+        """Indicator instance for name/params – created and warm-started on first use."""
+        key = (name.upper(), tuple(sorted(params.items())))
+        with self._lock:
+            ind = self._indicators.get(key)
+            if ind is None:
+                try:
+                    cls = INDICATOR_CLASSES[key[0]]
+                except KeyError:
+                    raise ValueError(
+                        f"{name} not in streaming set {sorted(INDICATOR_CLASSES)}"
+                    )
+                ind = cls(**params)
+                for close, high, low in self._history:
+                    ind.update(close, high, low)
+                self._indicators[key] = ind
+            return ind
+
+    def update(self, candle) -> bool:
+        """Feed one completed candle (mapping with close/high/low[/time])."""
+        with self._lock:
+            t = candle.get("time") if hasattr(candle, "get") else None
+            if t is not None and self.last_time is not None and t <= self.last_time:
+                return False  # already seen
+            close = float(candle["close"])
+            high = float(candle.get("high", close))
+            low = float(candle.get("low", close))
+            self._history.append((close, high, low))
+            for ind in self._indicators.values():
+                ind.update(close, high, low)
+            if t is not None:
+                self.last_time = t
+            return True
+
+    def sync(self, client, count: int = WARMUP_BARS) -> int:
+        """Pull recent candles through the candle store; feed only unseen ones."""
+        from utils.candle_store import get_candle_store  # lazy import
+
+        candles = get_candle_store().candles(
+            client, self.instrument, self.granularity, count
+        )
+        return self.feed(candles)
+
+    def feed(self, candles) -> int:
+        """Feed a candle DataFrame (time/close/high/low); returns rows not seen yet."""
+        with self._lock:
+            if self.last_time is not None:
+                candles = candles[candles["time"] > self.last_time]
+            fed = 0
+            for row in candles[["time", "close", "high", "low"]].itertuples(
+                index=False
+            ):
+                fed += self.update(row._asdict())
+            return fed
+
+
+_sets: Dict[Tuple[str, str], IndicatorSet] = {}
+_sets_lock = threading.Lock()
+
+
+def indicator_set(instrument: str, granularity: str) -> IndicatorSet:
+    """Process-wide shared IndicatorSet for instrument/timeframe."""
+    with _sets_lock:
+        key = (instrument, granularity)
+        if key not in _sets:
+            _sets[key] = IndicatorSet(instrument, granularity)
+        return _sets[key]
+
+
+__all__ = [
+    "IndicatorSet",
+    "indicator_set",
+    "INDICATOR_CLASSES",
+    "StreamingIndicator",
+] + list(INDICATOR_CLASSES)
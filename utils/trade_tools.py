@@ -6,16 +6,15 @@ from oandapyV20.endpoints.trades import TradeCRCDO
 from oandapyV20.exceptions import V20Error
 from oandapyV20.endpoints.trades import OpenTrades
 from core.trade_manager import TradeManager
+from utils.price_tools import format_price
 
 
-def close_all_positions(token: str, account_id: str, environment: str = "practice"):
+def close_all_positions(client: API, account_id: str):
     """
     Closes all open positions (long and short) across all instruments.
     Returns a list of closed positions with details.
     """
     try:
-        client = API(access_token=token, environment=environment)
-
         # Fetch all open positions
         request = OpenPositions(accountID=account_id)
         response = client.request(request)
@@ -79,16 +78,22 @@ def close_all_trades_by_id(api_client, account_id):
 
 
 def update_trade_stop_loss(
-    api_client, account_id, trade_id, new_sl_price=None, new_tp_price=None
+    api_client,
+    account_id,
+    trade_id,
+    new_sl_price=None,
+    new_tp_price=None,
+    instrument="",
 ):
     """
-    Updates the stop loss and/or take profit for a given trade.
+    Updates the stop loss and/or take profit for a given trade; prices are
+    rounded to the instrument's displayPrecision.
     """
     data = {}
     if new_sl_price:
-        data["stopLoss"] = {"price": str(round(float(new_sl_price), 5))}
+        data["stopLoss"] = {"price": format_price(new_sl_price, instrument)}
     if new_tp_price:
-        data["takeProfit"] = {"price": str(round(float(new_tp_price), 5))}
+        data["takeProfit"] = {"price": format_price(new_tp_price, instrument)}
 
     if not data:
         raise ValueError(